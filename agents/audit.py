@@ -1,11 +1,55 @@
-
+import atexit
 import json
 import hashlib
 import os
+import queue
 import threading
-from datetime import datetime
-from typing import Any, Dict
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from agents.audit_checkpoint import (
+    ChainError,
+    CheckpointIndex,
+    merkle_path,
+    merkle_root,
+    segment_of,
+    verify_window,
+    walk_chain,
+)
+from agents.audit_segments import (
+    SegmentManifest,
+    TraceIndex,
+    compress_segment,
+    iter_lines,
+    open_segment,
+)
 from agents.base import NDRAAgent
+from config.settings import settings
+
+_DURABILITY_POLICIES = ("every_event", "interval", "batch")
+_VERIFY_MODES = ("full", "incremental", "parallel")
+
+# Upper bound on events drained into a single group-commit write.
+_MAX_COMMIT_BATCH = 1024
+
+
+def _iter_log_lines(paths: List[str]) -> Iterator[str]:
+    for path in paths:
+        with open_segment(path) as f:
+            for raw_line in f:
+                yield raw_line.decode("utf-8")
+
+
+def _index_keys(event: Any) -> Tuple[Optional[str], Optional[str]]:
+    """Extract the ``(trace_id, event_type)`` an audit event is indexed under."""
+    if not isinstance(event, dict):
+        return None, None
+    trace_id = event.get("trace_id")
+    if trace_id is None and isinstance(event.get("data"), dict):
+        trace_id = event["data"].get("trace_id")
+    return trace_id, event.get("event_type")
+
 
 class AuditAgent(NDRAAgent):
     """
@@ -14,17 +58,104 @@ class AuditAgent(NDRAAgent):
     The hash chain is persisted to disk so that it survives process restarts.
     Thread-safe: a lock protects the in-memory last_hash and the append write
     so that concurrent requests cannot corrupt the chain.
+
+    Group-commit mode (``group_commit=True`` or ``AUDIT_GROUP_COMMIT``):
+    callers enqueue events and a dedicated writer thread chains the hashes in
+    queue order, appending each drained batch with a single write on a
+    long-lived file handle.  ``durability`` controls when the batch is
+    fsync'd — see :class:`_GroupCommitWriter`.  The on-disk entry format and
+    the chain semantics checked by :meth:`verify_chain` are identical in both
+    modes.
+
+    Checkpoints (``checkpoint_interval`` / ``AUDIT_CHECKPOINT_INTERVAL``):
+    every N entries the agent seals a signed checkpoint recording the window's
+    byte range, chain hash and Merkle root (see
+    :class:`agents.audit_checkpoint.CheckpointIndex`).  These enable
+    incremental and parallel verification and O(log n) inclusion proofs.
+    Checkpoints are signed with ``checkpoint_key`` / ``AUDIT_CHECKPOINT_KEY``;
+    without a key checkpointing stays off, since a key stored beside the log
+    would let anyone able to rewrite the log re-sign it too.
+
+    Segments (``AUDIT_SEGMENT_MAX_BYTES`` / ``AUDIT_SEGMENT_MAX_AGE_SECONDS``):
+    the active log is sealed and renamed to ``<log>.NNNNNN`` once it grows
+    past the size or age limit, optionally gzip-compressed in the background.
+    The chain carries straight across segments — the first entry of a new
+    segment links to the last hash of the previous one — and a
+    :class:`agents.audit_segments.TraceIndex` maps ``trace_id`` and
+    ``event_type`` to (segment, offset) for :meth:`trace` lookups.
     """
-    def __init__(self, log_file: str = None):
+    def __init__(
+        self,
+        log_file: str = None,
+        group_commit: Optional[bool] = None,
+        durability: Optional[str] = None,
+        fsync_interval_ms: Optional[int] = None,
+        fsync_batch_size: Optional[int] = None,
+        checkpoint_interval: Optional[int] = None,
+        checkpoint_key: Optional[str] = None,
+        segment_max_bytes: Optional[int] = None,
+        segment_max_age_seconds: Optional[int] = None,
+        compress_segments: Optional[bool] = None,
+        trace_index: Optional[bool] = None,
+    ):
         super().__init__("AuditAgent")
         self.log_file = log_file or os.getenv("AUDIT_LOG_FILE", "audit.log")
         log_parent = os.path.dirname(self.log_file)
         if log_parent:
             os.makedirs(log_parent, exist_ok=True)
         self._lock = threading.Lock()
+
+        self.segment_max_bytes = (
+            settings.AUDIT_SEGMENT_MAX_BYTES if segment_max_bytes is None else segment_max_bytes
+        )
+        self.segment_max_age_seconds = (
+            settings.AUDIT_SEGMENT_MAX_AGE_SECONDS
+            if segment_max_age_seconds is None
+            else segment_max_age_seconds
+        )
+        self.compress_segments = (
+            settings.AUDIT_COMPRESS_SEALED_SEGMENTS if compress_segments is None else compress_segments
+        )
+        self._manifest = SegmentManifest(self.log_file)
+        self._segment = self._manifest.next_segment
+        self._compressors: List[threading.Thread] = []
+
         # Restore the last known hash from the existing log so the chain remains
         # unbroken across process restarts.
         self.last_hash = self._read_last_hash()
+        self._restore_segment_state()
+
+        use_trace_index = settings.AUDIT_TRACE_INDEX if trace_index is None else trace_index
+        self._trace_index: Optional[TraceIndex] = TraceIndex(self.log_file) if use_trace_index else None
+        self._pending_index_rows: List[Tuple[Optional[str], Optional[str], int, int, int]] = []
+
+        self.group_commit = settings.AUDIT_GROUP_COMMIT if group_commit is None else group_commit
+        self.durability = durability or settings.AUDIT_DURABILITY
+        if self.durability not in _DURABILITY_POLICIES:
+            raise ValueError(
+                f"Unknown audit durability policy '{self.durability}'. "
+                f"Use one of {list(_DURABILITY_POLICIES)}."
+            )
+        self.fsync_interval_ms = (
+            settings.AUDIT_FSYNC_INTERVAL_MS if fsync_interval_ms is None else fsync_interval_ms
+        )
+        self.fsync_batch_size = max(
+            1, settings.AUDIT_FSYNC_BATCH_SIZE if fsync_batch_size is None else fsync_batch_size
+        )
+
+        self.checkpoint_interval = (
+            settings.AUDIT_CHECKPOINT_INTERVAL if checkpoint_interval is None else checkpoint_interval
+        )
+        self.checkpoint_key = checkpoint_key or settings.AUDIT_CHECKPOINT_KEY
+        self._checkpoints: Optional[CheckpointIndex] = None
+        # Highest checkpoint seq already verified by an incremental pass.
+        self._verified_seq = -1
+        self._restore_checkpoint_window()
+
+        self._writer: Optional["_GroupCommitWriter"] = None
+        if self.group_commit:
+            self._writer = _GroupCommitWriter(self)
+            atexit.register(self.close)
 
     def _read_last_hash(self) -> str:
         """Read the last hash from the audit log to resume the chain after restart.
@@ -32,7 +163,8 @@ class AuditAgent(NDRAAgent):
         Reads from the end of the file so performance is O(1) regardless of
         log size rather than O(n).
         """
-        genesis = "0" * 64
+        # An empty active segment continues from the last sealed segment.
+        genesis = self._manifest.last_hash or "0" * 64
         if not os.path.exists(self.log_file):
             return genesis
         try:
@@ -62,44 +194,311 @@ class AuditAgent(NDRAAgent):
             self.logger.warning(f"Could not restore audit chain from log: {e}")
         return genesis
 
+    def _restore_segment_state(self) -> None:
+        """Recover the active segment's size, entry count and age after a restart."""
+        self._log_offset = 0
+        self._segment_entries = 0
+        self._segment_started = time.time()
+        if not os.path.exists(self.log_file):
+            return
+        first_line = b""
+        with open(self.log_file, "rb") as f:
+            for raw_line in f:
+                self._log_offset += len(raw_line)
+                if raw_line.strip():
+                    self._segment_entries += 1
+                    first_line = first_line or raw_line
+        if first_line:
+            try:
+                started = json.loads(first_line)["payload"]["timestamp"]
+                self._segment_started = (
+                    datetime.fromisoformat(started).replace(tzinfo=timezone.utc).timestamp()
+                )
+            except (ValueError, KeyError, TypeError):
+                pass
+
+    def _segment_path(self, segment: int) -> str:
+        if segment == self._segment:
+            return self.log_file
+        return self._manifest.sealed_path(segment)
+
+    def _segment_paths(self) -> List[str]:
+        paths = [self._manifest.sealed_path(s["segment"]) for s in self._manifest.segments]
+        if os.path.exists(self.log_file):
+            paths.append(self.log_file)
+        return paths
+
+    def _walk_segments(
+        self,
+        segment: int,
+        byte_start: int,
+        prev_hash: str,
+        index_start: int,
+    ) -> Iterator[Tuple[int, int, int, str]]:
+        """Walk the chain from ``(segment, byte_start)`` through the active segment.
+
+        Yields ``(segment, entry_num, end_offset, entry_hash)``; raises
+        :class:`ChainError` at the first broken entry, including a break at a
+        segment boundary.
+        """
+        entry_num = index_start
+        while segment <= self._segment:
+            path = self._segment_path(segment)
+            if os.path.exists(path):
+                for entry_num, end_offset, entry_hash in walk_chain(
+                    path, byte_start, None, prev_hash, entry_num
+                ):
+                    yield segment, entry_num, end_offset, entry_hash
+                    prev_hash = entry_hash
+            segment += 1
+            byte_start = 0
+
+    def _restore_checkpoint_window(self) -> None:
+        """Rebuild the unsealed checkpoint window after a restart.
+
+        Entries appended since the last checkpoint (or the whole log, the
+        first time checkpointing is enabled on an existing log) are re-hashed
+        and sealed into checkpoints as their windows fill up.  If that tail
+        fails verification, checkpointing is disabled for this process so a
+        broken chain is never signed; ``verify_chain`` will report the break.
+        """
+        if self.checkpoint_interval <= 0:
+            return
+        if not self.checkpoint_key:
+            self.logger.warning("Audit checkpointing disabled: AUDIT_CHECKPOINT_KEY is not set")
+            return
+
+        self._checkpoints = CheckpointIndex(self.log_file, key=self.checkpoint_key)
+        last = self._checkpoints.last
+        first_segment = self._manifest.segments[0]["segment"] if self._manifest.segments else self._segment
+        self._window_segment = segment_of(last) if last else first_segment
+        self._window_index = last["index_end"] if last else 0
+        self._window_byte = last["byte_end"] if last else 0
+        self._window_prev_hash = last["chain_hash"] if last else "0" * 64
+        self._window_hashes: List[str] = []
+
+        try:
+            last_end = self._window_byte
+            for segment, _, end_offset, entry_hash in self._walk_segments(
+                self._window_segment, self._window_byte, self._window_prev_hash, self._window_index
+            ):
+                if segment != self._window_segment:
+                    # Windows never span segments: seal the previous segment's remainder.
+                    if self._window_hashes:
+                        self._seal_window(last_end)
+                    self._window_segment, self._window_byte = segment, 0
+                self._window_hashes.append(entry_hash)
+                last_end = end_offset
+                if len(self._window_hashes) >= self.checkpoint_interval:
+                    self._seal_window(end_offset)
+        except ChainError as exc:
+            self.logger.error(f"Audit checkpointing disabled, log tail failed verification: {exc}")
+            self._checkpoints = None
+            return
+
+        if self._window_segment != self._segment:
+            if self._window_hashes:
+                self._seal_window(last_end)
+            self._window_segment, self._window_byte = self._segment, 0
+
+    def _note_appended(self, entry: Dict[str, Any], nbytes: int) -> None:
+        """Record an appended entry: trace-index row, offsets, checkpoint window."""
+        if self._trace_index is not None:
+            trace_id, event_type = _index_keys(entry["payload"]["event"])
+            if trace_id is not None or event_type is not None:
+                self._pending_index_rows.append(
+                    (trace_id, event_type, self._segment, self._log_offset, nbytes)
+                )
+
+        self._log_offset += nbytes
+        self._segment_entries += 1
+        if self._checkpoints is None:
+            return
+        self._window_hashes.append(entry["hash"])
+        if len(self._window_hashes) >= self.checkpoint_interval:
+            self._seal_window(self._log_offset)
+
+    def _flush_trace_index(self) -> None:
+        rows, self._pending_index_rows = self._pending_index_rows, []
+        if self._trace_index is not None and rows:
+            try:
+                self._trace_index.add(rows)
+            except Exception as e:
+                # The index is derived data; never fail an audit write over it.
+                self.logger.error(f"Audit trace index update failed: {e}")
+
+    def _seal_window(self, byte_end: int) -> None:
+        record = self._checkpoints.append(
+            segment=self._window_segment,
+            index_start=self._window_index,
+            byte_start=self._window_byte,
+            byte_end=byte_end,
+            prev_hash=self._window_prev_hash,
+            entry_hashes=self._window_hashes,
+        )
+        self._window_index = record["index_end"]
+        self._window_byte = byte_end
+        self._window_prev_hash = record["chain_hash"]
+        self._window_hashes = []
+
+    def _rotation_due(self) -> bool:
+        if self._segment_entries == 0:
+            return False
+        if self.segment_max_bytes > 0 and self._log_offset >= self.segment_max_bytes:
+            return True
+        return (
+            self.segment_max_age_seconds > 0
+            and time.time() - self._segment_started >= self.segment_max_age_seconds
+        )
+
+    def _rotate(self) -> None:
+        """Seal the active segment and start a new one.
+
+        Callers must hold ``_lock`` or be the group-commit writer, and must
+        have closed any handle open on the active file.
+        """
+        if self._checkpoints is not None and self._window_hashes:
+            self._seal_window(self._log_offset)
+
+        sealed = self._segment
+        sealed_path = f"{self.log_file}.{sealed:06d}"
+        os.replace(self.log_file, sealed_path)
+        self._manifest.append(
+            segment=sealed,
+            first_index=self._manifest.next_index,
+            entries=self._segment_entries,
+            last_hash=self.last_hash,
+        )
+
+        self._segment = sealed + 1
+        self._log_offset = 0
+        self._segment_entries = 0
+        self._segment_started = time.time()
+        if self._checkpoints is not None:
+            self._window_segment, self._window_byte = self._segment, 0
+        self.logger.info(f"Audit segment {sealed} sealed as {os.path.basename(sealed_path)}")
+
+        if self.compress_segments:
+            worker = threading.Thread(
+                target=self._compress_sealed, args=(sealed_path,), name="AuditSegmentCompressor", daemon=True
+            )
+            self._compressors = [t for t in self._compressors if t.is_alive()] + [worker]
+            worker.start()
+
+    def _compress_sealed(self, path: str) -> None:
+        try:
+            compress_segment(path)
+        except Exception as e:
+            self.logger.error(f"Audit segment compression failed for {path}: {e}")
+
+    def _build_entry(self, timestamp: str, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Chain *event* onto ``last_hash`` and return the log entry.
+
+        Callers must hold ``_lock`` (synchronous mode) or be the group-commit
+        writer thread, which is the only mutator of ``last_hash`` in that mode.
+        """
+        # Create canonical string for hashing
+        payload = {
+            "timestamp": timestamp,
+            "prev_hash": self.last_hash,
+            "event": event
+        }
+
+        # Serialize deterministically
+        payload_str = json.dumps(payload, sort_keys=True)
+
+        # Compute Hash (SHA-256)
+        curr_hash = hashlib.sha256(payload_str.encode("utf-8")).hexdigest()
+        self.last_hash = curr_hash
+
+        return {
+            "hash": curr_hash,
+            "payload": payload
+        }
+
     def process(self, input_data: Dict[str, Any], context: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Record a decision/event.
         Input: Dict containing 'event_type', 'data', 'agent_source'.
         Output: The recorded log entry with hash.
         Thread-safe: the lock ensures the hash chain is updated atomically.
+        In group-commit mode the call blocks until the batch containing the
+        event has been committed according to the durability policy.
         """
+        if self._writer is not None:
+            return self.submit(input_data).result()
+
         timestamp = datetime.utcnow().isoformat()
 
         with self._lock:
-            # Create canonical string for hashing
-            payload = {
-                "timestamp": timestamp,
-                "prev_hash": self.last_hash,
-                "event": input_data
-            }
-
-            # Serialize deterministically
-            payload_str = json.dumps(payload, sort_keys=True)
-
-            # Compute Hash (SHA-256)
-            curr_hash = hashlib.sha256(payload_str.encode("utf-8")).hexdigest()
-            self.last_hash = curr_hash
-
-            entry = {
-                "hash": curr_hash,
-                "payload": payload
-            }
+            # Seal before chaining so the manifest records the sealed segment's
+            # own last hash.
+            if self._rotation_due():
+                self._rotate()
+            entry = self._build_entry(timestamp, input_data)
 
             # Append to log file (Immutable append-only) — inside the lock so
             # the hash and the write are an atomic unit.
-            with open(self.log_file, "a", encoding="utf-8") as f:
-                f.write(json.dumps(entry) + "\n")
+            line = (json.dumps(entry) + "\n").encode("utf-8")
+            with open(self.log_file, "ab") as f:
+                f.write(line)
+            self._note_appended(entry, len(line))
+            self._flush_trace_index()
 
-        self.logger.info(f"Audit Logged: {curr_hash[:8]}...")
+        self.logger.info(f"Audit Logged: {entry['hash'][:8]}...")
         return entry
 
-    def verify_chain(self) -> Dict[str, Any]:
+    def submit(self, input_data: Dict[str, Any]) -> "Future[Dict[str, Any]]":
+        """Enqueue an event without waiting for it to be committed.
+
+        Returns a future that resolves to the recorded entry once its batch
+        has been written (and fsync'd, under the ``every_event`` policy).  In
+        synchronous mode the event is written immediately and the returned
+        future is already resolved.
+        """
+        if self._writer is None:
+            future: Future = Future()
+            future.set_result(self.process(input_data))
+            return future
+        return self._writer.enqueue(datetime.utcnow().isoformat(), input_data)
+
+    def record(
+        self,
+        event_type: str,
+        data: Dict[str, Any],
+        trace_id: Optional[str] = None,
+        agent_source: str = "API",
+    ) -> "Future[Dict[str, Any]]":
+        """Append a structured event to the chain without blocking on the commit.
+
+        Events recorded with a ``trace_id`` are indexed so the request's full
+        decision lineage can be read back with :meth:`trace`.
+        """
+        return self.submit({
+            "event_type": event_type,
+            "trace_id": trace_id,
+            "agent_source": agent_source,
+            "data": data,
+        })
+
+    def flush(self) -> None:
+        """Block until every event enqueued so far has been written and fsync'd."""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self) -> None:
+        """Drain the group-commit queue, fsync, finish pending segment
+        compression and release the log file and trace index handles."""
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+        for worker in self._compressors:
+            worker.join()
+        self._compressors = []
+        if self._trace_index is not None:
+            self._trace_index.close()
+
+    def verify_chain(self, mode: str = "full", max_workers: Optional[int] = None) -> Dict[str, Any]:
         """Walk the entire audit log and verify the SHA-256 hash chain.
 
         Each entry's ``prev_hash`` must equal the hash stored in the
@@ -107,6 +506,21 @@ class AuditAgent(NDRAAgent):
         recomputed and compared against the stored ``hash`` field to detect
         tampering.
 
+        ``mode`` selects how much of the log is re-hashed:
+
+        * ``"full"`` — sequential walk from genesis (default).
+        * ``"incremental"`` — re-hash only the checkpoint windows sealed since
+          the last successful incremental pass, plus the unsealed tail.
+          Windows verified by an earlier pass are not re-read, so this
+          only detects tampering in entries written since then.
+        * ``"parallel"`` — re-hash every checkpoint window, one window per
+          worker process, plus the unsealed tail.
+
+        The checkpointed modes first check every checkpoint's signature and
+        linkage; each re-hashed window must reproduce its checkpoint's Merkle
+        root and chain hash.  They fall back to ``"full"`` when checkpointing
+        is disabled.
+
         Returns:
             A dict with the following keys:
 
@@ -117,8 +531,21 @@ class AuditAgent(NDRAAgent):
               first broken entry, or None if the chain is intact.
             * ``error`` (str | None) — Human-readable description of the
               failure, or None if valid.
+
+            The checkpointed modes also return ``mode`` and
+            ``checkpoints_verified``.
         """
-        if not os.path.exists(self.log_file):
+        if mode not in _VERIFY_MODES:
+            raise ValueError(f"Unknown verification mode '{mode}'. Use one of {list(_VERIFY_MODES)}.")
+
+        # Make sure queued group-commit events are on disk before reading.
+        self.flush()
+
+        segment_paths = self._segment_paths()
+        if mode != "full" and self._checkpoints is not None and segment_paths:
+            return self._verify_checkpointed(mode, max_workers)
+
+        if not segment_paths:
             return {
                 "valid": True,
                 "entries_verified": 0,
@@ -129,59 +556,60 @@ class AuditAgent(NDRAAgent):
         try:
             prev_hash = "0" * 64
             entries_verified = 0
+            line_num = 0
 
-            with open(self.log_file, "r", encoding="utf-8") as f:
-                for line_num, raw_line in enumerate(f, start=1):
-                    line = raw_line.strip()
-                    if not line:
-                        continue
+            # Line numbers run continuously across sealed segments and the active log.
+            for line_num, raw_line in enumerate(_iter_log_lines(segment_paths), start=1):
+                line = raw_line.strip()
+                if not line:
+                    continue
 
-                    try:
-                        entry = json.loads(line)
-                    except json.JSONDecodeError as exc:
-                        return {
-                            "valid": False,
-                            "entries_verified": entries_verified,
-                            "first_broken_at": line_num,
-                            "error": f"JSON parse error at line {line_num}: {exc}",
-                        }
-
-                    payload = entry.get("payload", {})
-
-                    # 1. Verify prev_hash link
-                    stored_prev = payload.get("prev_hash", "")
-                    if stored_prev != prev_hash:
-                        return {
-                            "valid": False,
-                            "entries_verified": entries_verified,
-                            "first_broken_at": line_num,
-                            "error": (
-                                f"Chain broken at entry {line_num}: "
-                                f"expected prev_hash={prev_hash[:16]}…, "
-                                f"got {stored_prev[:16]}…"
-                            ),
-                        }
-
-                    # 2. Recompute the entry hash and compare
-                    payload_str = json.dumps(payload, sort_keys=True)
-                    expected_hash = hashlib.sha256(
-                        payload_str.encode("utf-8")
-                    ).hexdigest()
-                    stored_hash = entry.get("hash", "")
-                    if stored_hash != expected_hash:
-                        return {
-                            "valid": False,
-                            "entries_verified": entries_verified,
-                            "first_broken_at": line_num,
-                            "error": (
-                                f"Hash mismatch at entry {line_num}: "
-                                f"stored={stored_hash[:16]}…, "
-                                f"recomputed={expected_hash[:16]}…"
-                            ),
-                        }
-
-                    prev_hash = stored_hash
-                    entries_verified += 1
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    return {
+                        "valid": False,
+                        "entries_verified": entries_verified,
+                        "first_broken_at": line_num,
+                        "error": f"JSON parse error at line {line_num}: {exc}",
+                    }
+
+                payload = entry.get("payload", {})
+
+                # 1. Verify prev_hash link
+                stored_prev = payload.get("prev_hash", "")
+                if stored_prev != prev_hash:
+                    return {
+                        "valid": False,
+                        "entries_verified": entries_verified,
+                        "first_broken_at": line_num,
+                        "error": (
+                            f"Chain broken at entry {line_num}: "
+                            f"expected prev_hash={prev_hash[:16]}…, "
+                            f"got {stored_prev[:16]}…"
+                        ),
+                    }
+
+                # 2. Recompute the entry hash and compare
+                payload_str = json.dumps(payload, sort_keys=True)
+                expected_hash = hashlib.sha256(
+                    payload_str.encode("utf-8")
+                ).hexdigest()
+                stored_hash = entry.get("hash", "")
+                if stored_hash != expected_hash:
+                    return {
+                        "valid": False,
+                        "entries_verified": entries_verified,
+                        "first_broken_at": line_num,
+                        "error": (
+                            f"Hash mismatch at entry {line_num}: "
+                            f"stored={stored_hash[:16]}…, "
+                            f"recomputed={expected_hash[:16]}…"
+                        ),
+                    }
+
+                prev_hash = stored_hash
+                entries_verified += 1
 
             return {
                 "valid": True,
@@ -197,3 +625,325 @@ class AuditAgent(NDRAAgent):
                 "first_broken_at": None,
                 "error": str(exc),
             }
+
+    def _verify_checkpointed(self, mode: str, max_workers: Optional[int]) -> Dict[str, Any]:
+        checkpoints = list(self._checkpoints.checkpoints)
+        ok, error = self._checkpoints.validate_sequence()
+        if not ok:
+            return {
+                "valid": False,
+                "entries_verified": 0,
+                "first_broken_at": None,
+                "error": error,
+                "mode": mode,
+                "checkpoints_verified": 0,
+            }
+
+        start_seq = self._verified_seq + 1 if mode == "incremental" else 0
+        pending = checkpoints[start_seq:]
+        args = [
+            (
+                self._segment_path(segment_of(c)),
+                c["byte_start"],
+                c["byte_end"],
+                c["prev_hash"],
+                c["index_start"],
+            )
+            for c in pending
+        ]
+        workers = max_workers or settings.AUDIT_VERIFY_WORKERS or os.cpu_count() or 1
+        if len(args) > 1 and workers > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(args))) as pool:
+                results = list(pool.map(verify_window, *zip(*args)))
+        else:
+            results = [verify_window(*a) for a in args]
+
+        for record, result in zip(pending, results):
+            error = result["error"]
+            if result["valid"]:
+                if len(result["hashes"]) != record["index_end"] - record["index_start"]:
+                    error = f"Checkpoint {record['seq']} covers a different number of entries"
+                elif result["hashes"][-1] != record["chain_hash"]:
+                    error = f"Checkpoint {record['seq']} chain hash mismatch"
+                elif merkle_root(result["hashes"]) != record["merkle_root"]:
+                    error = f"Checkpoint {record['seq']} Merkle root mismatch"
+            if error:
+                return {
+                    "valid": False,
+                    "entries_verified": record["index_start"] + len(result["hashes"]),
+                    "first_broken_at": result["first_broken_at"] or record["index_start"] + 1,
+                    "error": error,
+                    "mode": mode,
+                    "checkpoints_verified": record["seq"] - start_seq,
+                }
+
+        last = checkpoints[-1] if checkpoints else None
+        sealed = last["index_end"] if last else 0
+        tail_entries, tail_error, tail_broken_at = 0, None, None
+        # The unsealed tail may run from the last checkpoint's segment across
+        # any segments sealed while checkpointing was off.
+        first_segment = self._manifest.segments[0]["segment"] if self._manifest.segments else self._segment
+        try:
+            for _ in self._walk_segments(
+                segment_of(last) if last else first_segment,
+                last["byte_end"] if last else 0,
+                last["chain_hash"] if last else "0" * 64,
+                sealed,
+            ):
+                tail_entries += 1
+        except ChainError as exc:
+            tail_error, tail_broken_at = str(exc), exc.entry_num
+        except OSError as exc:
+            tail_error = str(exc)
+        if last is not None:
+            self._verified_seq = max(self._verified_seq, last["seq"])
+        return {
+            "valid": tail_error is None,
+            "entries_verified": sealed + tail_entries,
+            "first_broken_at": tail_broken_at,
+            "error": tail_error,
+            "mode": mode,
+            "checkpoints_verified": len(pending),
+        }
+
+    def inclusion_proof(self, index: int) -> Optional[Dict[str, Any]]:
+        """Return an O(log n) inclusion proof for the entry at 0-based *index*.
+
+        The proof pairs the entry's audit path up to its checkpoint's Merkle
+        root with that root's path up to the root over all checkpoints; check
+        it with :func:`agents.audit_checkpoint.verify_inclusion_proof`.
+        Returns None if the entry is not yet covered by a checkpoint.
+
+        Raises:
+            ValueError: If the checkpoint window holding the entry no longer
+                reproduces its recorded Merkle root.
+        """
+        self.flush()
+        if self._checkpoints is None:
+            return None
+        record = self._checkpoints.find(index)
+        if record is None:
+            return None
+
+        window = verify_window(
+            self._segment_path(segment_of(record)),
+            record["byte_start"],
+            record["byte_end"],
+            record["prev_hash"],
+            record["index_start"],
+        )
+        if not window["valid"] or merkle_root(window["hashes"]) != record["merkle_root"]:
+            raise ValueError(f"Checkpoint {record['seq']} window failed verification")
+
+        leaf = index - record["index_start"]
+        roots = [c["merkle_root"] for c in self._checkpoints.checkpoints]
+        return {
+            "index": index,
+            "entry_hash": window["hashes"][leaf],
+            "checkpoint_seq": record["seq"],
+            "window_path": merkle_path(window["hashes"], leaf),
+            "merkle_root": record["merkle_root"],
+            "root_path": merkle_path(roots, record["seq"]),
+            "checkpoints_root": merkle_root(roots),
+        }
+
+    def trace(self, trace_id: str) -> List[Dict[str, Any]]:
+        """Return every audit entry recorded for *trace_id*, in log order.
+
+        Reads only the indexed entries (one seek each) rather than scanning
+        the segments.  Returns an empty list when the trace index is disabled
+        or nothing was recorded for the trace.
+        """
+        if self._trace_index is None:
+            return []
+        self.flush()
+        entries: List[Dict[str, Any]] = []
+        handles: Dict[int, Any] = {}
+        try:
+            for segment, offset, length in self._trace_index.lookup(trace_id=trace_id):
+                f = handles.get(segment)
+                if f is None:
+                    f = handles[segment] = open_segment(self._segment_path(segment))
+                f.seek(offset)
+                entries.append(json.loads(f.read(length)))
+        finally:
+            for f in handles.values():
+                f.close()
+        return entries
+
+    def rebuild_trace_index(self) -> int:
+        """Re-derive the trace index from the segments; returns rows indexed."""
+        if self._trace_index is None:
+            return 0
+        self.flush()
+        with self._lock:
+            rows: List[Tuple[Optional[str], Optional[str], int, int, int]] = []
+            segments = [s["segment"] for s in self._manifest.segments]
+            if os.path.exists(self.log_file):
+                segments.append(self._segment)
+            for segment in segments:
+                for offset, raw_line in iter_lines(self._segment_path(segment)):
+                    if not raw_line.strip():
+                        continue
+                    event = json.loads(raw_line)["payload"]["event"]
+                    trace_id, event_type = _index_keys(event)
+                    if trace_id is not None or event_type is not None:
+                        rows.append((trace_id, event_type, segment, offset, len(raw_line)))
+            self._trace_index.clear()
+            self._trace_index.add(rows)
+        return len(rows)
+
+
+class _GroupCommitWriter:
+    """Dedicated writer thread implementing group commit for :class:`AuditAgent`.
+
+    Events are drained from the queue in arrival order, chained onto the
+    agent's ``last_hash`` and appended with one ``write`` per batch on a file
+    handle that stays open for the lifetime of the writer.  The durability
+    policy decides when ``os.fsync`` runs:
+
+    * ``every_event`` — after every batch, before any caller is acknowledged.
+    * ``interval`` — at most once per ``fsync_interval_ms``.
+    * ``batch`` — once ``fsync_batch_size`` events are written but unsynced.
+
+    Under the relaxed policies callers are acknowledged once their batch has
+    reached the OS page cache; ``flush`` and ``close`` always fsync.
+    """
+
+    def __init__(self, agent: AuditAgent):
+        self.agent = agent
+        self._queue: "queue.SimpleQueue[Optional[Tuple[Optional[str], Any, Future]]]" = queue.SimpleQueue()
+        self._file = open(agent.log_file, "ab")
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="AuditGroupCommitWriter", daemon=True
+        )
+        self._thread.start()
+
+    def enqueue(self, timestamp: str, event: Dict[str, Any]) -> Future:
+        if self._closed:
+            raise RuntimeError("Audit group-commit writer is closed.")
+        future: Future = Future()
+        self._queue.put((timestamp, event, future))
+        return future
+
+    def flush(self) -> None:
+        if self._closed:
+            return
+        marker: Future = Future()
+        # A ``None`` timestamp marks a flush barrier rather than an event.
+        self._queue.put((None, None, marker))
+        marker.result()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _poll_timeout(self) -> Optional[float]:
+        if self.agent.durability == "interval" and self._unsynced:
+            remaining = self.agent.fsync_interval_ms / 1000.0 - (time.monotonic() - self._last_sync)
+            return max(0.0, remaining)
+        return None
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                item = self._queue.get(timeout=self._poll_timeout())
+            except queue.Empty:
+                # Interval deadline passed with no new events — sync the tail.
+                self._sync()
+                continue
+
+            batch: List[Tuple[Optional[str], Any, Future]] = []
+            force_sync = False
+            while True:
+                if item is None:
+                    stopping = True
+                    force_sync = True
+                    break
+                if item[0] is None:
+                    force_sync = True
+                batch.append(item)
+                if len(batch) >= _MAX_COMMIT_BATCH:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            self._commit(batch, force_sync)
+
+        self._file.close()
+
+    def _commit(self, batch: List[Tuple[Optional[str], Any, Future]], force_sync: bool) -> None:
+        entries: List[Tuple[Future, Optional[Dict[str, Any]]]] = []
+        lines: List[bytes] = []
+        try:
+            if self.agent._rotation_due():
+                self._reopen_after_rotation()
+        except Exception as exc:
+            self.agent.logger.error(f"Audit segment rotation failed: {exc}")
+        for timestamp, event, future in batch:
+            if timestamp is None:
+                entries.append((future, None))
+                continue
+            entry = self.agent._build_entry(timestamp, event)
+            lines.append((json.dumps(entry) + "\n").encode("utf-8"))
+            entries.append((future, entry))
+
+        try:
+            if lines:
+                self._file.write(b"".join(lines))
+                self._file.flush()
+                self._unsynced += len(lines)
+                for (_, entry), line in zip((e for e in entries if e[1] is not None), lines):
+                    self.agent._note_appended(entry, len(line))
+                self.agent._flush_trace_index()
+
+            policy = self.agent.durability
+            if (
+                force_sync
+                or policy == "every_event"
+                or (policy == "batch" and self._unsynced >= self.agent.fsync_batch_size)
+                or (
+                    policy == "interval"
+                    and (time.monotonic() - self._last_sync) * 1000 >= self.agent.fsync_interval_ms
+                )
+            ):
+                self._sync()
+        except Exception as exc:
+            self.agent.logger.error(f"Audit group commit failed: {exc}")
+            for future, _ in entries:
+                future.set_exception(exc)
+            return
+
+        for future, entry in entries:
+            future.set_result(entry)
+        if lines:
+            self.agent.logger.info(
+                f"Audit Committed: {len(lines)} event(s), head {self.agent.last_hash[:8]}..."
+            )
+
+    def _reopen_after_rotation(self) -> None:
+        # Rotation is checked once per batch, so a segment may overshoot the
+        # size limit by up to one batch.
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._file.close()
+        try:
+            self.agent._rotate()
+        finally:
+            self._file = open(self.agent.log_file, "ab")
+
+    def _sync(self) -> None:
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
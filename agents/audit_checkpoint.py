@@ -0,0 +1,296 @@
+import hashlib
+import hmac
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from agents.audit_segments import open_segment
+
+# ---------------------------------------------------------------------------
+# Merkle tree helpers
+#
+# Leaves are the SHA-256 entry hashes already stored in audit.log.  Leaf and
+# interior nodes are domain-separated (0x00 / 0x01 prefixes, as in RFC 6962)
+# so that an interior node can never be replayed as a leaf.  An odd node at
+# any level is promoted unchanged to the next level.
+# ---------------------------------------------------------------------------
+
+
+def _leaf_hash(entry_hash: str) -> bytes:
+    return hashlib.sha256(b"\x00" + bytes.fromhex(entry_hash)).digest()
+
+
+def _node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def merkle_root(entry_hashes: List[str]) -> str:
+    """Return the hex Merkle root over a list of hex entry hashes."""
+    if not entry_hashes:
+        return hashlib.sha256(b"").hexdigest()
+    level = [_leaf_hash(h) for h in entry_hashes]
+    while len(level) > 1:
+        nxt = [_node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            nxt.append(level[-1])
+        level = nxt
+    return level[0].hex()
+
+
+def merkle_path(entry_hashes: List[str], index: int) -> List[Dict[str, str]]:
+    """Return the audit path proving ``entry_hashes[index]`` is under the root.
+
+    Each step is ``{"hash": <sibling hex>, "side": "left" | "right"}``; the
+    path has at most ``ceil(log2(n))`` steps.
+    """
+    level = [_leaf_hash(h) for h in entry_hashes]
+    path: List[Dict[str, str]] = []
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            path.append({
+                "hash": level[sibling].hex(),
+                "side": "left" if sibling < index else "right",
+            })
+        nxt = [_node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            nxt.append(level[-1])
+        level = nxt
+        index //= 2
+    return path
+
+
+def verify_merkle_path(entry_hash: str, path: List[Dict[str, str]], root: str) -> bool:
+    """Recompute the root from a leaf and its audit path."""
+    node = _leaf_hash(entry_hash)
+    for step in path:
+        sibling = bytes.fromhex(step["hash"])
+        node = _node_hash(sibling, node) if step["side"] == "left" else _node_hash(node, sibling)
+    return hmac.compare_digest(node.hex(), root)
+
+
+def verify_inclusion_proof(proof: Dict[str, Any]) -> bool:
+    """Check a proof produced by :meth:`AuditAgent.inclusion_proof`.
+
+    Verifies both levels: the entry against its checkpoint's Merkle root,
+    and that root against the root over all checkpoints.
+    """
+    if not verify_merkle_path(proof["entry_hash"], proof["window_path"], proof["merkle_root"]):
+        return False
+    # Checkpoint roots are themselves hex SHA-256 values, so they are hashed
+    # as leaves of the top-level tree exactly like entry hashes.
+    return verify_merkle_path(proof["merkle_root"], proof["root_path"], proof["checkpoints_root"])
+
+
+# ---------------------------------------------------------------------------
+# Chain walking
+#
+# ``verify_window`` is module-level so it can be shipped to a
+# ProcessPoolExecutor worker.
+# ---------------------------------------------------------------------------
+
+
+class ChainError(Exception):
+    """Raised by :func:`walk_chain` at the first broken or unparsable entry."""
+
+    def __init__(self, entry_num: Optional[int], message: str):
+        super().__init__(message)
+        self.entry_num = entry_num
+
+
+def walk_chain(
+    path: str,
+    byte_start: int,
+    byte_end: Optional[int],
+    prev_hash: str,
+    index_start: int,
+) -> Iterator[Tuple[int, int, str]]:
+    """Re-hash the entries stored in ``path[byte_start:byte_end]`` in order.
+
+    Checks every ``prev_hash`` link starting from *prev_hash* and recomputes
+    every entry hash.  ``byte_end=None`` reads to end of file (the unsealed
+    tail).  Yields ``(entry_num, end_offset, entry_hash)`` per entry, where
+    ``entry_num`` is 1-based across the whole log.  Compressed (``.gz``)
+    segments are read transparently.
+    """
+    entry_num = index_start
+    with open_segment(path) as f:
+        f.seek(byte_start)
+        offset = byte_start
+        while byte_end is None or offset < byte_end:
+            raw_line = f.readline()
+            if not raw_line:
+                break
+            offset += len(raw_line)
+            line = raw_line.strip()
+            if not line:
+                continue
+            entry_num += 1
+
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ChainError(entry_num, f"JSON parse error at entry {entry_num}: {exc}")
+
+            payload = entry.get("payload", {})
+            stored_prev = payload.get("prev_hash", "")
+            if stored_prev != prev_hash:
+                raise ChainError(
+                    entry_num,
+                    f"Chain broken at entry {entry_num}: "
+                    f"expected prev_hash={prev_hash[:16]}…, got {stored_prev[:16]}…",
+                )
+
+            expected_hash = hashlib.sha256(
+                json.dumps(payload, sort_keys=True).encode("utf-8")
+            ).hexdigest()
+            stored_hash = entry.get("hash", "")
+            if stored_hash != expected_hash:
+                raise ChainError(
+                    entry_num,
+                    f"Hash mismatch at entry {entry_num}: "
+                    f"stored={stored_hash[:16]}…, recomputed={expected_hash[:16]}…",
+                )
+
+            yield entry_num, offset, stored_hash
+            prev_hash = stored_hash
+
+
+def verify_window(
+    path: str,
+    byte_start: int,
+    byte_end: Optional[int],
+    prev_hash: str,
+    index_start: int,
+) -> Dict[str, Any]:
+    """Walk one window and return its entry hashes for Merkle comparison."""
+    hashes: List[str] = []
+    try:
+        for _, _, entry_hash in walk_chain(path, byte_start, byte_end, prev_hash, index_start):
+            hashes.append(entry_hash)
+    except ChainError as exc:
+        return {"valid": False, "hashes": hashes, "first_broken_at": exc.entry_num, "error": str(exc)}
+    except OSError as exc:
+        return {"valid": False, "hashes": hashes, "first_broken_at": None, "error": str(exc)}
+    return {"valid": True, "hashes": hashes, "first_broken_at": None, "error": None}
+
+
+# ---------------------------------------------------------------------------
+# Checkpoint sidecar index
+# ---------------------------------------------------------------------------
+
+
+def segment_of(record: Dict[str, Any]) -> int:
+    """Segment number of a checkpoint (records predating rotation are in segment 1)."""
+    return record.get("segment", 1)
+
+
+class CheckpointIndex:
+    """Append-only sidecar of signed audit-chain checkpoints.
+
+    Each line of ``<audit log>.ckpt`` seals one window of consecutive log
+    entries and records:
+
+    * ``seq`` — checkpoint sequence number (0-based).
+    * ``segment`` — log segment holding the window (windows never span
+      segments; rotation seals the open window first).
+    * ``index_start`` / ``index_end`` — entry index range ``[start, end)``.
+    * ``byte_start`` / ``byte_end`` — byte range of the window in its segment.
+    * ``prev_hash`` — chain hash immediately before the window.
+    * ``chain_hash`` — hash of the last entry in the window.
+    * ``merkle_root`` — Merkle root over the window's entry hashes.
+    * ``signature`` — HMAC-SHA256 over the other fields.
+
+    The HMAC key (``AUDIT_CHECKPOINT_KEY``) must be kept outside the log
+    directory: anyone who can rewrite the log and read the key can re-sign it.
+    """
+
+    def __init__(self, log_file: str, key: str):
+        if not key:
+            raise ValueError("Audit checkpoints need an HMAC key (AUDIT_CHECKPOINT_KEY)")
+        self.path = f"{log_file}.ckpt"
+        self._key = key.encode("utf-8")
+        self.checkpoints: List[Dict[str, Any]] = self._load()
+
+    def _load(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _sign(self, record: Dict[str, Any]) -> str:
+        body = {k: v for k, v in record.items() if k != "signature"}
+        return hmac.new(
+            self._key, json.dumps(body, sort_keys=True).encode("utf-8"), hashlib.sha256
+        ).hexdigest()
+
+    def verify_signature(self, record: Dict[str, Any]) -> bool:
+        return hmac.compare_digest(record.get("signature", ""), self._sign(record))
+
+    @property
+    def last(self) -> Optional[Dict[str, Any]]:
+        return self.checkpoints[-1] if self.checkpoints else None
+
+    def append(
+        self,
+        segment: int,
+        index_start: int,
+        byte_start: int,
+        byte_end: int,
+        prev_hash: str,
+        entry_hashes: List[str],
+    ) -> Dict[str, Any]:
+        """Seal a window of entries and persist its signed checkpoint."""
+        record: Dict[str, Any] = {
+            "seq": len(self.checkpoints),
+            "segment": segment,
+            "index_start": index_start,
+            "index_end": index_start + len(entry_hashes),
+            "byte_start": byte_start,
+            "byte_end": byte_end,
+            "prev_hash": prev_hash,
+            "chain_hash": entry_hashes[-1],
+            "merkle_root": merkle_root(entry_hashes),
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        record["signature"] = self._sign(record)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.checkpoints.append(record)
+        return record
+
+    def find(self, index: int) -> Optional[Dict[str, Any]]:
+        """Binary-search the checkpoint whose window contains entry *index*."""
+        lo, hi = 0, len(self.checkpoints)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            record = self.checkpoints[mid]
+            if index < record["index_start"]:
+                hi = mid
+            elif index >= record["index_end"]:
+                lo = mid + 1
+            else:
+                return record
+        return None
+
+    def validate_sequence(self) -> Tuple[bool, Optional[str]]:
+        """Check signatures and that consecutive checkpoints link up."""
+        prev: Optional[Dict[str, Any]] = None
+        for record in self.checkpoints:
+            if not self.verify_signature(record):
+                return False, f"Checkpoint {record.get('seq')} has an invalid signature"
+            expected_prev_hash = prev["chain_hash"] if prev else "0" * 64
+            expected_index = prev["index_end"] if prev else 0
+            same_segment = prev is not None and segment_of(prev) == segment_of(record)
+            expected_byte = prev["byte_end"] if same_segment else 0
+            if (
+                record["prev_hash"] != expected_prev_hash
+                or record["index_start"] != expected_index
+                or record["byte_start"] != expected_byte
+            ):
+                return False, f"Checkpoint {record['seq']} does not link to its predecessor"
+            prev = record
+        return True, None
@@ -0,0 +1,191 @@
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+
+def open_segment(path: str) -> BinaryIO:
+    """Open an audit segment for binary reading, transparently gunzipping.
+
+    Offsets recorded for a segment are always offsets into its uncompressed
+    content, so callers can ``seek`` either kind of file the same way (a
+    gzip seek decompresses up to the target offset).
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_lines(path: str) -> Iterator[Tuple[int, bytes]]:
+    """Yield ``(offset, raw_line)`` for every line of a segment."""
+    with open_segment(path) as f:
+        offset = 0
+        for raw_line in f:
+            yield offset, raw_line
+            offset += len(raw_line)
+
+
+def compress_segment(path: str) -> str:
+    """Gzip a sealed segment next to itself and remove the original.
+
+    The compressed copy is written to a temporary name and renamed into
+    place only once it is complete and fsync'd, so a crash never leaves a
+    truncated ``.gz`` that shadows the intact original.
+    """
+    gz_path = f"{path}.gz"
+    tmp_path = f"{gz_path}.tmp"
+    with open(path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, gz_path)
+    os.remove(path)
+    return gz_path
+
+
+class SegmentManifest:
+    """Append-only record of sealed audit log segments.
+
+    The active segment is always ``<log>``; sealing renames it to
+    ``<log>.NNNNNN`` (optionally compressed to ``<log>.NNNNNN.gz``) and appends
+    a line to ``<log>.segments`` holding the segment number, the global index
+    of its first entry, its entry count and its final chain hash.  The final
+    hash is what lets the next segment (and a restarted process) continue the
+    chain without reading the sealed, possibly compressed, file.
+    """
+
+    def __init__(self, log_file: str):
+        self.log_file = log_file
+        self.path = f"{log_file}.segments"
+        self.segments: List[Dict[str, Any]] = []
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.segments = [json.loads(line) for line in f if line.strip()]
+
+    @property
+    def next_segment(self) -> int:
+        return self.segments[-1]["segment"] + 1 if self.segments else 1
+
+    @property
+    def next_index(self) -> int:
+        if not self.segments:
+            return 0
+        last = self.segments[-1]
+        return last["first_index"] + last["entries"]
+
+    @property
+    def last_hash(self) -> Optional[str]:
+        return self.segments[-1]["last_hash"] if self.segments else None
+
+    def sealed_path(self, segment: int) -> str:
+        """Return the on-disk path of a sealed segment, preferring uncompressed."""
+        plain = f"{self.log_file}.{segment:06d}"
+        if os.path.exists(plain) or not os.path.exists(f"{plain}.gz"):
+            return plain
+        return f"{plain}.gz"
+
+    def append(self, segment: int, first_index: int, entries: int, last_hash: str) -> Dict[str, Any]:
+        record = {
+            "segment": segment,
+            "first_index": first_index,
+            "entries": entries,
+            "last_hash": last_hash,
+            "sealed_at": datetime.utcnow().isoformat(),
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.segments.append(record)
+        return record
+
+
+class TraceIndex:
+    """On-disk SQLite index from ``trace_id`` / ``event_type`` to entry location.
+
+    Each audit entry that carries an ``event_type`` or ``trace_id`` gets one
+    row ``(trace_id, event_type, segment, offset, length)`` so a request's
+    decision lineage can be read back with one indexed query and a handful of
+    seeks instead of a scan of the whole log.  The index is derived data:
+    it runs in WAL mode with ``synchronous=NORMAL`` and can always be rebuilt
+    from the segments with :meth:`AuditAgent.rebuild_trace_index`.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS audit_events (
+            trace_id   TEXT,
+            event_type TEXT,
+            segment    INTEGER NOT NULL,
+            offset     INTEGER NOT NULL,
+            length     INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_audit_trace ON audit_events (trace_id);
+        CREATE INDEX IF NOT EXISTS idx_audit_event_type ON audit_events (event_type);
+    """
+
+    def __init__(self, log_file: str):
+        self.path = f"{log_file}.trace.db"
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _writer(self) -> sqlite3.Connection:
+        # Opened lazily so logs that never record an indexed event leave no
+        # database behind.  Writes only ever come from the holder of
+        # AuditAgent._lock or the group-commit writer thread, never concurrently.
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self._SCHEMA)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def add(self, rows: List[Tuple[Optional[str], Optional[str], int, int, int]]) -> None:
+        if not rows:
+            return
+        conn = self._writer()
+        conn.executemany(
+            "INSERT INTO audit_events (trace_id, event_type, segment, offset, length) "
+            "VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+
+    def clear(self) -> None:
+        conn = self._writer()
+        conn.execute("DELETE FROM audit_events")
+        conn.commit()
+
+    def lookup(
+        self,
+        trace_id: Optional[str] = None,
+        event_type: Optional[str] = None,
+    ) -> List[Tuple[int, int, int]]:
+        """Return ``(segment, offset, length)`` rows in log order."""
+        clauses, params = [], []
+        if trace_id is not None:
+            clauses.append("trace_id = ?")
+            params.append(trace_id)
+        if event_type is not None:
+            clauses.append("event_type = ?")
+            params.append(event_type)
+        if not os.path.exists(self.path):
+            return []
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        # A short-lived read connection keeps lookups from API threads off the
+        # writer's connection; WAL lets them run while the writer commits.
+        with closing(sqlite3.connect(self.path)) as conn:
+            return conn.execute(
+                f"SELECT segment, offset, length FROM audit_events {where} "
+                f"ORDER BY segment, offset",
+                params,
+            ).fetchall()
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
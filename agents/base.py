@@ -1,30 +1,99 @@
-
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+import atexit
 import json
 import logging
+import logging.handlers
+import queue
 import uuid
-from datetime import datetime
+
+from config.settings import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_default(obj: Any) -> Any:
+    """Fallback encoder for values the JSON encoders do not handle natively."""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    if hasattr(obj, "dict"):
+        return obj.dict()
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=str)
+    return str(obj)
+
+
+if orjson is not None:
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+else:
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, default=_json_default)
+
+
+class _EventDetails:
+    """Defers serializing ``log_event`` details until a handler formats them.
+
+    Plain-text handlers (pytest, uvicorn) render the record message with
+    ``%s`` and so reach ``__str__``; ``_JsonFormatter`` reads ``details``
+    directly and serializes the whole record once.
+    """
+
+    __slots__ = ("details",)
+
+    def __init__(self, details: Any):
+        self.details = details
+
+    def __str__(self) -> str:
+        return _dumps(self.details)
 
 
 class _JsonFormatter(logging.Formatter):
     """
     Emits each log record as a single-line JSON object, suitable for
     ingestion by ELK, Splunk, or any cloud SIEM platform.
+
+    Records produced by :meth:`NDRAAgent.log_event` carry their fields as
+    ``extra`` data (``ndra_event``) and are emitted as top-level ``agent``,
+    ``event`` and ``details`` keys rather than a pre-formatted message.
     """
 
     def format(self, record: logging.LogRecord) -> str:
+        event = getattr(record, "ndra_event", None)
         obj: Dict[str, Any] = {
             "timestamp": self.formatTime(record, self.datefmt),
             "level": record.levelname,
             "logger": record.name,
-            "message": record.getMessage(),
+            "message": f"AUDIT_EVENT: {event['event']}" if event else record.getMessage(),
         }
+        if event:
+            obj["agent"] = event["agent"]
+            obj["event"] = event["event"]
+            obj["details"] = event["details"]
         if record.exc_info:
             obj["exception"] = self.formatException(record.exc_info)
         if record.stack_info:
             obj["stack_info"] = self.formatStack(record.stack_info)
-        return json.dumps(obj)
+        return _dumps(obj)
+
+
+class _AsyncQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that hands records over unformatted.
+
+    The stock ``prepare`` renders the message on the calling thread; here the
+    listener thread does all formatting and I/O, so pipeline threads only pay
+    for a queue put.  Objects passed to a log call must therefore not be
+    mutated afterwards.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_queue_listener: Optional[logging.handlers.QueueListener] = None
 
 
 def _configure_logging() -> None:
@@ -37,7 +106,12 @@ def _configure_logging() -> None:
     emitted before this module is imported may use a different format.  In
     production, ensure this module is imported early in the application
     startup sequence to guarantee consistent JSON formatting.
+
+    With ``LOG_ASYNC`` enabled the root logger gets a queue handler and a
+    background ``QueueListener`` owns the stream handler, so formatting and
+    log I/O never run on request or pipeline threads.
     """
+    global _queue_listener
     root = logging.getLogger()
     if root.handlers:
         # Handlers already present — respect the existing configuration.
@@ -45,7 +119,14 @@ def _configure_logging() -> None:
     handler = logging.StreamHandler()
     handler.setFormatter(_JsonFormatter())
     root.setLevel(logging.INFO)
-    root.addHandler(handler)
+    if settings.LOG_ASYNC:
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        _queue_listener = logging.handlers.QueueListener(log_queue, handler)
+        _queue_listener.start()
+        atexit.register(_queue_listener.stop)
+        root.addHandler(_AsyncQueueHandler(log_queue))
+    else:
+        root.addHandler(handler)
 
 
 _configure_logging()
@@ -70,17 +151,23 @@ class NDRAAgent(ABC):
         """
         pass
 
-    def log_event(self, event_type: str, details: Dict[str, Any]):
+    def log_event(self, event_type: str, details: Any):
         """
         Emits a structured log event for auditability.
+
+        ``details`` is attached to the record as ``extra`` data and only
+        serialized if a handler actually emits it; nothing is built when INFO
+        is disabled for this agent's logger.  Pydantic models may be passed
+        as-is and are dumped at format time.
         """
-        log_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "agent": self.agent_name,
-            "event": event_type,
-            "details": details,
-        }
-        self.logger.info(f"AUDIT_EVENT: {log_entry}")
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        self.logger.info(
+            "AUDIT_EVENT: %s %s",
+            event_type,
+            _EventDetails(details),
+            extra={"ndra_event": {"agent": self.agent_name, "event": event_type, "details": details}},
+        )
 
     def health_check(self) -> bool:
         """
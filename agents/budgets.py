@@ -0,0 +1,351 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Optional
+
+import regex
+import yaml
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Budget enforcement for nsrl/security/hard_limits.yml
+#
+# Deadlines are cooperative: the classifier checks its deadline before each
+# recognizer runs and the policy engine checks its deadline after each rule.
+# Work already in flight is never interrupted, so an overrun is bounded by
+# the cost of one recognizer or one rule — and individual regexes are bounded
+# separately by the regex timeout.  A document-wide PipelineDeadline is
+# checked the same way, between pages, chunks and recognizers.
+# ---------------------------------------------------------------------------
+
+BUDGET_OVERRUNS = Counter(
+    "ndrapii_budget_overruns_total",
+    "Evaluations that exceeded a hard_limits.yml budget",
+    ["stage", "name"],
+)
+
+
+class BudgetExceeded(Exception):
+    """Raised when an evaluation cannot proceed within its hard limits."""
+
+
+class InputTooLarge(BudgetExceeded):
+    """Raised when an input exceeds ``max_input_size_bytes``."""
+
+
+class PipelineCancelled(BudgetExceeded):
+    """Raised at a safe point once a :class:`PipelineDeadline` has expired or been cancelled."""
+
+    def __init__(self, stage: str, reason: str):
+        super().__init__(f"{stage} stopped: {reason}")
+        self.stage = stage
+        self.reason = reason
+
+
+class HardLimits:
+    """The ``limits`` section of ``nsrl/security/hard_limits.yml``."""
+
+    def __init__(
+        self,
+        max_rules_per_file: int = 1000,
+        max_conditions_per_rule: int = 25,
+        execution_timeout_ms: int = 50,
+        max_input_size_bytes: int = 1024 * 1024,
+        max_string_length: int = 10000,
+        allow_backtracking: bool = False,
+        max_complexity_score: int = 100,
+        regex_timeout_ms: int = 5,
+    ):
+        self.max_rules_per_file = max_rules_per_file
+        self.max_conditions_per_rule = max_conditions_per_rule
+        self.execution_timeout_ms = execution_timeout_ms
+        self.max_input_size_bytes = max_input_size_bytes
+        self.max_string_length = max_string_length
+        self.allow_backtracking = allow_backtracking
+        self.max_complexity_score = max_complexity_score
+        self.regex_timeout_ms = regex_timeout_ms
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> "HardLimits":
+        """Load limits from *path*; built-in defaults apply when it is absent."""
+        if not path or not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            limits: Dict[str, Any] = (yaml.safe_load(f) or {}).get("limits") or {}
+        regex_config = limits.get("regex_config") or {}
+        defaults = cls()
+        return cls(
+            max_rules_per_file=limits.get("max_rules_per_file", defaults.max_rules_per_file),
+            max_conditions_per_rule=limits.get("max_conditions_per_rule", defaults.max_conditions_per_rule),
+            execution_timeout_ms=limits.get("execution_timeout_ms", defaults.execution_timeout_ms),
+            max_input_size_bytes=limits.get("max_input_size_bytes", defaults.max_input_size_bytes),
+            max_string_length=limits.get("max_string_length", defaults.max_string_length),
+            allow_backtracking=regex_config.get("allow_backtracking", defaults.allow_backtracking),
+            max_complexity_score=regex_config.get("max_complexity_score", defaults.max_complexity_score),
+            regex_timeout_ms=regex_config.get("timeout_ms", defaults.regex_timeout_ms),
+        )
+
+
+class Deadline:
+    """A monotonic-clock deadline checked cooperatively at safe points."""
+
+    __slots__ = ("budget_ms", "_expires_at")
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+        # A non-positive budget disables the deadline.
+        self._expires_at = time.monotonic() + budget_ms / 1000.0 if budget_ms > 0 else None
+
+    def expired(self) -> bool:
+        return self._expires_at is not None and time.monotonic() >= self._expires_at
+
+
+class PipelineDeadline(Deadline):
+    """The deadline of a whole document run, which can also be cancelled.
+
+    One instance is shared by every stage of a run (it is thread-safe);
+    stages call :meth:`check` between pages, chunks and recognizers.  A copy
+    sent to a worker process keeps the expiry (the monotonic clock is
+    system-wide) but does not see a later :meth:`cancel`.
+    """
+
+    __slots__ = ("_cancelled", "_reason")
+
+    def __init__(self, budget_ms: float):
+        super().__init__(budget_ms)
+        self._cancelled = threading.Event()
+        self._reason: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._cancelled.is_set():
+            self._reason = reason
+            self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def reason(self) -> str:
+        return self._reason if self._cancelled.is_set() else "timeout"
+
+    def expired(self) -> bool:
+        return self._cancelled.is_set() or super().expired()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (0 once expired), or None without a time limit."""
+        if self._cancelled.is_set():
+            return 0.0
+        if self._expires_at is None:
+            return None
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def check(self, stage: str) -> None:
+        if self.expired():
+            raise PipelineCancelled(stage, self.reason)
+
+    def __reduce__(self):
+        return (_restore_pipeline_deadline, (self.budget_ms, self._expires_at, self._reason))
+
+
+def _restore_pipeline_deadline(budget_ms: float, expires_at: Optional[float], reason: Optional[str]) -> PipelineDeadline:
+    deadline = PipelineDeadline(0)
+    deadline.budget_ms = budget_ms
+    deadline._expires_at = expires_at
+    if reason is not None:
+        deadline.cancel(reason)
+    return deadline
+
+
+def check_input_size(text: str, limits: HardLimits, stage: str) -> None:
+    """Reject *text* early if it exceeds ``max_input_size_bytes``."""
+    # len(text) is a cheap lower bound on the UTF-8 size; only encode when close.
+    limit = limits.max_input_size_bytes
+    if limit <= 0 or len(text) * 4 <= limit:
+        return
+    size = len(text.encode("utf-8"))
+    if size > limit:
+        BUDGET_OVERRUNS.labels(stage=stage, name="max_input_size_bytes").inc()
+        raise InputTooLarge(f"{stage} input is {size} bytes; the limit is {limit} bytes")
+
+
+# ---------------------------------------------------------------------------
+# Regex safety
+# ---------------------------------------------------------------------------
+
+# A quantified group that itself contains a quantifier, e.g. ``(a+)+`` or
+# ``(\w*\s?)*`` — the classic catastrophic-backtracking shape.
+_NESTED_QUANTIFIER = regex.compile(r"\((?:[^()\\]|\\.)*[+*}](?:[^()\\]|\\.)*\)[+*{]")
+_QUANTIFIER = regex.compile(r"(?<!\\)(?:[+*?]|\{\d+(?:,\d*)?\})")
+
+
+def regex_complexity(pattern: str) -> int:
+    """Heuristic complexity score: quantifiers, alternations and groups."""
+    return (
+        4 * len(_QUANTIFIER.findall(pattern))
+        + 2 * pattern.count("|")
+        + 2 * pattern.count("(")
+        + len(pattern) // 20
+    )
+
+
+def check_regex(pattern: str, limits: HardLimits) -> None:
+    """Refuse patterns prone to catastrophic backtracking under strict limits.
+
+    Raises:
+        ValueError: If backtracking is disallowed and *pattern* nests
+            quantifiers, or its complexity exceeds ``max_complexity_score``.
+    """
+    if limits.allow_backtracking:
+        return
+    if _NESTED_QUANTIFIER.search(pattern):
+        raise ValueError(f"Regex {pattern!r} nests quantifiers (catastrophic backtracking risk)")
+    score = regex_complexity(pattern)
+    if score > limits.max_complexity_score:
+        raise ValueError(
+            f"Regex {pattern!r} complexity {score} exceeds max_complexity_score {limits.max_complexity_score}"
+        )
+
+
+def apply_presidio_regex_timeout(limits: HardLimits) -> None:
+    """Bound every Presidio pattern match by ``regex_config.timeout_ms``.
+
+    Presidio matches with the ``regex`` module and passes a module-level
+    ``REGEX_TIMEOUT_SECONDS`` (read once from the environment, integer
+    seconds only) as the per-match timeout; a timed-out pattern is logged and
+    skipped.  Setting the constant directly allows sub-second budgets.
+    """
+    from presidio_analyzer import analyzer_engine, pattern_recognizer
+
+    seconds = max(limits.regex_timeout_ms, 1) / 1000.0
+    pattern_recognizer.REGEX_TIMEOUT_SECONDS = seconds
+    analyzer_engine.REGEX_TIMEOUT_SECONDS = seconds
+
+
+# ---------------------------------------------------------------------------
+# Recognizer budgets
+# ---------------------------------------------------------------------------
+
+
+class _ClassificationState:
+    """One ``RecognizerBudget.run`` call: its deadlines and whether it degraded."""
+
+    __slots__ = ("deadline", "pipeline", "recognizer", "degraded")
+
+    def __init__(self, deadline: Deadline, pipeline: Optional[PipelineDeadline]):
+        self.deadline = deadline
+        self.pipeline = pipeline
+        self.recognizer: Optional[str] = None
+        self.degraded = False
+
+
+# The classification running in this thread/task, if any.  Recognizer wrappers
+# and the regex-timeout filter report to it, whichever budget installed them.
+_active_run: contextvars.ContextVar[Optional[_ClassificationState]] = contextvars.ContextVar(
+    "ndra_classification", default=None
+)
+
+
+class _RegexTimeoutFilter(logging.Filter):
+    """Counts Presidio regex timeouts against the recognizer that was running.
+
+    Presidio logs a timed-out pattern as a warning carrying the
+    ``TimeoutError``; the exception type is matched, not the message text.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        state = _active_run.get()
+        exc_type = record.exc_info[0] if record.exc_info else None
+        if state is not None and exc_type is not None and issubclass(exc_type, TimeoutError):
+            BUDGET_OVERRUNS.labels(stage="recognizer", name=state.recognizer or "unknown").inc()
+            state.degraded = True
+        return True
+
+
+# One filter on the presidio logger, shared by every live budget.
+_timeout_filter = _RegexTimeoutFilter()
+_timeout_filter_users = 0
+_timeout_filter_lock = threading.Lock()
+
+
+def _acquire_timeout_filter() -> None:
+    global _timeout_filter_users
+    with _timeout_filter_lock:
+        if _timeout_filter_users == 0:
+            logging.getLogger("presidio-analyzer").addFilter(_timeout_filter)
+        _timeout_filter_users += 1
+
+
+def _release_timeout_filter() -> None:
+    global _timeout_filter_users
+    with _timeout_filter_lock:
+        _timeout_filter_users -= 1
+        if _timeout_filter_users == 0:
+            logging.getLogger("presidio-analyzer").removeFilter(_timeout_filter)
+
+
+class RecognizerBudget:
+    """Applies a per-chunk cooperative deadline to Presidio recognizers.
+
+    ``install`` wraps each recognizer's ``analyze``.  Inside ``run``, a
+    recognizer reached after the deadline has expired is skipped and counted
+    as an overrun for that recognizer; regex timeouts raised inside Presidio
+    are counted too.  Either marks the classification as degraded, meaning
+    some PII may have gone undetected.
+
+    The regex-timeout log filter is installed once, while any budget is
+    alive; ``close`` (or garbage collection) releases this budget's hold.
+    """
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+        _acquire_timeout_filter()
+        self._release = weakref.finalize(self, _release_timeout_filter)
+
+    def close(self) -> None:
+        self._release()
+
+    def install(self, recognizers) -> None:
+        for recognizer in recognizers:
+            if getattr(recognizer, "_ndra_budgeted", False):
+                continue
+            recognizer.analyze = self._wrap(recognizer.name, recognizer.analyze)
+            recognizer._ndra_budgeted = True
+
+    @staticmethod
+    def _wrap(name: str, analyze: Callable) -> Callable:
+        def budgeted_analyze(*args, **kwargs):
+            state = _active_run.get()
+            if state is None:
+                return analyze(*args, **kwargs)
+            if state.pipeline is not None:
+                state.pipeline.check("classifier")
+            if state.deadline.expired():
+                BUDGET_OVERRUNS.labels(stage="recognizer", name=name).inc()
+                state.degraded = True
+                return []
+            state.recognizer = name
+            try:
+                return analyze(*args, **kwargs)
+            finally:
+                state.recognizer = None
+
+        return budgeted_analyze
+
+    def run(self, fn: Callable[[], Any], pipeline: Optional[PipelineDeadline] = None) -> "tuple[Any, bool]":
+        """Run *fn* under a fresh deadline; returns ``(result, degraded)``.
+
+        Recognizers reached once *pipeline* has expired raise
+        :class:`PipelineCancelled` instead of being skipped.
+        """
+        state = _ClassificationState(Deadline(self.budget_ms), pipeline)
+        token = _active_run.set(state)
+        try:
+            return fn(), state.degraded
+        finally:
+            _active_run.reset(token)
@@ -1,8 +1,11 @@
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
 from presidio_analyzer import AnalyzerEngine, PatternRecognizer, Pattern, RecognizerResult
 from agents.base import NDRAAgent
-from schemas.core_models import SemanticChunk, ClassifiedChunk, DetectedPII, PII_SEVERITY, LocationContext
+from agents.budgets import HardLimits, RecognizerBudget, apply_presidio_regex_timeout, check_input_size, check_regex
+from config.settings import settings
+from schemas.core_models import SemanticChunk, PII_SEVERITY
+from schemas.internal import Chunk, Entity, as_chunk
 
 class ClassifierAgent(NDRAAgent):
     """
@@ -11,10 +14,16 @@ class ClassifierAgent(NDRAAgent):
     - Standard Entities: PERSON, PHONE_NUMBER, EMAIL_ADDRESS, CREDIT_CARD, etc.
     - Custom Entities: AADHAAR_IN, PAN_IN.
     - Confidence Scoring
+    - Hard limits (nsrl/security/hard_limits.yml): oversize chunks are
+      rejected, every regex match is time-bounded, and a per-chunk deadline
+      skips the remaining recognizers once spent (the chunk is then marked
+      ``classification_degraded``).
     """
     
-    def __init__(self):
+    def __init__(self, hard_limits_path: str = "nsrl/security/hard_limits.yml"):
         super().__init__("ClassifierAgent")
+        self.limits = HardLimits.load(hard_limits_path)
+        apply_presidio_regex_timeout(self.limits)
         
         # Initialize Presidio
         # In a real setup, we might configure a specific NLP engine (Spacy/Transformers)
@@ -24,53 +33,43 @@ class ClassifierAgent(NDRAAgent):
         self._add_aadhaar_recognizer()
         self._add_pan_recognizer()
 
-    def process(self, chunk: SemanticChunk, context: Dict[str, Any] = None) -> ClassifiedChunk:
+        self.budget = RecognizerBudget(settings.CLASSIFIER_DEADLINE_MS)
+        self.budget.install(self.analyzer.registry.recognizers)
+
+    def process(self, chunk: Union[SemanticChunk, Chunk], context: Dict[str, Any] = None) -> Chunk:
         """
         Analyze a SemanticChunk for PII.
+
+        A ``PipelineDeadline`` passed as ``context["deadline"]`` is checked
+        before the chunk and before each recognizer.
         """
-        # 1. Analyze Text
-        results = self.analyzer.analyze(
+        deadline = (context or {}).get("deadline")
+        if deadline is not None:
+            deadline.check("classifier")
+        # 1. Analyze Text (raises InputTooLarge before any NLP work)
+        check_input_size(chunk.processed_text, self.limits, stage="classifier")
+        results, degraded = self.budget.run(lambda: self.analyzer.analyze(
             text=chunk.processed_text,
             language="en",
             return_decision_process=True
-        )
+        ), deadline)
         
-        # 2. Map Results to Schema
-        detected_pii_list = []
-        for res in results:
-            # Extract actual text value using span
-            text_val = chunk.processed_text[res.start:res.end]
-            
-            # Calculate Absolute Location on Page
-            # chunk.token_span is (start, end) on the page
-            page_offset_start = chunk.token_span[0] if chunk.token_span else 0
-            abs_start = page_offset_start + res.start
-            abs_end = page_offset_start + res.end
-            
-            loc = LocationContext(
-                page_number=chunk.page_number,
-                char_start_on_page=abs_start,
-                char_end_on_page=abs_end,
-                nearby_context=chunk.processed_text[max(0, res.start-20):min(len(chunk.processed_text), res.end+20)]
-            )
-            
-            detected = DetectedPII(
-                entity_type=res.entity_type,
-                text_value=text_val,
-                start_index=res.start,
-                end_index=res.end,
-                score=res.score,
-                source="Presidio",
-                location=loc
-            )
-            detected_pii_list.append(detected)
-            
-        # 3. Create Output
-        classified = ClassifiedChunk(
-            **chunk.dict(),
-            detected_entities=detected_pii_list,
-            pii_density_score=len(detected_pii_list) / max(1, len(chunk.processed_text.split())) # Simple density
-        )
+        # 2. Map Results to slot entities (pydantic models are only built at the API boundary)
+        chunk = as_chunk(chunk)
+        text = chunk.processed_text
+        page_number = chunk.page_number
+        # chunk.token_span is (start, end) on the page
+        page_offset = chunk.token_span[0] if chunk.token_span else 0
+        detected_pii_list = [
+            Entity(res.entity_type, text[res.start:res.end], res.start, res.end, res.score, "Presidio",
+                   page_number, page_offset)
+            for res in results
+        ]
+
+        # 3. Fill in the chunk in place
+        chunk.detected_entities = detected_pii_list
+        chunk.pii_density_score = len(detected_pii_list) / max(1, len(text.split())) # Simple density
+        chunk.classification_degraded = degraded
         
         # 4. Audit
         if detected_pii_list:
@@ -79,13 +78,16 @@ class ClassifierAgent(NDRAAgent):
                  "count": len(detected_pii_list),
                  "types": list(set(d.entity_type for d in detected_pii_list))
              })
+        if degraded:
+            self.log_event("CLASSIFICATION_BUDGET_EXCEEDED", {"chunk_id": chunk.chunk_id})
              
-        return classified
+        return chunk
 
     def _add_aadhaar_recognizer(self):
         """Adds custom regex for Indian Aadhaar."""
         # 12 digits, optional spaces/dashes (Naive for Demo)
         aadhaar_pattern = Pattern(name="aadhaar_pattern", regex=r"\b\d{4}\s?\d{4}\s?\d{4}\b", score=0.85)
+        check_regex(aadhaar_pattern.regex, self.limits)
         recognizer = PatternRecognizer(supported_entity="IN_AADHAAR", patterns=[aadhaar_pattern])
         self.analyzer.registry.add_recognizer(recognizer)
 
@@ -93,5 +95,6 @@ class ClassifierAgent(NDRAAgent):
         """Adds custom regex for Indian PAN Card."""
         # 5 letters, 4 digits, 1 letter
         pan_pattern = Pattern(name="pan_pattern", regex=r"\b[A-Z]{5}[0-9]{4}[A-Z]{1}\b", score=0.85)
+        check_regex(pan_pattern.regex, self.limits)
         recognizer = PatternRecognizer(supported_entity="IN_PAN", patterns=[pan_pattern])
         self.analyzer.registry.add_recognizer(recognizer)
@@ -0,0 +1,187 @@
+import html
+import logging
+import os
+import tempfile
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+from agents.redaction_kernel import UNSCANNED, Masker, PageSpan, TextNodes, entity_mask
+from core.v2.parsers import (
+    REDACTABLE_HEADERS,
+    EmailParsingError,
+    ParsedEmail,
+    RFCEmailParser,
+    html_attribute_values,
+    html_text_segments,
+)
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Structure-preserving EML redaction
+#
+# Pages follow RFCEmailParser.text_pages, which the extractor uses as well:
+# page 1 is the Subject/From/To/Cc block and every text/plain or text/html
+# part is a page of its own (HTML as its text content).  Only header blocks
+# and text parts are parsed (RFCEmailParser.parse_text_parts); spans are
+# aligned with the header values, the plain text, or the HTML text nodes,
+# and RFCEmailParser.reconstruct_parts splices the re-encoded parts and
+# re-folded headers into the original bytes.  Other parts, attachments and
+# boundaries are copied through untouched.
+# ---------------------------------------------------------------------------
+
+
+# Attributes whose values carry message content (links, alternative text,
+# tooltips, form values).  Presentation attributes (style, class, align, face,
+# ...) are left alone: a redacted value that happens to match markup there
+# must not corrupt the part.
+_CONTENT_ATTRIBUTES = frozenset({
+    "href", "src", "action", "cite", "alt", "title", "value", "placeholder", "label",
+    "aria-label", "content", "summary", "abbr", "download",
+})
+
+
+class EmlRedactionError(Exception):
+    """Raised when an email cannot be redacted safely."""
+
+
+class _Text:
+    """An editable piece of text: a header value, a body, or an HTML text node."""
+
+    __slots__ = ("key", "start", "end", "text", "original")
+
+    def __init__(self, key: Any, text: str, start: int = 0, end: int = 0):
+        self.key = key
+        self.start = start
+        self.end = end
+        self.text = text
+        self.original = text
+
+
+class EmlRedactionWriter:
+    """Redact an .eml file in place, one page per header block or text part.
+
+    Args:
+        masker: Replacement text for each redacted span.
+        fail_closed: Raise :class:`EmlRedactionError` instead of writing a
+            file when some span characters could not be located.
+    """
+
+    def __init__(self, masker: Masker = entity_mask, fail_closed: bool = True):
+        self.masker = masker
+        self.fail_closed = fail_closed
+        self.parser = RFCEmailParser()
+
+    def redact(self, source_path: str, output_path: str, spans: Mapping[int, Sequence[PageSpan]]) -> Dict[str, Any]:
+        """Write a redacted copy of *source_path*; *spans* maps page numbers to spans.
+
+        Returns a report with ``headers_rewritten``, ``parts_rewritten``,
+        ``spans_redacted`` and ``unresolved`` (page -> characters not located).
+        """
+        with open(source_path, "rb") as f:
+            raw = f.read()
+        try:
+            parsed = self.parser.parse_text_parts(raw)
+        except EmailParsingError as e:
+            raise EmlRedactionError(str(e)) from e
+
+        report: Dict[str, Any] = {"headers_rewritten": 0, "parts_rewritten": 0, "spans_redacted": 0, "unresolved": {}}
+        headers = self._redact_headers(parsed, list(spans.get(1, ())), report)
+        values = {
+            span.text: span.entity_type
+            for page_spans in spans.values()
+            for span in page_spans
+            if span.text and span.entity_type != UNSCANNED
+        }
+        bodies = {}
+        for page, part in enumerate(parsed.text_parts, start=2):
+            page_spans = list(spans.get(page, ()))
+            if part.content_type == "text/html":
+                text = self._redact_html(part.text, page, page_spans, values, report)
+            elif page_spans:
+                text = self._redact_plain(part.text, page, page_spans, report)
+            else:
+                continue
+            if text is not None:
+                bodies[part.index] = text
+        for page, page_spans in spans.items():
+            if page_spans and not 1 <= page <= len(parsed.text_parts) + 1:
+                report["unresolved"][page] = sum(span.end - span.start for span in page_spans)
+
+        if report["unresolved"] and self.fail_closed:
+            raise EmlRedactionError(f"Could not locate every redaction span: {report['unresolved']}")
+        try:
+            data = self.parser.reconstruct_parts(parsed, bodies, headers) if bodies or headers else raw
+        except EmailParsingError as e:
+            raise EmlRedactionError(str(e)) from e
+        _write_atomic(output_path, data)
+        report["headers_rewritten"] = len(headers)
+        report["parts_rewritten"] = len(bodies)
+        return report
+
+    def _apply(self, page: int, items: List[Any], spans: List[PageSpan], report: Dict[str, Any]) -> List[_Text]:
+        nodes = TextNodes(items)
+        masked, unresolved = nodes.redact(spans, self.masker)
+        if unresolved:
+            report["unresolved"][page] = unresolved
+        report["spans_redacted"] += masked
+        return [node for node in nodes.nodes if node.text != node.original]
+
+    def _redact_headers(self, parsed: ParsedEmail, spans: List[PageSpan], report: Dict[str, Any]) -> Dict[str, str]:
+        if not spans:
+            return {}
+        items: List[Any] = []
+        msg = parsed.raw_message
+        for name in REDACTABLE_HEADERS:
+            if msg[name] is None:
+                continue
+            if items:
+                items.append("\n")
+            items.extend([f"{name}: ", _Text(name, str(msg[name]))])
+        return {node.key: node.text for node in self._apply(1, items, spans, report)}
+
+    def _redact_plain(self, text: str, page: int, spans: List[PageSpan], report: Dict[str, Any]):
+        changed = self._apply(page, [_Text(None, text)], spans, report)
+        return changed[0].text if changed else None
+
+    def _redact_html(self, source: str, page: int, spans: List[PageSpan], values: Mapping[str, str],
+                     report: Dict[str, Any]):
+        edits: List[Tuple[int, int, str]] = []
+        if spans:
+            segments = [_Text(None, text, start, end) for start, end, text in html_text_segments(source)]
+            for node in self._apply(page, segments, spans, report):
+                edits.append((node.start, node.end, html.escape(node.text, quote=False)))
+        # Content attributes (mailto: links, alt, title) are not text content;
+        # mask any value redacted elsewhere in the message that appears in them.
+        if values:
+            for name, start, end in html_attribute_values(source):
+                if name not in _CONTENT_ATTRIBUTES and not name.startswith("data-"):
+                    continue
+                attribute = original = source[start:end]
+                for value, entity_type in values.items():
+                    for form in {value, html.escape(value)}:
+                        if form in attribute:
+                            attribute = attribute.replace(form, html.escape(self.masker(entity_type, value)))
+                if attribute != original:
+                    edits.append((start, end, attribute))
+        if not edits:
+            return None
+        out, cursor = [], 0
+        for start, end, text in sorted(edits):
+            out.append(source[cursor:start])
+            out.append(text)
+            cursor = end
+        out.append(source[cursor:])
+        return "".join(out)
+
+
+def _write_atomic(output_path: str, data: bytes) -> None:
+    directory = os.path.dirname(os.path.abspath(output_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".redacting-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
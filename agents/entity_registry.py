@@ -0,0 +1,109 @@
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from agents.pseudonymizer import canonical_value
+
+# ---------------------------------------------------------------------------
+# Document-wide entity registry
+#
+# Documents repeat the same addresses, names and numbers many times.  The
+# registry interns every entity of a document by (entity type, canonical
+# value) -- letters and digits, case-folded, as for pseudonyms -- and keeps
+# the occurrences with their page offsets, so summaries are built once per
+# distinct value.  It also memoises which compiled rules fire for an entity
+# (PolicyAgent.evaluate_chunk), so each distinct value is evaluated once.
+# Rules read the type, score and raw value, so the memo is keyed on exactly
+# those and never changes a decision.
+# ---------------------------------------------------------------------------
+
+
+class Occurrence(NamedTuple):
+    chunk_id: str
+    page_number: Optional[int]
+    start: int  # character offsets on the page
+    end: int
+    redacted: bool
+
+
+class RegisteredEntity:
+    """One distinct (entity type, canonical value) and where it occurs."""
+
+    __slots__ = ("entity_type", "text_value", "score", "occurrences", "redacted_count")
+
+    def __init__(self, entity_type: str, text_value: str, score: float):
+        self.entity_type = entity_type
+        # The first spelling seen; later ones may differ in case or separators.
+        self.text_value = text_value
+        self.score = score
+        self.occurrences: List[Occurrence] = []
+        self.redacted_count = 0
+
+    @property
+    def redacted(self) -> bool:
+        """True when any occurrence was masked."""
+        return self.redacted_count > 0
+
+    @property
+    def first(self) -> Occurrence:
+        return self.occurrences[0]
+
+
+class EntityRegistry:
+    """Per-document registry of distinct entity values.
+
+    Create one per document; it is not shared across threads.
+    """
+
+    def __init__(self):
+        self._entities: Dict[Tuple[str, str], RegisteredEntity] = {}
+        self._rules: Any = None
+        self._fired: Dict[Tuple[str, str, float], tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def __iter__(self) -> Iterator[RegisteredEntity]:
+        return iter(self._entities.values())
+
+    @property
+    def occurrence_count(self) -> int:
+        return sum(len(entry.occurrences) for entry in self._entities.values())
+
+    def add(self, entity: Any, chunk: Any, redacted: bool = False) -> RegisteredEntity:
+        """Record one occurrence of *entity* found in *chunk*."""
+        value = entity.text_value
+        key = (entity.entity_type, canonical_value(value) or value)
+        entry = self._entities.get(key)
+        if entry is None:
+            entry = self._entities[key] = RegisteredEntity(entity.entity_type, value, entity.score)
+        elif entity.score > entry.score:
+            entry.score = entity.score
+        # Pipeline entities carry their page offset as ints; pydantic ones a location.
+        page = getattr(entity, "page_number", None)
+        location = entity.location if page is None else None
+        if page is not None:
+            start, end = entity.page_offset + entity.start_index, entity.page_offset + entity.end_index
+        elif location is not None:
+            page, start, end = location.page_number, location.char_start_on_page, location.char_end_on_page
+        else:
+            offset = chunk.token_span[0] if chunk.token_span else 0
+            page, start, end = chunk.page_number, offset + entity.start_index, offset + entity.end_index
+        entry.occurrences.append(Occurrence(chunk.chunk_id, page, start, end, redacted))
+        if redacted:
+            entry.redacted_count += 1
+        return entry
+
+    def add_chunk(self, chunk: Any, redacted_types: Optional[set] = None) -> None:
+        """Record every entity of *chunk*; those of *redacted_types* count as masked."""
+        redacted_types = redacted_types or ()
+        for entity in chunk.detected_entities:
+            self.add(entity, chunk, entity.entity_type in redacted_types)
+
+    def fired_rules_cache(self, compiled_rules: Any) -> Dict[Tuple[str, str, float], tuple]:
+        """The memo of fired rules per (entity type, value, score) for *compiled_rules*.
+
+        Starts over when the rule set changes (a hot reload mid-document).
+        """
+        if compiled_rules is not self._rules:
+            self._rules = compiled_rules
+            self._fired = {}
+        return self._fired
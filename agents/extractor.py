@@ -8,7 +8,7 @@ import json
 import yaml
 import zipfile
 import tarfile
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 from datetime import datetime
 from pathlib import Path
 import logging
@@ -29,7 +29,10 @@ except ImportError:
 
 # Internal
 from agents.base import NDRAAgent
-from schemas.core_models import DocumentMetadata, SemanticChunk, RawChunk
+from agents.budgets import PipelineCancelled, PipelineDeadline
+from core.v2.parsers import EmailParsingError, RFCEmailParser
+from schemas.core_models import DocumentMetadata, RawChunk
+from schemas.internal import Chunk
 from config.settings import settings
 
 class ExtractorAgent(NDRAAgent):
@@ -113,10 +116,15 @@ class ExtractorAgent(NDRAAgent):
                 ".tgz": "application/gzip",
             })
 
-    def process(self, file_path: str, context: Dict[str, Any] = None) -> List[SemanticChunk]:
+    def process(self, file_path: str, context: Dict[str, Any] = None) -> List[Chunk]:
+        # A PipelineDeadline in context["deadline"] is checked between pages
+        # (and archive members); expiry raises PipelineCancelled.
+        deadline = (context or {}).get("deadline")
         path = Path(file_path)
         if not path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
+        if deadline is not None:
+            deadline.check("extractor")
 
         # 1. Integrity & Type
         file_hash = self._compute_sha256(path)
@@ -133,14 +141,14 @@ class ExtractorAgent(NDRAAgent):
             sha256_hash=file_hash,
             source_channel="file_system"
         )
-        self.log_event("DOCUMENT_RECEIVED", doc_meta.dict())
+        self.log_event("DOCUMENT_RECEIVED", doc_meta)
 
         # 2. Process Archives Recursively
         if mime_type in ["application/zip", "application/x-tar", "application/gzip"]:
             if not self.experimental_ingestion:
                 self._quarantine_file(path, "Archive ingestion disabled in frozen mode")
                 return []
-            return self._process_archive(path, mime_type)
+            return self._process_archive(path, mime_type, context)
 
         # 3. Select Handler or Quarantine
         handler = self.handlers.get(mime_type)
@@ -151,12 +159,12 @@ class ExtractorAgent(NDRAAgent):
         # 3. Extract
         try:
             raw_chunks = handler(path)
-            if not raw_chunks:
+
+            # 4. Semantic Chunking (PDF pages are extracted as they are chunked)
+            semantic_chunks = self._chunk_text(raw_chunks, doc_meta, deadline)
+            if not semantic_chunks:
                  self.logger.warning(f"No text extracted from {path.name}")
                  return []
-                 
-            # 4. Semantic Chunking
-            semantic_chunks = self._chunk_text(raw_chunks, doc_meta)
             
             self.log_event("EXTRACTION_COMPLETE", {
                 "file": path.name,
@@ -165,6 +173,9 @@ class ExtractorAgent(NDRAAgent):
             })
             return semantic_chunks
             
+        except PipelineCancelled:
+            # Out of time, not a bad file: nothing to quarantine.
+            raise
         except Exception as e:
             self.logger.error(f"Extraction failed for {path.name}: {e}")
             self._quarantine_file(path, f"Extraction Error: {str(e)}")
@@ -182,9 +193,11 @@ class ExtractorAgent(NDRAAgent):
 
     # --- Handlers ---
     
-    def _read_pdf(self, path: Path) -> List[Dict]:
+    def _read_pdf(self, path: Path) -> Iterator[Dict]:
+        # Lazy, so text extraction stops at the page where a deadline expires.
         reader = PdfReader(path)
-        return [{"text": p.extract_text() or "", "page": i+1} for i, p in enumerate(reader.pages)]
+        for i, p in enumerate(reader.pages):
+            yield {"text": p.extract_text() or "", "page": i+1}
 
     def _read_docx(self, path: Path) -> List[Dict]:
         doc = DocxDocument(path)
@@ -217,9 +230,11 @@ class ExtractorAgent(NDRAAgent):
     def _read_excel(self, path: Path) -> List[Dict]:
         sheets = pd.read_excel(path, sheet_name=None)
         chunks = []
-        for name, df in sheets.items():
+        # One page per sheet, in workbook order, so redacted-file writers can
+        # tell which sheet an entity came from.
+        for i, (name, df) in enumerate(sheets.items()):
             text = f"Sheet: {name}\n" + df.to_string()
-            chunks.append({"text": text, "page": 1})
+            chunks.append({"text": text, "page": i+1})
         return chunks
 
     def _read_json(self, path: Path) -> List[Dict]:
@@ -252,26 +267,17 @@ class ExtractorAgent(NDRAAgent):
             return []
 
     def _read_eml(self, path: Path) -> List[Dict]:
-        # Basic parsing of EML
-        import email
+        # Page 1 is the Subject/From/To/Cc block, then one page per text or
+        # HTML part; EmlRedactionWriter maps offsets back on the same layout.
         with open(path, "rb") as f:
-            msg = email.message_from_binary_file(f)
-
-        body = ""
-        if msg.is_multipart():
-            for part in msg.walk():
-                content_type = part.get_content_type()
-                if content_type == "text/plain":
-                    raw = part.get_payload(decode=True)
-                    if raw is not None:
-                        body += raw.decode(errors="replace")
-        else:
-            raw = msg.get_payload(decode=True)
-            if raw is not None:
-                body = raw.decode(errors="replace")
-
-        full_text = f"Subject: {msg['subject']}\nFrom: {msg['from']}\nTo: {msg['to']}\n\n{body}"
-        return [{"text": full_text, "page": 1}]
+            raw = f.read()
+        try:
+            parser = RFCEmailParser()
+            parsed = parser.parse_text_parts(raw)
+        except EmailParsingError:
+            parser = RFCEmailParser(strict_parsing=False)
+            parsed = parser.parse(raw)
+        return parser.text_pages(parsed)
 
     def _read_msg(self, path: Path) -> List[Dict]:
         if extract_msg:
@@ -279,7 +285,7 @@ class ExtractorAgent(NDRAAgent):
             return [{"text": msg.body, "page": 1}]
         raise RuntimeError("MSG ingestion requires optional dependency 'extract-msg'.")
 
-    def _process_archive(self, path: Path, mime_type: str) -> List[SemanticChunk]:
+    def _process_archive(self, path: Path, mime_type: str, context: Dict[str, Any] = None) -> List[Chunk]:
         """Extracts archives to a temporary directory and recursively processes their contents."""
         self.logger.info(f"Extracting archive: {path.name}")
         all_chunks = []
@@ -324,12 +330,16 @@ class ExtractorAgent(NDRAAgent):
                             self.logger.info(f"Processing extracted file: {file_name}")
                             try:
                                 # Recursively call process on each enclosed file
-                                chunks = self.process(str(extracted_file_path))
+                                chunks = self.process(str(extracted_file_path), context)
                                 all_chunks.extend(chunks)
+                            except PipelineCancelled:
+                                raise
                             except Exception as e:
                                 self.logger.error(f"Error processing extracted file {file_name}: {e}")
                                 # Continue processing other files
 
+        except PipelineCancelled:
+            raise
         except Exception as e:
             self.logger.error(f"Failed to process archive {path.name}: {e}")
             self._quarantine_file(path, f"Archive Extraction Error: {str(e)}")
@@ -357,7 +367,8 @@ class ExtractorAgent(NDRAAgent):
         mime, _ = mimetypes.guess_type(file_path)
         return mime or "application/octet-stream"
 
-    def _chunk_text(self, raw_pages: List[Dict], meta: DocumentMetadata) -> List[SemanticChunk]:
+    def _chunk_text(self, raw_pages: Iterable[Dict], meta: DocumentMetadata,
+                    deadline: Optional[PipelineDeadline] = None) -> List[Chunk]:
         """
         Sliding window semantic chunking (Same as Phase 2).
         """
@@ -368,6 +379,8 @@ class ExtractorAgent(NDRAAgent):
         doc_id = meta.sha256_hash
         
         for entry in raw_pages:
+            if deadline is not None:
+                deadline.check("extractor")
             page_text = str(entry["text"]) # Ensure string
             page_num = entry["page"]
             
@@ -384,16 +397,8 @@ class ExtractorAgent(NDRAAgent):
                     if last_period != -1 and (end - last_period) < 100:
                         end = last_period + 1
                         
-                chunk_text = page_text[start:end]
-                
-                chunk = SemanticChunk(
-                   document_id=doc_id,
-                   processed_text=chunk_text,
-                   original_text=chunk_text,
-                   page_number=page_num,
-                   token_span=(start, end),
-                   section_label="content" 
-                )
+                # A view of the page buffer; the text is not copied per chunk.
+                chunk = Chunk.on_page(doc_id, page_text, page_num, start, end, section_label="content")
                 chunks.append(chunk)
                 
                 start += (CHUNK_SIZE - OVERLAP)
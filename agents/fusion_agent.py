@@ -1,14 +1,179 @@
-from typing import List
+from operator import attrgetter
+from typing import List, Optional, Sequence
+
+from config.settings import settings
 from schemas.core_models import DetectedPII, ClassifiedChunk
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# ---------------------------------------------------------------------------
+# Intra-chunk deduplication
+#
+# Entities are scanned in (start, -end) order, keeping a stack of survivors;
+# each entity is compared with the last survivor only (_dedupe_python).
+# The NumPy backend gets the same result: after the same sort, an entity
+# whose start is at or past every earlier end opens a new overlap group, and
+# the scan restarts at each group (nothing earlier can overlap it).  Groups
+# of one entity, the bulk of log-style input with thousands of IPs and
+# emails, are kept in one vector step, as are pairs (two recognizers on one
+# value); only larger groups replay the scan.
+# ---------------------------------------------------------------------------
+
+# Below this many entities NumPy's fixed costs outweigh the scan
+# (toolscripts/bench_fusion.py).
+_VECTORIZE_MIN_ENTITIES = 500
+
+_start = attrgetter("start_index")
+
+
+def _dedupe_python(entities: Sequence[DetectedPII]) -> List[DetectedPII]:
+    """The reference scan; the NumPy backend must match it exactly."""
+    if not entities:
+        return []
+
+    # Sort by start_index, then by end_index (descending) to prioritize longer matches starting at same pos
+    sorted_entities = sorted(entities, key=lambda x: (x.start_index, -x.end_index))
+    
+    merged = []
+    
+    for current in sorted_entities:
+        if not merged:
+            merged.append(current)
+            continue
+        
+        last = merged[-1]
+        
+        # Check for overlap
+        if current.start_index < last.end_index:
+            # Overlap detected
+            
+            # Case 1: containment. Last contains Current.
+            # Since we sorted by start_index, Last.start <= Current.start.
+            # We just need to check if Last.end >= Current.end.
+            if last.end_index >= current.end_index:
+                # Current is inside Last.
+                
+                # Check for exact span match (same length)
+                if (last.end_index - last.start_index) == (current.end_index - current.start_index):
+                     if current.score > last.score:
+                         merged.pop()
+                         merged.append(current)
+                
+                # If Last is longer, we keep Last (ignore Current)
+                continue
+            
+            # Case 2: Partial overlap.
+            # Last: [---]
+            # Curr:   [---]
+            # We need to decide which to keep.
+            
+            # Length check
+            last_len = last.end_index - last.start_index
+            curr_len = current.end_index - current.start_index
+            
+            if curr_len > last_len:
+                # Current is longer, replace Last
+                merged.pop()
+                merged.append(current)
+            elif curr_len < last_len:
+                # Last is longer, keep Last (ignore Current)
+                continue
+            else:
+                # Same length. Check score.
+                if current.score > last.score:
+                     merged.pop()
+                     merged.append(current)
+        else:
+            # No overlap
+            merged.append(current)
+            
+    return merged
+
+
+def _dedupe_numpy(entities: Sequence[DetectedPII]) -> List[int]:
+    n = len(entities)
+    # Packing the spans is the one per-object pass left; list comprehensions
+    # beat np.fromiter over attrgetter here.
+    starts = np.array([entity.start_index for entity in entities], dtype=np.int64)
+    ends = np.array([entity.end_index for entity in entities], dtype=np.int64)
+
+    # Sort by (start, -end, input position), like the stable sorted() above.
+    # When the three fit in one int64 the keys are unique and the default
+    # (unstable, much faster) argsort gives the same order.
+    start_rel = starts - starts.min()
+    end_rel = ends.max() - ends
+    end_bits = int(end_rel.max()).bit_length()
+    index_bits = (n - 1).bit_length()
+    if int(start_rel.max()).bit_length() + end_bits + index_bits <= 62:
+        order = np.argsort((start_rel << (end_bits + index_bits)) | (end_rel << index_bits) | np.arange(n))
+    else:
+        order = np.lexsort((-ends, starts))
+    sorted_starts = starts[order]
+    sorted_ends = ends[order]
+
+    # A group opens where the start is at or past every earlier end.
+    opens = np.empty(n, dtype=bool)
+    opens[0] = True
+    np.greater_equal(sorted_starts[1:], np.maximum.accumulate(sorted_ends)[:-1], out=opens[1:])
+    closes = np.empty(n, dtype=bool)
+    closes[-1] = True
+    closes[:-1] = opens[1:]
+    kept = opens & closes
+
+    group_starts = np.flatnonzero(opens & ~closes)
+    if group_starts.size:
+        open_positions = np.flatnonzero(opens)
+        group_ends = np.append(open_positions, n)[np.searchsorted(open_positions, group_starts) + 1]
+        sizes = group_ends - group_starts
+
+        # Pairs (a second recognizer on the same value) in one vector step:
+        # the scan keeps the second entity when it is longer, or as long
+        # with a higher score, unless the first contains it.
+        first = group_starts[sizes == 2]
+        if first.size:
+            second = first + 1
+            first_scores = np.array([entities[i].score for i in order[first].tolist()])
+            second_scores = np.array([entities[i].score for i in order[second].tolist()])
+            first_len = sorted_ends[first] - sorted_starts[first]
+            second_len = sorted_ends[second] - sorted_starts[second]
+            higher = (first_len == second_len) & (second_scores > first_scores)
+            take_second = np.where(
+                sorted_ends[first] >= sorted_ends[second], higher, (second_len > first_len) | higher
+            )
+            kept[np.where(take_second, second, first)] = True
+
+        # Larger groups replay the scan.
+        larger = sizes > 2
+        if larger.any():
+            order_list = order.tolist()
+            survivors: List[int] = []
+            for group_first, group_end in zip(group_starts[larger].tolist(), group_ends[larger].tolist()):
+                position = {id(entities[order_list[i]]): i for i in range(group_first, group_end)}
+                group = [entities[order_list[i]] for i in range(group_first, group_end)]
+                survivors.extend(position[id(entity)] for entity in _dedupe_python(group))
+            kept[survivors] = True
+    return order[kept].tolist()
+
+
 class FusionAgent:
     """
     Agent responsible for deduplicating and resolving PII entities.
     Phase 4: PII Fusion.
+
+    Args:
+        backend: ``"auto"`` (NumPy for entity-dense chunks when installed),
+            ``"python"`` or ``"numpy"``; all give identical results.
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, backend: Optional[str] = None):
+        self.backend = backend or settings.FUSION_BACKEND
+        if self.backend not in ("auto", "python", "numpy"):
+            raise ValueError(f"Unknown fusion backend '{self.backend}'")
+        if self.backend == "numpy" and np is None:
+            raise ValueError("The numpy fusion backend needs the 'numpy' package")
 
     def deduplicate_entities(self, entities: List[DetectedPII]) -> List[DetectedPII]:
         """
@@ -21,63 +186,11 @@ class FusionAgent:
         if not entities:
             return []
 
-        # Sort by start_index, then by end_index (descending) to prioritize longer matches starting at same pos
-        sorted_entities = sorted(entities, key=lambda x: (x.start_index, -x.end_index))
-        
-        merged = []
-        
-        for current in sorted_entities:
-            if not merged:
-                merged.append(current)
-                continue
-            
-            last = merged[-1]
-            
-            # Check for overlap
-            if current.start_index < last.end_index:
-                # Overlap detected
-                
-                # Case 1: containment. Last contains Current.
-                # Since we sorted by start_index, Last.start <= Current.start.
-                # We just need to check if Last.end >= Current.end.
-                if last.end_index >= current.end_index:
-                    # Current is inside Last.
-                    
-                    # Check for exact span match (same length)
-                    if (last.end_index - last.start_index) == (current.end_index - current.start_index):
-                         if current.score > last.score:
-                             merged.pop()
-                             merged.append(current)
-                    
-                    # If Last is longer, we keep Last (ignore Current)
-                    continue
-                
-                # Case 2: Partial overlap.
-                # Last: [---]
-                # Curr:   [---]
-                # We need to decide which to keep.
-                
-                # Length check
-                last_len = last.end_index - last.start_index
-                curr_len = current.end_index - current.start_index
-                
-                if curr_len > last_len:
-                    # Current is longer, replace Last
-                    merged.pop()
-                    merged.append(current)
-                elif curr_len < last_len:
-                    # Last is longer, keep Last (ignore Current)
-                    continue
-                else:
-                    # Same length. Check score.
-                    if current.score > last.score:
-                         merged.pop()
-                         merged.append(current)
-            else:
-                # No overlap
-                merged.append(current)
-                
-        return merged
+        if self.backend == "numpy" or (
+            self.backend == "auto" and np is not None and len(entities) >= _VECTORIZE_MIN_ENTITIES
+        ):
+            return [entities[i] for i in _dedupe_numpy(entities)]
+        return _dedupe_python(entities)
 
     def fuse_chunk(self, chunk: ClassifiedChunk) -> ClassifiedChunk:
         """
@@ -106,14 +219,10 @@ class FusionAgent:
             if not chunk_a.detected_entities or not chunk_b.detected_entities:
                 continue
                 
-            # Sort entities by position
-            a_entities = sorted(chunk_a.detected_entities, key=lambda e: e.start_index)
-            b_entities = sorted(chunk_b.detected_entities, key=lambda e: e.start_index)
-            
-            # Trailing entity in Chunk A
-            trailing_a = a_entities[-1]
-            # Leading entity in Chunk B
-            leading_b = b_entities[0]
+            # Trailing entity in Chunk A (the last one with the highest start)
+            trailing_a = max(reversed(chunk_a.detected_entities), key=_start)
+            # Leading entity in Chunk B (the first one with the lowest start)
+            leading_b = min(chunk_b.detected_entities, key=_start)
             
             # Check proximity to boundaries
             chunk_a_len = len(chunk_a.processed_text)
@@ -0,0 +1,560 @@
+import copy
+import html
+import logging
+import os
+import posixpath
+import re
+import shutil
+import struct
+import tempfile
+import zipfile
+from abc import ABC, abstractmethod
+from xml.sax.saxutils import escape
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple, Union
+
+from lxml import etree
+
+from agents.redaction_kernel import Masker, PageSpan, TextNodes, entity_mask
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Format-preserving OOXML redaction (DOCX, PPTX, XLSX)
+#
+# An Office file is a zip package of XML parts.  The writers parse only the
+# parts that carry redacted text, patch the affected text nodes, and write a
+# new package in which every other member is copied with its compressed bytes
+# verbatim (no inflate / deflate), so the cost of redacting a large file is
+# close to a plain file copy plus the rewritten parts.
+#
+#   * DOCX: page 1 is the body paragraphs of word/document.xml, as
+#     ``_read_docx`` joins them; spans are aligned with the runs' w:t nodes.
+#   * PPTX: page N is slide N; spans are aligned with the a:t nodes of the
+#     slide's top-level text shapes, as ``_read_pptx`` reads them.
+#   * XLSX: page N is sheet N.  ``_read_excel`` renders sheets through
+#     pandas, whose layout has no stable relation to cells, so entity values
+#     are matched against cell contents instead: shared strings (patched
+#     workbook-wide), inline and formula strings, and numeric cells.
+#
+# Replacement text comes from the redaction kernel's maskers.  A span split
+# across runs keeps the mask in its first run; run formatting is kept.
+# Out of scope: headers/footers, tables, comments, notes, charts and document
+# properties.  Spans that cannot be located are reported; with
+# ``fail_closed`` no file is written.
+# ---------------------------------------------------------------------------
+
+_NS = {
+    "w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "p": "http://schemas.openxmlformats.org/presentationml/2006/main",
+    "s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+}
+_XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+_COPY_BLOCK = 1 << 20
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+
+
+class OfficeRedactionError(Exception):
+    """Raised when an Office file cannot be redacted safely."""
+
+
+def _parser() -> etree.XMLParser:
+    return etree.XMLParser(resolve_entities=False, no_network=True, huge_tree=True, remove_blank_text=False)
+
+
+def _read_xml(package: zipfile.ZipFile, name: str) -> etree._ElementTree:
+    with package.open(name) as member:
+        return etree.parse(member, _parser())
+
+
+def _serialise(tree: etree._ElementTree) -> bytes:
+    return etree.tostring(tree, xml_declaration=True, encoding="UTF-8", standalone=tree.docinfo.standalone)
+
+
+def _targets(package: zipfile.ZipFile, part: str) -> Dict[str, str]:
+    """Relationship id -> package member name for the rels of *part*."""
+    folder, name = posixpath.split(part)
+    rels_name = posixpath.join(folder, "_rels", f"{name}.rels")
+    if rels_name not in package.NameToInfo:
+        return {}
+    targets = {}
+    for rel in _read_xml(package, rels_name).getroot().iterfind("rel:Relationship", _NS):
+        target = rel.get("Target", "")
+        if rel.get("TargetMode") == "External":
+            continue
+        path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(folder, target))
+        targets[rel.get("Id")] = path
+    return targets
+
+
+# _raw_copy reaches into zipfile internals (there is no public raw-copy API):
+# zipfile._strip_extra (zipfile._Extra.strip from 3.13), ZipInfo.FileHeader
+# and the writer's filelist, NameToInfo, start_dir and _didModify.  Checked
+# on CPython 3.9 to 3.13; where any of them is missing, members are
+# recompressed instead.
+_strip_extra = getattr(zipfile, "_strip_extra", None) or getattr(getattr(zipfile, "_Extra", None), "strip", None)
+_RAW_COPY_ATTRIBUTES = ("filelist", "NameToInfo", "start_dir", "_didModify")
+
+
+def _raw_copy_supported(output: zipfile.ZipFile) -> bool:
+    return (
+        _strip_extra is not None
+        and hasattr(zipfile.ZipInfo, "FileHeader")
+        and all(hasattr(output, name) for name in _RAW_COPY_ATTRIBUTES)
+    )
+
+
+def _copy_member(source: zipfile.ZipFile, source_fp: BinaryIO, info: zipfile.ZipInfo, output: zipfile.ZipFile) -> None:
+    """Copy an unchanged member; its compressed bytes verbatim when possible."""
+    if _raw_copy_supported(output):
+        _raw_copy(source_fp, info, output)
+        return
+    entry = zipfile.ZipInfo(info.filename, info.date_time)
+    entry.external_attr = info.external_attr
+    entry.compress_type = info.compress_type
+    with source.open(info) as member, output.open(entry, "w", force_zip64=info.file_size > zipfile.ZIP64_LIMIT) as sink:
+        shutil.copyfileobj(member, sink, _COPY_BLOCK)
+
+
+def _raw_copy(source_fp: BinaryIO, info: zipfile.ZipInfo, output: zipfile.ZipFile) -> None:
+    # Write the local header ourselves, stream the compressed bytes, and
+    # register the entry so close() emits its central directory record.
+    source_fp.seek(info.header_offset)
+    header = _LOCAL_HEADER.unpack(source_fp.read(_LOCAL_HEADER.size))
+    source_fp.seek(header[10] + header[11], os.SEEK_CUR)
+
+    entry = copy.copy(info)
+    entry.flag_bits &= ~0x08  # sizes and CRC go in the header, no data descriptor
+    entry.extra = _strip_extra(info.extra, (1,))  # zip64 sizes are re-added when needed
+    entry.header_offset = output.fp.tell()
+    output.fp.write(entry.FileHeader(zip64=info.file_size > zipfile.ZIP64_LIMIT or info.compress_size > zipfile.ZIP64_LIMIT))
+    remaining = info.compress_size
+    while remaining:
+        block = source_fp.read(min(_COPY_BLOCK, remaining))
+        if not block:
+            raise OfficeRedactionError(f"Truncated zip member {info.filename}")
+        output.fp.write(block)
+        remaining -= len(block)
+    output.filelist.append(entry)
+    output.NameToInfo[entry.filename] = entry
+    output.start_dir = output.fp.tell()
+    output._didModify = True
+
+
+# A rewritten part: its new bytes, or a function streaming them to a sink.
+Part = Union[bytes, Callable[[BinaryIO], None]]
+
+
+def _write_package(
+    source: zipfile.ZipFile,
+    source_path: str,
+    output_path: str,
+    parts: Mapping[str, Part],
+    check: Optional[Callable[[], None]] = None,
+) -> None:
+    """Write *source* to *output_path* with *parts* replaced, atomically.
+
+    *check* runs after every part is written and before the file is moved
+    into place; raising from it discards the output.
+    """
+    directory = os.path.dirname(os.path.abspath(output_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".redacting-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as raw, open(source_path, "rb") as source_fp:
+            with zipfile.ZipFile(raw, "w") as output:
+                for info in source.infolist():
+                    part = parts.get(info.filename)
+                    if part is None:
+                        _copy_member(source, source_fp, info, output)
+                        continue
+                    entry = zipfile.ZipInfo(info.filename, info.date_time)
+                    entry.external_attr = info.external_attr
+                    entry.compress_type = zipfile.ZIP_DEFLATED
+                    if isinstance(part, bytes):
+                        output.writestr(entry, part)
+                    else:
+                        with output.open(entry, "w", force_zip64=True) as sink:
+                            part(sink)
+        if check is not None:
+            check()
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _set_text(node: Any, text: str) -> None:
+    node.text = text
+    if text != text.strip() and node.tag == f"{{{_NS['w']}}}t":
+        node.set(_XML_SPACE, "preserve")
+
+
+def _docx_items(tree: etree._ElementTree) -> Iterable[Any]:
+    # python-docx: "\n".join(paragraph.text), where a paragraph's text is its
+    # runs and hyperlink runs, with tabs and breaks as whitespace.
+    run_content = "*[self::w:t or self::w:tab or self::w:ptab or self::w:br or self::w:cr or self::w:noBreakHyphen]"
+    for index, paragraph in enumerate(tree.iterfind("w:body/w:p", _NS)):
+        if index:
+            yield "\n"
+        for element in paragraph.xpath(f"w:r/{run_content} | w:hyperlink/w:r/{run_content}", namespaces=_NS):
+            name = etree.QName(element).localname
+            if name == "t":
+                yield element
+            elif name == "noBreakHyphen":
+                yield "-"
+            elif name == "br" and element.get(f"{{{_NS['w']}}}type", "textWrapping") != "textWrapping":
+                continue
+            else:
+                yield "\n"
+
+
+def _pptx_items(tree: etree._ElementTree) -> Iterable[Any]:
+    # python-pptx: "\n".join(shape.text) over top-level text shapes; a
+    # shape's text is its paragraphs' runs, breaks and fields.
+    for shape_index, shape in enumerate(tree.iterfind("p:cSld/p:spTree/p:sp", _NS)):
+        if shape_index:
+            yield "\n"
+        for paragraph_index, paragraph in enumerate(shape.iterfind("p:txBody/a:p", _NS)):
+            if paragraph_index:
+                yield "\n"
+            for element in paragraph.xpath("a:r/a:t | a:br | a:fld/a:t", namespaces=_NS):
+                yield "\v" if etree.QName(element).localname == "br" else element
+
+
+class _Writer(ABC):
+    """Shared package handling for the three formats."""
+
+    def __init__(self, masker: Masker = entity_mask, fail_closed: bool = True):
+        self.masker = masker
+        self.fail_closed = fail_closed
+
+    def redact(self, source_path: str, output_path: str, spans: Mapping[int, Sequence[PageSpan]]) -> Dict[str, Any]:
+        """Write a redacted copy of *source_path*; *spans* maps 1-based page numbers to spans.
+
+        Returns a report with ``parts_rewritten``, ``parts_copied``,
+        ``spans_redacted`` and ``unresolved`` (page -> characters or values
+        not located).
+        """
+        try:
+            source = zipfile.ZipFile(source_path)
+        except zipfile.BadZipFile as e:
+            raise OfficeRedactionError(f"Not an OOXML package: {e}") from e
+        with source:
+            if any(info.flag_bits & 0x01 for info in source.infolist()):
+                raise OfficeRedactionError("Encrypted zip members are not supported")
+            report: Dict[str, Any] = {"spans_redacted": 0, "unresolved": {}}
+            parts, settle = self._patch(source, {page: list(page_spans) for page, page_spans in spans.items() if page_spans}, report)
+
+            def check() -> None:
+                if settle is not None:
+                    settle()
+                if report["unresolved"] and self.fail_closed:
+                    raise OfficeRedactionError(f"Could not locate every redaction span: {report['unresolved']}")
+
+            if settle is None:
+                check()  # fail before writing anything
+            _write_package(source, source_path, output_path, parts, check)
+            report["parts_rewritten"] = len(parts)
+            report["parts_copied"] = len(source.infolist()) - len(parts)
+        return report
+
+    @abstractmethod
+    def _patch(
+        self, source: zipfile.ZipFile, spans: Dict[int, List[PageSpan]], report: Dict[str, Any]
+    ) -> Tuple[Dict[str, Part], Optional[Callable[[], None]]]:
+        """The parts to rewrite, and an optional function completing *report*
+        once they have been written."""
+
+    def _patch_nodes(self, page: int, nodes: TextNodes, spans: List[PageSpan], report: Dict[str, Any]) -> bool:
+        masked, unresolved = nodes.redact(spans, self.masker)
+        if unresolved:
+            report["unresolved"][page] = report["unresolved"].get(page, 0) + unresolved
+        report["spans_redacted"] += masked
+        return masked > 0
+
+
+class DocxRedactionWriter(_Writer):
+    """Redact the body paragraphs of a .docx in place."""
+
+    def _patch(self, source, spans, report):
+        body_spans = spans.pop(1, [])
+        for page in spans:
+            report["unresolved"][page] = sum(span.end - span.start for span in spans[page])
+        if not body_spans:
+            return {}, None
+        tree = _read_xml(source, "word/document.xml")
+        nodes = TextNodes(_docx_items(tree), _set_text)
+        if not self._patch_nodes(1, nodes, body_spans, report):
+            return {}, None
+        return {"word/document.xml": _serialise(tree)}, None
+
+
+class PptxRedactionWriter(_Writer):
+    """Redact text shapes of a .pptx in place, one page per slide."""
+
+    def _patch(self, source, spans, report):
+        targets = _targets(source, "ppt/presentation.xml")
+        presentation = _read_xml(source, "ppt/presentation.xml")
+        slides = [
+            targets.get(slide_id.get(f"{{{_NS['r']}}}id"))
+            for slide_id in presentation.iterfind("p:sldIdLst/p:sldId", _NS)
+        ]
+        parts = {}
+        for page, page_spans in sorted(spans.items()):
+            part = slides[page - 1] if 1 <= page <= len(slides) else None
+            if part is None:
+                report["unresolved"][page] = sum(span.end - span.start for span in page_spans)
+                continue
+            tree = _read_xml(source, part)
+            nodes = TextNodes(_pptx_items(tree), _set_text)
+            if self._patch_nodes(page, nodes, page_spans, report):
+                parts[part] = _serialise(tree)
+        return parts, None
+
+
+# --- XLSX: streaming byte-level rewrite of matching cells -------------------
+#
+# Sheet and shared-string parts can be hundreds of megabytes, so they are
+# never parsed as a whole.  A part is first scanned for the redacted values;
+# only if one occurs is it streamed through again, and only the elements
+# (<c> cells, <si> shared strings) containing a match are re-written.
+
+_T_NODE = re.compile(rb"(<t(?:\s[^>]*)?>)(.*?)(</t>)", re.S)
+_V_NODE = re.compile(rb"<v>(.*?)</v>", re.S)
+_CELL_START = re.compile(rb"<c((?:\s[^>]*?)?)(/?)>")
+_TYPE_ATTR = re.compile(rb'\st="([^"]*)"')
+_ELEMENT_END = {b"c": b"</row>", b"si": b"</si>"}
+# Rich-text runs can split a value, so every shared string with runs is a
+# candidate; _XlsxPass.mask_runs checks the joined text.
+_RICH_TEXT_RUNS = {b"<r>", b"<r "}
+_MAX_PENDING = 64 << 20
+
+
+def _number_texts(value: str) -> Set[str]:
+    """Renderings of a numeric cell value that pandas may have shown."""
+    texts = {value}
+    try:
+        number = float(value)
+    except ValueError:
+        return texts
+    texts.add(repr(number))
+    if number.is_integer():
+        texts.add(str(int(number)))
+    return texts
+
+
+def _needles(values: Iterable[str]) -> Set[bytes]:
+    return {escape(text).encode("utf-8") for value in values for text in _number_texts(value)}
+
+
+def _scan(source: zipfile.ZipFile, name: str, needles: Set[bytes]) -> bool:
+    """Whether any needle occurs in member *name*, read in bounded blocks."""
+    overlap = max(len(needle) for needle in needles)
+    tail = b""
+    with source.open(name) as member:
+        while True:
+            block = member.read(_COPY_BLOCK)
+            if not block:
+                return False
+            window = tail + block
+            if any(needle in window for needle in needles):
+                return True
+            tail = window[-overlap:]
+
+
+def _enclosing(data: bytes, position: int, tag: bytes) -> Optional[Tuple[int, int]]:
+    """Bounds of the <tag> element of *data* containing *position*."""
+    close = b"</" + tag + b">"
+    start = data.rfind(b"<" + tag, 0, position)
+    while start >= 0 and data[start + len(tag) + 1:start + len(tag) + 2] not in (b" ", b">", b"\t", b"\r", b"\n", b"/"):
+        start = data.rfind(b"<" + tag, 0, start)
+    if start < 0 or data.rfind(close, start, position) >= 0:
+        return None
+    end = data.find(close, position)
+    return (start, end + len(close)) if end >= 0 else None
+
+
+def _stream_rewrite(
+    source: zipfile.ZipFile,
+    name: str,
+    tag: bytes,
+    needles: Set[bytes],
+    rewrite: Callable[[bytes], bytes],
+    sink: BinaryIO,
+) -> None:
+    """Copy member *name* to *sink*, passing <tag> elements containing a needle through *rewrite*."""
+    boundary = _ELEMENT_END[tag]
+    pending = b""
+    with source.open(name) as member:
+        while True:
+            block = member.read(_COPY_BLOCK)
+            pending += block
+            # Only hand over data ending on an element boundary, so no
+            # matching element is split between two pieces.
+            cut = len(pending) if not block else pending.rfind(boundary) + len(boundary)
+            if block and cut < len(boundary):
+                if len(pending) > _MAX_PENDING:
+                    raise OfficeRedactionError(f"No <{tag.decode()}> boundary in {_MAX_PENDING} bytes of {name}")
+                continue
+            piece, pending = pending[:cut], pending[cut:]
+            sink.write(_rewrite_piece(piece, tag, needles, rewrite))
+            if not block:
+                return
+
+
+def _rewrite_piece(piece: bytes, tag: bytes, needles: Set[bytes], rewrite: Callable[[bytes], bytes]) -> bytes:
+    elements = set()
+    for needle in needles:
+        position = piece.find(needle)
+        while position >= 0:
+            bounds = _enclosing(piece, position, tag)
+            if bounds is not None:
+                elements.add(bounds)
+            position = piece.find(needle, position + 1)
+    if not elements:
+        return piece
+    out = []
+    cursor = 0
+    for start, end in sorted(elements):
+        if start < cursor:
+            continue
+        out.append(piece[cursor:start])
+        out.append(rewrite(piece[start:end]))
+        cursor = end
+    out.append(piece[cursor:])
+    return b"".join(out)
+
+
+def _unescape(text: bytes) -> str:
+    return html.unescape(text.decode("utf-8"))
+
+
+class _XlsxPass:
+    """Values to redact in one workbook, and which of them were found."""
+
+    def __init__(self, values: Mapping[str, str], masker: Masker):
+        self.values = values
+        self.masker = masker
+        # Longest first, so a value containing another is masked whole.
+        self.pattern = re.compile("|".join(re.escape(value) for value in sorted(values, key=len, reverse=True)))
+        self.seen: Set[str] = set()
+
+    def mask(self, text: str) -> str:
+        def replace(match):
+            self.seen.add(match.group())
+            return self.masker(self.values[match.group()], match.group())
+        return self.pattern.sub(replace, text)
+
+    def mask_runs(self, fragment: bytes) -> bytes:
+        """Mask the <t> texts of a string item; a match across rich-text runs
+        moves the masked text into the first run."""
+        nodes = list(_T_NODE.finditer(fragment))
+        texts = [_unescape(node.group(2)) for node in nodes]
+        joined = "".join(texts)
+        if not nodes or not self.pattern.search(joined):
+            return fragment
+        bounds, position = [], 0
+        for text in texts[:-1]:
+            position += len(text)
+            bounds.append(position)
+        crosses = any(
+            start < bound < end
+            for match in self.pattern.finditer(joined)
+            for start, end in [match.span()]
+            for bound in bounds
+        )
+        new_texts = [self.mask(joined)] + [""] * (len(texts) - 1) if crosses else [self.mask(text) for text in texts]
+        out, cursor = [], 0
+        for node, text in zip(nodes, new_texts):
+            out.append(fragment[cursor:node.start()])
+            out.append(b'<t xml:space="preserve">' + escape(text).encode("utf-8") + node.group(3))
+            cursor = node.end()
+        out.append(fragment[cursor:])
+        return b"".join(out)
+
+    def mask_cell(self, fragment: bytes) -> bytes:
+        start = _CELL_START.match(fragment)
+        if start is None or start.group(2):
+            return fragment
+        attributes = start.group(1)
+        cell_type = _TYPE_ATTR.search(attributes)
+        cell_type = cell_type.group(1) if cell_type else b"n"
+        if cell_type == b"inlineStr":
+            return self.mask_runs(fragment)
+        value = _V_NODE.search(fragment)
+        if value is None:
+            return fragment
+        text = _unescape(value.group(1))
+        if cell_type == b"str":
+            masked = self.mask(text)
+        elif cell_type == b"n":
+            matches = sorted(_number_texts(text) & set(self.values))
+            if not matches:
+                return fragment
+            self.seen.add(matches[0])
+            masked = self.masker(self.values[matches[0]], matches[0])
+        else:
+            return fragment
+        if masked == text:
+            return fragment
+        # A masked value is text, and a formula would recompute it.
+        attributes = _TYPE_ATTR.sub(b"", attributes) + b' t="inlineStr"'
+        return b"<c" + attributes + b'><is><t xml:space="preserve">' + escape(masked).encode("utf-8") + b"</t></is></c>"
+
+
+class XlsxRedactionWriter(_Writer):
+    """Redact cell values of a .xlsx in place, one page per sheet."""
+
+    def _patch(self, source, spans, report):
+        targets = _targets(source, "xl/workbook.xml")
+        workbook = _read_xml(source, "xl/workbook.xml")
+        sheets = [
+            targets.get(sheet.get(f"{{{_NS['r']}}}id"))
+            for sheet in workbook.iterfind("s:sheets/s:sheet", _NS)
+        ]
+        values: Dict[int, Dict[str, str]] = {}
+        for page, page_spans in spans.items():
+            found = {span.text.strip(): span.entity_type for span in page_spans if span.text.strip()}
+            if found:
+                values[page] = found
+        if not values:
+            return {}, None
+        all_values: Dict[str, str] = {}
+        for page_values in values.values():
+            all_values.update(page_values)
+        redaction = _XlsxPass(all_values, self.masker)
+
+        parts: Dict[str, Part] = {}
+        shared = "xl/sharedStrings.xml"
+        needles = {escape(value).encode("utf-8") for value in all_values} | _RICH_TEXT_RUNS
+        if shared in source.NameToInfo and _scan(source, shared, needles):
+            parts[shared] = lambda sink: _stream_rewrite(source, shared, b"si", needles, redaction.mask_runs, sink)
+        for page, page_values in values.items():
+            part = sheets[page - 1] if 1 <= page <= len(sheets) else None
+            sheet_needles = _needles(page_values)
+            if part is not None and _scan(source, part, sheet_needles):
+                parts[part] = (
+                    lambda sink, part=part, sheet_needles=sheet_needles:
+                    _stream_rewrite(source, part, b"c", sheet_needles, redaction.mask_cell, sink)
+                )
+
+        def settle() -> None:
+            # Shared strings are workbook-wide, so a value counts as found
+            # wherever it was masked.
+            for page, page_values in values.items():
+                missing = [value for value in page_values if value not in redaction.seen]
+                if missing:
+                    report["unresolved"][page] = len(missing)
+                report["spans_redacted"] += len(page_values) - len(missing)
+
+        return parts, settle
+
+
+OOXML_WRITERS = {
+    ".docx": DocxRedactionWriter,
+    ".pptx": PptxRedactionWriter,
+    ".xlsx": XlsxRedactionWriter,
+}
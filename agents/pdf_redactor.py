@@ -0,0 +1,538 @@
+import logging
+import os
+import tempfile
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+from pypdf import PageObject, PdfReader
+from pypdf.generic import (
+    ArrayObject,
+    ByteStringObject,
+    ContentStream,
+    DictionaryObject,
+    FloatObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    StreamObject,
+)
+
+from agents.redaction_kernel import align_spans, page_entity_spans
+from schemas.core_models import GovernedChunk
+
+logger = logging.getLogger(__name__)
+
+# The font model pypdf's own text extraction uses; Font.from_font_resource
+# first shipped in pypdf 6.20.0 (requirements.lock pins a version that has it).
+try:
+    from pypdf.generic._font import Font
+except ImportError:  # pragma: no cover - older pypdf
+    Font = None
+    logger.warning(
+        "[PdfRedaction] pypdf has no font model (needs >= 6.20): glyph widths default to "
+        "500 units and text decodes as latin-1, so spans in CID fonts fail closed"
+    )
+
+# ---------------------------------------------------------------------------
+# Format-preserving PDF redaction
+#
+# Entity offsets produced by the extractor are character offsets into the
+# whitespace-normalised ``page.extract_text()`` of each page.  For a page
+# with entities, the writer interprets the page's content stream, decodes
+# every shown glyph with the font's encoding / ToUnicode map and tracks its
+# position, aligns the decoded glyph text with the extracted text, and then:
+#
+#   * removes the matched glyphs from their Tj/TJ/'/" operators, replacing
+#     each removed run with a TJ displacement of the same width so the rest
+#     of the line keeps its layout;
+#   * draws an opaque box over each removed run on the original page.
+#
+# The output file is written object by object from the source: unmodified
+# pages, fonts, images and other streams are copied with their encoded
+# bytes as-is (no re-compression), only the redacted pages' dictionaries
+# and new content streams are new, and superseded content streams and
+# earlier incremental revisions are dropped, so removed text does not
+# survive anywhere in the file.  Objects are resolved one at a time and
+# released after writing, which keeps memory bounded for large files.
+#
+# Out of scope: text inside form XObjects, annotations and form fields,
+# metadata, and encrypted input.  Glyphs that cannot be aligned with the
+# extracted text are reported; with ``fail_closed`` the writer refuses to
+# emit a file that may still contain them.
+# ---------------------------------------------------------------------------
+
+_IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+_SKIPPED_TYPES = {"/ObjStm", "/XRef"}
+
+Matrix = Tuple[float, float, float, float, float, float]
+Span = Tuple[int, int]
+
+
+class PdfRedactionError(Exception):
+    """Raised when a PDF cannot be redacted safely."""
+
+
+def _mult(m: Sequence[float], n: Sequence[float]) -> Matrix:
+    return (
+        m[0] * n[0] + m[1] * n[2],
+        m[0] * n[1] + m[1] * n[3],
+        m[2] * n[0] + m[3] * n[2],
+        m[2] * n[1] + m[3] * n[3],
+        m[4] * n[0] + m[5] * n[2] + n[4],
+        m[4] * n[1] + m[5] * n[3] + n[5],
+    )
+
+
+def _apply(m: Sequence[float], x: float, y: float) -> Tuple[float, float]:
+    return x * m[0] + y * m[2] + m[4], x * m[1] + y * m[3] + m[5]
+
+
+def _raw_bytes(value: Any) -> bytes:
+    original = getattr(value, "original_bytes", None)
+    if original is not None:
+        return original
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode("latin-1", "replace")
+
+
+class _FontInfo:
+    """Decoding and metrics for one font resource."""
+
+    __slots__ = ("two_byte", "atomic", "encoding", "char_map", "widths", "default_width", "ascent", "descent")
+
+    def __init__(self, font_dict: Optional[DictionaryObject]):
+        self.two_byte = False
+        self.atomic = False
+        self.encoding: Any = None
+        self.char_map: Dict[Any, Any] = {}
+        self.widths: Dict[str, float] = {}
+        self.default_width = 500.0
+        self.ascent, self.descent = 800.0, -200.0
+        if font_dict is None or Font is None:
+            return
+        try:
+            font = Font.from_font_resource(font_dict)
+        except Exception as e:
+            logger.warning(f"[PdfRedaction] Font metrics unavailable, using defaults: {e}")
+            return
+        self.encoding = font.encoding
+        self.char_map = font.character_map
+        self.widths = font.character_widths
+        self.default_width = float(font.character_widths.get("default", 500))
+        descriptor = font.font_descriptor
+        if descriptor.ascent:
+            self.ascent = float(descriptor.ascent)
+        if descriptor.descent:
+            self.descent = float(descriptor.descent)
+        if isinstance(self.encoding, str):
+            # Identity and UCS-2 CMaps use two-byte codes; other named CMaps
+            # have variable-length codes and are handled a string at a time.
+            self.two_byte = self.encoding == "utf-16-be"
+            self.atomic = not self.two_byte
+
+    def codes(self, data: bytes) -> List[Tuple[int, int, str, float]]:
+        """Split *data* into ``(start, end, unicode, width)`` per glyph code."""
+        if self.atomic:
+            try:
+                text = data.decode(self.encoding, "surrogateescape")
+            except (LookupError, UnicodeDecodeError):
+                text = data.decode("latin-1")
+            text = "".join(self.char_map.get(c, c) for c in text)
+            width = sum(self.widths.get(c, self.default_width) for c in text)
+            return [(0, len(data), text, width)]
+        glyphs = []
+        step = 2 if self.two_byte else 1
+        for i in range(0, len(data) - step + 1, step):
+            code = int.from_bytes(data[i:i + step], "big")
+            raw = chr(code)
+            if self.two_byte:
+                decoded = raw
+            elif isinstance(self.encoding, dict):
+                decoded = self.encoding.get(code, raw)
+            else:
+                decoded = bytes((code,)).decode("latin-1")
+            text = self.char_map.get(decoded, decoded)
+            glyphs.append((i, i + step, text, float(self.widths.get(raw, self.default_width))))
+        return glyphs
+
+
+class _Glyph:
+    __slots__ = ("text", "adjust", "box")
+
+    def __init__(self, text: str, adjust: float, box: Tuple[float, float, float, float]):
+        self.text = text
+        # TJ displacement (thousandths of text space) equal to this glyph's advance.
+        self.adjust = adjust
+        self.box = box
+
+
+class _PageText:
+    """Glyphs shown by one page's content stream, with positions.
+
+    ``items[op_index]`` lists the operands of each text-showing operator as
+    numbers or ``(bytes, [(code_start, code_end, glyph_index), ...])``.
+    """
+
+    def __init__(self, content: ContentStream, resources: Optional[DictionaryObject]):
+        self.glyphs: List[_Glyph] = []
+        self.items: Dict[int, List[Any]] = {}
+        fonts = {}
+        if resources is not None:
+            font_res = resources.get("/Font")
+            fonts = font_res.get_object() if font_res is not None else {}
+        self._fonts = fonts
+        self._font_cache: Dict[str, _FontInfo] = {}
+        self._run(content.operations)
+
+    def _font(self, name: Any) -> _FontInfo:
+        key = str(name)
+        info = self._font_cache.get(key)
+        if info is None:
+            font_ref = self._fonts.get(key) if self._fonts else None
+            info = self._font_cache[key] = _FontInfo(font_ref.get_object() if font_ref is not None else None)
+        return info
+
+    def _run(self, operations: List[Tuple[List[Any], bytes]]) -> None:
+        ctm: Matrix = _IDENTITY
+        tm: Matrix = _IDENTITY
+        tlm: Matrix = _IDENTITY
+        state = {"font": _FontInfo(None), "size": 0.0, "Tc": 0.0, "Tw": 0.0, "Th": 1.0, "TL": 0.0, "Ts": 0.0}
+        stack: List[Tuple[Matrix, Dict[str, Any]]] = []
+
+        def show(op_index: int, operands: List[Any]) -> None:
+            nonlocal tm
+            font, size = state["font"], state["size"]
+            th, tc, tw, rise = state["Th"], state["Tc"], state["Tw"], state["Ts"]
+            items: List[Any] = []
+            x = 0.0
+            for operand in operands:
+                if isinstance(operand, (int, float)):
+                    x -= float(operand) / 1000.0 * size * th
+                    items.append(operand)
+                    continue
+                data = _raw_bytes(operand)
+                codes = []
+                trm = _mult(tm, ctm)
+                for start, end, text, width in font.codes(data):
+                    spacing = tc + (tw if end - start == 1 and data[start] == 32 else 0.0)
+                    advance = (width / 1000.0 * size + spacing) * th
+                    x1 = x + width / 1000.0 * size * th
+                    y0 = font.descent / 1000.0 * size + rise
+                    y1 = font.ascent / 1000.0 * size + rise
+                    corners = [_apply(trm, cx, cy) for cx in (x, x1) for cy in (y0, y1)]
+                    xs = [c[0] for c in corners]
+                    ys = [c[1] for c in corners]
+                    adjust = -(width + spacing * 1000.0 / size) if size else 0.0
+                    codes.append((start, end, len(self.glyphs)))
+                    self.glyphs.append(_Glyph(text, adjust, (min(xs), min(ys), max(xs), max(ys))))
+                    x += advance
+                items.append((data, codes))
+            self.items[op_index] = items
+            tm = _mult((1.0, 0.0, 0.0, 1.0, x, 0.0), tm)
+
+        def next_line() -> None:
+            nonlocal tm, tlm
+            tlm = _mult((1.0, 0.0, 0.0, 1.0, 0.0, -state["TL"]), tlm)
+            tm = tlm
+
+        for op_index, (operands, operator) in enumerate(operations):
+            try:
+                if operator == b"q":
+                    stack.append((ctm, dict(state)))
+                elif operator == b"Q":
+                    if stack:
+                        ctm, state = stack.pop()
+                elif operator == b"cm":
+                    ctm = _mult([float(v) for v in operands[:6]], ctm)
+                elif operator == b"BT":
+                    tm = tlm = _IDENTITY
+                elif operator in (b"Td", b"TD"):
+                    tx, ty = float(operands[0]), float(operands[1])
+                    if operator == b"TD":
+                        state["TL"] = -ty
+                    tlm = _mult((1.0, 0.0, 0.0, 1.0, tx, ty), tlm)
+                    tm = tlm
+                elif operator == b"Tm":
+                    tm = tlm = tuple(float(v) for v in operands[:6])
+                elif operator == b"T*":
+                    next_line()
+                elif operator == b"Tf":
+                    state["font"] = self._font(operands[0])
+                    state["size"] = float(operands[1])
+                elif operator == b"Tc":
+                    state["Tc"] = float(operands[0])
+                elif operator == b"Tw":
+                    state["Tw"] = float(operands[0])
+                elif operator == b"Tz":
+                    state["Th"] = float(operands[0]) / 100.0
+                elif operator == b"TL":
+                    state["TL"] = float(operands[0])
+                elif operator == b"Ts":
+                    state["Ts"] = float(operands[0])
+                elif operator == b"Tj":
+                    show(op_index, [operands[0]])
+                elif operator == b"TJ":
+                    show(op_index, list(operands[0]))
+                elif operator == b"'":
+                    next_line()
+                    show(op_index, [operands[0]])
+                elif operator == b'"':
+                    state["Tw"], state["Tc"] = float(operands[0]), float(operands[1])
+                    next_line()
+                    show(op_index, [operands[2]])
+            except (IndexError, TypeError, ValueError) as e:
+                logger.debug(f"[PdfRedaction] Skipping malformed {operator!r}: {e}")
+
+    def non_space(self) -> Tuple[str, List[int]]:
+        """Non-whitespace decoded text and the glyph index of each character."""
+        chars: List[str] = []
+        owners: List[int] = []
+        for index, glyph in enumerate(self.glyphs):
+            for char in glyph.text:
+                if not char.isspace():
+                    chars.append(char)
+                    owners.append(index)
+        return "".join(chars), owners
+
+
+def _extract_text(page: PageObject, content: ContentStream) -> str:
+    """``page.extract_text()`` over the already-parsed *content*.
+
+    pypdf re-parses ``/Contents`` unless it already is a ``ContentStream``;
+    lending it ours for the call halves the parsing cost per page.
+    """
+    original = page.get("/Contents")
+    page[NameObject("/Contents")] = content
+    try:
+        return page.extract_text() or ""
+    finally:
+        page[NameObject("/Contents")] = original
+
+
+def _locate(page_text: str, spans: Iterable[Span], decoded: str, owners: List[int]) -> Tuple[Set[int], int]:
+    """Glyph indices covering *spans* of the normalised *page_text*.
+
+    Returns the glyph set and the number of span characters that could not
+    be aligned with the content stream.
+    """
+    located, unresolved = align_spans(page_text, spans, decoded)
+    return {owners[k] for indices in located for k in indices}, unresolved
+
+
+def _rewrite(operations: List[Tuple[List[Any], bytes]], page: _PageText, removed: Set[int]) -> List[Tuple[List[Any], bytes]]:
+    """Copy *operations*, dropping the *removed* glyphs from show operators."""
+    rewritten = []
+    for op_index, (operands, operator) in enumerate(operations):
+        items = page.items.get(op_index)
+        if items is None or not any(g in removed for item in items if isinstance(item, tuple) for _, _, g in item[1]):
+            rewritten.append((operands, operator))
+            continue
+        array = ArrayObject()
+        for item in items:
+            if not isinstance(item, tuple):
+                array.append(item)
+                continue
+            data, codes = item
+            kept = bytearray()
+            gap = 0.0
+            for start, end, glyph_index in codes:
+                if glyph_index in removed:
+                    if kept:
+                        array.append(ByteStringObject(bytes(kept)))
+                        kept = bytearray()
+                    gap += page.glyphs[glyph_index].adjust
+                else:
+                    if gap:
+                        array.append(FloatObject(round(gap, 3)))
+                        gap = 0.0
+                    kept += data[start:end]
+            if kept:
+                array.append(ByteStringObject(bytes(kept)))
+            if gap:
+                array.append(FloatObject(round(gap, 3)))
+        if operator == b"'":
+            rewritten.append(([], b"T*"))
+        elif operator == b'"':
+            rewritten.append(([operands[0]], b"Tw"))
+            rewritten.append(([operands[1]], b"Tc"))
+            rewritten.append(([], b"T*"))
+        rewritten.append(([array], b"TJ"))
+    return rewritten
+
+
+def _merge_boxes(page: _PageText, removed: Set[int]) -> List[Tuple[float, float, float, float]]:
+    """One box per run of consecutive removed glyphs on the same line."""
+    boxes: List[List[float]] = []
+    last = None
+    for index in sorted(removed):
+        x0, y0, x1, y1 = page.glyphs[index].box
+        if boxes and last == index - 1 and abs(boxes[-1][1] - y0) < 0.5 and abs(boxes[-1][3] - y1) < 0.5:
+            box = boxes[-1]
+            box[0], box[2] = min(box[0], x0), max(box[2], x1)
+        else:
+            boxes.append([x0, y0, x1, y1])
+        last = index
+    return [tuple(box) for box in boxes]
+
+
+def page_spans(chunks: Iterable[GovernedChunk], redacted_types: Optional[Mapping[str, Set[str]]] = None) -> Dict[int, List[Span]]:
+    """Page-level character spans of the entities that were redacted.
+
+    See :func:`agents.redaction_kernel.page_entity_spans`; glyph removal does
+    not depend on the entity type, so only the offsets are kept.
+    """
+    return {
+        page: sorted({(span.start, span.end) for span in page_list})
+        for page, page_list in page_entity_spans(chunks, redacted_types).items()
+    }
+
+
+class PdfRedactionWriter:
+    """Redact page-level character spans in place and write a new PDF.
+
+    Args:
+        fail_closed: Raise :class:`PdfRedactionError` instead of writing a
+            file when some span characters could not be located in the
+            content stream.
+        fill: RGB fill of the redaction boxes (0-1 floats).
+    """
+
+    def __init__(self, fail_closed: bool = True, fill: Tuple[float, float, float] = (0.0, 0.0, 0.0)):
+        self.fail_closed = fail_closed
+        self.fill = fill
+
+    def redact(self, source_path: str, output_path: str, spans: Mapping[int, Sequence[Span]]) -> Dict[str, Any]:
+        """Write a redacted copy of *source_path*; *spans* maps 1-based page numbers to spans.
+
+        Returns a report with ``pages_redacted``, ``glyphs_removed``,
+        ``boxes`` and ``unresolved`` (page -> characters not located).
+        """
+        reader = PdfReader(source_path)
+        if reader.is_encrypted:
+            raise PdfRedactionError("Encrypted PDFs are not supported for in-place redaction")
+
+        replacements: Dict[int, Tuple[DictionaryObject, bytes]] = {}
+        report: Dict[str, Any] = {"pages_redacted": 0, "glyphs_removed": 0, "boxes": 0, "unresolved": {}}
+        for page_number, page_span_list in spans.items():
+            if not page_span_list or not 1 <= page_number <= len(reader.pages):
+                continue
+            page = reader.pages[page_number - 1]
+            if page.indirect_reference is None:
+                raise PdfRedactionError(f"Page {page_number} is not an indirect object")
+            content = page.get_contents()
+            if content is None:
+                continue
+            resources = page.get("/Resources")
+            glyph_text = _PageText(content, resources.get_object() if resources is not None else None)
+            decoded, owners = glyph_text.non_space()
+            removed, unresolved = _locate(_extract_text(page, content), page_span_list, decoded, owners)
+            if unresolved:
+                report["unresolved"][page_number] = unresolved
+            if not removed:
+                continue
+            operations = _rewrite(content.operations, glyph_text, removed)
+            boxes = _merge_boxes(glyph_text, removed)
+            content.operations = operations
+            r, g, b = self.fill
+            overlay = "".join(f"{x0:.3f} {y0:.3f} {x1 - x0:.3f} {y1 - y0:.3f} re\n" for x0, y0, x1, y1 in boxes)
+            data = b"q\n" + content.get_data() + f"\nQ\nq {r:g} {g:g} {b:g} rg\n{overlay}f\nQ\n".encode("ascii")
+            replacements[page.indirect_reference.idnum] = (page, data)
+            report["pages_redacted"] += 1
+            report["glyphs_removed"] += len(removed)
+            report["boxes"] += len(boxes)
+
+        if report["unresolved"] and self.fail_closed:
+            raise PdfRedactionError(
+                f"Could not locate every redaction span in the content streams: {report['unresolved']}"
+            )
+        self._write(reader, output_path, replacements)
+        return report
+
+    def _write(self, reader: PdfReader, output_path: str, replacements: Dict[int, Tuple[DictionaryObject, bytes]]) -> None:
+        # Content streams referenced only by redacted pages are dropped.
+        dropped: Set[int] = set()
+        kept_refs: Set[int] = set()
+        for page in reader.pages:
+            contents = page.get("/Contents")
+            refs = []
+            if isinstance(contents, IndirectObject):
+                resolved = contents.get_object()
+                refs = [contents] + (list(resolved) if isinstance(resolved, ArrayObject) else [])
+            elif isinstance(contents, ArrayObject):
+                refs = list(contents)
+            ids = {ref.idnum for ref in refs if isinstance(ref, IndirectObject)}
+            if page.indirect_reference is not None and page.indirect_reference.idnum in replacements:
+                dropped |= ids
+            else:
+                kept_refs |= ids
+        dropped -= kept_refs
+
+        objects: Dict[int, int] = {}
+        for generation, entries in reader.xref.items():
+            for idnum in entries:
+                if not reader.xref_free_entry.get(generation, {}).get(idnum, False):
+                    objects[idnum] = generation
+        for idnum in reader.xref_objStm:
+            objects.setdefault(idnum, 0)
+        next_id = max(objects, default=0) + 1
+
+        directory = os.path.dirname(os.path.abspath(output_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".redact-", suffix=".pdf")
+        offsets: Dict[int, Tuple[int, int]] = {}
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(b"%PDF-" + (reader.pdf_header[5:].encode("ascii", "ignore") or b"1.7") + b"\n%\xe2\xe3\xcf\xd3\n")
+
+                def emit(idnum: int, generation: int, obj: Any) -> None:
+                    offsets[idnum] = (out.tell(), generation)
+                    out.write(f"{idnum} {generation} obj\n".encode("ascii"))
+                    obj.write_to_stream(out)
+                    out.write(b"\nendobj\n")
+
+                for idnum in sorted(objects):
+                    if idnum in dropped:
+                        continue
+                    generation = objects[idnum]
+                    if idnum in replacements:
+                        page, data = replacements[idnum]
+                        stream = StreamObject()
+                        stream.set_data(data)
+                        emit(next_id, 0, stream.flate_encode())
+                        page_dict = DictionaryObject(page)
+                        page_dict[NameObject("/Contents")] = IndirectObject(next_id, 0, reader)
+                        next_id += 1
+                        emit(idnum, generation, page_dict)
+                        continue
+                    obj = reader.get_object(IndirectObject(idnum, generation, reader))
+                    if obj is None or (isinstance(obj, DictionaryObject) and (
+                        obj.get("/Type") in _SKIPPED_TYPES or "/Linearized" in obj
+                    )):
+                        continue
+                    emit(idnum, generation, obj)
+                    # Release parsed objects as we go so memory stays bounded.
+                    reader.resolved_objects.pop((generation, idnum), None)
+
+                xref_offset = out.tell()
+                size = max(max(offsets, default=0), next_id - 1) + 1
+                out.write(f"xref\n0 {size}\n".encode("ascii"))
+                out.write(b"0000000000 65535 f \n")
+                for idnum in range(1, size):
+                    entry = offsets.get(idnum)
+                    if entry is None:
+                        out.write(b"0000000000 65535 f \n")
+                    else:
+                        out.write(f"{entry[0]:010d} {entry[1]:05d} n \n".encode("ascii"))
+                trailer = DictionaryObject()
+                trailer[NameObject("/Size")] = NumberObject(size)
+                for key in ("/Root", "/Info", "/ID"):
+                    if key in reader.trailer:
+                        trailer[NameObject(key)] = reader.trailer.raw_get(key)
+                out.write(b"trailer\n")
+                trailer.write_to_stream(out)
+                out.write(f"\nstartxref\n{xref_offset}\n%%EOF\n".encode("ascii"))
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
@@ -1,38 +1,17 @@
 import os
-import yaml
 import logging
-from typing import Any, Dict, List, Optional
-from schemas.core_models import ClassifiedChunk, GovernedChunk, AgentDecision, DetectedPII
+from typing import Any, Dict, List, Optional, Union
+from schemas.core_models import ClassifiedChunk, AgentDecision, DetectedPII
+from schemas.internal import Chunk, as_chunk
 from schemas.rule_schema import NSRLRule
-
-# ---------------------------------------------------------------------------
-# Document-context entity type classification sets
-#
-# These sets map Presidio / custom entity type names to the boolean context
-# fields used by CONTEXT_MATCH escalation rules in the NSRL rule files:
-#
-#   _GOV_ID_ENTITY_TYPES  → ``has_gov_id``
-#   _HEALTHCARE_ENTITY_TYPES → ``has_healthcare_data``
-#   _FINANCIAL_ENTITY_TYPES  → ``has_financial_data``
-#
-# When a document contains any entity whose type appears in one of these
-# sets, the corresponding boolean is set to True in the document context
-# dict passed to :meth:`PolicyAgent._check_context_conditions`.  This
-# enables rules like ESC-TOXIC-ID-FIN-001 (identity + finance) and
-# ESC-TOXIC-ID-HEALTH-001 (identity + healthcare) to fire correctly.
-# ---------------------------------------------------------------------------
-_GOV_ID_ENTITY_TYPES: frozenset = frozenset({
-    "US_SSN", "UK_NINO", "IN_AADHAAR", "IN_PAN",
-    "DE_PASSPORT", "FR_PASSPORT", "ES_PASSPORT", "IT_PASSPORT",
-})
-_HEALTHCARE_ENTITY_TYPES: frozenset = frozenset({
-    "ICD10_CODE", "MEDICAL_LICENSE", "US_HEALTHCARE_NPI",
-    "NHS_NUMBER", "HEALTHCARE_NUMBER",
-})
-_FINANCIAL_ENTITY_TYPES: frozenset = frozenset({
-    "CREDIT_CARD", "IBAN_CODE", "SWIFT_CODE",
-    "CRYPTO_BTC_WALLET", "US_BANK_NUMBER",
-})
+from agents.entity_registry import EntityRegistry
+from agents.budgets import BUDGET_OVERRUNS, Deadline, HardLimits, check_input_size
+from agents.policy_engine import DocumentContext
+from agents.rule_integrity import IntegrityPolicy, ManifestVerifier
+from agents.rule_sets import RuleSet, RuleSetManager
+from agents.rule_snapshot import RuleSetSnapshotStore
+from agents.rule_testing import RuleProfiler
+from config.settings import settings
 
 # Configure Logging
 logger = logging.getLogger(__name__)
@@ -43,48 +22,113 @@ class PolicyAgent:
     Phase 5: Governance.
     """
     
-    def __init__(self, rules_dir: str = "nsrl/rules"):
+    def __init__(
+        self,
+        rules_dir: str = "nsrl/rules",
+        manifest_path: Optional[str] = None,
+        hot_reload: Optional[bool] = None,
+    ):
         self.rules_dir = rules_dir
-        self.rules: List[NSRLRule] = []
-        self._load_rules()
-
-    def _load_rules(self):
-        """Loads all YAML rule files from the rules directory."""
-        if not os.path.exists(self.rules_dir):
-            logger.warning(f"Rules directory not found: {self.rules_dir}")
-            return
-
-        loaded_count = 0
-        for root, _, files in os.walk(self.rules_dir):
-            for file in files:
-                if file.endswith(".yml") or file.endswith(".yaml"):
-                    file_path = os.path.join(root, file)
-                    try:
-                        with open(file_path, "r") as f:
-                            content = yaml.safe_load(f)
-                            if isinstance(content, list):
-                                for item in content:
-                                    rule = NSRLRule(**item)
-                                    self.rules.append(rule)
-                                    loaded_count += 1
-                    except Exception as e:
-                        logger.error(f"Failed to load rule file {file_path}: {e}")
-        
-        # Sort rules by priority (descending)
-        self.rules.sort(key=lambda x: x.meta.priority, reverse=True)
-        logger.info(f"[PolicyAgent] Loaded {loaded_count} rules from {self.rules_dir}")
-
-    def evaluate_chunk(self, chunk: ClassifiedChunk, trace_id: str = "unknown") -> GovernedChunk:
+        nsrl_root = os.path.dirname(os.path.normpath(rules_dir))
+        if manifest_path is None:
+            manifest_path = os.path.join(nsrl_root, "meta", "policy_manifest.yml")
+        self.limits = HardLimits.load(os.path.join(nsrl_root, "security", "hard_limits.yml"))
+        self._rule_sets = RuleSetManager(
+            rules_dir,
+            manifest_path=manifest_path,
+            poll_interval=settings.POLICY_RELOAD_INTERVAL_SECONDS,
+            verifier=self._integrity_verifier(nsrl_root),
+            limits=self.limits,
+            snapshots=self._snapshot_store(),
+            tenant_cache_size=settings.POLICY_TENANT_CACHE_SIZE,
+        )
+        if settings.POLICY_HOT_RELOAD if hot_reload is None else hot_reload:
+            self._rule_sets.start()
+        # Set to a RuleProfiler to time every rule evaluation (profiling mode).
+        self.profiler: Optional[RuleProfiler] = None
+
+    @staticmethod
+    def _snapshot_store() -> Optional[RuleSetSnapshotStore]:
+        """Rule-set snapshots, when both a directory and a signing key are configured."""
+        if not settings.POLICY_SNAPSHOT_DIR:
+            return None
+        if not settings.POLICY_SNAPSHOT_KEY:
+            logger.info("Rule-set snapshots disabled: POLICY_SNAPSHOT_KEY is not set")
+            return None
+        return RuleSetSnapshotStore(settings.POLICY_SNAPSHOT_DIR, settings.POLICY_SNAPSHOT_KEY)
+
+    @staticmethod
+    def _integrity_verifier(nsrl_root: str) -> Optional[ManifestVerifier]:
+        """Build the manifest checksum verifier if the NSRL tree declares one.
+
+        Enforced when ``security/integrity_checks.yml`` exists next to the
+        rules directory and ``POLICY_INTEGRITY_CHECK`` is on.  The signature
+        section of that file is not enforced here.
+        """
+        policy_path = os.path.join(nsrl_root, "security", "integrity_checks.yml")
+        if not settings.POLICY_INTEGRITY_CHECK or not os.path.exists(policy_path):
+            return None
+        return ManifestVerifier(nsrl_root, IntegrityPolicy.load(policy_path))
+
+    @property
+    def rule_set(self) -> RuleSet:
+        """The active compiled rule set (an immutable snapshot)."""
+        return self._rule_sets.current
+
+    @property
+    def rule_set_version(self) -> str:
+        """Content-hash version of the active rules; use it as a cache key."""
+        return self._rule_sets.current.version
+
+    @property
+    def rules(self) -> List[NSRLRule]:
+        return self._rule_sets.current.rules
+
+    @rules.setter
+    def rules(self, rules: List[NSRLRule]) -> None:
+        self._rule_sets.install(RuleSet(rules, version="manual"))
+
+    def reload_rules(self, force: bool = False) -> bool:
+        """Re-read the rules now; returns True if a new version was swapped in."""
+        return self._rule_sets.reload(force=force)
+
+    def close(self) -> None:
+        """Stop the hot-reload watcher, if running."""
+        self._rule_sets.stop()
+
+    def evaluate_chunk(
+        self,
+        chunk: Union[ClassifiedChunk, Chunk],
+        trace_id: str = "unknown",
+        tenant_id: Optional[str] = None,
+        registry: Optional[EntityRegistry] = None,
+    ) -> Chunk:
         """
         Evaluates a classified chunk against loaded rules.
         Determines the highest risk score and appropriate action.
+
+        With *tenant_id*, the tenant's overrides from ``tenant_overrides.yml``
+        are layered over the shared base rules; unknown tenants get the base.
+        With a document *registry* (:class:`agents.entity_registry.EntityRegistry`),
+        rule matches are evaluated once per distinct entity value.
+
+        Bounded by ``hard_limits.yml``: oversize chunks raise
+        :class:`agents.budgets.InputTooLarge`, and evaluation stops once
+        ``execution_timeout_ms`` is spent.  A chunk whose evaluation or
+        classification was cut short fails closed to Redact.
         """
+        check_input_size(chunk.processed_text, self.limits, stage="policy")
+        # The decision is attached in place; pydantic input is converted once.
+        chunk = as_chunk(chunk)
+        deadline = Deadline(self.limits.execution_timeout_ms)
         max_risk_score = 0.0
         final_action = "Allow"
         justifications = []
+        # One snapshot per evaluation so a concurrent reload cannot mix versions.
+        _, compiled_rules = self._rule_sets.compiled_for(tenant_id)
         
         # Default decision if no rules fire
-        if not chunk.detected_entities:
+        if not chunk.detected_entities and not chunk.classification_degraded:
              decision = AgentDecision(
                 trace_id=trace_id,
                 chunk_id=chunk.chunk_id,
@@ -93,36 +137,71 @@ class PolicyAgent:
                 risk_score=0.0,
                 justification_trace=["No PII detected."]
             )
-             return GovernedChunk(
-                 **chunk.dict(),
-                 redacted_text=chunk.processed_text, # No redaction needed
-                 decision=decision
-             )
+             chunk.decision = decision
+             return chunk
 
         # Iterate over entities and check rules
         # We need to find the most severe rule that applies to *any* entity in the chunk.
-        
+        # Each entity is only tested against the compiled rules indexed under
+        # its entity type (plus rules that do not constrain the type).
+        # The deadline is checked after every rule; the rule that crosses it
+        # is charged with the overrun.
+        # With a document registry, the rules fired for a (type, value, score)
+        # are remembered, so repeated values are evaluated once per document.
+        # The profiler needs every evaluation, so it bypasses the memo.
+        overrun_rule = None
+        profiler = self.profiler
+        fired_cache = registry.fired_rules_cache(compiled_rules) if registry is not None and profiler is None else None
+
         for entity in chunk.detected_entities:
-            for rule in self.rules:
-                if self._check_conditions(entity, rule):
-                    # Rule Fired
-                    justifications.append(f"Rule {rule.id} fired on '{entity.entity_type}': {rule.actions.justification}")
-                    
-                    if rule.actions.score > max_risk_score:
-                        max_risk_score = rule.actions.score
-                        
-                    # Determine Action based on Severity/Score
-                    # Map NSRL Actions to System Actions
-                    # Currently NSRL has 'classification' and 'severity'.
-                    
-                    if rule.actions.severity in ["CRITICAL", "HIGH"]:
-                        # Escalate to Redact/Block
-                        final_action = "Redact" 
-                    elif rule.actions.severity == "MEDIUM" and final_action != "Redact":
-                         final_action = "Redact" # Or maybe Review? Let's stick to Redact for PII.
-
-                    # Since we sort by priority, maybe we want to keep checking? 
-                    # Yes, to find max score.
+            key = (entity.entity_type, entity.text_value, entity.score)
+            fired = fired_cache.get(key) if fired_cache is not None else None
+            if fired is None:
+                fired = []
+                for compiled in compiled_rules.candidates(entity.entity_type):
+                    if compiled.matches(entity) if profiler is None else profiler.match_entity(compiled, entity):
+                        fired.append(compiled)
+                    if deadline.expired():
+                        overrun_rule = compiled.rule.id
+                        break
+                # A cut-short evaluation is incomplete; never remember it.
+                if fired_cache is not None and overrun_rule is None:
+                    fired_cache[key] = fired
+
+            for compiled in fired:
+                rule = compiled.rule
+                # Rule Fired
+                justifications.append(f"Rule {rule.id} fired on '{entity.entity_type}': {rule.actions.justification}")
+
+                if rule.actions.score > max_risk_score:
+                    max_risk_score = rule.actions.score
+
+                # Determine Action based on Severity/Score
+                # Map NSRL Actions to System Actions
+                # Currently NSRL has 'classification' and 'severity'.
+
+                if rule.actions.severity in ["CRITICAL", "HIGH"]:
+                    # Escalate to Redact/Block
+                    final_action = "Redact"
+                elif rule.actions.severity == "MEDIUM" and final_action != "Redact":
+                     final_action = "Redact" # Or maybe Review? Let's stick to Redact for PII.
+
+                # Since we sort by priority, maybe we want to keep checking?
+                # Yes, to find max score.
+            if overrun_rule is not None:
+                break
+
+        # Fail closed: an incomplete evaluation or detection may hide PII.
+        if overrun_rule is not None:
+            BUDGET_OVERRUNS.labels(stage="policy_rule", name=overrun_rule).inc()
+            justifications.append(
+                f"Policy evaluation exceeded execution_timeout_ms ({self.limits.execution_timeout_ms} ms) "
+                f"at rule {overrun_rule}; remaining rules skipped, failing closed."
+            )
+            final_action = "Redact"
+        if chunk.classification_degraded:
+            justifications.append("PII detection was cut short by its time budget; failing closed.")
+            final_action = "Redact"
         
         if not justifications:
              justifications.append("No specific NSRL rules matched active PII, but PII was present.")
@@ -141,17 +220,18 @@ class PolicyAgent:
             justification_trace=justifications
         )
 
-        return GovernedChunk(
-            **chunk.dict(),
-            redacted_text=chunk.processed_text, # Placeholder for Phase 6
-            decision=decision
-        )
+        chunk.decision = decision
+        return chunk
 
     def _check_conditions(self, entity: DetectedPII, rule: NSRLRule) -> bool:
         """
         Checks if a detected entity matches the rule conditions.
         ALL conditions must match (AND logic).
 
+        This is the reference (interpreted) form of the semantics compiled by
+        :class:`agents.policy_engine.CompiledRuleSet`, which ``evaluate_chunk``
+        uses on the hot path.
+
         Only PII_MATCH conditions can be evaluated here because this method
         operates at the entity level.  CONTEXT_MATCH conditions require
         document-level context (e.g. total PII count, jurisdiction) that is
@@ -207,30 +287,19 @@ class PolicyAgent:
     # Document-level escalation evaluation (CONTEXT_MATCH rules)
     # ------------------------------------------------------------------
 
-    def _build_document_context(
+    def new_document_context(
         self,
-        chunks: List[ClassifiedChunk],
         jurisdiction: Optional[str] = None,
-    ) -> Dict[str, Any]:
-        """Derives document-level context fields from all classified chunks.
+        tenant_id: Optional[str] = None,
+    ) -> DocumentContext:
+        """Start an incremental document context bound to the active rule set.
 
-        The returned dict is passed to :meth:`_check_context_conditions` so
-        that CONTEXT_MATCH rules can be evaluated against real document data.
+        Feed it each chunk with :meth:`DocumentContext.add_chunk` as the
+        pipeline produces them, then pass it to :meth:`evaluate_document`.
+        *tenant_id* selects that tenant's overlay, as in :meth:`evaluate_chunk`.
         """
-        all_entity_types: set = set()
-        total_pii = 0
-        for chunk in chunks:
-            for entity in chunk.detected_entities:
-                all_entity_types.add(entity.entity_type)
-                total_pii += 1
-
-        return {
-            "pii_total_count": total_pii,
-            "has_gov_id": bool(all_entity_types & _GOV_ID_ENTITY_TYPES),
-            "has_healthcare_data": bool(all_entity_types & _HEALTHCARE_ENTITY_TYPES),
-            "has_financial_data": bool(all_entity_types & _FINANCIAL_ENTITY_TYPES),
-            "jurisdiction": jurisdiction,
-        }
+        rule_set, compiled = self._rule_sets.compiled_for(tenant_id)
+        return DocumentContext(compiled, jurisdiction=jurisdiction, rule_set_version=rule_set.version)
 
     def _check_context_conditions(
         self,
@@ -243,6 +312,10 @@ class PolicyAgent:
         those rules belong to the per-entity evaluation path in
         :meth:`_check_conditions`.  This enforces strict separation between
         the two evaluation tiers.
+
+        This is the reference (interpreted) form of the CONTEXT_MATCH
+        semantics compiled into :class:`agents.policy_engine.DocumentContext`,
+        which ``evaluate_document`` uses.
         """
         for cond in rule.conditions:
             if cond.type != "CONTEXT_MATCH":
@@ -271,11 +344,13 @@ class PolicyAgent:
 
     def evaluate_document(
         self,
-        chunks: List[ClassifiedChunk],
+        chunks: Optional[List[ClassifiedChunk]] = None,
         trace_id: str = "unknown",
         jurisdiction: Optional[str] = None,
+        context: Optional[DocumentContext] = None,
+        tenant_id: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Evaluate document-level CONTEXT_MATCH escalation rules.
+        """Evaluate document-level escalation rules.
 
         This is the **second evaluation phase**, complementing the per-chunk
         :meth:`evaluate_chunk` method.  It must be called after all chunks
@@ -283,15 +358,23 @@ class PolicyAgent:
         PII count, presence of gov-ID/health/financial entity types) are
         available.
 
-        Only rules whose **every** condition is of type ``CONTEXT_MATCH`` are
-        evaluated here; rules that mix PII_MATCH with CONTEXT_MATCH are not
-        yet supported and are skipped with a warning.
+        Rules whose conditions are all ``CONTEXT_MATCH`` fire on the document
+        context alone.  Rules that mix PII_MATCH with CONTEXT_MATCH fire when
+        at least one entity satisfies every PII_MATCH condition and the
+        document context satisfies every CONTEXT_MATCH condition.
 
         Args:
             chunks: All classified chunks from the document (post Fusion).
+                Not needed when *context* is given.
             trace_id: Trace identifier for auditability.
             jurisdiction: Optional jurisdiction code (e.g. ``"EU"`` to trigger
-                GDPR rules).  Pass ``None`` (default) when unknown.
+                GDPR rules).  Pass ``None`` (default) when unknown.  Ignored
+                when *context* is given.
+            context: A :class:`DocumentContext` from
+                :meth:`new_document_context` that was fed each chunk as it
+                was produced; avoids a second pass over the entities.
+            tenant_id: Tenant whose overlay applies.  Ignored when *context*
+                is given (the context is already bound to one).
 
         Returns:
             A dict with the following keys:
@@ -303,8 +386,14 @@ class PolicyAgent:
             * ``justifications`` (list[str]) — Human-readable explanations.
             * ``context_snapshot`` (dict) — The document context that was
               evaluated, useful for debugging and audit purposes.
+            * ``rule_set_version`` (str) — Content-hash version of the rules
+              that produced this result.
         """
-        doc_context = self._build_document_context(chunks, jurisdiction=jurisdiction)
+        if context is None:
+            context = self.new_document_context(jurisdiction, tenant_id=tenant_id)
+            for chunk in chunks or []:
+                context.add_chunk(chunk)
+        doc_context = context.snapshot()
 
         _severity_order = {"CRITICAL": 4, "HIGH": 3, "MEDIUM": 2, "LOW": 1, "NONE": 0}
         max_risk_score = 0.0
@@ -312,25 +401,16 @@ class PolicyAgent:
         rules_fired: List[str] = []
         justifications: List[str] = []
 
-        for rule in self.rules:
-            if not rule.conditions:
-                continue
-
-            # Skip rules that mix condition types — they require a combined evaluator
-            # not yet implemented.  Log a warning so operators know.
-            if not all(c.type == "CONTEXT_MATCH" for c in rule.conditions):
-                continue
-
-            if self._check_context_conditions(doc_context, rule):
-                rules_fired.append(rule.id)
-                justifications.append(
-                    f"Rule {rule.id} fired: "
-                    f"{rule.actions.justification or rule.meta.description}"
-                )
-                if rule.actions.score > max_risk_score:
-                    max_risk_score = rule.actions.score
-                if _severity_order.get(rule.actions.severity, 0) > _severity_order.get(severity, 0):
-                    severity = rule.actions.severity
+        for rule in context.fired_rules(doc_context, profiler=self.profiler):
+            rules_fired.append(rule.id)
+            justifications.append(
+                f"Rule {rule.id} fired: "
+                f"{rule.actions.justification or rule.meta.description}"
+            )
+            if rule.actions.score > max_risk_score:
+                max_risk_score = rule.actions.score
+            if _severity_order.get(rule.actions.severity, 0) > _severity_order.get(severity, 0):
+                severity = rule.actions.severity
 
         logger.info(
             "[PolicyAgent] Document evaluation complete: trace=%s escalated=%s "
@@ -345,4 +425,5 @@ class PolicyAgent:
             "rules_fired": rules_fired,
             "justifications": justifications,
             "context_snapshot": doc_context,
+            "rule_set_version": context.rule_set_version,
         }
@@ -0,0 +1,433 @@
+from operator import attrgetter
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from schemas.core_models import ClassifiedChunk, DetectedPII
+from schemas.rule_schema import NSRLRule, RuleCondition
+
+# ---------------------------------------------------------------------------
+# Compiled PII_MATCH rule engine
+#
+# NSRL rules are compiled once, at load time, into predicate closures and a
+# dispatch index keyed on entity type.  Almost every PII_MATCH rule carries a
+# ``type EQUALS X`` (or ``type IN_LIST [...]``) condition; that condition
+# becomes the index key and is dropped from the rule's predicates, so an
+# entity is only ever tested against the rules that can fire for its type.
+# Per-entity cost is therefore independent of the total number of rules.
+#
+# The compiled predicates reproduce PolicyAgent._check_conditions exactly,
+# including its "never matches" cases (unknown field, unknown operator,
+# CONTEXT_MATCH or unknown condition types): such rules are left out of the
+# index altogether.
+# ---------------------------------------------------------------------------
+
+EntityPredicate = Callable[[DetectedPII], bool]
+ContextPredicate = Callable[[Dict[str, Any]], bool]
+
+_FIELD_GETTERS: Dict[str, Callable[[DetectedPII], Any]] = {
+    "type": attrgetter("entity_type"),
+    "confidence": attrgetter("score"),
+    "value": attrgetter("text_value"),
+}
+
+_LIST_TYPES = (list, tuple, set, frozenset)
+
+
+def _membership(target: Any) -> Any:
+    """Return the fastest container with the same ``in`` semantics as *target*."""
+    if isinstance(target, _LIST_TYPES):
+        try:
+            return frozenset(target)
+        except TypeError:
+            return tuple(target)
+    # Strings keep substring semantics, as in the interpreted evaluator.
+    return target
+
+
+def compile_pii_condition(cond: RuleCondition) -> Optional[EntityPredicate]:
+    """Compile one PII_MATCH condition into a closure over a DetectedPII.
+
+    Returns None when the condition can never be satisfied at the entity
+    level, which makes the whole rule unmatchable.
+    """
+    if cond.type != "PII_MATCH":
+        return None
+    get = _FIELD_GETTERS.get(cond.field)
+    if get is None:
+        return None
+    target = cond.value
+
+    if cond.operator == "EQUALS":
+        return lambda entity: get(entity) == target
+    if cond.operator == "GREATER_THAN":
+        def greater_than(entity: DetectedPII) -> bool:
+            val = get(entity)
+            return isinstance(val, (int, float)) and val > target
+        return greater_than
+    if cond.operator == "LESS_THAN_OR_EQUALS":
+        def less_than_or_equals(entity: DetectedPII) -> bool:
+            val = get(entity)
+            return isinstance(val, (int, float)) and val <= target
+        return less_than_or_equals
+    if cond.operator == "IN_LIST":
+        members = _membership(target)
+        return lambda entity: get(entity) in members
+    return None
+
+
+def compile_context_condition(cond: RuleCondition) -> Optional[ContextPredicate]:
+    """Compile one CONTEXT_MATCH condition into a closure over the document context.
+
+    Mirrors PolicyAgent._check_context_conditions; returns None for an
+    unknown operator, which makes the whole rule unmatchable.
+    """
+    if cond.type != "CONTEXT_MATCH":
+        return None
+    field = cond.field
+    target = cond.value
+
+    if cond.operator == "EQUALS":
+        return lambda ctx: ctx.get(field) == target
+    if cond.operator == "GREATER_THAN":
+        def greater_than(ctx: Dict[str, Any]) -> bool:
+            val = ctx.get(field)
+            return isinstance(val, (int, float)) and val > target
+        return greater_than
+    if cond.operator == "LESS_THAN_OR_EQUALS":
+        def less_than_or_equals(ctx: Dict[str, Any]) -> bool:
+            val = ctx.get(field)
+            return isinstance(val, (int, float)) and val <= target
+        return less_than_or_equals
+    if cond.operator == "IN_LIST":
+        members = _membership(target)
+        return lambda ctx: ctx.get(field) in members
+    return None
+
+
+def _type_keys(cond: RuleCondition) -> Optional[FrozenSet[str]]:
+    """Entity types a ``type`` condition restricts a rule to, if indexable."""
+    if cond.type != "PII_MATCH" or cond.field != "type":
+        return None
+    if cond.operator == "EQUALS":
+        return frozenset({cond.value}) if isinstance(cond.value, str) else None
+    if cond.operator == "IN_LIST" and isinstance(cond.value, _LIST_TYPES):
+        if all(isinstance(v, str) for v in cond.value):
+            return frozenset(cond.value)
+    return None
+
+
+class CompiledRule:
+    """An NSRL rule reduced to its residual entity predicates."""
+
+    __slots__ = ("rule", "rank", "predicates")
+
+    def __init__(self, rule: NSRLRule, rank: int, predicates: Tuple[EntityPredicate, ...]):
+        self.rule = rule
+        self.rank = rank
+        self.predicates = predicates
+
+    def matches(self, entity: DetectedPII) -> bool:
+        for predicate in self.predicates:
+            if not predicate(entity):
+                return False
+        return True
+
+
+class CompiledDocumentRule:
+    """A document-level rule: CONTEXT_MATCH predicates plus, for mixed rules,
+    the PII_MATCH part that at least one entity of the document must satisfy.
+    """
+
+    __slots__ = ("rule", "rank", "type_keys", "entity_predicates", "context_predicates", "mixed")
+
+    def __init__(
+        self,
+        rule: NSRLRule,
+        rank: int,
+        type_keys: Optional[FrozenSet[str]],
+        entity_predicates: Tuple[EntityPredicate, ...],
+        context_predicates: Tuple[ContextPredicate, ...],
+        mixed: bool,
+    ):
+        self.rule = rule
+        self.rank = rank
+        self.type_keys = type_keys
+        self.entity_predicates = entity_predicates
+        self.context_predicates = context_predicates
+        self.mixed = mixed
+
+    def matches_entity(self, entity: DetectedPII) -> bool:
+        if self.type_keys is not None and entity.entity_type not in self.type_keys:
+            return False
+        for predicate in self.entity_predicates:
+            if not predicate(entity):
+                return False
+        return True
+
+    def matches_context(self, ctx: Dict[str, Any]) -> bool:
+        for predicate in self.context_predicates:
+            if not predicate(ctx):
+                return False
+        return True
+
+
+class CompiledRuleSet:
+    """Type-indexed dispatch table over a priority-ordered list of NSRL rules.
+
+    ``candidates(entity_type)`` returns, in the original priority order, the
+    compiled rules keyed on that type merged with the rules that do not
+    constrain the type at all.  ``context_rules`` holds the CONTEXT_MATCH-only
+    rules; ``document_rules`` holds those plus the rules that mix PII_MATCH and
+    CONTEXT_MATCH conditions, compiled for :class:`DocumentContext`.
+    """
+
+    def __init__(self, rules: Sequence[NSRLRule], rank_offset: int = 0):
+        self.rules = list(rules)
+        keyed: Dict[str, List[CompiledRule]] = {}
+        self._wildcard: List[CompiledRule] = []
+        self.context_rules: List[NSRLRule] = []
+        document_rules: List[CompiledDocumentRule] = []
+
+        # rank_offset keeps ranks unique when this set overlays another.
+        for rank, rule in enumerate(self.rules, start=rank_offset):
+            kinds = {c.type for c in rule.conditions}
+            if "CONTEXT_MATCH" in kinds:
+                if kinds == {"CONTEXT_MATCH"}:
+                    self.context_rules.append(rule)
+                doc_rule = self._compile_document(rule, rank)
+                if doc_rule is not None:
+                    document_rules.append(doc_rule)
+                continue
+            compiled = self._compile(rule, rank)
+            if compiled is None:
+                continue
+            keys, crule = compiled
+            if keys is None:
+                self._wildcard.append(crule)
+            else:
+                for key in keys:
+                    keyed.setdefault(key, []).append(crule)
+
+        self._index: Dict[str, Tuple[CompiledRule, ...]] = {
+            key: tuple(sorted(bucket + self._wildcard, key=attrgetter("rank")))
+            for key, bucket in keyed.items()
+        }
+        self._wildcard_tuple = tuple(self._wildcard)
+        self.document_rules: Tuple[CompiledDocumentRule, ...] = tuple(document_rules)
+        self.mixed_rules: Tuple[CompiledDocumentRule, ...] = tuple(r for r in document_rules if r.mixed)
+
+    @staticmethod
+    def _compile_document(rule: NSRLRule, rank: int) -> Optional[CompiledDocumentRule]:
+        keys: Optional[FrozenSet[str]] = None
+        entity_predicates: List[EntityPredicate] = []
+        context_predicates: List[ContextPredicate] = []
+        mixed = False
+        for cond in rule.conditions:
+            if cond.type == "CONTEXT_MATCH":
+                predicate = compile_context_condition(cond)
+                if predicate is None:
+                    return None
+                context_predicates.append(predicate)
+                continue
+            mixed = True
+            cond_keys = _type_keys(cond) if keys is None else None
+            if cond_keys is not None:
+                keys = cond_keys
+                continue
+            predicate = compile_pii_condition(cond)
+            if predicate is None:
+                return None
+            entity_predicates.append(predicate)
+        return CompiledDocumentRule(
+            rule, rank, keys, tuple(entity_predicates), tuple(context_predicates), mixed
+        )
+
+    @staticmethod
+    def _compile(rule: NSRLRule, rank: int) -> Optional[Tuple[Optional[FrozenSet[str]], CompiledRule]]:
+        keys: Optional[FrozenSet[str]] = None
+        predicates: List[EntityPredicate] = []
+        for cond in rule.conditions:
+            cond_keys = _type_keys(cond) if keys is None else None
+            if cond_keys is not None:
+                keys = cond_keys
+                continue
+            predicate = compile_pii_condition(cond)
+            if predicate is None:
+                return None
+            predicates.append(predicate)
+        return keys, CompiledRule(rule, rank, tuple(predicates))
+
+    def candidates(self, entity_type: str) -> Tuple[CompiledRule, ...]:
+        return self._index.get(entity_type, self._wildcard_tuple)
+
+    def matching_rules(self, entity: DetectedPII) -> List[NSRLRule]:
+        """Rules that fire on *entity*, highest priority first."""
+        return [c.rule for c in self.candidates(entity.entity_type) if c.matches(entity)]
+
+
+def _by_priority(item: Any) -> int:
+    return -item.rule.meta.priority
+
+
+class OverlayRuleSet:
+    """A tenant's view of a shared base :class:`CompiledRuleSet`.
+
+    Only the tenant's own rules are compiled (into a small overlay set);
+    base rules are shared by reference.  Tenant rules replace base rules
+    with the same id, and ids in *disabled* are hidden.  The merged
+    candidate tuple for an entity type is built on first use and memoized,
+    so steady-state dispatch costs the same as on the base set.  Ties in
+    priority keep base rules ahead of tenant rules.
+    """
+
+    def __init__(self, base: CompiledRuleSet, rules: Sequence[NSRLRule], disabled: Iterable[str] = ()):
+        self.base = base
+        self.overlay = CompiledRuleSet(
+            sorted(rules, key=lambda x: x.meta.priority, reverse=True), rank_offset=len(base.rules)
+        )
+        self._hidden = frozenset(disabled) | {rule.id for rule in rules}
+        self._merged: Dict[str, Tuple[CompiledRule, ...]] = {}
+        hidden = self._hidden
+        self.context_rules: List[NSRLRule] = sorted(
+            [r for r in base.context_rules if r.id not in hidden] + self.overlay.context_rules,
+            key=lambda x: x.meta.priority, reverse=True,
+        )
+        self.document_rules: Tuple[CompiledDocumentRule, ...] = tuple(sorted(
+            [d for d in base.document_rules if d.rule.id not in hidden] + list(self.overlay.document_rules),
+            key=_by_priority,
+        ))
+        self.mixed_rules: Tuple[CompiledDocumentRule, ...] = tuple(r for r in self.document_rules if r.mixed)
+
+    def candidates(self, entity_type: str) -> Tuple[CompiledRule, ...]:
+        merged = self._merged.get(entity_type)
+        if merged is None:
+            hidden = self._hidden
+            base = [c for c in self.base.candidates(entity_type) if c.rule.id not in hidden]
+            merged = tuple(sorted(base + list(self.overlay.candidates(entity_type)), key=_by_priority))
+            self._merged[entity_type] = merged
+        return merged
+
+    def matching_rules(self, entity: DetectedPII) -> List[NSRLRule]:
+        """Rules that fire on *entity*, highest priority first."""
+        return [c.rule for c in self.candidates(entity.entity_type) if c.matches(entity)]
+
+
+# ---------------------------------------------------------------------------
+# Document-context entity type classification sets
+#
+# These sets map Presidio / custom entity type names to the boolean context
+# fields used by CONTEXT_MATCH escalation rules in the NSRL rule files:
+#
+#   _GOV_ID_ENTITY_TYPES  → ``has_gov_id``
+#   _HEALTHCARE_ENTITY_TYPES → ``has_healthcare_data``
+#   _FINANCIAL_ENTITY_TYPES  → ``has_financial_data``
+#
+# When a document contains any entity whose type appears in one of these
+# sets, the corresponding boolean is set to True in the document context
+# evaluated by the CONTEXT_MATCH rules.  This enables rules like
+# ESC-TOXIC-ID-FIN-001 (identity + finance) and ESC-TOXIC-ID-HEALTH-001
+# (identity + healthcare) to fire correctly.
+# ---------------------------------------------------------------------------
+_GOV_ID_ENTITY_TYPES: frozenset = frozenset({
+    "US_SSN", "UK_NINO", "IN_AADHAAR", "IN_PAN",
+    "DE_PASSPORT", "FR_PASSPORT", "ES_PASSPORT", "IT_PASSPORT",
+})
+_HEALTHCARE_ENTITY_TYPES: frozenset = frozenset({
+    "ICD10_CODE", "MEDICAL_LICENSE", "US_HEALTHCARE_NPI",
+    "NHS_NUMBER", "HEALTHCARE_NUMBER",
+})
+_FINANCIAL_ENTITY_TYPES: frozenset = frozenset({
+    "CREDIT_CARD", "IBAN_CODE", "SWIFT_CODE",
+    "CRYPTO_BTC_WALLET", "US_BANK_NUMBER",
+})
+
+
+class DocumentContext:
+    """Running document-level context, updated incrementally chunk by chunk.
+
+    Feed every chunk (post fusion) to :meth:`add_chunk` as the pipeline
+    produces it; :meth:`fired_rules` then evaluates the document rules
+    against the running state without another pass over the entities.
+
+    A mixed rule fires when at least one entity seen so far satisfies all of
+    its PII_MATCH conditions *and* the document context satisfies all of its
+    CONTEXT_MATCH conditions.  The entity half is tracked as entities arrive
+    (it can only turn true), so evaluation costs O(document rules) whenever
+    it is asked for — mid-stream or at the end.
+    """
+
+    def __init__(
+        self,
+        rule_set: CompiledRuleSet,
+        jurisdiction: Optional[str] = None,
+        rule_set_version: Optional[str] = None,
+    ):
+        self.rule_set = rule_set
+        self.rule_set_version = rule_set_version
+        self.jurisdiction = jurisdiction
+        self.pii_total_count = 0
+        self.entity_type_counts: Dict[str, int] = {}
+        self.has_gov_id = False
+        self.has_healthcare_data = False
+        self.has_financial_data = False
+        self._pending: List[CompiledDocumentRule] = list(rule_set.mixed_rules)
+        self._entity_matched: Set[int] = set()
+
+    def add_entities(self, entities: Iterable[DetectedPII]) -> None:
+        counts = self.entity_type_counts
+        for entity in entities:
+            entity_type = entity.entity_type
+            seen = counts.get(entity_type)
+            if seen is None:
+                # Category flags only change the first time a type appears.
+                self.has_gov_id = self.has_gov_id or entity_type in _GOV_ID_ENTITY_TYPES
+                self.has_healthcare_data = self.has_healthcare_data or entity_type in _HEALTHCARE_ENTITY_TYPES
+                self.has_financial_data = self.has_financial_data or entity_type in _FINANCIAL_ENTITY_TYPES
+                seen = 0
+            counts[entity_type] = seen + 1
+            self.pii_total_count += 1
+            if self._pending:
+                self._match_pending(entity)
+
+    def add_chunk(self, chunk: ClassifiedChunk) -> None:
+        self.add_entities(chunk.detected_entities)
+
+    def _match_pending(self, entity: DetectedPII) -> None:
+        still_pending = []
+        for doc_rule in self._pending:
+            if doc_rule.matches_entity(entity):
+                self._entity_matched.add(doc_rule.rank)
+            else:
+                still_pending.append(doc_rule)
+        self._pending = still_pending
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The context fields CONTEXT_MATCH conditions are evaluated against."""
+        return {
+            "pii_total_count": self.pii_total_count,
+            "has_gov_id": self.has_gov_id,
+            "has_healthcare_data": self.has_healthcare_data,
+            "has_financial_data": self.has_financial_data,
+            "jurisdiction": self.jurisdiction,
+            "entity_type_counts": dict(self.entity_type_counts),
+        }
+
+    def fired_rules(self, ctx: Optional[Dict[str, Any]] = None, profiler=None) -> List[NSRLRule]:
+        """Document rules that fire on the current state, highest priority first.
+
+        *profiler* (a :class:`agents.rule_testing.RuleProfiler`) times each
+        rule's context evaluation.
+        """
+        if ctx is None:
+            ctx = self.snapshot()
+        matched = self._entity_matched
+        if profiler is not None:
+            return [
+                doc_rule.rule
+                for doc_rule in self.rule_set.document_rules
+                if profiler.match_context(doc_rule, ctx, not doc_rule.mixed or doc_rule.rank in matched)
+            ]
+        return [
+            doc_rule.rule
+            for doc_rule in self.rule_set.document_rules
+            if (not doc_rule.mixed or doc_rule.rank in matched) and doc_rule.matches_context(ctx)
+        ]
@@ -0,0 +1,249 @@
+import hashlib
+import hmac
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from prometheus_client import Counter
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PSEUDONYM_CACHE = Counter(
+    "ndrapii_pseudonym_cache_total", "Pseudonym token cache lookups and evictions", ["result"]
+)
+# Bound once: the hit path runs for every repeated identifier.
+_CACHE_HIT = PSEUDONYM_CACHE.labels(result="hit")
+_CACHE_MISS = PSEUDONYM_CACHE.labels(result="miss")
+_CACHE_EVICTED = PSEUDONYM_CACHE.labels(result="evicted")
+
+# ---------------------------------------------------------------------------
+# Deterministic, format-preserving pseudonyms
+#
+# A token is derived from HMAC-SHA256(key, entity type + canonical value),
+# where the canonical value keeps only letters and digits, case-folded, so
+# "123-45-6789" and "123456789" share their digits.  Every digit of the span
+# is replaced by a digit and every letter by a letter of the same case;
+# separators and punctuation are kept.  Entity types with check digits get a
+# valid one, so tokens pass the same format checks as real values.  One key
+# serves every entity type: the type is part of the MAC input, not of the key.
+# ---------------------------------------------------------------------------
+
+_ASCII_LOWER = "abcdefghijklmnopqrstuvwxyz"
+_MAX_ATTEMPTS = 16
+
+_VERHOEFF_D = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+    (1, 2, 3, 4, 0, 6, 7, 8, 9, 5),
+    (2, 3, 4, 0, 1, 7, 8, 9, 5, 6),
+    (3, 4, 0, 1, 2, 8, 9, 5, 6, 7),
+    (4, 0, 1, 2, 3, 9, 5, 6, 7, 8),
+    (5, 9, 8, 7, 6, 0, 4, 3, 2, 1),
+    (6, 5, 9, 8, 7, 1, 0, 4, 3, 2),
+    (7, 6, 5, 9, 8, 2, 1, 0, 4, 3),
+    (8, 7, 6, 5, 9, 3, 2, 1, 0, 4),
+    (9, 8, 7, 6, 5, 4, 3, 2, 1, 0),
+)
+_VERHOEFF_P = (
+    (0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+    (1, 5, 7, 6, 2, 8, 3, 0, 9, 4),
+    (5, 8, 0, 3, 7, 9, 6, 1, 4, 2),
+    (8, 9, 1, 6, 0, 4, 3, 5, 2, 7),
+    (9, 4, 5, 3, 1, 2, 6, 8, 7, 0),
+    (4, 2, 8, 6, 5, 7, 3, 9, 0, 1),
+    (2, 7, 9, 3, 8, 0, 6, 4, 1, 5),
+    (7, 0, 4, 6, 9, 1, 3, 2, 5, 8),
+)
+_VERHOEFF_INV = (0, 4, 3, 2, 1, 5, 6, 7, 8, 9)
+
+
+def verhoeff_check_digit(payload: str) -> int:
+    """Verhoeff check digit for a string of digits (as used by Aadhaar)."""
+    c = 0
+    for i, digit in enumerate(reversed(payload)):
+        c = _VERHOEFF_D[c][_VERHOEFF_P[(i + 1) % 8][int(digit)]]
+    return _VERHOEFF_INV[c]
+
+
+def luhn_check_digit(payload: str) -> int:
+    """Luhn check digit for a string of digits (as used by payment cards)."""
+    total = 0
+    for i, digit in enumerate(reversed(payload)):
+        value = int(digit)
+        if i % 2 == 0:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return (10 - total % 10) % 10
+
+
+def _replace_digits(token: str, digits: str) -> str:
+    chars = list(token)
+    it = iter(digits)
+    for i, ch in enumerate(chars):
+        if "0" <= ch <= "9":
+            chars[i] = next(it)
+    return "".join(chars)
+
+
+def _digits(token: str) -> str:
+    return "".join(ch for ch in token if "0" <= ch <= "9")
+
+
+def _aadhaar(token: str) -> Optional[str]:
+    # 12 digits, never starting with 0 or 1, Verhoeff check digit last.
+    digits = _digits(token)
+    if len(digits) != 12:
+        return token
+    body = str(2 + int(digits[0]) % 8) + digits[1:11]
+    return _replace_digits(token, body + str(verhoeff_check_digit(body)))
+
+
+def _card(token: str) -> Optional[str]:
+    digits = _digits(token)
+    if len(digits) < 12:
+        return token
+    body = digits[:-1]
+    return _replace_digits(token, body + str(luhn_check_digit(body)))
+
+
+def _ssn(token: str) -> Optional[str]:
+    # SSA never issues area 000, 666 or 9xx, group 00 or serial 0000.
+    digits = _digits(token)
+    if len(digits) != 9:
+        return token
+    area, group, serial = digits[:3], digits[3:5], digits[5:]
+    if area in ("000", "666") or area[0] == "9" or group == "00" or serial == "0000":
+        return None
+    return token
+
+
+# entity type -> token fixup; returning None asks for another candidate.
+FORMAT_RULES: Dict[str, Callable[[str], Optional[str]]] = {
+    "IN_AADHAAR": _aadhaar,
+    "CREDIT_CARD": _card,
+    "US_SSN": _ssn,
+}
+
+
+def canonical_value(span: str) -> str:
+    """Letters and digits only, case-folded: "123-45-6789" -> "123456789"."""
+    return "".join(ch for ch in span if ch.isalnum()).casefold()
+
+
+class Pseudonymizer:
+    """Masker producing deterministic, format-preserving pseudonyms.
+
+    The same (entity type, value) always maps to the same token under the
+    same key, across documents and restarts.  Tokens are memoised in a
+    bounded LRU of ``cache_size`` entries, since documents repeat the same
+    identifiers; the HMAC is keyed once and copied per value.
+
+    Args:
+        key: HMAC key; keep it secret, tokens are only as unlinkable as it is.
+        cache_size: Maximum number of cached value -> token mappings.
+    """
+
+    def __init__(self, key: bytes, cache_size: int = 65536):
+        self._mac = hmac.new(key, digestmod=hashlib.sha256)
+        self.cache_size = max(0, cache_size)
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __call__(self, entity_type: str, span: str) -> str:
+        key = (entity_type, span)
+        with self._lock:
+            token = self._cache.get(key)
+            if token is not None:
+                self._cache.move_to_end(key)
+        if token is not None:
+            _CACHE_HIT.inc()
+            return token
+        token = self.pseudonym(entity_type, span)
+        _CACHE_MISS.inc()
+        if self.cache_size:
+            with self._lock:
+                self._cache[key] = token
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+                    _CACHE_EVICTED.inc()
+        return token
+
+    def pseudonym(self, entity_type: str, span: str) -> str:
+        """The token for *span*, bypassing the cache."""
+        canonical = canonical_value(span)
+        rule = FORMAT_RULES.get(entity_type)
+        token = span
+        for attempt in range(_MAX_ATTEMPTS):
+            token = self._shape(span, self._stream(entity_type, canonical, attempt))
+            if rule is None:
+                return token
+            fixed = rule(token)
+            if fixed is not None:
+                return fixed
+        logger.warning(f"No valid {entity_type} pseudonym after {_MAX_ATTEMPTS} attempts")
+        return token
+
+    def _stream(self, entity_type: str, canonical: str, attempt: int) -> Iterator[int]:
+        block = 0
+        while True:
+            mac = self._mac.copy()
+            mac.update(f"{entity_type}\x00{canonical}\x00{attempt}\x00{block}".encode("utf-8"))
+            yield from mac.digest()
+            block += 1
+
+    @staticmethod
+    def _shape(span: str, stream: Iterator[int]) -> str:
+        out = []
+        for ch in span:
+            if ch.isdigit():
+                out.append(str(next(stream) % 10))
+            elif ch.isalpha():
+                letter = _ASCII_LOWER[next(stream) % 26]
+                out.append(letter.upper() if ch.isupper() else letter)
+            else:
+                out.append(ch)
+        return "".join(out)
+
+
+def load_or_create_key(key_path: str) -> str:
+    """Read the key at *key_path*, creating a random one (mode 0600) if missing."""
+    if os.path.exists(key_path):
+        with open(key_path, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    os.makedirs(os.path.dirname(os.path.abspath(key_path)), exist_ok=True)
+    key = os.urandom(32).hex()
+    fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(key)
+    return key
+
+
+_default: Optional[Pseudonymizer] = None
+_default_lock = threading.Lock()
+
+
+def default_pseudonymizer() -> Pseudonymizer:
+    """The process-wide pseudonymizer, keyed from ``PSEUDONYM_KEY``.
+
+    When the key is unset, a random one is created once at
+    ``PSEUDONYM_KEY_FILE`` (mode 0600) so tokens stay stable across restarts.
+    """
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                key = settings.PSEUDONYM_KEY or load_or_create_key(settings.PSEUDONYM_KEY_FILE)
+                _default = Pseudonymizer(key.encode("utf-8"), settings.PSEUDONYM_CACHE_SIZE)
+    return _default
+
+
+def pseudonym_mask(entity_type: str, span: str) -> str:
+    return default_pseudonymizer()(entity_type, span)
@@ -0,0 +1,350 @@
+import difflib
+import logging
+import re
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+from agents.pseudonymizer import pseudonym_mask
+from agents.token_vault import default_vault, token_mask
+from schemas.core_models import DetectedPII, GovernedChunk
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Single-pass redaction kernel
+#
+# Shared by RedactionAgent and the API's mask-style controls.  Spans are
+# visited in start order and the output is assembled once with ``join`` over
+# untouched slices and replacements, so cost is O(n + k log k) for a chunk of
+# n characters and k entities instead of O(n * k) list splicing.
+# ---------------------------------------------------------------------------
+
+# A masker turns (entity_type, original span text) into the replacement.
+Masker = Callable[[str, str], str]
+
+
+def entity_mask(entity_type: str, span: str) -> str:
+    return f"[{entity_type}]"
+
+
+def fixed_mask(entity_type: str, span: str) -> str:
+    return "[REDACTED]"
+
+
+def block_mask(entity_type: str, span: str) -> str:
+    return "#" * max(4, len(span))
+
+
+MASKERS: Dict[str, Masker] = {
+    "entity": entity_mask,
+    "fixed": fixed_mask,
+    "block": block_mask,
+    # Deterministic HMAC tokens in the value's own format (agents.pseudonymizer).
+    "pseudonym": pseudonym_mask,
+    # Reversible tokens backed by the local vault (agents.token_vault).
+    "token": token_mask,
+}
+
+
+def register_masker(style: str, masker: Masker) -> None:
+    """Make *masker* available as ``mask_style=<style>``."""
+    MASKERS[style] = masker
+
+
+def get_masker(style: str, tenant_id: Optional[str] = None) -> Masker:
+    """The masker for *style*; raises ``KeyError`` for unknown styles.
+
+    ``token`` masks are issued to *tenant_id*, so only that tenant can
+    resolve them.
+    """
+    if style == "token" and tenant_id:
+        return default_vault().masker(tenant_id)
+    return MASKERS[style]
+
+
+# A planned redaction: (start, end, entity_type), sorted and non-overlapping.
+Span = Tuple[int, int, str]
+
+# Entity type of the span covering a whole chunk whose classification was cut
+# short (``classification_degraded``): recognizers that never ran may have
+# missed PII anywhere in it, so all of it is masked, with block_mask whatever
+# the mask style (a pseudonym or vault token of a whole chunk means nothing).
+UNSCANNED = "UNSCANNED"
+
+
+def mask_span(masker: Masker, entity_type: str, span: str) -> str:
+    """``masker(entity_type, span)``, except that unscanned chunks are blocked out."""
+    if entity_type == UNSCANNED:
+        return block_mask(entity_type, span)
+    return masker(entity_type, span)
+
+
+def plan_spans(
+    text_len: int,
+    entities: Iterable[DetectedPII],
+    allowed_types: Optional[Set[str]] = None,
+) -> List[Span]:
+    """The spans :func:`redact_spans` masks in a text of *text_len* characters.
+
+    Entities outside *allowed_types* (when given) are left in place, as are
+    empty or out-of-bounds spans.  Fusion should leave no overlaps; if one
+    slips through, the later span is clipped to start where the earlier one
+    ended, so no original characters survive either way.
+    """
+    spans: List[Span] = []
+    for entity in entities:
+        entity_type = entity.entity_type
+        if allowed_types is not None and entity_type not in allowed_types:
+            continue
+        start, end = entity.start_index, entity.end_index
+        if start < 0 or end > text_len:
+            logger.warning(f"Skipping OOB entity {entity_type} [{start}:{end}] in text len {text_len}")
+            continue
+        if start < end:
+            spans.append((start, end, entity_type))
+    if not spans:
+        return spans
+    spans.sort()
+
+    planned: List[Span] = []
+    cursor = 0
+    for start, end, entity_type in spans:
+        if end <= cursor:
+            continue
+        planned.append((max(start, cursor), end, entity_type))
+        cursor = end
+    return planned
+
+
+def chunk_spans(chunk: Any, text_len: int, allowed_types: Optional[Set[str]] = None) -> List[Span]:
+    """The spans to mask in *chunk*: its entities' (see :func:`plan_spans`),
+    or one :data:`UNSCANNED` span over all of it when classification was cut
+    short, whatever *allowed_types* says."""
+    if getattr(chunk, "classification_degraded", False):
+        return [(0, text_len, UNSCANNED)] if text_len else []
+    if not chunk.detected_entities:
+        return []
+    return plan_spans(text_len, chunk.detected_entities, allowed_types)
+
+
+def write_spans(
+    parts: List[str],
+    buffer: str,
+    start: int,
+    end: int,
+    spans: Sequence[Span],
+    masker: Masker = entity_mask,
+) -> None:
+    """Append ``buffer[start:end]`` to *parts* with *spans* (relative to
+    *start*) replaced by ``masker(entity_type, span)``.
+
+    Untouched text is sliced straight from *buffer*, so a chunk that views a
+    shared page buffer is never copied as a whole.
+    """
+    cursor = start
+    for span_start, span_end, entity_type in spans:
+        span_start += start
+        span_end += start
+        if span_start > cursor:
+            parts.append(buffer[cursor:span_start])
+        parts.append(mask_span(masker, entity_type, buffer[span_start:span_end]))
+        cursor = span_end
+    if cursor < end:
+        parts.append(buffer[cursor:end])
+
+
+def redact_spans(
+    text: str,
+    entities: Iterable[DetectedPII],
+    masker: Masker = entity_mask,
+    allowed_types: Optional[Set[str]] = None,
+) -> Tuple[str, Set[str]]:
+    """Replace every entity span in *text* with ``masker(entity_type, span)``.
+
+    Spans are chosen by :func:`plan_spans`.  Returns the redacted text and
+    the entity types actually masked.
+    """
+    spans = plan_spans(len(text), entities, allowed_types)
+    if not spans:
+        return text, set()
+    parts: List[str] = []
+    write_spans(parts, text, 0, len(text), spans, masker)
+    return "".join(parts), {entity_type for _, _, entity_type in spans}
+
+
+# ---------------------------------------------------------------------------
+# Page spans for format-preserving writers
+#
+# Entity offsets are character offsets into the whitespace-normalised text of
+# a page (ExtractorAgent._chunk_text).  File writers re-derive the characters
+# a format actually stores (PDF glyphs, OOXML text nodes, ...) and align the
+# two on their non-space characters, falling back to a diff when extraction
+# and storage disagree (ligatures, fields, dropped characters).
+# ---------------------------------------------------------------------------
+
+
+class PageSpan(NamedTuple):
+    start: int
+    end: int
+    entity_type: str
+    text: str
+
+
+def normalise_page_text(text: str) -> str:
+    # Must match ExtractorAgent._chunk_text, which defines entity offsets.
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def page_entity_spans(
+    chunks: Iterable[GovernedChunk],
+    redacted_types: Optional[Mapping[str, Set[str]]] = None,
+) -> Dict[int, List[PageSpan]]:
+    """Page-level spans of the entities that were redacted, by page number.
+
+    By default every entity of a chunk whose decision is ``Redact`` counts;
+    *redacted_types* (chunk id -> entity types actually masked) narrows that
+    for the API's mask controls.  A chunk whose classification was cut short
+    is reported as one :data:`UNSCANNED` span over its whole extent.  Entities
+    seen by two overlapping chunks are reported once.
+    """
+    spans: Dict[int, Set[PageSpan]] = {}
+    for chunk in chunks:
+        if getattr(chunk, "classification_degraded", False):
+            start, end = chunk.token_span
+            spans.setdefault(chunk.page_number, set()).add(PageSpan(start, end, UNSCANNED, chunk.processed_text))
+            continue
+        if redacted_types is not None:
+            types = redacted_types.get(chunk.chunk_id, set())
+        elif chunk.decision.action == "Redact":
+            types = None
+        else:
+            continue
+        for entity in chunk.detected_entities:
+            if types is not None and entity.entity_type not in types:
+                continue
+            if entity.location is not None:
+                page = entity.location.page_number
+                start, end = entity.location.char_start_on_page, entity.location.char_end_on_page
+            else:
+                page = chunk.page_number
+                start, end = chunk.token_span[0] + entity.start_index, chunk.token_span[0] + entity.end_index
+            spans.setdefault(page, set()).add(PageSpan(start, end, entity.entity_type, entity.text_value))
+    return {page: sorted(page_set) for page, page_set in spans.items()}
+
+
+def align_spans(
+    page_text: str,
+    spans: Iterable[Sequence[int]],
+    stored: str,
+) -> Tuple[List[List[int]], int]:
+    """Map *spans* of the normalised *page_text* onto *stored* characters.
+
+    *stored* is the non-space character sequence a writer can edit.  Returns,
+    per span, the indices into *stored* it covers, and the number of span
+    characters that could not be aligned.
+    """
+    normalised = normalise_page_text(page_text)
+    # extracted[k] is the k-th non-space character; position -> count before it.
+    extracted_chars: List[str] = []
+    before = [0] * (len(normalised) + 1)
+    for i, char in enumerate(normalised):
+        before[i] = len(extracted_chars)
+        if not char.isspace():
+            extracted_chars.append(char)
+    before[len(normalised)] = len(extracted_chars)
+    extracted = "".join(extracted_chars)
+
+    if extracted == stored:
+        mapping: Optional[List[int]] = None
+    else:
+        mapping = [-1] * len(extracted)
+        matcher = difflib.SequenceMatcher(None, extracted, stored, autojunk=False)
+        for a, b, size in matcher.get_matching_blocks():
+            for k in range(size):
+                mapping[a + k] = b + k
+
+    located: List[List[int]] = []
+    unresolved = 0
+    for span in spans:
+        start, end = span[0], span[1]
+        # Characters past the extracted page text cannot be located at all.
+        unresolved += max(0, end - max(start, len(normalised)))
+        start, end = max(0, start), min(len(normalised), end)
+        indices: List[int] = []
+        for k in range(before[start], before[end]) if start < end else ():
+            target = k if mapping is None else mapping[k]
+            if target < 0:
+                unresolved += 1
+            else:
+                indices.append(target)
+        located.append(indices)
+    return located, unresolved
+
+
+class TextNodes:
+    """Editable text nodes of one page, in reading order.
+
+    Built from the page's items as the extractor reads them: editable nodes
+    (objects with a ``text`` attribute, such as XML elements), and strings
+    standing for tabs, breaks and separators.  *setter* stores a node's new
+    text (default: assign ``node.text``).  ``page_text`` reproduces the extracted page text, ``stored``
+    is the elements' concatenated non-space text, and ``owners[k]`` is the
+    ``(node index, offset in node text)`` of its k-th character.
+    """
+
+    def __init__(self, items: Iterable[Any], setter: Optional[Callable[[Any, str], None]] = None):
+        self.setter = setter
+        self.nodes: List[Any] = []
+        self.texts: List[str] = []
+        pieces: List[str] = []
+        chars: List[str] = []
+        self.owners: List[Tuple[int, int]] = []
+        for item in items:
+            if isinstance(item, str):
+                pieces.append(item)
+                continue
+            index, text = len(self.nodes), item.text or ""
+            self.nodes.append(item)
+            self.texts.append(text)
+            pieces.append(text)
+            for offset, char in enumerate(text):
+                if not char.isspace():
+                    chars.append(char)
+                    self.owners.append((index, offset))
+        self.page_text = "".join(pieces)
+        self.stored = "".join(chars)
+
+    def redact(self, spans: Sequence[PageSpan], masker: Masker) -> Tuple[int, int]:
+        """Mask *spans* in place; returns (spans masked, characters unresolved)."""
+        located, unresolved = align_spans(self.page_text, spans, self.stored)
+        ranges = sorted(
+            (min(indices), max(indices), span)
+            for span, indices in zip(spans, located)
+            if indices
+        )
+        # Merge overlaps so edits never interleave, then apply them right to
+        # left so earlier offsets stay valid.
+        merged: List[List[Any]] = []
+        for first, last, span in ranges:
+            if merged and first <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], last)
+            else:
+                merged.append([first, last, span])
+        for first, last, span in reversed(merged):
+            (first_node, first_offset), (last_node, last_offset) = self.owners[first], self.owners[last]
+            mask = mask_span(masker, span.entity_type, span.text)
+            if first_node == last_node:
+                text = self.texts[first_node]
+                self._set(first_node, text[:first_offset] + mask + text[last_offset + 1:])
+                continue
+            self._set(last_node, self.texts[last_node][last_offset + 1:])
+            for index in range(first_node + 1, last_node):
+                self._set(index, "")
+            self._set(first_node, self.texts[first_node][:first_offset] + mask)
+        return len(merged), unresolved
+
+    def _set(self, index: int, text: str) -> None:
+        self.texts[index] = text
+        if self.setter is not None:
+            self.setter(self.nodes[index], text)
+        else:
+            self.nodes[index].text = text
@@ -0,0 +1,207 @@
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+_HASH_CHUNK = 1024 * 1024
+
+# libyaml's loader is several times faster than the pure-Python one.
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class IntegrityError(Exception):
+    """Raised when the NSRL rule files do not match the policy manifest."""
+
+
+def hash_file(path: str, algorithm: str = "sha256") -> str:
+    h = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class IntegrityPolicy:
+    """The checksum section of ``nsrl/security/integrity_checks.yml``."""
+
+    def __init__(
+        self,
+        enforcement_mode: str = "FAIL_CLOSED",
+        algorithm: str = "sha256",
+        manifest_path: str = "meta/policy_manifest.yml",
+        strict: bool = True,
+        validation_events: Optional[List[str]] = None,
+    ):
+        self.enforcement_mode = enforcement_mode
+        self.algorithm = algorithm
+        self.manifest_path = manifest_path
+        self.strict = strict
+        self.validation_events = validation_events or ["ON_ENGINE_START", "ON_CONFIG_RELOAD"]
+
+    @property
+    def fail_closed(self) -> bool:
+        return self.enforcement_mode == "FAIL_CLOSED"
+
+    @classmethod
+    def load(cls, path: str) -> "IntegrityPolicy":
+        with open(path, "r", encoding="utf-8") as f:
+            doc = yaml.load(f, Loader=YamlLoader) or {}
+        checksums = doc.get("checksums") or {}
+        return cls(
+            enforcement_mode=(doc.get("policy") or {}).get("enforcement_mode", "FAIL_CLOSED"),
+            algorithm=checksums.get("algorithm", "sha256"),
+            manifest_path=checksums.get("manifest_path", "meta/policy_manifest.yml"),
+            strict=checksums.get("enforce_strict_mode", True),
+            validation_events=doc.get("validation_events"),
+        )
+
+
+class ManifestVerifier:
+    """Checks NSRL rule files against the digests in ``policy_manifest.yml``.
+
+    The manifest lists every active module under ``active_modules`` and its
+    digest under ``checksums`` (paths relative to the NSRL root).  Files are
+    hashed in parallel, and each verified digest is cached by
+    ``(path, mtime_ns, size)`` so a reload only re-hashes files that changed.
+    In strict mode, rule files present on disk but absent from the manifest
+    (orphans) fail verification.
+    """
+
+    def __init__(self, nsrl_root: str, policy: IntegrityPolicy, max_workers: Optional[int] = None):
+        self.nsrl_root = nsrl_root
+        self.policy = policy
+        self.manifest_path = os.path.join(nsrl_root, policy.manifest_path)
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self._cache: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, path: str) -> Tuple[Optional[str], Tuple[int, int]]:
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        cached = self._cache.get(path)
+        if cached is not None and cached[:2] == key:
+            return cached[2], key
+        return None, key
+
+    def verify(self, rules_dir: str, event: str = "ON_ENGINE_START") -> Dict[str, Any]:
+        """Verify every rule file and return a report.
+
+        The report holds ``valid``, ``errors``, ``digests`` (absolute path to
+        verified digest), ``hashed`` and ``cached`` counts.  Verification is
+        skipped (reported valid) for events the policy does not list.
+        """
+        report: Dict[str, Any] = {"valid": True, "errors": [], "digests": {}, "hashed": 0, "cached": 0}
+        if event not in self.policy.validation_events:
+            return report
+        if not os.path.exists(self.manifest_path):
+            report["valid"] = False
+            report["errors"].append(f"Policy manifest not found: {self.manifest_path}")
+            return report
+
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = yaml.load(f, Loader=YamlLoader) or {}
+        active = [os.path.normpath(m) for m in manifest.get("active_modules") or []]
+        expected = {os.path.normpath(k): str(v) for k, v in (manifest.get("checksums") or {}).items()}
+
+        on_disk = []
+        for root, _, files in os.walk(rules_dir):
+            for file in files:
+                if file.endswith(".yml") or file.endswith(".yaml"):
+                    on_disk.append(os.path.relpath(os.path.join(root, file), self.nsrl_root))
+
+        errors = report["errors"]
+        active_set = set(active)
+        if self.policy.strict:
+            errors.extend(f"Orphan rule file not in manifest: {rel}" for rel in sorted(set(on_disk) - active_set))
+        for rel in active:
+            if rel not in expected:
+                errors.append(f"No {self.policy.algorithm} checksum in manifest for {rel}")
+            elif not os.path.exists(os.path.join(self.nsrl_root, rel)):
+                errors.append(f"Manifest module missing on disk: {rel}")
+
+        to_check = [rel for rel in active if rel in expected and os.path.exists(os.path.join(self.nsrl_root, rel))]
+        paths = [os.path.join(self.nsrl_root, rel) for rel in to_check]
+        with self._lock:
+            # Cache hits cost one stat; only the misses go to the hashing pool.
+            lookups = [self._cached(p) for p in paths]
+            misses = [p for p, (digest, _) in zip(paths, lookups) if digest is None]
+            algorithm = self.policy.algorithm
+            if len(misses) > 1 and self.max_workers > 1:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(misses))) as pool:
+                    fresh = dict(zip(misses, pool.map(lambda p: hash_file(p, algorithm), misses)))
+            else:
+                fresh = {p: hash_file(p, algorithm) for p in misses}
+            for path, (_, key) in zip(paths, lookups):
+                if path in fresh:
+                    self._cache[path] = (key[0], key[1], fresh[path])
+        report["hashed"] = len(fresh)
+        report["cached"] = len(paths) - len(fresh)
+
+        for rel, path, (cached, _) in zip(to_check, paths, lookups):
+            digest = fresh.get(path, cached)
+            if digest != expected[rel]:
+                errors.append(f"Checksum mismatch for {rel}")
+                # A mismatching digest must not be trusted on the next pass.
+                self._cache.pop(path, None)
+            else:
+                report["digests"][os.path.abspath(path)] = digest
+
+        report["valid"] = not errors
+        return report
+
+    def enforce(self, rules_dir: str, event: str) -> Optional[Dict[str, str]]:
+        """Verify and apply the enforcement mode.
+
+        Returns the verified digests, or None when verification failed under
+        a fail-open policy.  Raises :class:`IntegrityError` when it failed
+        under ``FAIL_CLOSED``.
+        """
+        report = self.verify(rules_dir, event)
+        if report["valid"]:
+            logger.info(
+                f"[PolicyAgent] NSRL integrity verified on {event}: "
+                f"{report['hashed']} hashed, {report['cached']} cached"
+            )
+            return report["digests"]
+        message = f"NSRL integrity check failed on {event}: " + "; ".join(report["errors"])
+        if self.policy.fail_closed:
+            raise IntegrityError(message)
+        logger.warning(message)
+        return None
+
+
+def render_manifest_checksums(nsrl_root: str, policy: IntegrityPolicy) -> str:
+    """Return the manifest text with its ``checksums`` block regenerated.
+
+    Comments and the rest of the manifest are preserved; only the trailing
+    top-level ``checksums:`` block is replaced (or appended).
+    """
+    manifest_path = os.path.join(nsrl_root, policy.manifest_path)
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    manifest = yaml.load(text, Loader=YamlLoader) or {}
+
+    kept: List[str] = []
+    in_block = False
+    for line in text.splitlines():
+        if line.startswith("checksums:"):
+            in_block = True
+            continue
+        if in_block and (not line.strip() or line[0] in " \t#"):
+            continue
+        in_block = False
+        kept.append(line)
+    while kept and not kept[-1].strip():
+        kept.pop()
+
+    block = ["", "checksums:"]
+    for rel in manifest.get("active_modules") or []:
+        digest = hash_file(os.path.join(nsrl_root, rel), policy.algorithm)
+        block.append(f'  "{rel}": "{digest}"')
+    return "\n".join(kept + block) + "\n"
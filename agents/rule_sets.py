@@ -0,0 +1,425 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple, Union
+
+import yaml
+from prometheus_client import Counter, Gauge, Histogram, Info
+
+from agents.budgets import HardLimits
+from agents.policy_engine import CompiledRuleSet, OverlayRuleSet
+from agents.rule_integrity import IntegrityError, ManifestVerifier, YamlLoader
+from agents.rule_snapshot import RuleSetSnapshotStore
+from schemas.rule_schema import NSRLRule
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+POLICY_RELOADS = Counter(
+    "ndrapii_policy_reloads_total", "NSRL rule-set reload attempts", ["status"]
+)
+POLICY_RELOAD_SECONDS = Histogram(
+    "ndrapii_policy_reload_seconds", "Time to load, validate and compile an NSRL rule set"
+)
+POLICY_RULES_LOADED = Gauge(
+    "ndrapii_policy_rules_loaded", "Rules in the active NSRL rule set"
+)
+POLICY_RULE_SET = Info(
+    "ndrapii_policy_rule_set", "Content-hash version of the active NSRL rule set"
+)
+POLICY_TENANT_OVERLAYS = Counter(
+    "ndrapii_policy_tenant_overlays_total", "Tenant overlay cache lookups and evictions", ["result"]
+)
+
+
+class RuleSetError(Exception):
+    """Raised when a candidate rule set fails validation; the active set is kept."""
+
+
+class TenantPolicy:
+    """One tenant's overrides: base rule ids to disable plus its own rules.
+
+    A tenant rule with the same id as a base rule replaces it.
+    """
+
+    __slots__ = ("disabled", "rules")
+
+    def __init__(self, disabled: Sequence[str] = (), rules: Sequence[NSRLRule] = ()):
+        self.disabled: FrozenSet[str] = frozenset(disabled)
+        self.rules: Tuple[NSRLRule, ...] = tuple(rules)
+
+
+class RuleSet:
+    """Immutable, compiled snapshot of the NSRL rules.
+
+    ``version`` is a content hash over every rule file and the policy
+    manifest, so two processes that loaded the same policy agree on it and
+    result caches can key on it safely.  ``tenants`` holds the uncompiled
+    per-tenant overrides; :class:`TenantOverlayCache` compiles them on
+    demand.
+    """
+
+    __slots__ = ("rules", "compiled", "version", "loaded_at", "tenants")
+
+    def __init__(
+        self,
+        rules: Sequence[NSRLRule],
+        version: str,
+        tenants: Optional[Dict[str, TenantPolicy]] = None,
+    ):
+        # Sort rules by priority (descending)
+        self.rules: List[NSRLRule] = sorted(rules, key=lambda x: x.meta.priority, reverse=True)
+        self.compiled = CompiledRuleSet(self.rules)
+        self.version = version
+        self.loaded_at = datetime.utcnow().isoformat()
+        self.tenants: Dict[str, TenantPolicy] = tenants or {}
+
+
+CompiledView = Union[CompiledRuleSet, OverlayRuleSet]
+
+
+class TenantOverlayCache:
+    """Bounded LRU of compiled tenant overlays over the active base set.
+
+    Lookups are a dict hit keyed by tenant id, so per-request cost does not
+    grow with the number of tenants; only the ``capacity`` most recently
+    used overlays stay compiled.  Entries remember the :class:`RuleSet`
+    they were built on and are rebuilt after a reload.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = max(1, capacity)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[RuleSet, OverlayRuleSet]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, rule_set: RuleSet, tenant_id: Optional[str]) -> CompiledView:
+        """The compiled view for *tenant_id*; the base set for no or unknown tenants."""
+        policy = rule_set.tenants.get(tenant_id) if tenant_id else None
+        if policy is None:
+            return rule_set.compiled
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+            if entry is not None and entry[0] is rule_set:
+                self._entries.move_to_end(tenant_id)
+                POLICY_TENANT_OVERLAYS.labels(result="hit").inc()
+                return entry[1]
+        # Compile outside the lock; a concurrent miss for the same tenant
+        # builds an identical overlay and the last writer wins.
+        overlay = OverlayRuleSet(rule_set.compiled, policy.rules, policy.disabled)
+        POLICY_TENANT_OVERLAYS.labels(result="miss").inc()
+        with self._lock:
+            self._entries[tenant_id] = (rule_set, overlay)
+            self._entries.move_to_end(tenant_id)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                POLICY_TENANT_OVERLAYS.labels(result="evicted").inc()
+        return overlay
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def _rule_files(rules_dir: str) -> List[str]:
+    paths = []
+    for root, _, files in os.walk(rules_dir):
+        for file in files:
+            if file.endswith(".yml") or file.endswith(".yaml"):
+                paths.append(os.path.join(root, file))
+    return sorted(paths)
+
+
+def _check_structure(rules: List[NSRLRule], limits: HardLimits) -> None:
+    if len(rules) > limits.max_rules_per_file:
+        raise ValueError(f"{len(rules)} rules exceed max_rules_per_file {limits.max_rules_per_file}")
+    for rule in rules:
+        if len(rule.conditions) > limits.max_conditions_per_rule:
+            raise ValueError(
+                f"Rule {rule.id} has {len(rule.conditions)} conditions; "
+                f"max_conditions_per_rule is {limits.max_conditions_per_rule}"
+            )
+
+
+def _check_duplicates(rules: Sequence[NSRLRule], scope: str = "") -> None:
+    seen = set()
+    for rule in rules:
+        if rule.id in seen:
+            raise RuleSetError(f"Duplicate rule id {rule.id}{scope}")
+        seen.add(rule.id)
+
+
+def _parse_tenants(content: Dict[str, Any], limits: Optional[HardLimits]) -> Dict[str, TenantPolicy]:
+    """Parse a ``tenants:`` mapping (see ``tenant_overrides.yml``)."""
+    tenants = {}
+    for tenant_id, spec in (content.get("tenants") or {}).items():
+        spec = spec or {}
+        rules = [NSRLRule(**item) for item in spec.get("rules") or []]
+        if limits is not None:
+            _check_structure(rules, limits)
+        tenants[str(tenant_id)] = TenantPolicy(spec.get("disable") or [], rules)
+    return tenants
+
+
+def _merge_tenants(into: Dict[str, TenantPolicy], tenants: Dict[str, TenantPolicy]) -> None:
+    for tenant_id, policy in tenants.items():
+        existing = into.get(tenant_id)
+        if existing is not None:
+            policy = TenantPolicy(existing.disabled | policy.disabled, existing.rules + policy.rules)
+        into[tenant_id] = policy
+
+
+def _check_all_duplicates(rules: Sequence[NSRLRule], tenants: Dict[str, TenantPolicy]) -> None:
+    _check_duplicates(rules)
+    for tenant_id, policy in tenants.items():
+        _check_duplicates(policy.rules, scope=f" for tenant {tenant_id}")
+
+
+def _version(rules_dir: str, sources: Sequence[Tuple[str, bytes]], manifest: Optional[bytes]) -> str:
+    digest = hashlib.sha256()
+    for file_path, raw in sources:
+        digest.update(os.path.relpath(file_path, rules_dir).encode("utf-8") + b"\0" + raw + b"\0")
+    if manifest is not None:
+        digest.update(b"manifest\0" + manifest)
+    return digest.hexdigest()[:16]
+
+
+def load_rule_set(
+    rules_dir: str,
+    manifest_path: Optional[str] = None,
+    strict: bool = False,
+    verified_digests: Optional[Dict[str, str]] = None,
+    limits: Optional[HardLimits] = None,
+    snapshots: Optional[RuleSetSnapshotStore] = None,
+) -> RuleSet:
+    """Load, validate and compile every YAML rule file under *rules_dir*.
+
+    With ``strict=False`` (startup) a file that fails to load is logged and
+    skipped, as before.  With ``strict=True`` (hot reload) any unreadable
+    file, invalid rule or duplicate rule id raises :class:`RuleSetError` so a
+    half-edited policy never replaces a working one.
+
+    *verified_digests* maps absolute paths to the SHA-256 digests the
+    integrity check accepted; the bytes actually parsed are re-checked
+    against them so a file swapped after verification is never loaded.
+
+    *limits* applies the structure limits of ``hard_limits.yml``
+    (``max_rules_per_file``, ``max_conditions_per_rule``); a file that
+    exceeds them is treated like any other invalid file.
+
+    With *snapshots*, the source bytes are still read and hashed, but YAML
+    parsing and validation are skipped when a snapshot exists for that
+    content; a clean parse writes one for the next process.
+
+    A file whose top level is a mapping with a ``tenants`` key contributes
+    per-tenant overrides instead of base rules (``tenant_overrides.yml``).
+    """
+    sources: List[Tuple[str, bytes]] = []
+    if not os.path.exists(rules_dir):
+        logger.warning(f"Rules directory not found: {rules_dir}")
+    for file_path in _rule_files(rules_dir) if os.path.exists(rules_dir) else []:
+        try:
+            with open(file_path, "rb") as f:
+                raw = f.read()
+        except OSError as e:
+            if strict:
+                raise RuleSetError(f"Failed to load rule file {file_path}: {e}") from e
+            logger.error(f"Failed to load rule file {file_path}: {e}")
+            continue
+        expected = (verified_digests or {}).get(os.path.abspath(file_path))
+        if expected is not None and hashlib.sha256(raw).hexdigest() != expected:
+            raise IntegrityError(f"{file_path} changed after integrity verification")
+        sources.append((file_path, raw))
+
+    manifest = None
+    if manifest_path and os.path.exists(manifest_path):
+        with open(manifest_path, "rb") as f:
+            manifest = f.read()
+    version = _version(rules_dir, sources, manifest)
+
+    snapshot_key = None
+    if snapshots is not None:
+        structure = (limits.max_rules_per_file, limits.max_conditions_per_rule) if limits else None
+        snapshot_key = snapshots.key(version, structure)
+        cached = snapshots.load(snapshot_key)
+        if cached is not None:
+            rules, tenant_specs = cached
+            tenants = {tenant_id: TenantPolicy(*spec) for tenant_id, spec in tenant_specs.items()}
+            if strict:
+                _check_all_duplicates(rules, tenants)
+            return RuleSet(rules, version, tenants)
+
+    rules: List[NSRLRule] = []
+    tenants: Dict[str, TenantPolicy] = {}
+    loaded: List[Tuple[str, bytes]] = []
+    for file_path, raw in sources:
+        try:
+            content = yaml.load(raw, Loader=YamlLoader)
+            file_rules = [NSRLRule(**item) for item in content] if isinstance(content, list) else []
+            if limits is not None:
+                _check_structure(file_rules, limits)
+            file_tenants = _parse_tenants(content, limits) if isinstance(content, dict) else {}
+        except Exception as e:
+            if strict:
+                raise RuleSetError(f"Failed to load rule file {file_path}: {e}") from e
+            logger.error(f"Failed to load rule file {file_path}: {e}")
+            continue
+        loaded.append((file_path, raw))
+        rules.extend(file_rules)
+        _merge_tenants(tenants, file_tenants)
+
+    if strict:
+        _check_all_duplicates(rules, tenants)
+
+    if len(loaded) != len(sources):
+        # The version covers only the files that actually loaded.
+        version = _version(rules_dir, loaded, manifest)
+    elif snapshot_key is not None:
+        snapshots.save(
+            snapshot_key, rules,
+            {tenant_id: (sorted(policy.disabled), policy.rules) for tenant_id, policy in tenants.items()},
+        )
+
+    return RuleSet(rules, version, tenants)
+
+
+class RuleSetManager:
+    """Owns the active :class:`RuleSet` and swaps in new versions atomically.
+
+    Readers take ``manager.current`` once per evaluation and use that
+    snapshot throughout, so a swap never changes the rules under a running
+    evaluation.  ``reload`` builds the candidate set entirely on the calling
+    thread (the watcher thread when hot reload is on) and only then replaces
+    the reference.  The watcher polls file metadata — the rules directory
+    and the policy manifest — rather than depending on a file-system
+    notification library.
+
+    It also owns the :class:`TenantOverlayCache`; :meth:`compiled_for`
+    resolves the compiled view a tenant's requests evaluate against.
+    """
+
+    def __init__(
+        self,
+        rules_dir: str,
+        manifest_path: Optional[str] = None,
+        poll_interval: float = 2.0,
+        verifier: Optional[ManifestVerifier] = None,
+        limits: Optional[HardLimits] = None,
+        snapshots: Optional[RuleSetSnapshotStore] = None,
+        tenant_cache_size: int = 1024,
+    ):
+        self.rules_dir = rules_dir
+        self.manifest_path = manifest_path
+        self.poll_interval = poll_interval
+        self.verifier = verifier
+        self.limits = limits
+        self.snapshots = snapshots
+        self.tenant_overlays = TenantOverlayCache(tenant_cache_size)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._fingerprint = self._snapshot()
+        # Under FAIL_CLOSED an IntegrityError propagates: the engine refuses to start.
+        self._current = self._timed_load(strict=False, event="ON_ENGINE_START")
+        logger.info(
+            f"[PolicyAgent] Loaded {len(self._current.rules)} rules from {self.rules_dir} "
+            f"(version {self._current.version})"
+        )
+
+    @property
+    def current(self) -> RuleSet:
+        return self._current
+
+    def install(self, rule_set: RuleSet) -> None:
+        """Atomically make *rule_set* the active set."""
+        self._current = rule_set
+        POLICY_RULES_LOADED.set(len(rule_set.rules))
+        POLICY_RULE_SET.info({"version": rule_set.version, "loaded_at": rule_set.loaded_at})
+        # Overlays compiled on the previous base are rebuilt on next use.
+        self.tenant_overlays.clear()
+
+    def compiled_for(self, tenant_id: Optional[str] = None) -> Tuple[RuleSet, CompiledView]:
+        """The active rule set and the compiled view *tenant_id* evaluates against."""
+        rule_set = self._current
+        return rule_set, self.tenant_overlays.get(rule_set, tenant_id)
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        paths = _rule_files(self.rules_dir) if os.path.exists(self.rules_dir) else []
+        if self.manifest_path:
+            paths.append(self.manifest_path)
+        fingerprint = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            fingerprint[path] = (st.st_mtime_ns, st.st_size)
+        return fingerprint
+
+    def _timed_load(self, strict: bool, event: str) -> RuleSet:
+        started = time.perf_counter()
+        digests = None
+        if self.verifier is not None:
+            digests = self.verifier.enforce(self.rules_dir, event)
+        rule_set = load_rule_set(
+            self.rules_dir, self.manifest_path, strict=strict, verified_digests=digests,
+            limits=self.limits, snapshots=self.snapshots,
+        )
+        POLICY_RELOAD_SECONDS.observe(time.perf_counter() - started)
+        self.install(rule_set)
+        return rule_set
+
+    def reload(self, force: bool = False) -> bool:
+        """Reload if any watched file changed (or unconditionally with *force*).
+
+        Returns True if a new version was swapped in.  A candidate that fails
+        validation is rejected and the active set stays in place.
+        """
+        with self._lock:
+            fingerprint = self._snapshot()
+            if not force and fingerprint == self._fingerprint:
+                return False
+            self._fingerprint = fingerprint
+            previous = self._current.version
+            try:
+                rule_set = self._timed_load(strict=True, event="ON_CONFIG_RELOAD")
+            except (RuleSetError, IntegrityError) as e:
+                POLICY_RELOADS.labels(status="rejected").inc()
+                logger.error(f"[PolicyAgent] Rule reload rejected, keeping version {previous}: {e}")
+                return False
+            POLICY_RELOADS.labels(status="success").inc()
+            if rule_set.version != previous:
+                logger.info(
+                    f"[PolicyAgent] Rule set reloaded: {previous} -> {rule_set.version} "
+                    f"({len(rule_set.rules)} rules)"
+                )
+            return rule_set.version != previous
+
+    def start(self) -> None:
+        """Start the background watcher thread."""
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="NSRLRuleWatcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"[PolicyAgent] Rule watcher error: {e}")
@@ -0,0 +1,161 @@
+import hashlib
+import hmac
+import logging
+import marshal
+import mmap
+import os
+import struct
+import tempfile
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from schemas.rule_schema import NSRLRule, RuleActions, RuleCondition, RuleMeta
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Precompiled NSRL rule-set snapshots
+#
+# A snapshot stores an already-validated rule set as marshalled tuples, so a
+# worker whose rule sources are unchanged skips YAML parsing and pydantic
+# validation entirely: the file is memory-mapped, checked, unmarshalled and
+# rebuilt with ``model_construct``.  Snapshots are keyed by the rule-set
+# version (a content hash over every rule file and the policy manifest) plus
+# the snapshot format and structure limits, so any edit to a source file
+# yields a new key and the YAML is parsed again.
+#
+# Because a snapshot bypasses validation and the manifest check of the YAML,
+# it is authenticated with an HMAC under a secret key (POLICY_SNAPSHOT_KEY)
+# over its snapshot key and payload: whoever can write the snapshot directory
+# cannot forge a rule set, nor replay a snapshot under other source digests.
+#
+# File layout:  MAGIC | u32 payload length | HMAC-SHA256(key, snapshot key | payload) | payload
+# Payload:      (base rules, {tenant id: (disabled ids, tenant rules)})
+# ---------------------------------------------------------------------------
+
+SNAPSHOT_FORMAT = 3
+_MAGIC = b"NSRLSNP3"
+_HEADER = struct.Struct("<8sI32s")
+
+RuleTuple = Tuple[Any, ...]
+# tenant id -> (disabled base rule ids, tenant rules)
+TenantSpecs = Mapping[str, Tuple[Sequence[str], Sequence[NSRLRule]]]
+
+
+def _to_tuple(rule: NSRLRule) -> RuleTuple:
+    meta, actions = rule.meta, rule.actions
+    return (
+        rule.id,
+        rule.version,
+        (meta.name, meta.description, meta.priority, list(meta.tags)),
+        [(c.type, c.field, c.operator, c.value) for c in rule.conditions],
+        (actions.classification, actions.severity, actions.score, actions.justification, list(actions.tags)),
+    )
+
+
+def _from_tuple(item: RuleTuple) -> NSRLRule:
+    # The tuples were produced from validated models; skip re-validation.
+    rule_id, version, meta, conditions, actions = item
+    return NSRLRule.model_construct(
+        id=rule_id,
+        version=version,
+        meta=RuleMeta.model_construct(name=meta[0], description=meta[1], priority=meta[2], tags=meta[3]),
+        conditions=[
+            RuleCondition.model_construct(type=c[0], field=c[1], operator=c[2], value=c[3]) for c in conditions
+        ],
+        actions=RuleActions.model_construct(
+            classification=actions[0], severity=actions[1], score=actions[2],
+            justification=actions[3], tags=actions[4],
+        ),
+    )
+
+
+class RuleSetSnapshotStore:
+    """Directory of rule-set snapshots signed with *secret*, newest ``keep`` retained."""
+
+    def __init__(self, directory: str, secret: str, keep: int = 8):
+        if not secret:
+            raise ValueError("Rule-set snapshots need an HMAC key (POLICY_SNAPSHOT_KEY)")
+        self.directory = directory
+        self.keep = keep
+        self._secret = secret.encode("utf-8")
+
+    def _mac(self, key: str, payload: Any) -> bytes:
+        mac = hmac.new(self._secret, key.encode("ascii") + b"\x00", hashlib.sha256)
+        mac.update(payload)
+        return mac.digest()
+
+    @staticmethod
+    def key(version: str, *parts: Any) -> str:
+        """Snapshot key for a rule-set *version* and anything else that shapes it."""
+        material = repr((SNAPSHOT_FORMAT, version) + parts).encode("utf-8")
+        return hashlib.sha256(material).hexdigest()[:24]
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"ruleset-{key}.snap")
+
+    def load(self, key: str) -> Optional[Tuple[List[NSRLRule], Dict[str, Tuple[List[str], List[NSRLRule]]]]]:
+        """Return ``(rules, tenants)`` stored under *key*, or None on a miss or a bad file."""
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                magic, length, signature = _HEADER.unpack_from(mm, 0)
+                payload = memoryview(mm)[_HEADER.size:_HEADER.size + length]
+                try:
+                    if (
+                        magic != _MAGIC
+                        or len(payload) != length
+                        or not hmac.compare_digest(self._mac(key, payload), signature)
+                    ):
+                        raise ValueError("header or signature mismatch")
+                    items, tenants = marshal.loads(payload)
+                finally:
+                    payload.release()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, EOFError, TypeError, struct.error) as e:
+            logger.warning(f"[PolicyAgent] Ignoring unreadable rule-set snapshot {path}: {e}")
+            return None
+        return (
+            [_from_tuple(item) for item in items],
+            {tenant: (disabled, [_from_tuple(item) for item in rules]) for tenant, (disabled, rules) in tenants.items()},
+        )
+
+    def save(self, key: str, rules: Sequence[NSRLRule], tenants: Optional[TenantSpecs] = None) -> None:
+        """Atomically write *rules* (and tenant overlays) under *key*; failures are logged, not raised."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            payload = marshal.dumps((
+                [_to_tuple(rule) for rule in rules],
+                {
+                    tenant: (list(disabled), [_to_tuple(rule) for rule in tenant_rules])
+                    for tenant, (disabled, tenant_rules) in (tenants or {}).items()
+                },
+            ))
+            header = _HEADER.pack(_MAGIC, len(payload), self._mac(key, payload))
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".ruleset-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(header)
+                    f.write(payload)
+                os.replace(tmp_path, self.path_for(key))
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+        except (OSError, ValueError) as e:
+            logger.warning(f"[PolicyAgent] Could not write rule-set snapshot: {e}")
+            return
+        self._prune()
+
+    def _prune(self) -> None:
+        try:
+            snapshots = [
+                os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.startswith("ruleset-") and name.endswith(".snap")
+            ]
+            snapshots.sort(key=os.path.getmtime, reverse=True)
+            for stale in snapshots[self.keep:]:
+                os.unlink(stale)
+        except OSError:
+            pass
@@ -0,0 +1,218 @@
+import glob
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import yaml
+from prometheus_client.core import CounterMetricFamily
+
+from agents.policy_engine import CompiledDocumentRule, CompiledRule, DocumentContext
+from agents.rule_integrity import YamlLoader
+from schemas.core_models import ClassifiedChunk, DetectedPII
+
+# Ordering from nsrl/contracts/output_schema.yml and the NSRL severities.
+_CLASSIFICATION_ORDER = {"PUBLIC": 0, "INTERNAL": 1, "CONFIDENTIAL": 2, "RESTRICTED": 3, "CRITICAL": 4}
+_SEVERITY_ORDER = {"NONE": 0, "LOW": 1, "MEDIUM": 2, "HIGH": 3, "CRITICAL": 4}
+
+# Placeholder entity type used by context-only test cases.
+_DOC_CONTEXT_TYPE = "DOC_CONTEXT"
+
+
+# ---------------------------------------------------------------------------
+# Per-rule profiler
+# ---------------------------------------------------------------------------
+
+
+class RuleProfiler:
+    """Per-rule evaluation counts, match counts and cumulative time.
+
+    Attach it to a :class:`PolicyAgent` (``agent.profiler = RuleProfiler()``)
+    to profile a real workload; the agent then times every rule it tests.
+    The profiler is also a Prometheus collector: register it with a
+    ``CollectorRegistry`` (or the default ``REGISTRY``) to export the
+    ``ndrapii_rule_*`` counters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # rule id -> [evaluations, matches, seconds]
+        self._stats: Dict[str, List[float]] = {}
+
+    def record(self, rule_id: str, matched: bool, seconds: float) -> None:
+        with self._lock:
+            stats = self._stats.get(rule_id)
+            if stats is None:
+                stats = self._stats[rule_id] = [0, 0, 0.0]
+            stats[0] += 1
+            stats[1] += matched
+            stats[2] += seconds
+
+    def match_entity(self, compiled: CompiledRule, entity: DetectedPII) -> bool:
+        started = time.perf_counter()
+        matched = compiled.matches(entity)
+        self.record(compiled.rule.id, matched, time.perf_counter() - started)
+        return matched
+
+    def match_context(self, doc_rule: CompiledDocumentRule, ctx: Dict[str, Any], entity_matched: bool) -> bool:
+        started = time.perf_counter()
+        matched = entity_matched and doc_rule.matches_context(ctx)
+        self.record(doc_rule.rule.id, matched, time.perf_counter() - started)
+        return matched
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def report(self, rule_ids: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """Per-rule rows, most expensive first.
+
+        Rules listed in *rule_ids* that were never evaluated are included with
+        zero counts, so unreachable rules show up alongside hot ones.
+        """
+        with self._lock:
+            stats = {rule_id: list(values) for rule_id, values in self._stats.items()}
+        for rule_id in rule_ids:
+            stats.setdefault(rule_id, [0, 0, 0.0])
+        rows = []
+        for rule_id, (evaluations, matches, seconds) in stats.items():
+            rows.append({
+                "rule_id": rule_id,
+                "evaluations": int(evaluations),
+                "matches": int(matches),
+                "match_rate": round(matches / evaluations, 4) if evaluations else 0.0,
+                "total_ms": round(seconds * 1000, 3),
+                "mean_us": round(seconds * 1e6 / evaluations, 3) if evaluations else 0.0,
+            })
+        rows.sort(key=lambda row: (-row["total_ms"], row["rule_id"]))
+        return rows
+
+    def collect(self):
+        evaluations = CounterMetricFamily(
+            "ndrapii_rule_evaluations", "NSRL rule evaluations (profiling mode)", labels=["rule_id"]
+        )
+        matches = CounterMetricFamily(
+            "ndrapii_rule_matches", "NSRL rule matches (profiling mode)", labels=["rule_id"]
+        )
+        seconds = CounterMetricFamily(
+            "ndrapii_rule_eval_seconds", "Cumulative NSRL rule evaluation time (profiling mode)", labels=["rule_id"]
+        )
+        with self._lock:
+            for rule_id, (count, matched, elapsed) in self._stats.items():
+                evaluations.add_metric([rule_id], count)
+                matches.add_metric([rule_id], matched)
+                seconds.add_metric([rule_id], elapsed)
+        return [evaluations, matches, seconds]
+
+
+# ---------------------------------------------------------------------------
+# nsrl/tests runner
+# ---------------------------------------------------------------------------
+
+
+def load_test_cases(tests_dir: str) -> List[Dict[str, Any]]:
+    """Load every case from ``*.yml`` under *tests_dir*, tagged with its suite."""
+    cases = []
+    for path in sorted(glob.glob(os.path.join(tests_dir, "*.yml"))):
+        with open(path, "r", encoding="utf-8") as f:
+            doc = yaml.load(f, Loader=YamlLoader) or {}
+        suite = os.path.splitext(os.path.basename(path))[0]
+        for case in doc.get("tests") or []:
+            cases.append(dict(case, suite=suite))
+    return cases
+
+
+def _max_by(values: Iterable[str], order: Dict[str, int]) -> Optional[str]:
+    best = None
+    for value in values:
+        if best is None or order.get(value, -1) > order.get(best, -1):
+            best = value
+    return best
+
+
+def evaluate_case(agent, case: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one test case through *agent* and return the observed outcome.
+
+    ``input.object`` becomes a single detected entity evaluated by
+    ``evaluate_chunk`` (objects of type ``DOC_CONTEXT`` are placeholders and
+    contribute no entity); ``input.context`` overrides fields of the document
+    context for the document rules.
+    """
+    inputs = case.get("input") or {}
+    obj = inputs.get("object") or {}
+    entities = []
+    if obj and obj.get("type") != _DOC_CONTEXT_TYPE:
+        value = str(obj.get("value", ""))
+        entities.append(DetectedPII(
+            entity_type=obj.get("type", ""),
+            text_value=value,
+            start_index=0,
+            end_index=len(value),
+            score=float(obj.get("confidence", 1.0)),
+            source="nsrl-test",
+        ))
+    text = entities[0].text_value if entities else ""
+    chunk = ClassifiedChunk(
+        chunk_id=f"nsrl-test:{case.get('name', '')}",
+        document_id="nsrl-test",
+        processed_text=text,
+        original_text=text,
+        page_number=1,
+        token_span=(0, len(text)),
+        detected_entities=entities,
+    )
+
+    governed = agent.evaluate_chunk(chunk, trace_id="nsrl-test")
+    rule_set = agent.rule_set
+    fired = [rule for entity in entities for rule in rule_set.compiled.matching_rules(entity)]
+
+    context = DocumentContext(rule_set.compiled, rule_set_version=rule_set.version)
+    context.add_chunk(chunk)
+    ctx = context.snapshot()
+    ctx.update(inputs.get("context") or {})
+    fired.extend(context.fired_rules(ctx, profiler=agent.profiler))
+
+    matched_rules = list(dict.fromkeys(rule.id for rule in fired))
+    return {
+        "matched_rules": matched_rules,
+        "classification": _max_by((r.actions.classification for r in fired), _CLASSIFICATION_ORDER),
+        "severity": _max_by((r.actions.severity for r in fired), _SEVERITY_ORDER),
+        "allowed": governed.decision.action not in ("Block", "Quarantine"),
+        "action": governed.decision.action,
+    }
+
+
+def check_case(expected: Dict[str, Any], actual: Dict[str, Any]) -> List[str]:
+    """Compare the keys present in ``expected_output``; returns the failures."""
+    failures = []
+    for key, want in (expected or {}).items():
+        got = actual.get(key)
+        if key == "matched_rules":
+            if sorted(want or []) != sorted(got):
+                failures.append(f"matched_rules: expected {sorted(want or [])}, got {sorted(got)}")
+        elif got != want:
+            failures.append(f"{key}: expected {want!r}, got {got!r}")
+    return failures
+
+
+def run_rule_tests(agent, tests_dir: str = "nsrl/tests") -> Dict[str, Any]:
+    """Execute every NSRL test case against *agent* and report correctness."""
+    results = []
+    for case in load_test_cases(tests_dir):
+        actual = evaluate_case(agent, case)
+        failures = check_case(case.get("expected_output") or {}, actual)
+        results.append({
+            "suite": case["suite"],
+            "name": case.get("name", ""),
+            "passed": not failures,
+            "failures": failures,
+            "actual": actual,
+        })
+    passed = sum(1 for r in results if r["passed"])
+    return {
+        "rule_set_version": agent.rule_set_version,
+        "total": len(results),
+        "passed": passed,
+        "failed": len(results) - passed,
+        "results": results,
+    }
@@ -0,0 +1,267 @@
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import closing
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from prometheus_client import Counter
+
+from agents.pseudonymizer import load_or_create_key
+from config.settings import settings
+
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:
+    AESGCM = None
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VAULT_OPS = Counter(
+    "ndrapii_token_vault_total", "Token vault tokenizations, inserts and lookups", ["op"]
+)
+_TOKENIZED = TOKEN_VAULT_OPS.labels(op="tokenize")
+_INSERTED = TOKEN_VAULT_OPS.labels(op="insert")
+_DETOKENIZED = TOKEN_VAULT_OPS.labels(op="detokenize")
+
+# ---------------------------------------------------------------------------
+# Reversible tokenization vault
+#
+# A token is "[<ENTITY_TYPE>:<id>]" where id is a truncated HMAC of the
+# (entity type, value) pair, so the same value always gets the same token
+# and issuing one needs no database round trip.  The value is stored once,
+# AES-256-GCM encrypted with the token id as associated data, in a local
+# SQLite database (WAL).  New tokens are buffered and written with one
+# INSERT OR IGNORE batch per document (flush) or whenever the buffer
+# reaches TOKEN_VAULT_BATCH_SIZE.
+#
+# Tokens are scoped to the tenant that issued them: each tenant gets its own
+# token and encryption keys derived from the master key, its rows carry the
+# tenant id (also bound into the associated data), and a lookup only
+# resolves the caller's own rows.  Requests without a tenant (the master API
+# key) use the original, unsuffixed derivation.
+# ---------------------------------------------------------------------------
+
+_TOKEN_ID = re.compile(r"(?:\[[A-Z0-9_]+:)?([a-z2-7]{24})\]?")
+# Token ids recently written or queued; repeated values skip encryption.
+_SEEN_CAPACITY = 65536
+# SQLite's default limit on bound parameters per statement.
+_LOOKUP_CHUNK = 900
+
+
+class TokenVaultError(Exception):
+    """Raised when the vault cannot be opened or a value cannot be decrypted."""
+
+
+class TokenVault:
+    """Issue stable tokens for detected values and resolve them back.
+
+    Args:
+        path: SQLite database file.
+        key: Master key; the per-tenant token and encryption keys are derived from it.
+        batch_size: Pending tokens that trigger a write before :meth:`flush`.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tokens (
+            token       TEXT PRIMARY KEY,
+            tenant      TEXT NOT NULL DEFAULT '',
+            entity_type TEXT NOT NULL,
+            nonce       BLOB NOT NULL,
+            value       BLOB NOT NULL
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: str, key: bytes, batch_size: int = 4096):
+        if AESGCM is None:
+            raise TokenVaultError("The token vault needs the 'cryptography' package")
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self._key = key
+        self._tenant_keys: Dict[str, Tuple["hmac.HMAC", "AESGCM"]] = {}
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Tuple[str, str, bytes, bytes]] = {}
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _writer(self) -> sqlite3.Connection:
+        # Callers hold self._lock.  The vault holds the only copy of each
+        # value, so commits are fsynced (synchronous=FULL) even in WAL mode.
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.executescript(self._SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(tokens)")}
+            if "tenant" not in columns:
+                # Vaults written before tenant scoping: their rows belong to
+                # the master key.
+                conn.execute("ALTER TABLE tokens ADD COLUMN tenant TEXT NOT NULL DEFAULT ''")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _keys(self, tenant: str) -> Tuple["hmac.HMAC", "AESGCM"]:
+        keys = self._tenant_keys.get(tenant)
+        if keys is None:
+            scope = b"\x00" + tenant.encode("utf-8") if tenant else b""
+            keys = (
+                hmac.new(self._key, b"ndra-token-vault/token" + scope, hashlib.sha256),
+                AESGCM(hmac.new(self._key, b"ndra-token-vault/encrypt" + scope, hashlib.sha256).digest()),
+            )
+            self._tenant_keys[tenant] = keys
+        return keys
+
+    @staticmethod
+    def _associated_data(tenant: str, token: str) -> bytes:
+        return f"{tenant}\x00{token}".encode("utf-8") if tenant else token.encode("ascii")
+
+    def token_id(self, entity_type: str, value: str, tenant_id: Optional[str] = None) -> str:
+        mac = self._keys(tenant_id or "")[0].copy()
+        mac.update(f"{entity_type}\x00{value}".encode("utf-8"))
+        return base64.b32encode(mac.digest()[:15]).decode("ascii").lower()
+
+    def tokenize(self, entity_type: str, value: str, tenant_id: Optional[str] = None) -> str:
+        """The token for *value*, issued to *tenant_id* (``None``: the master key)."""
+        tenant = tenant_id or ""
+        token = self.token_id(entity_type, value, tenant)
+        _TOKENIZED.inc()
+        with self._lock:
+            if token in self._seen:
+                self._seen.move_to_end(token)
+            else:
+                nonce = os.urandom(12)
+                sealed = self._keys(tenant)[1].encrypt(
+                    nonce, value.encode("utf-8"), self._associated_data(tenant, token)
+                )
+                self._pending[token] = (tenant, entity_type, nonce, sealed)
+                self._seen[token] = None
+                while len(self._seen) > _SEEN_CAPACITY:
+                    self._seen.popitem(last=False)
+                if len(self._pending) >= self.batch_size:
+                    self._flush_locked()
+        return f"[{entity_type}:{token}]"
+
+    __call__ = tokenize
+
+    def masker(self, tenant_id: Optional[str] = None) -> Callable[[str, str], str]:
+        """A ``mask_style=token`` masker issuing tokens to *tenant_id*."""
+        return lambda entity_type, span: self.tokenize(entity_type, span, tenant_id)
+
+    def flush(self) -> int:
+        """Write pending tokens in one transaction; returns how many were new."""
+        with self._lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> int:
+        if not self._pending:
+            return 0
+        rows = [
+            (token, tenant, entity_type, nonce, sealed)
+            for token, (tenant, entity_type, nonce, sealed) in self._pending.items()
+        ]
+        conn = self._writer()
+        try:
+            with conn:
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO tokens (token, tenant, entity_type, nonce, value) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                inserted = conn.total_changes - before
+        except sqlite3.Error:
+            # Nothing was written: forget these ids so they are queued again.
+            for token in self._pending:
+                self._seen.pop(token, None)
+            self._pending.clear()
+            raise
+        self._pending.clear()
+        _INSERTED.inc(inserted)
+        return inserted
+
+    def detokenize(
+        self, tokens: Iterable[str], tenant_id: Optional[str] = None
+    ) -> Dict[str, Optional[Dict[str, str]]]:
+        """Resolve tokens (``[TYPE:id]`` or bare ids) in bulk.
+
+        Returns token -> ``{"entity_type", "value"}``, or ``None`` for tokens
+        the vault does not hold for *tenant_id*; another tenant's tokens are
+        never resolved.
+        """
+        tenant = tenant_id or ""
+        with self._lock:
+            self._flush_locked()
+            if os.path.exists(self.path):
+                self._writer()  # adds the tenant column to older vaults
+        requested = list(dict.fromkeys(tokens))
+        ids = {}
+        for token in requested:
+            match = _TOKEN_ID.fullmatch(token.strip())
+            if match:
+                ids[token] = match.group(1)
+        rows: Dict[str, Tuple[str, bytes, bytes]] = {}
+        if ids and os.path.exists(self.path):
+            unique = sorted(set(ids.values()))
+            # A short-lived read connection; WAL lets lookups run while the
+            # writer commits.
+            with closing(sqlite3.connect(self.path)) as conn:
+                for i in range(0, len(unique), _LOOKUP_CHUNK):
+                    chunk = unique[i:i + _LOOKUP_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    for token_id, entity_type, nonce, sealed in conn.execute(
+                        "SELECT token, entity_type, nonce, value FROM tokens"
+                        f" WHERE tenant = ? AND token IN ({placeholders})",
+                        [tenant, *chunk],
+                    ):
+                        rows[token_id] = (entity_type, nonce, sealed)
+        aead = self._keys(tenant)[1]
+        result: Dict[str, Optional[Dict[str, str]]] = {}
+        for token in requested:
+            row = rows.get(ids.get(token, ""))
+            if row is None:
+                result[token] = None
+                continue
+            entity_type, nonce, sealed = row
+            try:
+                value = aead.decrypt(nonce, sealed, self._associated_data(tenant, ids[token])).decode("utf-8")
+            except Exception as e:
+                raise TokenVaultError(f"Token {ids[token]} does not decrypt with this key") from e
+            result[token] = {"entity_type": entity_type, "value": value}
+        _DETOKENIZED.inc(sum(1 for entry in result.values() if entry is not None))
+        return result
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_default: Optional[TokenVault] = None
+_default_lock = threading.Lock()
+
+
+def default_vault() -> TokenVault:
+    """The process-wide vault at ``TOKEN_VAULT_PATH``, keyed from ``TOKEN_VAULT_KEY``.
+
+    When the key is unset, a random one is created once at
+    ``TOKEN_VAULT_KEY_FILE`` (mode 0600).
+    """
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                key = settings.TOKEN_VAULT_KEY or load_or_create_key(settings.TOKEN_VAULT_KEY_FILE)
+                _default = TokenVault(settings.TOKEN_VAULT_PATH, key.encode("utf-8"), settings.TOKEN_VAULT_BATCH_SIZE)
+    return _default
+
+
+def token_mask(entity_type: str, span: str) -> str:
+    return default_vault().tokenize(entity_type, span)
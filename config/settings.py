@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 class NDRAConfig(BaseSettings):
     APP_NAME: str = "NDRA-PII (Neuro-Semantic Distributed Risk Analysis)"
@@ -8,6 +8,10 @@ class NDRAConfig(BaseSettings):
 
     # Paths
     UPLOAD_DIR: str = "./uploads"
+    # Format-preserving redacted copies (/analyze/upload with redacted_file=true).
+    REDACTED_OUTPUT_DIR: str = "./output/redacted"
+    # Redacted copies older than this are deleted (and no longer served); 0 keeps them.
+    REDACTED_FILE_RETENTION_SECONDS: int = 3600
     ARTIFACTS_DIR: str = "./artifacts"
 
     # Presidio
@@ -57,6 +61,35 @@ class NDRAConfig(BaseSettings):
     # Leave unset (default) to disable auth (only for local development).
     API_KEY: Optional[str] = None
 
+    # Tenant-scoped API keys, as a JSON object mapping key -> tenant id:
+    #   TENANT_API_KEYS='{"k-acme-123": "acme"}'
+    # A request made with one of these keys is authenticated and evaluated
+    # against that tenant's overrides in nsrl/rules/tenant_overrides.yml.
+    # Requests made with API_KEY (or with auth disabled) may instead name a
+    # tenant with the X-Tenant-ID header.
+    TENANT_API_KEYS: Dict[str, str] = {}
+
+    # HMAC key for mask_style=pseudonym.  The same value gets the same token
+    # wherever the key is shared; when unset, a random key is created once
+    # at PSEUDONYM_KEY_FILE (mode 0600).
+    PSEUDONYM_KEY: Optional[str] = None
+    PSEUDONYM_KEY_FILE: str = "./artifacts/pseudonym.key"
+    # Value -> token mappings kept in memory (LRU).
+    PSEUDONYM_CACHE_SIZE: int = 65536
+
+    # Reversible tokenization vault for mask_style=token (SQLite, WAL).
+    # Values are AES-GCM encrypted under keys derived from TOKEN_VAULT_KEY;
+    # when unset, a random key is created once at TOKEN_VAULT_KEY_FILE
+    # (mode 0600).  Keep the key away from the database in production.
+    # POST /detokenize resolves tokens and always requires an API key.
+    TOKEN_VAULT_PATH: str = "./artifacts/token_vault.db"
+    TOKEN_VAULT_KEY: Optional[str] = None
+    TOKEN_VAULT_KEY_FILE: str = "./artifacts/token_vault.key"
+    # New tokens are written once per document, or when this many are pending.
+    TOKEN_VAULT_BATCH_SIZE: int = 4096
+    # Maximum tokens per /detokenize request.
+    DETOKENIZE_MAX_TOKENS: int = 10000
+
     # Maximum number of /analyze/* requests per minute per IP address.
     # Set to 0 to disable rate limiting.
     RATE_LIMIT_PER_MINUTE: int = 60
@@ -93,6 +126,92 @@ class NDRAConfig(BaseSettings):
     # recursion. Ignored while FREEZE_WORKING_SYSTEM is True.
     ENABLE_EXPERIMENTAL_INGESTION: bool = False
 
+    # Hand log records to a background QueueListener instead of formatting
+    # and writing them on the calling (request / pipeline) thread.
+    LOG_ASYNC: bool = False
+
+    # Watch nsrl/rules and nsrl/meta/policy_manifest.yml and atomically swap
+    # in a re-validated, re-compiled rule set when they change.
+    POLICY_HOT_RELOAD: bool = False
+    POLICY_RELOAD_INTERVAL_SECONDS: float = 2.0
+
+    # Enforce nsrl/security/integrity_checks.yml: rule files must match the
+    # SHA-256 checksums in nsrl/meta/policy_manifest.yml (FAIL_CLOSED refuses
+    # to start, and rejects reloads, on mismatch or orphan files).
+    POLICY_INTEGRITY_CHECK: bool = True
+
+    # Time every NSRL rule evaluation; exposes GET /policy/profile and the
+    # ndrapii_rule_* Prometheus counters.  Adds per-rule overhead.
+    POLICY_PROFILING: bool = False
+
+    # Directory for precompiled NSRL rule-set snapshots keyed by the rule
+    # files' content hash; unchanged rules start without YAML parsing.
+    # Empty disables snapshots.
+    POLICY_SNAPSHOT_DIR: str = "./artifacts/nsrl_snapshots"
+
+    # HMAC key authenticating snapshots, which are loaded without validation;
+    # snapshots stay off without it.  Keep it out of POLICY_SNAPSHOT_DIR.
+    POLICY_SNAPSHOT_KEY: Optional[str] = None
+
+    # Compiled per-tenant policy overlays kept in memory (LRU).  Evicted
+    # overlays are recompiled from the loaded tenant overrides on next use.
+    POLICY_TENANT_CACHE_SIZE: int = 1024
+
+    # Per-chunk classification deadline (ms), checked before each Presidio
+    # recognizer runs; once spent, the remaining recognizers are skipped and
+    # the chunk is redacted whole (block mask).  0 disables.  Policy evaluation is
+    # bounded by execution_timeout_ms in nsrl/security/hard_limits.yml.
+    CLASSIFIER_DEADLINE_MS: int = 2000
+
+    # Intra-chunk fusion backend: "auto" uses NumPy for entity-dense chunks
+    # when it is installed, "python" and "numpy" force one.  Results are
+    # identical.
+    FUSION_BACKEND: str = "auto"
+
+    # ------------------------------------------------------------------
+    # Audit log write path
+    # ------------------------------------------------------------------
+    # When enabled, AuditAgent.process enqueues events for a dedicated writer
+    # thread that chains hashes in order and commits them in batches (one
+    # write, at most one fsync per batch) instead of taking a global lock and
+    # reopening audit.log for every event.
+    AUDIT_GROUP_COMMIT: bool = False
+
+    # Durability policy for the group-commit writer:
+    #   "every_event" - fsync before any caller is acknowledged
+    #   "interval"    - fsync at most every AUDIT_FSYNC_INTERVAL_MS
+    #   "batch"       - fsync after every AUDIT_FSYNC_BATCH_SIZE events
+    AUDIT_DURABILITY: str = "every_event"
+    AUDIT_FSYNC_INTERVAL_MS: int = 50
+    AUDIT_FSYNC_BATCH_SIZE: int = 256
+
+    # Seal a signed Merkle checkpoint every N audit entries (0 disables).
+    # Checkpoints live in the "<AUDIT_LOG_FILE>.ckpt" sidecar and let
+    # /audit/verify resume from the last verified checkpoint or verify
+    # sealed windows in parallel instead of re-hashing from genesis.
+    AUDIT_CHECKPOINT_INTERVAL: int = 1000
+
+    # HMAC key used to sign checkpoints; checkpointing stays off without it.
+    # Keep it out of the audit directory (a secret store or the environment):
+    # whoever can write the log and read the key can re-sign a rewritten log.
+    AUDIT_CHECKPOINT_KEY: Optional[str] = None
+
+    # Worker processes for parallel checkpoint verification (0 = CPU count).
+    AUDIT_VERIFY_WORKERS: int = 0
+
+    # Seal the active audit log into "<AUDIT_LOG_FILE>.NNNNNN" once it reaches
+    # this size / age (0 disables either trigger).  The hash chain continues
+    # across segments; "<AUDIT_LOG_FILE>.segments" records each sealed one.
+    AUDIT_SEGMENT_MAX_BYTES: int = 64 * 1024 * 1024
+    AUDIT_SEGMENT_MAX_AGE_SECONDS: int = 0
+
+    # Gzip sealed segments in a background thread.
+    AUDIT_COMPRESS_SEALED_SEGMENTS: bool = False
+
+    # Maintain "<AUDIT_LOG_FILE>.trace.db" (SQLite) mapping trace_id and
+    # event_type to entry locations, used by GET /audit/trace/{trace_id}.
+    AUDIT_TRACE_INDEX: bool = True
+
     class Config:
         env_file = ".env"
 
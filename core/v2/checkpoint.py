@@ -0,0 +1,212 @@
+"""Per-chunk checkpoints for resuming large documents in the v2 orchestrator.
+
+Classification and governance results are written, chunk by chunk, to a
+local SQLite database keyed by (document key, stage, chunk index).  A run
+that fails or times out near the end of a 5,000-chunk document leaves its
+committed chunks behind; the next run of the same document -- on this
+worker or any other sharing the database -- reuses them and only processes
+the rest.
+
+The document key is the SHA-256 of the file's bytes together with the
+policy rule-set version (when the policy port exposes ``rule_set_version``),
+so edited files and changed rules never reuse stale results.  Chunk indexes
+rely on extraction being deterministic for the same bytes; resumed chunks
+keep the chunk ids of the run that committed them.
+
+Results hold the document text and detected values, so each one is stored
+as the pydantic model's JSON (not a pickle) sealed with AES-256-GCM under a
+key derived from ``checkpoint_key``, with (document key, stage, chunk index)
+as associated data: the file reveals no PII, and a row that was tampered
+with or moved to another chunk does not load.  A write failure is logged and
+the run continues without checkpoints.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Tuple
+
+from schemas.core_models import ClassifiedChunk, GovernedChunk
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:
+    AESGCM = None
+
+logger = logging.getLogger(__name__)
+
+CLASSIFIED = "classified"
+GOVERNED = "governed"
+_MODELS = {CLASSIFIED: ClassifiedChunk, GOVERNED: GovernedChunk}
+
+
+def document_key(file_path: str, version: str = "") -> Optional[str]:
+    """The checkpoint key for *file_path*, or None when it cannot be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                digest.update(block)
+    except OSError:
+        return None
+    return hashlib.sha256(f"{digest.hexdigest()}\x00{version}".encode("utf-8")).hexdigest()
+
+
+def _to_json(chunk: Any) -> str:
+    # Pipeline chunks convert at the boundary; ports may return models already.
+    model = chunk.to_model() if hasattr(chunk, "to_model") else chunk
+    return model.model_dump_json()
+
+
+class CheckpointStore:
+    """SQLite store of per-chunk results (WAL, safe to share between processes).
+
+    Args:
+        path: SQLite database file.
+        key: Secret the result encryption key is derived from; raises
+            ``ValueError`` when empty or when ``cryptography`` is missing.
+        batch_size: Recorded results that trigger a commit before :meth:`flush`.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS chunk_results (
+            document_key TEXT NOT NULL,
+            stage        TEXT NOT NULL,
+            chunk_index  INTEGER NOT NULL,
+            nonce        BLOB NOT NULL,
+            result       BLOB NOT NULL,
+            PRIMARY KEY (document_key, stage, chunk_index)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: str, key: str, batch_size: int = 32):
+        if not key:
+            raise ValueError("Checkpoints need a checkpoint_key")
+        if AESGCM is None:
+            raise ValueError("Checkpoints need the 'cryptography' package")
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self._aead = AESGCM(hmac.new(key.encode("utf-8"), b"ndra-v2-checkpoint/encrypt", hashlib.sha256).digest())
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, str, int, bytes, bytes]] = []
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _writer(self) -> sqlite3.Connection:
+        # Callers hold self._lock.  Checkpoints can always be recomputed, so
+        # commits are not fsynced individually (synchronous=NORMAL).
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(chunk_results)")}
+            if columns and "nonce" not in columns:
+                # Plaintext results from before encryption: recomputable, so
+                # they are dropped rather than kept readable on disk.
+                conn.execute("DROP TABLE chunk_results")
+            conn.executescript(self._SCHEMA)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _associated_data(key: str, stage: str, index: int) -> bytes:
+        return f"{key}\x00{stage}\x00{index}".encode("utf-8")
+
+    def load(self, key: str, stage: str) -> Dict[int, Any]:
+        """Committed results of *stage* for *key*, by chunk index."""
+        if not os.path.exists(self.path):
+            return {}
+        model = _MODELS[stage]
+        results: Dict[int, Any] = {}
+        try:
+            with closing(sqlite3.connect(self.path)) as conn:
+                for index, nonce, sealed in conn.execute(
+                    "SELECT chunk_index, nonce, result FROM chunk_results WHERE document_key = ? AND stage = ?",
+                    (key, stage),
+                ):
+                    result = self._aead.decrypt(nonce, sealed, self._associated_data(key, stage, index))
+                    results[index] = model.model_validate_json(result)
+        except (sqlite3.Error, ValueError, InvalidTag) as e:
+            logger.warning(f"[V2Pipeline] Ignoring unreadable checkpoints in {self.path}: {e}")
+            return {}
+        return results
+
+    def record(self, key: str, stage: str, index: int, chunk: Any) -> None:
+        """Queue the result of chunk *index*; sealed now, committed in batches."""
+        nonce = os.urandom(12)
+        sealed = self._aead.encrypt(nonce, _to_json(chunk).encode("utf-8"), self._associated_data(key, stage, index))
+        row = (key, stage, index, nonce, sealed)
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        try:
+            conn = self._writer()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO chunk_results (document_key, stage, chunk_index, nonce, result) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"[V2Pipeline] Could not write {len(rows)} checkpoints to {self.path}: {e}")
+
+    def discard(self, key: str) -> None:
+        """Drop every checkpoint of *key* (and any still queued)."""
+        with self._lock:
+            self._pending = [row for row in self._pending if row[0] != key]
+            if not os.path.exists(self.path):
+                return
+            try:
+                conn = self._writer()
+                with conn:
+                    conn.execute("DELETE FROM chunk_results WHERE document_key = ?", (key,))
+            except sqlite3.Error as e:
+                logger.warning(f"[V2Pipeline] Could not discard checkpoints in {self.path}: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class DocumentCheckpoint:
+    """The checkpoints of one run: results loaded up front, new ones recorded."""
+
+    def __init__(self, store: CheckpointStore, key: str):
+        self.store = store
+        self.key = key
+        self.classified = store.load(key, CLASSIFIED)
+        self.governed = store.load(key, GOVERNED)
+
+    def record_classified(self, index: int, chunk: Any) -> None:
+        self.store.record(self.key, CLASSIFIED, index, chunk)
+
+    def record_governed(self, index: int, chunk: Any) -> None:
+        self.store.record(self.key, GOVERNED, index, chunk)
+
+    def finish(self, completed: bool, keep: bool = False) -> None:
+        """Commit what is queued; a completed run's checkpoints are dropped unless *keep*."""
+        if completed and not keep:
+            self.store.discard(self.key)
+        else:
+            self.store.flush()
@@ -1,7 +1,9 @@
 from datetime import datetime, timezone
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Dict, List, Literal, Optional
 
+from agents.budgets import PipelineDeadline
+
 
 DecisionAction = Literal["Allow", "Redact", "Escalate", "Block", "Quarantine"]
 
@@ -9,12 +11,32 @@ DecisionAction = Literal["Allow", "Redact", "Escalate", "Block", "Quarantine"]
 class OrchestrationStepMetric(BaseModel):
     name: str
     elapsed_ms: int = Field(ge=0)
+    # Pipelined execution only: time a stage waited for input, and time it
+    # was held back by a full downstream queue.
+    queue_wait_ms: int = Field(default=0, ge=0)
+    blocked_ms: int = Field(default=0, ge=0)
 
 
 class PipelineContext(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     trace_id: str
     filename: str
     started_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Checked by every stage; the orchestrator sets one from
+    # max_processing_seconds when absent.  Cancel it to stop a run early.
+    deadline: Optional[PipelineDeadline] = Field(default=None, exclude=True)
+
+
+class PipelineProgress(BaseModel):
+    """Chunks that got through each stage before a run stopped."""
+
+    extracted: int = 0
+    classified: int = 0
+    fused: int = 0
+    governed: int = 0
+    # The first stage that had not finished.
+    stopped_in: Optional[str] = None
 
 
 class PipelineOutput(BaseModel):
@@ -28,3 +50,4 @@ class PipelineOutput(BaseModel):
     redacted_text_preview: Optional[str] = None
     step_metrics: List[OrchestrationStepMetric] = []
     diagnostics: Dict[str, str] = {}
+    progress: Optional[PipelineProgress] = None
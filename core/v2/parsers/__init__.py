@@ -1,5 +1,13 @@
 """Email parsers for v2 architecture."""
 
-from .rfc_email_parser import RFCEmailParser, ParsedEmail, EmailParsingError
+from .rfc_email_parser import RFCEmailParser, ParsedEmail, EmailParsingError, TextPart, REDACTABLE_HEADERS, html_attribute_values, html_text_segments
 
-__all__ = ["RFCEmailParser", "ParsedEmail", "EmailParsingError"]
+__all__ = [
+    "RFCEmailParser",
+    "ParsedEmail",
+    "EmailParsingError",
+    "TextPart",
+    "REDACTABLE_HEADERS",
+    "html_attribute_values",
+    "html_text_segments",
+]
@@ -14,12 +14,36 @@ from email import policy
 from email.message import Message, EmailMessage
 from email.parser import BytesParser
 from dataclasses import dataclass, field
-from typing import Dict, List, Any
+from email.header import Header
+from html import unescape as html_unescape
+from html.parser import HTMLParser
+from typing import Dict, List, Any, Tuple
 import base64
 import quopri
+import re
 from io import BytesIO
 
 
+# Headers whose values are scanned for PII and may be rewritten.
+REDACTABLE_HEADERS = ("Subject", "From", "To", "Cc")
+
+_HEADER_END = re.compile(rb"\r?\n\r?\n")
+
+
+@dataclass
+class TextPart:
+    """A non-attachment text/plain or text/html leaf part."""
+
+    index: int
+    """Position among the message's leaf parts (``msg.walk()`` order)"""
+
+    content_type: str
+    charset: str
+    transfer_encoding: str
+    text: str
+    """Decoded content"""
+
+
 @dataclass
 class ParsedEmail:
     """RFC-compliant parsed email structure."""
@@ -48,6 +72,12 @@ class ParsedEmail:
     content_transfer_encoding: str = "7bit"
     """Content-Transfer-Encoding of body (quoted-printable, base64, etc.)"""
 
+    text_parts: List[TextPart] = field(default_factory=list)
+    """Every text/plain and text/html body part, in message order"""
+
+    raw_bytes: bytes = b""
+    """The message as received, for splice-based reconstruction"""
+
 
 class EmailParsingError(Exception):
     """Raised when email parsing fails."""
@@ -111,6 +141,8 @@ class RFCEmailParser:
             attachments = self._extract_attachments(msg)
             
             return ParsedEmail(
+                text_parts=self._extract_text_parts(msg),
+                raw_bytes=raw_email,
                 headers=headers,
                 body_text=body_text,
                 body_html=body_html,
@@ -263,6 +295,150 @@ class RFCEmailParser:
         
         return attachments
     
+    def _extract_text_parts(self, msg: Message) -> List[TextPart]:
+        """Decode every non-attachment text/plain and text/html leaf part.
+
+        Args:
+            msg: Parsed email message
+
+        Returns:
+            TextPart list in ``msg.walk()`` order
+        """
+        leaves = [part for part in msg.walk() if not part.is_multipart()]
+        parts = [_text_part(index, part) for index, part in enumerate(leaves) if _is_text_body(part)]
+        return [part for part in parts if part is not None]
+
+    def parse_text_parts(self, raw_email: bytes) -> ParsedEmail:
+        """Parse the header blocks and text parts only.
+
+        The MIME tree is found by scanning the raw bytes for boundaries;
+        every part's header block is parsed, but only non-attachment
+        text/plain and text/html bodies are decoded.  Attachment bodies are
+        never fed to the email parser, so the cost does not grow with their
+        size.  ``raw_message`` holds the top-level headers only.  This is
+        enough for :meth:`text_pages` and :meth:`reconstruct_parts`; use
+        :meth:`parse` for the full message tree.
+
+        Args:
+            raw_email: Raw .eml file as bytes
+
+        Returns:
+            ParsedEmail with headers, text parts and attachment metadata
+
+        Raises:
+            EmailParsingError: If the MIME structure cannot be scanned
+        """
+        try:
+            leaves: List[Tuple[Message, int, int, int]] = []
+            boundaries: List[str] = []
+            top = _scan_leaves(raw_email, 0, len(raw_email), self.policy, leaves, boundaries)
+            text_parts, attachments = [], []
+            for index, (headers, start, body_start, end) in enumerate(leaves):
+                if _is_text_body(headers):
+                    part = _text_part(index, BytesParser(policy=self.policy).parsebytes(raw_email[start:end]))
+                    if part is not None:
+                        text_parts.append(part)
+                elif "attachment" in str(headers.get("Content-Disposition", "")):
+                    attachments.append({
+                        "filename": headers.get_filename(),
+                        "content_type": headers.get_content_type(),
+                        "size_bytes": _decoded_size(raw_email[body_start:end], headers),
+                    })
+        except EmailParsingError:
+            raise
+        except Exception as e:
+            raise EmailParsingError(f"Failed to parse email: {e}") from e
+
+        # Like _extract_body: the last plain and HTML parts win.
+        plain = [part for part in text_parts if part.content_type == "text/plain"]
+        html = [part for part in text_parts if part.content_type == "text/html"]
+        return ParsedEmail(
+            text_parts=text_parts,
+            raw_bytes=raw_email,
+            headers=self._extract_headers(top),
+            body_text=plain[-1].text if plain else "",
+            body_html=html[-1].text if html else None,
+            attachments=attachments,
+            mime_boundaries=boundaries,
+            original_encoding=plain[-1].charset if plain else "utf-8",
+            content_transfer_encoding=plain[-1].transfer_encoding if plain else "7bit",
+            raw_message=top,
+        )
+
+    def text_pages(self, parsed: ParsedEmail) -> List[Dict[str, Any]]:
+        """The message as extractor pages.
+
+        Page 1 is the ``REDACTABLE_HEADERS`` block ("Name: value" lines);
+        each text part follows as its own page, HTML reduced to its text
+        content (see :func:`html_text_segments`).  Entity offsets on these pages can be mapped back with
+        :meth:`reconstruct_parts`.
+        """
+        msg = parsed.raw_message
+        lines = [f"{name}: {msg[name]}" for name in REDACTABLE_HEADERS if msg[name] is not None]
+        pages = [{"text": "\n".join(lines), "page": 1}]
+        for number, part in enumerate(parsed.text_parts, start=2):
+            if part.content_type == "text/html":
+                text = "".join(segment[2] for segment in html_text_segments(part.text))
+            else:
+                text = part.text
+            pages.append({"text": text, "page": number})
+        if not parsed.text_parts and parsed.body_text:
+            # Best-effort parse: the raw text, which cannot be mapped back.
+            pages.append({"text": parsed.body_text, "page": 2})
+        return pages
+
+    def reconstruct_parts(
+        self,
+        parsed: ParsedEmail,
+        bodies: Dict[int, str],
+        headers: Dict[str, str] | None = None,
+    ) -> bytes:
+        """Re-emit the original message with some parts and headers replaced.
+
+        Only replaced bodies are re-encoded (same charset and
+        Content-Transfer-Encoding) and only replaced header fields are
+        re-folded; every other byte, including attachments and MIME
+        boundaries, is copied from ``parsed.raw_bytes`` unchanged.
+
+        Args:
+            parsed: ParsedEmail from :meth:`parse` or :meth:`parse_text_parts`
+            bodies: leaf part index (``TextPart.index``) -> new decoded text
+            headers: top-level header name -> new value
+
+        Returns:
+            The message as bytes
+
+        Raises:
+            EmailParsingError: if the raw bytes do not match the parsed
+                MIME structure
+        """
+        raw = parsed.raw_bytes
+        if not raw:
+            raise EmailParsingError("Splice reconstruction needs the raw message bytes")
+        newline = b"\r\n" if b"\r\n" in raw[:4096] else b"\n"
+        leaves: List[Tuple[Message, int, int, int]] = []
+        _scan_leaves(raw, 0, len(raw), self.policy, leaves, [])
+
+        edits: List[Tuple[int, int, bytes]] = []
+        if headers:
+            edits.extend(_header_edits(raw, _body_start(raw, 0, len(raw)), headers, newline))
+        text_parts = {part.index: part for part in parsed.text_parts}
+        for index, text in bodies.items():
+            part = text_parts[index]
+            if index >= len(leaves) or leaves[index][0].get_content_type() != part.content_type:
+                raise EmailParsingError(f"MIME structure mismatch at leaf part {index}")
+            _, _, body_start, body_end = leaves[index]
+            edits.append((body_start, body_end, _encode_body(text, part, newline, raw[body_end - 2:body_end])))
+
+        out = []
+        cursor = 0
+        for start, end, data in sorted(edits):
+            out.append(raw[cursor:start])
+            out.append(data)
+            cursor = end
+        out.append(raw[cursor:])
+        return b"".join(out)
+
     def reconstruct(self, parsed: ParsedEmail, redacted_text: str) -> bytes:
         """Reconstruct email with redacted text, preserving structure.
         
@@ -280,6 +456,12 @@ class RFCEmailParser:
         Returns:
             Reconstructed .eml as bytes with proper MIME encoding
         """
+        plain = [part for part in parsed.text_parts if part.content_type == "text/plain"]
+        if parsed.raw_bytes and plain:
+            # Splice the new body into the original bytes; nothing else is
+            # re-serialized.
+            return self.reconstruct_parts(parsed, {plain[0].index: redacted_text})
+
         msg = parsed.raw_message
         
         # Handle multipart messages
@@ -402,3 +584,209 @@ class RFCEmailParser:
         ])
         
         return protected
+
+
+def _body_start(raw: bytes, start: int, end: int) -> int:
+    if raw.startswith(b"\r\n", start):
+        return start + 2
+    if raw.startswith(b"\n", start):
+        return start + 1
+    match = _HEADER_END.search(raw, start, end)
+    return match.end() if match else end
+
+
+def _scan_leaves(
+    raw: bytes,
+    start: int,
+    end: int,
+    msg_policy,
+    out: List[Tuple[Message, int, int, int]],
+    boundaries: List[str],
+) -> Message:
+    """Append ``(headers, header_start, body_start, body_end)`` for every leaf
+    part of ``raw[start:end]``, in ``msg.walk()`` order, and return the
+    headers of the part itself.  Only header blocks are parsed."""
+    body_start = _body_start(raw, start, end)
+    headers = BytesParser(policy=msg_policy).parsebytes(raw[start:body_start], headersonly=True)
+    if headers.get_content_maintype() == "multipart":
+        boundary = headers.get_boundary()
+        if boundary is None:
+            raise EmailParsingError("Multipart part without a boundary")
+        boundaries.append(boundary)
+        marker = b"--" + boundary.encode("ascii", "surrogateescape")
+        for child_start, child_end in _multipart_segments(raw, body_start, end, marker):
+            _scan_leaves(raw, child_start, child_end, msg_policy, out, boundaries)
+    elif headers.get_content_type() == "message/rfc822":
+        # The body is one complete nested message.
+        _scan_leaves(raw, body_start, end, msg_policy, out, boundaries)
+    else:
+        out.append((headers, start, body_start, end))
+    return headers
+
+
+def _multipart_segments(raw: bytes, start: int, end: int, marker: bytes) -> List[Tuple[int, int]]:
+    """Byte ranges of the body parts between ``--boundary`` delimiter lines.
+
+    The line break before a delimiter belongs to the delimiter (RFC 2046).
+    """
+    segments = []
+    previous = None
+    position = start
+    while True:
+        hit = raw.find(marker, position, end)
+        if hit < 0:
+            break
+        after = hit + len(marker)
+        position = after
+        if hit != start and raw[hit - 1:hit] != b"\n":
+            continue
+        closing = raw.startswith(b"--", after)
+        line_end = raw.find(b"\n", after, end)
+        line_end = end if line_end < 0 else line_end + 1
+        if raw[after + 2 * closing:line_end].strip(b" \t\r\n"):
+            # A longer boundary that shares this one as a prefix.
+            continue
+        if previous is not None:
+            cut = hit - 2 if raw[hit - 2:hit] == b"\r\n" else hit - 1 if hit > start else hit
+            segments.append((previous, max(previous, cut)))
+        if closing:
+            break
+        previous = line_end
+    return segments
+
+
+def _is_text_body(part: Message) -> bool:
+    return (part.get_content_type() in ("text/plain", "text/html")
+            and "attachment" not in str(part.get("Content-Disposition", "")))
+
+
+def _text_part(index: int, part: Message) -> TextPart | None:
+    payload = part.get_payload(decode=True)
+    if payload is None:
+        return None
+    charset = part.get_content_charset() or "utf-8"
+    try:
+        text = payload.decode(charset, errors="replace")
+    except LookupError:
+        charset = "utf-8"
+        text = payload.decode(charset, errors="replace")
+    return TextPart(
+        index=index,
+        content_type=part.get_content_type(),
+        charset=charset,
+        transfer_encoding=str(part.get("Content-Transfer-Encoding", "7bit")).strip().lower(),
+        text=text,
+    )
+
+
+def _decoded_size(body: bytes, headers: Message) -> int:
+    """Decoded length of a body, without decoding it."""
+    if str(headers.get("Content-Transfer-Encoding", "")).strip().lower() != "base64":
+        return len(body)
+    digits = len(body) - sum(body.count(ws) for ws in (b"\r", b"\n", b" ", b"\t"))
+    return digits * 3 // 4 - body.rstrip().endswith(b"=") - body.rstrip().endswith(b"==")
+
+
+def _header_edits(raw: bytes, header_end: int, headers: Dict[str, str], newline: bytes) -> List[Tuple[int, int, bytes]]:
+    """Replacement byte ranges for the first occurrence of each header field."""
+    edits = []
+    wanted = {name.lower(): (name, value) for name, value in headers.items()}
+    for match in re.finditer(rb"^([!-9;-~]+):.*?(?=\r?\n(?![ \t])|\Z)", raw[:header_end], re.M | re.S):
+        key = match.group(1).decode("ascii").lower()
+        if key not in wanted:
+            continue
+        name, value = wanted.pop(key)
+        try:
+            field_bytes = f"{name}: {value}".encode("ascii")
+        except UnicodeEncodeError:
+            encoded = Header(value, "utf-8", header_name=name).encode(linesep=newline.decode("ascii"))
+            field_bytes = f"{name}: {encoded}".encode("ascii")
+        edits.append((match.start(), match.end(), field_bytes))
+    return edits
+
+
+def _encode_body(text: str, part: TextPart, newline: bytes, tail: bytes) -> bytes:
+    """Encode *text* like the original part, with the message's line endings."""
+    data = text.replace("\r\n", "\n").encode(part.charset, errors="replace")
+    if part.transfer_encoding == "quoted-printable":
+        data = quopri.encodestring(data)
+    elif part.transfer_encoding == "base64":
+        data = base64.encodebytes(data)
+    data = data.replace(b"\n", newline) if newline != b"\n" else data
+    # Keep a trailing line break if the original body ended with one.
+    if tail.endswith(b"\n") and not data.endswith(b"\n"):
+        data += newline
+    return data
+
+
+# name = "value" | 'value' | value, inside a start tag.
+_HTML_ATTRIBUTE = re.compile(r"""([^\s"'<>/=]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+))""")
+
+
+class _HtmlText(HTMLParser):
+    def __init__(self, html: str):
+        super().__init__(convert_charrefs=False)
+        self.html = html
+        self.line_starts = [0] + [match.end() for match in re.finditer("\n", html)]
+        self.segments: List[Tuple[int, int, str]] = []
+        self.attributes: List[Tuple[str, int, int]] = []
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self.line_starts[line - 1] + column
+
+    def handle_data(self, data):
+        start = self._offset()
+        self.segments.append((start, start + len(data), data))
+
+    def handle_comment(self, data):
+        start = self._offset() + len("<!--")
+        self.segments.append((start, start + len(data), data))
+
+    def _reference(self, raw: str) -> None:
+        start = self._offset()
+        end = start + len(raw)
+        if self.html.startswith(";", end):
+            end += 1
+        self.segments.append((start, end, html_unescape(self.html[start:end])))
+
+    def handle_entityref(self, name):
+        self._reference(f"&{name}")
+
+    def handle_charref(self, name):
+        self._reference(f"&#{name}")
+
+    def handle_starttag(self, tag, attrs):
+        start = self._offset()
+        tag_text = self.get_starttag_text() or ""
+        # Skip the tag name so "<a" never reads as an attribute.
+        name_end = len(tag) + 1
+        for match in _HTML_ATTRIBUTE.finditer(tag_text, name_end):
+            group = next(g for g in (2, 3, 4) if match.group(g) is not None)
+            self.attributes.append(
+                (match.group(1).lower(), start + match.start(group), start + match.end(group))
+            )
+
+    handle_startendtag = handle_starttag
+
+
+def html_text_segments(html: str) -> List[Tuple[int, int, str]]:
+    """Text content of *html* as ``(start, end, text)`` ranges of the source.
+
+    Covers character data (including script and style content, which may
+    carry data too) and comments; character references are separate
+    segments holding their decoded text.
+    """
+    parser = _HtmlText(html)
+    parser.feed(html)
+    parser.close()
+    return parser.segments
+
+
+def html_attribute_values(html: str) -> List[Tuple[str, int, int]]:
+    """Attribute values of *html*'s start tags as ``(name, start, end)`` ranges
+    of the source, without their quotes (names are lower-cased)."""
+    parser = _HtmlText(html)
+    parser.feed(html)
+    parser.close()
+    return parser.attributes
@@ -1,13 +1,37 @@
 from __future__ import annotations
 
+import logging
+import queue
+import threading
 from time import monotonic
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional
 
-from schemas.core_models import ClassifiedChunk
+from agents.budgets import PipelineCancelled, PipelineDeadline
+from schemas.core_models import ClassifiedChunk, GovernedChunk
 
-from .models import OrchestrationStepMetric, PipelineContext, PipelineOutput
+from .checkpoint import CheckpointStore, DocumentCheckpoint, document_key
+from .models import OrchestrationStepMetric, PipelineContext, PipelineOutput, PipelineProgress
 from .ports import ClassifierPort, ExtractorPort, FusionPort, PolicyPort, RedactionPort
 from .settings import V2RuntimeSettings
+from .stages import END, POLL_SECONDS, CrossChunkFusion, PoolStage, SourceStage, StagePool, StageThread
+
+logger = logging.getLogger(__name__)
+
+
+class _Tally:
+    """Running totals over governed chunks, in chunk order."""
+
+    __slots__ = ("governed", "total_pii", "policy_decisions", "final_action", "redacted_preview", "error", "resumed")
+
+    def __init__(self):
+        self.governed = 0
+        self.total_pii = 0
+        self.policy_decisions = 0
+        self.final_action = "Allow"
+        self.redacted_preview: Optional[str] = None
+        self.error: Optional[str] = None
+        # Governed chunks taken from checkpoints rather than recomputed.
+        self.resumed = 0
 
 
 class V2PipelineOrchestrator:
@@ -15,6 +39,8 @@ class V2PipelineOrchestrator:
 
     This class centralizes runtime safeguards and deterministic execution while
     delegating extraction/classification/policy/redaction work to pluggable ports.
+    With ``execution_mode="pipelined"`` the ports run concurrently on their
+    own pools (see :mod:`core.v2.stages`), with the same results.
     """
 
     def __init__(
@@ -25,6 +51,7 @@ class V2PipelineOrchestrator:
         policy: PolicyPort,
         redaction: RedactionPort,
         settings: V2RuntimeSettings | None = None,
+        checkpoints: CheckpointStore | None = None,
     ):
         self.extractor = extractor
         self.classifier = classifier
@@ -32,103 +59,316 @@ class V2PipelineOrchestrator:
         self.policy = policy
         self.redaction = redaction
         self.settings = settings or V2RuntimeSettings()
+        if checkpoints is None and self.settings.checkpoint_path:
+            try:
+                checkpoints = CheckpointStore(
+                    self.settings.checkpoint_path, self.settings.checkpoint_key or "", self.settings.checkpoint_batch_size
+                )
+            except ValueError as e:
+                logger.warning(f"[V2Pipeline] Running without checkpoints: {e}")
+        self.checkpoints = checkpoints
 
     def run(self, file_path: str, context: PipelineContext) -> PipelineOutput:
-        pipeline_start = monotonic()
+        """Process *file_path*; fails closed when a limit or the deadline is hit.
+
+        The deadline (``context.deadline``, else ``max_processing_seconds``)
+        is passed to the extractor and classifier as ``context["deadline"]``
+        and checked between chunks here; a failed result reports how far the
+        run got in ``progress``.  With checkpoints enabled, chunks committed
+        by an earlier run of the same document are not processed again.
+        """
+        if context.deadline is None:
+            context.deadline = PipelineDeadline(self.settings.max_processing_seconds * 1000)
+        if self.settings.execution_mode == "pipelined":
+            return self._run_pipelined(file_path, context)
+
+        deadline = context.deadline
+        port_context = {"trace_id": context.trace_id, "deadline": deadline}
         metrics: List[OrchestrationStepMetric] = []
+        progress = PipelineProgress()
+        tally = _Tally()
+        checkpoint = self._open_checkpoint(file_path)
+        completed = False
+
+        try:
+            progress.stopped_in = "extract"
+            chunks = self._timed_extract(file_path, metrics, port_context)
+            progress.extracted = len(chunks)
+            if len(chunks) > self.settings.max_chunks_per_document:
+                return self._failed_result(
+                    context=context,
+                    metrics=metrics,
+                    diagnostics={"error": "Chunk limit exceeded"},
+                    progress=progress,
+                )
 
-        chunks = self._timed_extract(file_path, metrics)
-        if len(chunks) > self.settings.max_chunks_per_document:
+            progress.stopped_in = "classify"
+            classified_chunks = self._timed_classify(chunks, metrics, port_context, progress, checkpoint)
+            progress.stopped_in = "fuse"
+            fused_chunks = self._timed_fuse(classified_chunks, metrics, deadline, progress)
+
+            progress.stopped_in = "govern"
+            self._tally(tally, self._govern(fused_chunks, context.trace_id, checkpoint, tally), deadline)
+            completed = tally.error is None
+        except PipelineCancelled as exc:
+            tally.error = _deadline_error(exc.reason)
+        finally:
+            if checkpoint is not None:
+                checkpoint.finish(completed, keep=self.settings.checkpoint_keep_completed)
+
+        progress.governed = tally.governed
+        if tally.error is not None:
             return self._failed_result(
-                context=context,
-                metrics=metrics,
-                diagnostics={"error": "Chunk limit exceeded"},
+                context=context, metrics=metrics, diagnostics=self._diagnostics(tally, tally.error),
+                progress=progress, tally=tally,
             )
+        return self._processed_result(context, len(chunks), tally, metrics)
+
+    def _open_checkpoint(self, file_path: str) -> Optional[DocumentCheckpoint]:
+        if self.checkpoints is None:
+            return None
+        key = document_key(file_path, str(getattr(self.policy, "rule_set_version", "")))
+        if key is None:
+            logger.warning(f"[V2Pipeline] Cannot read {file_path}; running without checkpoints")
+            return None
+        return DocumentCheckpoint(self.checkpoints, key)
+
+    def _govern(
+        self,
+        fused_chunks: List[ClassifiedChunk],
+        trace_id: str,
+        checkpoint: Optional[DocumentCheckpoint],
+        tally: "_Tally",
+    ) -> Iterator[GovernedChunk]:
+        for index, chunk in enumerate(fused_chunks):
+            governed = checkpoint.governed.get(index) if checkpoint is not None else None
+            if governed is not None:
+                tally.resumed += 1
+                yield governed
+                continue
+            redacted = self.redaction.redact(self.policy.evaluate_chunk(chunk, trace_id=trace_id))
+            if checkpoint is not None:
+                checkpoint.record_governed(index, redacted)
+            yield redacted
+
+    @staticmethod
+    def _diagnostics(tally: "_Tally", error: Optional[str] = None) -> Dict[str, str]:
+        diagnostics = {"error": error} if error is not None else {}
+        if tally.resumed:
+            diagnostics["resumed_chunks"] = str(tally.resumed)
+        return diagnostics
 
-        classified_chunks = self._timed_classify(chunks, metrics)
-        fused_chunks = self._timed_fuse(classified_chunks, metrics)
+    def _run_pipelined(self, file_path: str, context: PipelineContext) -> PipelineOutput:
+        """Run every port on its own pool, joined by bounded queues.
 
-        total_pii = 0
-        policy_decisions = 0
-        final_action = "Allow"
-        redacted_preview = None
+        Results are consumed in chunk order, so the output is the same as
+        sequential execution; the step metrics overlap in time and carry
+        each stage's queue waits.  Once the deadline expires the run returns
+        within a poll interval, leaving calls in flight to finish (or notice
+        the deadline) in the background.
+        """
+        settings = self.settings
+        deadline = context.deadline
+        port_context = {"trace_id": context.trace_id, "deadline": deadline}
+        stop = threading.Event()
+        queues = [queue.Queue(maxsize=settings.stage_queue_size) for _ in range(5)]
+        cross = CrossChunkFusion(self.fusion)
+        checkpoint = self._open_checkpoint(file_path)
+        # Fusion links neighbouring chunks, so it is recomputed on resume;
+        # a checkpointed governed chunk skips both policy and redaction.
+        classified_hooks = governed_hooks = {}
+        if checkpoint is not None:
+            classified_hooks = dict(cached=checkpoint.classified.get, record=checkpoint.record_classified)
+            governed_hooks = dict(cached=checkpoint.governed.get, record=checkpoint.record_governed)
+        pools = [
+            StagePool("classify", self.classifier, "process", settings.classify_pool, context=port_context),
+            StagePool("fuse", self.fusion, "fuse_chunk", settings.fuse_pool),
+            StagePool("policy", self.policy, "evaluate_chunk", settings.policy_pool, trace_id=context.trace_id),
+            StagePool("redact", self.redaction, "redact", settings.redaction_pool),
+        ]
+        source = SourceStage(
+            "extract", lambda: self.extractor.process(file_path, port_context), queues[0], stop, deadline,
+            settings.max_chunks_per_document,
+        )
+        stages = [
+            source,
+            PoolStage("classify", pools[0], queues[0], queues[1], stop, deadline, **classified_hooks),
+            PoolStage("fuse", pools[1], queues[1], queues[2], stop, deadline, after=cross, finish=cross.finish),
+            PoolStage("policy", pools[2], queues[2], queues[3], stop, deadline,
+                      cached=governed_hooks.get("cached")),
+            PoolStage("redact", pools[3], queues[3], queues[4], stop, deadline, **governed_hooks),
+        ]
+        for stage in stages:
+            stage.start()
+
+        tally = _Tally()
+        completed = False
+        try:
+            self._tally(tally, self._drain(queues[4], stages, stop, deadline), deadline)
+            completed = tally.error is None and not source.limit_exceeded
+        except PipelineCancelled as exc:
+            tally.error = _deadline_error(exc.reason)
+        finally:
+            stop.set()
+            # Past the deadline, do not wait for calls still in flight.
+            release = deadline.expired()
+            for stage in stages:
+                stage.join(timeout=2 * POLL_SECONDS if release else None)
+            for pool in pools:
+                pool.shutdown(wait=not release)
+            if checkpoint is not None:
+                checkpoint.finish(completed, keep=settings.checkpoint_keep_completed)
+        metrics = [stage.metric() for stage in stages]
+        tally.resumed = stages[4].cache_hits
+
+        if source.limit_exceeded:
+            tally.error = "Chunk limit exceeded"
+        if tally.error is not None:
+            progress = PipelineProgress(
+                extracted=source.produced,
+                classified=stages[1].emitted,
+                fused=stages[2].emitted,
+                governed=tally.governed,
+                stopped_in=next(
+                    (stage.stage_name for stage in stages[:3] if not stage.completed), "govern"
+                ),
+            )
+            return self._failed_result(
+                context=context, metrics=metrics, diagnostics=self._diagnostics(tally, tally.error),
+                progress=progress, tally=tally,
+            )
+        return self._processed_result(context, source.emitted, tally, metrics)
 
-        for chunk in fused_chunks:
-            governed = self.policy.evaluate_chunk(chunk, trace_id=context.trace_id)
-            redacted = self.redaction.redact(governed)
+    @staticmethod
+    def _drain(
+        outbox: "queue.Queue",
+        stages: List[StageThread],
+        stop: threading.Event,
+        deadline: PipelineDeadline,
+    ) -> Iterator[GovernedChunk]:
+        while True:
+            try:
+                item = outbox.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                deadline.check("govern")
+                if stop.is_set():
+                    break
+                continue
+            if item is END:
+                break
+            yield item
+        # A port error ends the stream early; surface it as sequential runs do.
+        for stage in stages:
+            if stage.error is not None:
+                raise stage.error
+        deadline.check("govern")
 
+    def _tally(self, tally: "_Tally", redacted_chunks: Iterable[GovernedChunk], deadline: PipelineDeadline) -> None:
+        for redacted in redacted_chunks:
+            tally.governed += 1
             if redacted.decision.action != "Allow" or redacted.decision.risk_score > 0:
-                policy_decisions += 1
+                tally.policy_decisions += 1
 
             if redacted.detected_entities:
-                total_pii += len(redacted.detected_entities)
-                if redacted_preview is None:
-                    redacted_preview = redacted.redacted_text[:300]
+                tally.total_pii += len(redacted.detected_entities)
+                if tally.redacted_preview is None:
+                    tally.redacted_preview = redacted.redacted_text[:300]
 
             if redacted.decision.action in {"Block", "Quarantine", "Escalate", "Redact"}:
-                final_action = redacted.decision.action
+                tally.final_action = redacted.decision.action
 
             if len(redacted.detected_entities) > self.settings.max_entities_per_chunk:
-                return self._failed_result(
-                    context=context,
-                    metrics=metrics,
-                    diagnostics={"error": "Entity limit exceeded"},
-                )
+                tally.error = "Entity limit exceeded"
+                break
 
-            if monotonic() - pipeline_start > self.settings.max_processing_seconds:
-                return self._failed_result(
-                    context=context,
-                    metrics=metrics,
-                    diagnostics={"error": "Processing timeout exceeded"},
-                )
+            if deadline.expired():
+                tally.error = _deadline_error(deadline.reason)
+                break
 
+    def _processed_result(
+        self,
+        context: PipelineContext,
+        chunks_count: int,
+        tally: "_Tally",
+        metrics: List[OrchestrationStepMetric],
+    ) -> PipelineOutput:
         return PipelineOutput(
             trace_id=context.trace_id,
             filename=context.filename,
             status="processed",
-            chunks_count=len(chunks),
-            pii_detected_count=total_pii,
-            policy_decisions_count=policy_decisions,
-            final_action=final_action,
-            redacted_text_preview=redacted_preview,
+            chunks_count=chunks_count,
+            pii_detected_count=tally.total_pii,
+            policy_decisions_count=tally.policy_decisions,
+            final_action=tally.final_action,
+            redacted_text_preview=tally.redacted_preview,
             step_metrics=metrics,
-            diagnostics={},
+            diagnostics=self._diagnostics(tally),
         )
 
-    def _timed_extract(self, file_path: str, metrics: List[OrchestrationStepMetric]):
+    def _timed_extract(self, file_path: str, metrics: List[OrchestrationStepMetric], port_context: dict):
         start = monotonic()
-        chunks = self.extractor.process(file_path)
-        metrics.append(
-            OrchestrationStepMetric(
-                name="extract",
-                elapsed_ms=int((monotonic() - start) * 1000),
+        try:
+            return self.extractor.process(file_path, port_context)
+        finally:
+            metrics.append(
+                OrchestrationStepMetric(
+                    name="extract",
+                    elapsed_ms=int((monotonic() - start) * 1000),
+                )
             )
-        )
-        return chunks
 
-    def _timed_classify(self, chunks, metrics: List[OrchestrationStepMetric]) -> List[ClassifiedChunk]:
+    def _timed_classify(
+        self,
+        chunks,
+        metrics: List[OrchestrationStepMetric],
+        port_context: dict,
+        progress: PipelineProgress,
+        checkpoint: Optional[DocumentCheckpoint] = None,
+    ) -> List[ClassifiedChunk]:
         start = monotonic()
+        deadline = port_context["deadline"]
         classified = []
-        for chunk in chunks:
-            classified.append(self.classifier.process(chunk))
-        metrics.append(
-            OrchestrationStepMetric(
-                name="classify",
-                elapsed_ms=int((monotonic() - start) * 1000),
+        try:
+            for index, chunk in enumerate(chunks):
+                result = checkpoint.classified.get(index) if checkpoint is not None else None
+                if result is None:
+                    deadline.check("classify")
+                    result = self.classifier.process(chunk, port_context)
+                    if checkpoint is not None:
+                        checkpoint.record_classified(index, result)
+                classified.append(result)
+                progress.classified += 1
+        finally:
+            metrics.append(
+                OrchestrationStepMetric(
+                    name="classify",
+                    elapsed_ms=int((monotonic() - start) * 1000),
+                )
             )
-        )
         return classified
 
-    def _timed_fuse(self, classified_chunks: List[ClassifiedChunk], metrics: List[OrchestrationStepMetric]):
+    def _timed_fuse(
+        self,
+        classified_chunks: List[ClassifiedChunk],
+        metrics: List[OrchestrationStepMetric],
+        deadline: PipelineDeadline,
+        progress: PipelineProgress,
+    ):
         start = monotonic()
-        intra = [self.fusion.fuse_chunk(chunk) for chunk in classified_chunks]
-        fused = self.fusion.fuse_cross_chunks(intra)
-        metrics.append(
-            OrchestrationStepMetric(
-                name="fuse",
-                elapsed_ms=int((monotonic() - start) * 1000),
+        try:
+            intra = []
+            for chunk in classified_chunks:
+                deadline.check("fuse")
+                intra.append(self.fusion.fuse_chunk(chunk))
+            fused = self.fusion.fuse_cross_chunks(intra)
+            progress.fused = len(fused)
+        finally:
+            metrics.append(
+                OrchestrationStepMetric(
+                    name="fuse",
+                    elapsed_ms=int((monotonic() - start) * 1000),
+                )
             )
-        )
         return fused
 
     def _failed_result(
@@ -136,16 +376,24 @@ class V2PipelineOrchestrator:
         context: PipelineContext,
         metrics: List[OrchestrationStepMetric],
         diagnostics: dict,
+        progress: Optional[PipelineProgress] = None,
+        tally: Optional["_Tally"] = None,
     ) -> PipelineOutput:
+        # Counts cover the chunks processed before the run stopped.
         return PipelineOutput(
             trace_id=context.trace_id,
             filename=context.filename,
             status="failed",
-            chunks_count=0,
-            pii_detected_count=0,
-            policy_decisions_count=0,
+            chunks_count=progress.extracted if progress is not None else 0,
+            pii_detected_count=tally.total_pii if tally is not None else 0,
+            policy_decisions_count=tally.policy_decisions if tally is not None else 0,
             final_action="Quarantine" if self.settings.fail_closed else "Allow",
             redacted_text_preview=None,
             step_metrics=metrics,
             diagnostics=diagnostics,
+            progress=progress,
         )
+
+
+def _deadline_error(reason: str) -> str:
+    return "Processing timeout exceeded" if reason == "timeout" else f"Processing cancelled: {reason}"
@@ -1,5 +1,13 @@
 from typing import List, Protocol
 from schemas.core_models import ClassifiedChunk, GovernedChunk, SemanticChunk
+from schemas.internal import Chunk
+
+# The orchestrator passes ``context={"trace_id": ..., "deadline": PipelineDeadline}``
+# to the extractor and classifier; they should call ``deadline.check(stage)``
+# between pages and chunks.
+#
+# The built-in agents hand chunks on as schemas.internal.Chunk, which has the
+# attributes of every pydantic chunk model; ports accept and may return either.
 
 
 class ExtractorPort(Protocol):
@@ -8,23 +16,23 @@ class ExtractorPort(Protocol):
 
 
 class ClassifierPort(Protocol):
-    def process(self, chunk: SemanticChunk, context: dict | None = None) -> ClassifiedChunk:
+    def process(self, chunk: SemanticChunk | Chunk, context: dict | None = None) -> ClassifiedChunk | Chunk:
         ...
 
 
 class FusionPort(Protocol):
-    def fuse_chunk(self, chunk: ClassifiedChunk) -> ClassifiedChunk:
+    def fuse_chunk(self, chunk: ClassifiedChunk | Chunk) -> ClassifiedChunk | Chunk:
         ...
 
-    def fuse_cross_chunks(self, chunks: List[ClassifiedChunk]) -> List[ClassifiedChunk]:
+    def fuse_cross_chunks(self, chunks: List[ClassifiedChunk | Chunk]) -> List[ClassifiedChunk | Chunk]:
         ...
 
 
 class PolicyPort(Protocol):
-    def evaluate_chunk(self, chunk: ClassifiedChunk, trace_id: str = "unknown") -> GovernedChunk:
+    def evaluate_chunk(self, chunk: ClassifiedChunk | Chunk, trace_id: str = "unknown") -> GovernedChunk | Chunk:
         ...
 
 
 class RedactionPort(Protocol):
-    def redact(self, chunk: GovernedChunk) -> GovernedChunk:
+    def redact(self, chunk: GovernedChunk | Chunk) -> GovernedChunk | Chunk:
         ...
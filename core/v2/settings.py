@@ -1,6 +1,15 @@
+from typing import Literal, Optional
+
 from pydantic import BaseModel, Field
 
 
+class StagePoolSettings(BaseModel):
+    """Executor for one port in pipelined execution."""
+
+    kind: Literal["thread", "process"] = Field(default="thread")
+    workers: int = Field(default=1, ge=1)
+
+
 class V2RuntimeSettings(BaseModel):
     """Runtime safety controls for the v2 orchestrator."""
 
@@ -10,3 +19,17 @@ class V2RuntimeSettings(BaseModel):
     max_entities_per_chunk: int = Field(default=500, ge=1)
     max_processing_seconds: int = Field(default=300, ge=1)
     redact_by_default_when_pii_present: bool = Field(default=True)
+    # "pipelined" runs each port on its own pool, joined by bounded queues.
+    execution_mode: Literal["sequential", "pipelined"] = Field(default="sequential")
+    stage_queue_size: int = Field(default=32, ge=1)
+    classify_pool: StagePoolSettings = Field(default_factory=StagePoolSettings)
+    fuse_pool: StagePoolSettings = Field(default_factory=StagePoolSettings)
+    policy_pool: StagePoolSettings = Field(default_factory=StagePoolSettings)
+    redaction_pool: StagePoolSettings = Field(default_factory=StagePoolSettings)
+    # Per-chunk checkpoints (core.v2.checkpoint): a SQLite file shared by
+    # re-runs and workers; None disables them.
+    checkpoint_path: Optional[str] = Field(default=None)
+    # Secret for encrypting checkpointed results; checkpoints stay off without it.
+    checkpoint_key: Optional[str] = Field(default=None, repr=False)
+    checkpoint_batch_size: int = Field(default=32, ge=1)
+    checkpoint_keep_completed: bool = Field(default=False)
@@ -0,0 +1,309 @@
+"""Pipelined execution primitives for the v2 orchestrator.
+
+Each port runs on its own executor (a thread or a process pool) and stages
+are joined by bounded queues, so a large document's chunks flow through
+classification, fusion, policy and redaction concurrently.  Every stage
+emits its results in input order, so the output matches sequential
+execution chunk for chunk.
+
+Stages stop at the next poll once the run's ``PipelineDeadline`` expires or
+is cancelled, without waiting for calls still in flight; the ports check the
+same deadline cooperatively.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from time import monotonic
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from agents.budgets import PipelineDeadline
+
+from .models import OrchestrationStepMetric
+from .settings import StagePoolSettings
+
+# Marks the end of a stage's output.
+END = object()
+# Returned by an idle poll, so finished calls are emitted while input is slow.
+_IDLE = object()
+
+# How often a blocked stage re-checks the stop flag and the deadline.
+POLL_SECONDS = 0.05
+
+# Ports installed in a process-pool worker, by stage name.
+_worker_ports: Dict[str, Any] = {}
+
+
+def _install_port(stage: str, port: Any) -> None:
+    _worker_ports[stage] = port
+
+
+def _call_port(stage: str, method: str, item: Any, kwargs: Dict[str, Any]) -> Any:
+    return getattr(_worker_ports[stage], method)(item, **kwargs)
+
+
+class StagePool:
+    """The executor running one port's calls.
+
+    Process workers receive the port once, at start-up, rather than with
+    every call; the port and the chunks must then be picklable.
+    """
+
+    def __init__(self, stage: str, port: Any, method: str, settings: StagePoolSettings, **kwargs: Any):
+        self.stage = stage
+        self.workers = settings.workers
+        self._kwargs = kwargs
+        if settings.kind == "process":
+            self._executor: Executor = ProcessPoolExecutor(
+                max_workers=settings.workers, initializer=_install_port, initargs=(stage, port)
+            )
+            self._method = method
+            self._call = None
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=settings.workers, thread_name_prefix=f"v2-{stage}")
+            self._call = getattr(port, method)
+
+    def submit(self, item: Any) -> Future:
+        if self._call is not None:
+            return self._executor.submit(self._call, item, **self._kwargs)
+        return self._executor.submit(_call_port, self.stage, self._method, item, self._kwargs)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Drop queued calls; with *wait* False, calls in flight finish in the background."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class _Stopped(Exception):
+    """The run stopped while a stage was waiting on a call."""
+
+
+class StageThread(threading.Thread):
+    """Common queue handling: stop-aware, with wait accounting.
+
+    *stop* ends the run (set on a port error, a limit or normal completion);
+    an expired *deadline* ends it too.
+    """
+
+    def __init__(self, name: str, outbox: "queue.Queue[Any]", stop: threading.Event, deadline: PipelineDeadline):
+        super().__init__(name=f"v2-{name}-stage", daemon=True)
+        self.stage_name = name
+        self.outbox = outbox
+        self.stop = stop
+        self.deadline = deadline
+        self.error: Optional[BaseException] = None
+        # Items passed downstream, and whether the whole input was.
+        self.emitted = 0
+        self.completed = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.blocked_seconds = 0.0
+        self.queue_wait_seconds = 0.0
+
+    def stopped(self) -> bool:
+        return self.stop.is_set() or self.deadline.expired()
+
+    def _put(self, item: Any) -> bool:
+        """Queue *item* downstream; False if the run stopped first."""
+        start = monotonic()
+        try:
+            while not self.stopped():
+                try:
+                    self.outbox.put(item, timeout=POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            self.blocked_seconds += monotonic() - start
+
+    def _fail(self, exc: BaseException) -> None:
+        self.error = exc
+        self.stop.set()
+
+    def metric(self) -> OrchestrationStepMetric:
+        started = self.started_at if self.started_at is not None else monotonic()
+        finished = self.finished_at if self.finished_at is not None else monotonic()
+        return OrchestrationStepMetric(
+            name=self.stage_name,
+            elapsed_ms=int((finished - started) * 1000),
+            queue_wait_ms=int(self.queue_wait_seconds * 1000),
+            blocked_ms=int(self.blocked_seconds * 1000),
+        )
+
+
+class SourceStage(StageThread):
+    """Runs the extractor and streams its chunks downstream.
+
+    An extractor returning a list is checked against *max_chunks* before
+    anything is emitted; one returning an iterator is checked as it streams.
+    """
+
+    def __init__(self, name: str, produce: Callable[[], Iterable[Any]], outbox: "queue.Queue[Any]",
+                 stop: threading.Event, deadline: PipelineDeadline, max_chunks: int):
+        super().__init__(name, outbox, stop, deadline)
+        self.produce = produce
+        self.max_chunks = max_chunks
+        # Chunks the extractor has returned (a list) or yielded so far.
+        self.produced = 0
+        self.limit_exceeded = False
+
+    def run(self) -> None:
+        self.started_at = monotonic()
+        try:
+            chunks = self.produce()
+            if isinstance(chunks, list):
+                # Extraction is done; what remains is handing the chunks on.
+                self.produced = len(chunks)
+                self.completed = True
+                if len(chunks) > self.max_chunks:
+                    self.limit_exceeded = True
+                    self.stop.set()
+                    return
+            for chunk in chunks:
+                if self.emitted >= self.max_chunks:
+                    self.limit_exceeded = True
+                    self.stop.set()
+                    return
+                if not self._put(chunk):
+                    return
+                self.emitted += 1
+                self.produced = max(self.produced, self.emitted)
+            self.completed = True
+        except BaseException as exc:
+            self._fail(exc)
+        finally:
+            self.finished_at = monotonic()
+            self._put(END)
+
+
+class PoolStage(StageThread):
+    """Feeds its inbox to a :class:`StagePool` and emits the results in order.
+
+    At most ``2 * workers`` calls are in flight, so a stalled consumer holds
+    back this stage instead of buffering the document.  *after* maps each
+    ordered result to the items emitted for it and *finish* emits any held
+    back at the end (used by cross-chunk fusion, which needs a lookahead).
+    *cached* returns a checkpointed result for an input index (the call is
+    then skipped) and *record* receives every result that was computed.
+    """
+
+    def __init__(self, name: str, pool: StagePool, inbox: "queue.Queue[Any]", outbox: "queue.Queue[Any]",
+                 stop: threading.Event, deadline: PipelineDeadline,
+                 after: Optional[Callable[[Any], Iterable[Any]]] = None,
+                 finish: Optional[Callable[[], Iterable[Any]]] = None,
+                 cached: Optional[Callable[[int], Any]] = None,
+                 record: Optional[Callable[[int, Any], None]] = None):
+        super().__init__(name, outbox, stop, deadline)
+        self.pool = pool
+        self.inbox = inbox
+        self.window = 2 * pool.workers
+        self.after = after
+        self.finish = finish
+        self.cached = cached
+        self.record = record
+        self.received = 0
+        self.cache_hits = 0
+
+    def _submit(self, item: Any) -> Tuple[int, Future, bool]:
+        index = self.received
+        self.received += 1
+        hit = self.cached(index) if self.cached is not None else None
+        if hit is None:
+            return index, self.pool.submit(item), True
+        self.cache_hits += 1
+        future: Future = Future()
+        future.set_result(hit)
+        return index, future, False
+
+    def _complete(self, entry: Tuple[int, Future, bool]) -> Any:
+        index, future, computed = entry
+        result = self._result(future)
+        if computed and self.record is not None:
+            self.record(index, result)
+        return result
+
+    def _get(self, pending: "Deque[Tuple[int, Future, bool]]") -> Any:
+        start = monotonic()
+        try:
+            while True:
+                try:
+                    return self.inbox.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    if self.stopped():
+                        return END
+                    if pending and pending[0][1].done():
+                        return _IDLE
+        finally:
+            self.queue_wait_seconds += monotonic() - start
+
+    def _result(self, future: Future) -> Any:
+        while True:
+            try:
+                return future.result(timeout=POLL_SECONDS)
+            except FutureTimeout:
+                if self.stopped():
+                    raise _Stopped()
+
+    def _emit(self, items: Iterable[Any]) -> None:
+        for item in items:
+            if not self._put(item):
+                raise _Stopped()
+            self.emitted += 1
+
+    def run(self) -> None:
+        self.started_at = monotonic()
+        pending: Deque[Tuple[int, Future, bool]] = deque()
+        after = self.after if self.after is not None else (lambda result: (result,))
+        try:
+            while not self.stopped():
+                item = self._get(pending)
+                if item is END:
+                    break
+                if item is not _IDLE:
+                    pending.append(self._submit(item))
+                while pending and (len(pending) >= self.window or pending[0][1].done()):
+                    self._emit(after(self._complete(pending.popleft())))
+            while pending and not self.stopped():
+                self._emit(after(self._complete(pending.popleft())))
+            if not self.stopped():
+                if self.finish is not None:
+                    self._emit(self.finish())
+                self.completed = True
+        except _Stopped:
+            pass
+        except BaseException as exc:
+            self._fail(exc)
+        finally:
+            for _, future, _ in pending:
+                future.cancel()
+            self.finished_at = monotonic()
+            self._put(END)
+
+
+class CrossChunkFusion:
+    """Streams ``fuse_cross_chunks`` over adjacent pairs of ordered chunks.
+
+    A chunk is released once it has been linked with its successor.  This is
+    equivalent to one call over the whole document for a fusion port that
+    only links neighbouring chunks, in order (as ``FusionAgent`` does).
+    """
+
+    def __init__(self, fusion: Any):
+        self.fusion = fusion
+        self._previous: Optional[Any] = None
+
+    def __call__(self, chunk: Any) -> List[Any]:
+        if self._previous is None:
+            self._previous = chunk
+            return []
+        previous, self._previous = self.fusion.fuse_cross_chunks([self._previous, chunk])
+        return [previous]
+
+    def finish(self) -> List[Any]:
+        if self._previous is None:
+            return []
+        return self.fusion.fuse_cross_chunks([self._previous])
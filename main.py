@@ -8,24 +8,34 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 import asyncio
 import collections
+import hashlib
 import os
 import time
 import threading
 import uuid
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 import requests
 
-from prometheus_client import make_asgi_app, Counter
+from prometheus_client import make_asgi_app, Counter, REGISTRY
 
 # Core Agents
 from agents.audit import AuditAgent
+from agents.budgets import InputTooLarge
+from agents.email_redactor import EmlRedactionWriter
+from agents.entity_registry import EntityRegistry
 from agents.extractor import ExtractorAgent
 from agents.classifier import ClassifierAgent
 from agents.fusion_agent import FusionAgent
+from agents.office_redactor import OOXML_WRITERS
+from agents.pdf_redactor import PdfRedactionWriter, page_spans
 from agents.policy_agent import PolicyAgent
 from agents.redaction_agent import RedactionAgent
+from agents.redaction_kernel import MASKERS, chunk_spans, get_masker, page_entity_spans
+from agents.rule_testing import RuleProfiler
+from agents.token_vault import TokenVaultError, default_vault
 from config.settings import settings
-from schemas.core_models import DetectedPII
+from schemas.core_models import GovernedChunk
+from schemas.internal import Chunk
 
 # Initialize Agents
 audit_agent = AuditAgent()
@@ -35,6 +45,10 @@ fusion_agent = FusionAgent()
 policy_agent = PolicyAgent()
 redaction_agent = RedactionAgent()
 
+if settings.POLICY_PROFILING:
+    policy_agent.profiler = RuleProfiler()
+    REGISTRY.register(policy_agent.profiler)
+
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.VERSION,
@@ -123,7 +137,7 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_methods=["GET", "POST"],
-    allow_headers=["Content-Type", "X-API-Key"],
+    allow_headers=["Content-Type", "X-API-Key", "X-Tenant-ID"],
 )
 
 # ---------------------------------------------------------------------------
@@ -131,22 +145,59 @@ app.add_middleware(
 # ---------------------------------------------------------------------------
 
 _api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+_tenant_header = APIKeyHeader(name="X-Tenant-ID", auto_error=False)
 
 
 def _require_api_key(api_key: Optional[str] = Security(_api_key_header)) -> None:
     """FastAPI dependency that enforces the API key when one is configured.
 
-    When ``settings.API_KEY`` is None or empty the dependency is a no-op,
-    allowing unauthenticated access in development.  In production, set
-    ``API_KEY`` in the environment and every /analyze/* and /audit/* request
-    must include the ``X-API-Key`` header.
+    When neither ``settings.API_KEY`` nor ``settings.TENANT_API_KEYS`` is
+    set the dependency is a no-op, allowing unauthenticated access in
+    development.  In production, set ``API_KEY`` in the environment and
+    every /analyze/* and /detokenize request must include the ``X-API-Key``
+    header; tenant keys from ``TENANT_API_KEYS`` are accepted as well.
     """
-    if settings.API_KEY and api_key != settings.API_KEY:
-        raise HTTPException(
-            status_code=401,
-            detail="Invalid or missing API key. Set the X-API-Key request header.",
-            headers={"WWW-Authenticate": "ApiKey"},
-        )
+    if not settings.API_KEY and not settings.TENANT_API_KEYS:
+        return
+    if api_key is None or (api_key != settings.API_KEY and api_key not in settings.TENANT_API_KEYS):
+        raise _invalid_api_key()
+
+
+def _require_master_key(api_key: Optional[str] = Security(_api_key_header)) -> None:
+    """FastAPI dependency for the /policy/* and /audit/* admin endpoints.
+
+    Like :func:`_require_api_key`, but only the master ``API_KEY`` is
+    accepted: tenant keys cannot reload or profile the shared rules or run
+    chain verification.  With tenant keys but no ``API_KEY`` configured,
+    these endpoints are closed.
+    """
+    if not settings.API_KEY and not settings.TENANT_API_KEYS:
+        return
+    if not settings.API_KEY or api_key != settings.API_KEY:
+        raise _invalid_api_key()
+
+
+def _invalid_api_key() -> HTTPException:
+    return HTTPException(
+        status_code=401,
+        detail="Invalid or missing API key. Set the X-API-Key request header.",
+        headers={"WWW-Authenticate": "ApiKey"},
+    )
+
+
+def _resolve_tenant(
+    api_key: Optional[str] = Security(_api_key_header),
+    tenant_header: Optional[str] = Security(_tenant_header),
+) -> Optional[str]:
+    """Tenant whose policy overlay applies to this request.
+
+    A tenant API key always selects its own tenant.  Otherwise the
+    ``X-Tenant-ID`` header is honoured; tenant-key callers cannot use it to
+    switch tenants.  None means the shared base policy.
+    """
+    if api_key is not None and api_key in settings.TENANT_API_KEYS:
+        return settings.TENANT_API_KEYS[api_key]
+    return (tenant_header or "").strip() or None
 
 
 # --- Prometheus Metrics ---
@@ -162,6 +213,7 @@ class PIISummary(BaseModel):
     text_preview: str
     score: float
     location_str: str
+    occurrences: int = 1
 
 class PolicyTrace(BaseModel):
     chunk_id: str
@@ -185,6 +237,9 @@ class PipelineStep(BaseModel):
     items_out: Optional[int] = None
 
 
+class DetokenizeRequest(BaseModel):
+    tokens: List[str]
+
 class RedactionOptionsApplied(BaseModel):
     mode: str
     mask_style: str
@@ -203,6 +258,8 @@ class AnalysisResult(BaseModel):
     pipeline_steps: List[PipelineStep] = []
     redaction_options: Optional[RedactionOptionsApplied] = None
     redacted_document_text: Optional[str] = None
+    # GET path of the format-preserving redacted copy, when one was requested and written.
+    redacted_file_url: Optional[str] = None
     trace_id: str
 
 # --- Endpoints ---
@@ -290,6 +347,8 @@ async def analyze_file_upload(
     mask_style: str = Form("entity"),
     findings_limit: int = Form(100),
     show_only_redacted: bool = Form(False),
+    redacted_file: bool = Form(False),
+    tenant_id: Optional[str] = Depends(_resolve_tenant),
 ):
     """
     Real-time Upload & Analysis.
@@ -300,18 +359,18 @@ async def analyze_file_upload(
     mask_style = (mask_style or "entity").strip().lower()
     if redact_mode not in {"policy", "selected_types"}:
         raise HTTPException(status_code=400, detail="Invalid redact_mode. Use 'policy' or 'selected_types'.")
-    if mask_style not in {"entity", "fixed", "block"}:
-        raise HTTPException(status_code=400, detail="Invalid mask_style. Use 'entity', 'fixed', or 'block'.")
+    if mask_style not in MASKERS:
+        raise HTTPException(status_code=400, detail=f"Invalid mask_style. Use one of {sorted(MASKERS)}.")
     findings_limit = max(1, min(findings_limit, 500))
     selected_types = _parse_selected_types(redact_types)
 
-    audit_agent.log_event("UPLOAD_RECEIVED", {
+    audit_agent.record("UPLOAD_RECEIVED", {
         "filename": file.filename,
-        "trace_id": trace_id,
         "redact_mode": redact_mode,
         "mask_style": mask_style,
         "selected_types": selected_types,
-    })
+        "tenant_id": tenant_id,
+    }, trace_id=trace_id)
 
     # --- Input validation ---
     # 1. MIME-type whitelist
@@ -366,16 +425,18 @@ async def analyze_file_upload(
             mask_style,
             findings_limit,
             show_only_redacted,
+            tenant_id,
+            redacted_file,
         )
 
     except HTTPException:
         raise
     except Exception as e:
-        audit_agent.log_event("UPLOAD_FAILED", {"error": str(e)})
+        audit_agent.record("UPLOAD_FAILED", {"error": str(e)}, trace_id=trace_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/analyze/path", response_model=AnalysisResult, dependencies=[Depends(_require_api_key)])
-async def analyze_local_path(file_path: str):
+async def analyze_local_path(file_path: str, tenant_id: Optional[str] = Depends(_resolve_tenant)):
     """
     Analyze a file already on the server/local disk.
     Only permitted when ALLOWED_PATH_PREFIXES is configured and the requested
@@ -403,18 +464,40 @@ async def analyze_local_path(file_path: str):
         raise HTTPException(status_code=404, detail="File not found")
 
     trace_id = str(uuid.uuid4())
-    return await asyncio.to_thread(_run_pipeline, resolved, os.path.basename(resolved), trace_id)
+    return await asyncio.to_thread(
+        _run_pipeline, resolved, os.path.basename(resolved), trace_id, tenant_id=tenant_id
+    )
+
+@app.get("/analyze/redacted/{trace_id}", dependencies=[Depends(_require_api_key)])
+def download_redacted_file(trace_id: str, tenant_id: Optional[str] = Depends(_resolve_tenant)):
+    """Download the format-preserving redacted copy written for *trace_id*.
 
-@app.get("/audit/verify", dependencies=[Depends(_require_api_key)])
-def audit_verify():
+    Only the tenant the copy was written for can download it, until
+    ``REDACTED_FILE_RETENTION_SECONDS`` have passed.
+    """
+    path = _find_redacted_file(trace_id, tenant_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="No redacted file for this trace_id")
+    return FileResponse(path, filename=os.path.basename(path).split("_", 1)[-1])
+
+@app.get("/audit/verify", dependencies=[Depends(_require_master_key)])
+def audit_verify(mode: str = "full"):
     """Verify the integrity of the tamper-evident audit log hash chain.
 
     Walks every entry in the audit log, recomputes each SHA-256 hash, and
     confirms that the ``prev_hash`` field in each entry correctly links to the
     hash of the preceding entry.  Returns the verification result without
     exposing any audit log content.
+
+    ``mode`` is ``full`` (default: sequential walk from genesis),
+    ``parallel`` (re-hash every checkpoint window across worker processes) or
+    ``incremental`` (only the windows sealed since the last incremental pass,
+    so earlier entries are not re-checked).
     """
-    result = audit_agent.verify_chain()
+    try:
+        result = audit_agent.verify_chain(mode=mode)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     if not result["valid"]:
         # Return 409 Conflict to signal chain corruption — callers should
         # treat this as a security incident requiring investigation.
@@ -424,6 +507,105 @@ def audit_verify():
         )
     return result
 
+@app.get("/audit/proof/{index}", dependencies=[Depends(_require_master_key)])
+def audit_inclusion_proof(index: int):
+    """Return a Merkle inclusion proof for the audit entry at 0-based ``index``.
+
+    The proof links the entry hash to its checkpoint's Merkle root and that
+    root to the root over all checkpoints, in O(log n) hashes.  Entries not
+    yet sealed by a checkpoint return 404.
+    """
+    try:
+        proof = audit_agent.inclusion_proof(index)
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    if proof is None:
+        raise HTTPException(status_code=404, detail="Entry is not covered by a checkpoint yet.")
+    return proof
+
+@app.get("/audit/trace/{trace_id}", dependencies=[Depends(_require_api_key)])
+def audit_trace(
+    trace_id: str,
+    tenant_id: Optional[str] = Depends(_resolve_tenant),
+    api_key: Optional[str] = Security(_api_key_header),
+):
+    """Return every audit entry recorded for ``trace_id``, in chain order.
+
+    Entries are located through the on-disk trace index and read with one
+    seek each, so the lookup cost does not grow with the size of the log.
+    A tenant key only sees traces recorded for its own tenant; other
+    traces answer 404 as if they did not exist.
+    """
+    events = audit_agent.trace(trace_id)
+    if api_key is not None and api_key in settings.TENANT_API_KEYS and _trace_tenant(events) != tenant_id:
+        events = []
+    if not events:
+        raise HTTPException(status_code=404, detail="No audit events recorded for this trace_id.")
+    return {"trace_id": trace_id, "events": events}
+
+def _trace_tenant(events: List[Dict[str, Any]]) -> Optional[str]:
+    """The tenant a trace was recorded for (the first event naming one)."""
+    for entry in events:
+        data = entry.get("payload", {}).get("event", {}).get("data") or {}
+        if data.get("tenant_id"):
+            return data["tenant_id"]
+    return None
+
+@app.post("/detokenize", dependencies=[Depends(_require_api_key)])
+def detokenize(request: DetokenizeRequest, tenant_id: Optional[str] = Depends(_resolve_tenant)):
+    """Resolve ``mask_style=token`` tokens back to the original values.
+
+    Tokens may be sent as issued (``[US_SSN:<id>]``) or as bare ids; unknown
+    tokens map to ``null``.  Unlike other endpoints this one is never open:
+    it is refused unless an API key is configured.  A tenant key resolves
+    only the tokens issued under that tenant; the master key only those
+    issued without one.  Each call is audited
+    with its token count, never the values.
+    """
+    if not settings.API_KEY and not settings.TENANT_API_KEYS:
+        raise HTTPException(status_code=403, detail="Detokenization requires API_KEY to be configured.")
+    if len(request.tokens) > settings.DETOKENIZE_MAX_TOKENS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.DETOKENIZE_MAX_TOKENS} tokens per request."
+        )
+    trace_id = str(uuid.uuid4())
+    try:
+        values = default_vault().detokenize(request.tokens, tenant_id)
+    except TokenVaultError as exc:
+        audit_agent.record("DETOKENIZE_FAILED", {"error": str(exc), "tenant_id": tenant_id}, trace_id=trace_id)
+        raise HTTPException(status_code=500, detail=str(exc))
+    audit_agent.record("DETOKENIZE", {
+        "requested": len(request.tokens),
+        "resolved": sum(1 for entry in values.values() if entry is not None),
+        "tenant_id": tenant_id,
+    }, trace_id=trace_id)
+    return {"trace_id": trace_id, "values": values}
+
+@app.post("/policy/reload", dependencies=[Depends(_require_master_key)])
+def policy_reload():
+    """Re-read the NSRL rules now instead of waiting for the watcher.
+
+    The new rule set is validated and compiled before being swapped in; an
+    invalid policy is rejected and the active version keeps serving.
+    """
+    swapped = policy_agent.reload_rules(force=True)
+    return {"reloaded": swapped, "rule_set_version": policy_agent.rule_set_version}
+
+@app.get("/policy/profile", dependencies=[Depends(_require_master_key)])
+def policy_profile():
+    """Per-rule evaluation counts, match rates and cumulative time.
+
+    Available when POLICY_PROFILING is enabled; active rules that were never
+    evaluated are listed with zero counts.
+    """
+    if policy_agent.profiler is None:
+        raise HTTPException(status_code=404, detail="Rule profiling is disabled (set POLICY_PROFILING=true).")
+    rule_ids = [rule.id for rule in policy_agent.rules]
+    return {
+        "rule_set_version": policy_agent.rule_set_version,
+        "rules": policy_agent.profiler.report(rule_ids),
+    }
+
 def _parse_selected_types(redact_types: str) -> List[str]:
     """Normalize comma-separated entity type list into unique uppercase values."""
     if not redact_types:
@@ -438,38 +620,130 @@ def _parse_selected_types(redact_types: str) -> List[str]:
     return normalized
 
 
-def _build_mask(entity_type: str, span_len: int, mask_style: str) -> str:
-    if mask_style == "fixed":
-        return "[REDACTED]"
-    if mask_style == "block":
-        return "#" * max(4, span_len)
-    return f"[{entity_type}]"
+def _build_mask(
+    entity_type: str,
+    span_len: int,
+    mask_style: str,
+    span: Optional[str] = None,
+    tenant_id: Optional[str] = None,
+) -> str:
+    # Without the span text, maskers that need it see a placeholder of the
+    # same length; pseudonyms need the real value to match the redacted text.
+    return get_masker(mask_style, tenant_id)(entity_type, span if span is not None else "#" * span_len)
 
 
-def _redact_text_with_controls(
-    text: str,
-    entities: List[DetectedPII],
+def _apply_redaction_controls(
+    chunk: Chunk,
     mask_style: str,
     allowed_types: Optional[set[str]],
-) -> tuple[str, set[str]]:
-    """Redact text with optional per-entity type allowlist and mask style."""
-    if not entities:
-        return text, set()
-
-    chars = list(text)
-    redacted_types: set[str] = set()
-    for entity in sorted(entities, key=lambda item: item.start_index, reverse=True):
-        if allowed_types is not None and entity.entity_type not in allowed_types:
-            continue
-        start = entity.start_index
-        end = entity.end_index
-        if start < 0 or end > len(text) or start >= end:
+    tenant_id: Optional[str] = None,
+) -> set[str]:
+    """Record the chunk's spans under an optional entity type allowlist and mask style.
+
+    Returns the entity types that will be masked; the text itself is produced
+    when the document is assembled.  A chunk whose classification was cut
+    short is masked whole, so every entity found in it counts.
+    """
+    spans = chunk_spans(chunk, chunk.text_length, allowed_types)
+    chunk.set_redaction(spans, get_masker(mask_style, tenant_id))
+    if chunk.classification_degraded:
+        return {entity.entity_type for entity in chunk.detected_entities}
+    return {entity_type for _, _, entity_type in spans}
+
+
+def _write_redacted_pdf(source_path, output_path, chunks, redacted_types, mask_style, tenant_id):
+    # Glyphs are removed and boxed, so the mask style does not apply.
+    return PdfRedactionWriter().redact(source_path, output_path, page_spans(chunks, redacted_types))
+
+
+def _span_writer(writer_cls):
+    def write(source_path, output_path, chunks, redacted_types, mask_style, tenant_id):
+        writer = writer_cls(masker=get_masker(mask_style, tenant_id))
+        return writer.redact(source_path, output_path, page_entity_spans(chunks, redacted_types))
+    return write
+
+
+# Format-preserving writers by file extension:
+#   (source path, output path, governed chunks, chunk id -> masked types, mask style, tenant) -> report
+_REDACTED_FILE_WRITERS = {
+    ".pdf": _write_redacted_pdf,
+    ".eml": _span_writer(EmlRedactionWriter),
+    **{ext: _span_writer(writer_cls) for ext, writer_cls in OOXML_WRITERS.items()},
+}
+
+
+def _find_redacted_file(trace_id: str, tenant_id: Optional[str]) -> Optional[str]:
+    """The unexpired redacted copy of *trace_id* written for *tenant_id*."""
+    _expire_redacted_files()
+    directory = _redacted_dir(tenant_id)
+    try:
+        uuid.UUID(trace_id)
+        names = os.listdir(directory)
+    except (ValueError, OSError):
+        return None
+    for name in names:
+        if name.startswith(f"{trace_id}_"):
+            return os.path.join(directory, name)
+    return None
+
+
+def _redacted_dir(tenant_id: Optional[str]) -> str:
+    # One subdirectory per tenant; the name is a digest so tenant ids never
+    # form paths.
+    if not tenant_id:
+        return os.path.join(settings.REDACTED_OUTPUT_DIR, "shared")
+    digest = hashlib.sha256(tenant_id.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(settings.REDACTED_OUTPUT_DIR, f"tenant-{digest}")
+
+
+def _expire_redacted_files() -> None:
+    """Delete redacted copies older than ``REDACTED_FILE_RETENTION_SECONDS`` (0 keeps them)."""
+    if settings.REDACTED_FILE_RETENTION_SECONDS <= 0:
+        return
+    cutoff = time.time() - settings.REDACTED_FILE_RETENTION_SECONDS
+    try:
+        directories = [entry.path for entry in os.scandir(settings.REDACTED_OUTPUT_DIR) if entry.is_dir()]
+    except OSError:
+        return
+    for directory in directories:
+        try:
+            for entry in os.scandir(directory):
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+        except OSError:
             continue
-        replacement = _build_mask(entity.entity_type, end - start, mask_style)
-        chars[start:end] = list(replacement)
-        redacted_types.add(entity.entity_type)
 
-    return "".join(chars), redacted_types
+
+def _write_redacted_file(
+    file_path: str,
+    filename: str,
+    trace_id: str,
+    chunks: List[GovernedChunk],
+    redacted_types: Dict[str, set[str]],
+    mask_style: str = "entity",
+    tenant_id: Optional[str] = None,
+) -> Optional[str]:
+    """Write a redacted copy in the original format; returns its download path.
+
+    Returns None for formats without a writer or when the writer refuses
+    (for example a PDF span it could not locate); the reason is audited.
+    """
+    ext = os.path.splitext(filename or file_path)[1].lower()
+    writer = _REDACTED_FILE_WRITERS.get(ext)
+    if writer is None:
+        audit_agent.record("REDACTED_FILE_SKIPPED", {"reason": f"no writer for '{ext}'"}, trace_id=trace_id)
+        return None
+    _expire_redacted_files()
+    output_dir = _redacted_dir(tenant_id)
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, f"{trace_id}_{os.path.basename(filename or file_path)}")
+    try:
+        report = writer(file_path, output_path, chunks, redacted_types, mask_style, tenant_id)
+    except Exception as e:
+        audit_agent.record("REDACTED_FILE_FAILED", {"error": str(e)}, trace_id=trace_id)
+        return None
+    audit_agent.record("REDACTED_FILE_WRITTEN", {"format": ext, **report}, trace_id=trace_id)
+    return f"/analyze/redacted/{trace_id}"
 
 
 def _run_pipeline(
@@ -481,8 +755,16 @@ def _run_pipeline(
     mask_style: str = "entity",
     findings_limit: int = 100,
     show_only_redacted: bool = False,
+    tenant_id: Optional[str] = None,
+    redacted_file: bool = False,
 ) -> AnalysisResult:
-    """Helper to run Extractor -> Classifier -> Fusion -> Policy -> Redaction pipeline."""
+    """Helper to run Extractor -> Classifier -> Fusion -> Policy -> Redaction pipeline.
+
+    *tenant_id* selects the tenant's policy overlay for both evaluation phases
+    and scopes ``mask_style=token`` tokens to that tenant.
+    With *redacted_file*, a redacted copy in the original format is written
+    (see ``_REDACTED_FILE_WRITERS``).
+    """
     try:
         pipeline_steps: List[PipelineStep] = []
 
@@ -519,12 +801,20 @@ def _run_pipeline(
         pii_summaries = []
         policy_traces = []
         total_pii = 0
-        redacted_document_chunks: List[str] = []
+        # Redacted text is written here once, at assembly, from the page buffers.
+        redacted_document_parts: List[str] = []
+        governed_chunks: List[GovernedChunk] = []
+        redacted_types_by_chunk: Dict[str, set[str]] = {}
         selected_type_set = set(selected_types or [])
+        # Document context is accumulated in this pass so escalation needs no rescan.
+        doc_context = policy_agent.new_document_context(tenant_id=tenant_id)
+        # Distinct entity values of the document: policy matches and findings once per value.
+        registry = EntityRegistry()
         
         for final_chunk in fused_chunks:
             # Apply Policy
-            governed = policy_agent.evaluate_chunk(final_chunk, trace_id)
+            governed = policy_agent.evaluate_chunk(final_chunk, trace_id, tenant_id=tenant_id, registry=registry)
+            doc_context.add_chunk(final_chunk)
 
             # Apply Redaction with advanced controls
             if redact_mode == "policy" and mask_style == "entity":
@@ -542,16 +832,15 @@ def _run_pipeline(
                 else:
                     allowed_types = set()
 
-                controlled_text, redacted_type_hits = _redact_text_with_controls(
-                    governed.processed_text,
-                    governed.detected_entities,
-                    mask_style,
-                    allowed_types,
-                )
-                governed.redacted_text = controlled_text
+                redacted_type_hits = _apply_redaction_controls(governed, mask_style, allowed_types, tenant_id)
                 redacted_chunk = governed
 
-            redacted_document_chunks.append(redacted_chunk.redacted_text)
+            if redacted_document_parts:
+                redacted_document_parts.append("\n\n")
+            redacted_chunk.write_redacted(redacted_document_parts)
+            if redacted_file:
+                governed_chunks.append(redacted_chunk)
+                redacted_types_by_chunk[redacted_chunk.chunk_id] = redacted_type_hits
             
             # Collect Policy Decisions
             if redacted_chunk.decision.action != "Allow" or redacted_chunk.decision.risk_score > 0:
@@ -561,43 +850,52 @@ def _run_pipeline(
                      risk_score=redacted_chunk.decision.risk_score,
                      details=redacted_chunk.decision.justification_trace
                  ))
+                 audit_agent.record("POLICY_DECISION", {
+                     "chunk_id": redacted_chunk.chunk_id,
+                     "action": redacted_chunk.decision.action,
+                     "risk_score": redacted_chunk.decision.risk_score,
+                     "entity_types": sorted({e.entity_type for e in redacted_chunk.detected_entities}),
+                     "justification": redacted_chunk.decision.justification_trace,
+                 }, trace_id=trace_id, agent_source="PolicyAgent")
 
             if redacted_chunk.detected_entities:
                 total_pii += len(redacted_chunk.detected_entities)
-                for pii in redacted_chunk.detected_entities:
-                    # Export Metric: Policy decision per actual entity
-                    PII_POLICY_ACTIONS.labels(
-                        action=redacted_chunk.decision.action, 
-                        entity_type=pii.entity_type
-                    ).inc()
-
-                    # Format Location
-                    loc_str = "N/A"
-                    if pii.location:
-                         loc_str = f"Page {pii.location.page_number} [{pii.location.char_start_on_page}:{pii.location.char_end_on_page}]"
-                    
-                    # Decide on text preview
-                    is_redacted_entity = pii.entity_type in redacted_type_hits
-                    preview = pii.text_value
-                    if is_redacted_entity:
-                        preview = _build_mask(
-                            pii.entity_type,
-                            max(1, pii.end_index - pii.start_index),
-                            mask_style,
-                        )
-
-                    if show_only_redacted and not is_redacted_entity:
-                        continue
-
-                    if len(pii_summaries) >= findings_limit:
-                        continue
+                registry.add_chunk(redacted_chunk, redacted_type_hits)
+                # Export Metric: Policy decision per actual entity
+                for entity_type, count in collections.Counter(e.entity_type for e in redacted_chunk.detected_entities).items():
+                    PII_POLICY_ACTIONS.labels(action=redacted_chunk.decision.action, entity_type=entity_type).inc(count)
+
+        # One finding per distinct value, with its occurrence count.
+        for entry in registry:
+            if show_only_redacted and not entry.redacted:
+                continue
+            if len(pii_summaries) >= findings_limit:
+                break
+
+            # Format Location (first occurrence)
+            first = entry.first
+            loc_str = "N/A"
+            if first.page_number is not None:
+                loc_str = f"Page {first.page_number} [{first.start}:{first.end}]"
+
+            # Decide on text preview
+            preview = entry.text_value
+            if entry.redacted:
+                preview = _build_mask(
+                    entry.entity_type,
+                    max(1, first.end - first.start),
+                    mask_style,
+                    entry.text_value or None,
+                    tenant_id,
+                )
 
-                    pii_summaries.append(PIISummary(
-                        entity_type=pii.entity_type,
-                        text_preview=preview,
-                        score=pii.score,
-                        location_str=loc_str
-                    ))
+            pii_summaries.append(PIISummary(
+                entity_type=entry.entity_type,
+                text_preview=preview,
+                score=entry.score,
+                location_str=loc_str,
+                occurrences=len(entry.occurrences),
+            ))
         pipeline_steps.append(PipelineStep(
             name="policy_redact",
             elapsed_ms=int((time.monotonic() - t2) * 1000),
@@ -605,10 +903,10 @@ def _run_pipeline(
             items_out=len(fused_chunks),
         ))
         
-        # 5. Document-level escalation evaluation (CONTEXT_MATCH rules)
+        # 5. Document-level escalation evaluation (CONTEXT_MATCH and mixed rules)
         # Runs after all per-chunk governance so the full PII inventory is known.
         t3 = time.monotonic()
-        doc_esc = policy_agent.evaluate_document(fused_chunks, trace_id=trace_id)
+        doc_esc = policy_agent.evaluate_document(trace_id=trace_id, context=doc_context)
         document_risk = DocumentRisk(
             escalated=doc_esc["escalated"],
             risk_score=doc_esc["risk_score"],
@@ -616,6 +914,12 @@ def _run_pipeline(
             rules_fired=doc_esc["rules_fired"],
             justifications=doc_esc["justifications"],
         )
+        if doc_esc["escalated"]:
+            audit_agent.record("DOCUMENT_ESCALATION", {
+                "risk_score": doc_esc["risk_score"],
+                "severity": doc_esc["severity"],
+                "rules_fired": doc_esc["rules_fired"],
+            }, trace_id=trace_id, agent_source="PolicyAgent")
         pipeline_steps.append(PipelineStep(
             name="document_evaluation",
             elapsed_ms=int((time.monotonic() - t3) * 1000),
@@ -623,16 +927,35 @@ def _run_pipeline(
             items_out=1,
         ))
 
-        redacted_document_text = "\n\n".join(redacted_document_chunks)
+        redacted_document_text = "".join(redacted_document_parts)
+        redacted_document_parts.clear()
+
+        redacted_file_url = None
+        if redacted_file:
+            t4 = time.monotonic()
+            redacted_file_url = _write_redacted_file(
+                file_path, filename, trace_id, governed_chunks, redacted_types_by_chunk, mask_style, tenant_id
+            )
+            pipeline_steps.append(PipelineStep(
+                name="write_redacted_file",
+                elapsed_ms=int((time.monotonic() - t4) * 1000),
+                items_in=len(governed_chunks),
+                items_out=1 if redacted_file_url else 0,
+            ))
+
+        if mask_style == "token":
+            # One vault transaction per document, before any token is returned.
+            default_vault().flush()
 
         # 6. Audit
-        audit_agent.log_event("ANALYSIS_COMPLETE", {
+        audit_agent.record("ANALYSIS_COMPLETE", {
             "file": filename,
             "pii_count": total_pii,
             "decisions": len(policy_traces),
             "doc_escalated": doc_esc["escalated"],
-            "trace_id": trace_id
-        })
+            "rule_set_version": doc_esc["rule_set_version"],
+            "tenant_id": tenant_id,
+        }, trace_id=trace_id)
         
         PII_FILES_PROCESSED.labels(status="success").inc()
         
@@ -653,6 +976,7 @@ def _run_pipeline(
                 show_only_redacted=show_only_redacted,
             ),
             redacted_document_text=redacted_document_text,
+            redacted_file_url=redacted_file_url,
             trace_id=trace_id
         )
         
@@ -660,9 +984,14 @@ def _run_pipeline(
         # Re-raise FastAPI/HTTP errors without wrapping them in a 500 — they
         # carry a meaningful status code (e.g. 404, 403) that must reach the caller.
         raise
+    except InputTooLarge as e:
+        # A chunk exceeded max_input_size_bytes in nsrl/security/hard_limits.yml.
+        PII_FILES_PROCESSED.labels(status="failed").inc()
+        audit_agent.record("PIPELINE_ERROR", {"error": str(e)}, trace_id=trace_id)
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         PII_FILES_PROCESSED.labels(status="failed").inc()
-        audit_agent.log_event("PIPELINE_ERROR", {"error": str(e)})
+        audit_agent.record("PIPELINE_ERROR", {"error": str(e)}, trace_id=trace_id)
         raise HTTPException(status_code=500, detail=f"Pipeline Error: {str(e)}")
 
 if __name__ == "__main__":
@@ -22,6 +22,10 @@ from agents.classifier import ClassifierAgent
 from agents.fusion_agent import FusionAgent
 from agents.policy_agent import PolicyAgent
 from agents.redaction_agent import RedactionAgent
+from agents.email_redactor import EmlRedactionError, EmlRedactionWriter
+from agents.office_redactor import OOXML_WRITERS, OfficeRedactionError
+from agents.pdf_redactor import PdfRedactionError, PdfRedactionWriter, page_spans
+from agents.redaction_kernel import page_entity_spans
 
 def run_interactive():
     print("="*60)
@@ -55,7 +59,7 @@ def run_interactive():
            
            # Classify
            pii_count = 0
-           full_redacted_text = []
+           redacted_chunks = []
            print(f"[2] Analyzing for PII...")
            
            # Classification Stage
@@ -76,7 +80,7 @@ def run_interactive():
                
                # Redaction
                redacted_chunk = redaction_agent.redact(governed)
-               full_redacted_text.append(redacted_chunk.redacted_text)
+               redacted_chunks.append(redacted_chunk)
                
                if redacted_chunk.detected_entities:
                    pii_count += len(redacted_chunk.detected_entities)
@@ -113,10 +117,38 @@ def run_interactive():
                base_name = os.path.basename(file_path)
                name, ext = os.path.splitext(base_name)
                out_file = os.path.join(output_dir, f"{name}_redacted.pdf")
+
+               # 2a. Office and email input: patch the original (structure preserved)
+               format_writers = {**OOXML_WRITERS, ".eml": EmlRedactionWriter}
+               if ext.lower() in format_writers:
+                   office_out = os.path.join(output_dir, f"{name}_redacted{ext.lower()}")
+                   print(f"\n[3] Generating Redacted {ext.upper()[1:]}: {office_out}")
+                   try:
+                       writer = format_writers[ext.lower()]()
+                       report = writer.redact(file_path, office_out, page_entity_spans(redacted_chunks))
+                       print(
+                           f"[SUCCESS] Redacted {report['spans_redacted']} span(s), rewrote "
+                           f"{report['parts_rewritten']} part(s): {os.path.abspath(office_out)}"
+                       )
+                   except (OfficeRedactionError, EmlRedactionError) as office_err:
+                       print(f"[ERROR] In-place {ext.upper()[1:]} redaction refused: {office_err}")
+                   continue
                
                print(f"\n[3] Generating Redacted PDF: {out_file}")
+
+               # 2b. PDF input: redact the original pages in place (layout preserved)
+               if ext.lower() == ".pdf":
+                   try:
+                       report = PdfRedactionWriter().redact(file_path, out_file, page_spans(redacted_chunks))
+                       print(
+                           f"[SUCCESS] Redacted {report['glyphs_removed']} glyphs on "
+                           f"{report['pages_redacted']} page(s): {os.path.abspath(out_file)}"
+                       )
+                   except PdfRedactionError as pdf_err:
+                       print(f"[ERROR] In-place PDF redaction refused: {pdf_err}")
+                   continue
                
-               # 2. Build PDF
+               # 2c. Other formats: build a text PDF from the redacted chunks
                try:
                    doc = SimpleDocTemplate(out_file, pagesize=letter)
                    styles = getSampleStyleSheet()
@@ -129,7 +161,8 @@ def run_interactive():
                    
                    # Add Content
                    # We join chunks, but better to add them as separate paragraphs to preserve some structure
-                   for text_chunk in full_redacted_text:
+                   # Redacted text is produced here, one chunk at a time.
+                   for text_chunk in (chunk.redacted_text for chunk in redacted_chunks):
                        # Handle newlines by replacing with <br/> for HTML-like flow in Paragraph
                        formatted_text = text_chunk.replace("\n", "<br/>")
                        
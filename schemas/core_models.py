@@ -58,6 +58,9 @@ class ClassifiedChunk(SemanticChunk):
     """Chunk enriched with PII detections."""
     detected_entities: List[DetectedPII] = []
     pii_density_score: float = 0.0
+    # True when the classification deadline or a regex timeout cut detection
+    # short; PolicyAgent fails such chunks closed.
+    classification_degraded: bool = False
 
 # --- 4. Decision & Audit Schema ---
 class AgentDecision(BaseModel):
@@ -0,0 +1,258 @@
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from schemas.core_models import (
+    AgentDecision,
+    ClassifiedChunk,
+    DetectedPII,
+    GovernedChunk,
+    LocationContext,
+    SemanticChunk,
+)
+
+# ---------------------------------------------------------------------------
+# Hot-path representations
+#
+# Chunks and entities flowing extractor -> classifier -> fusion -> policy ->
+# redaction are plain __slots__ objects with the same attribute names as the
+# pydantic models in core_models, so every stage reads them identically.
+# A chunk is one object mutated in place by each stage (no per-stage
+# ``**chunk.dict()`` copies that re-validate every entity), and an entity
+# keeps its page position as two ints instead of a LocationContext model.
+# Pydantic models are built only at the API boundary (``to_model``), and
+# stages still accept them as input (``as_chunk``).
+# ---------------------------------------------------------------------------
+
+
+class Location:
+    """Page position of an entity; attribute-compatible with LocationContext."""
+
+    __slots__ = ("page_number", "char_start_on_page", "char_end_on_page", "nearby_context")
+
+    def __init__(self, page_number: int, char_start_on_page: int, char_end_on_page: int,
+                 nearby_context: Optional[str] = None):
+        self.page_number = page_number
+        self.char_start_on_page = char_start_on_page
+        self.char_end_on_page = char_end_on_page
+        self.nearby_context = nearby_context
+
+    def to_model(self) -> LocationContext:
+        return LocationContext(
+            page_number=self.page_number,
+            char_start_on_page=self.char_start_on_page,
+            char_end_on_page=self.char_end_on_page,
+            nearby_context=self.nearby_context,
+        )
+
+
+class Entity:
+    """A detected entity; attribute-compatible with DetectedPII.
+
+    ``page_number``/``page_offset`` (the chunk's page and its start on the
+    page) replace the stored location; :attr:`location` derives it on access.
+    """
+
+    __slots__ = ("entity_type", "text_value", "start_index", "end_index", "score", "source",
+                 "page_number", "page_offset", "_metadata")
+
+    def __init__(self, entity_type: str, text_value: str, start_index: int, end_index: int, score: float,
+                 source: str, page_number: Optional[int] = None, page_offset: int = 0,
+                 metadata: Optional[Dict[str, Any]] = None):
+        self.entity_type = entity_type
+        self.text_value = text_value
+        self.start_index = start_index
+        self.end_index = end_index
+        self.score = score
+        self.source = source
+        self.page_number = page_number
+        self.page_offset = page_offset
+        self._metadata = metadata
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        # Allocated on first use; nothing on the hot path writes metadata.
+        if self._metadata is None:
+            self._metadata = {}
+        return self._metadata
+
+    @property
+    def location(self) -> Optional[Location]:
+        if self.page_number is None:
+            return None
+        return Location(self.page_number, self.page_offset + self.start_index, self.page_offset + self.end_index)
+
+    def __repr__(self) -> str:
+        return (f"Entity({self.entity_type!r}, [{self.start_index}:{self.end_index}], "
+                f"score={self.score}, source={self.source!r})")
+
+    @classmethod
+    def from_model(cls, model: DetectedPII) -> "Entity":
+        entity = cls(model.entity_type, model.text_value, model.start_index, model.end_index, model.score,
+                     model.source, metadata=dict(model.metadata) if model.metadata else None)
+        if model.location is not None:
+            entity.page_number = model.location.page_number
+            entity.page_offset = model.location.char_start_on_page - model.start_index
+        return entity
+
+    def to_model(self) -> DetectedPII:
+        location = self.location
+        return DetectedPII(
+            entity_type=self.entity_type,
+            text_value=self.text_value,
+            start_index=self.start_index,
+            end_index=self.end_index,
+            score=self.score,
+            source=self.source,
+            metadata=dict(self._metadata or {}),
+            location=location.to_model() if location is not None else None,
+        )
+
+
+class Chunk:
+    """A chunk at any pipeline stage; attribute-compatible with
+    SemanticChunk, ClassifiedChunk and GovernedChunk.
+
+    The text is a ``[start:end]`` view of a buffer shared by every chunk of
+    a page (:meth:`on_page`), so chunks hold no copy of their own;
+    ``processed_text`` slices it on access.  The classifier fills
+    ``detected_entities``, the policy agent sets ``decision`` and the
+    redaction agent records the spans to mask (:meth:`set_redaction`), all
+    in place.  Redacted text is only produced when asked for, typically once
+    for the whole document via :meth:`write_redacted`.
+    """
+
+    __slots__ = ("chunk_id", "document_id", "page_number", "token_span", "bbox", "section_label",
+                 "detected_entities", "pii_density_score", "classification_degraded", "decision",
+                 "_buffer", "_start", "_end", "_original", "_redacted", "redaction_spans", "masker")
+
+    def __init__(self, document_id: str, processed_text: str, original_text: Optional[str], page_number: int,
+                 token_span: Tuple[int, int], bbox: Optional[List[float]] = None,
+                 section_label: Optional[str] = None, chunk_id: Optional[str] = None):
+        self.chunk_id = chunk_id or str(uuid.uuid4())
+        self.document_id = document_id
+        self.page_number = page_number
+        self.token_span = token_span
+        self.bbox = bbox
+        self.section_label = section_label
+        self.detected_entities: List[Entity] = []
+        self.pii_density_score = 0.0
+        self.classification_degraded = False
+        self.decision: Optional[AgentDecision] = None
+        self._buffer = processed_text
+        self._start = 0
+        self._end = len(processed_text)
+        # None while the original text is the processed text.
+        self._original = original_text if original_text is not None and original_text != processed_text else None
+        self._redacted: Optional[str] = None
+        self.redaction_spans: Optional[List[Tuple[int, int, str]]] = None
+        self.masker = None
+
+    @classmethod
+    def on_page(cls, document_id: str, page_text: str, page_number: int, start: int, end: int,
+                section_label: Optional[str] = None) -> "Chunk":
+        """The chunk ``page_text[start:end]``, viewing *page_text* without copying it."""
+        chunk = cls(document_id, "", None, page_number, (start, end), section_label=section_label)
+        chunk._buffer = page_text
+        chunk._start = start
+        chunk._end = end
+        return chunk
+
+    @property
+    def processed_text(self) -> str:
+        return self._buffer[self._start:self._end]
+
+    @property
+    def original_text(self) -> str:
+        return self._original if self._original is not None else self.processed_text
+
+    @property
+    def text_length(self) -> int:
+        return self._end - self._start
+
+    @property
+    def redacted_text(self) -> str:
+        if self._redacted is not None:
+            return self._redacted
+        if not self.redaction_spans:
+            return self.processed_text
+        parts: List[str] = []
+        self.write_redacted(parts)
+        return parts[0]
+
+    @redacted_text.setter
+    def redacted_text(self, text: str) -> None:
+        # An explicit text replaces any recorded spans.
+        self._redacted = text
+        self.redaction_spans = None
+
+    def set_redaction(self, spans: Optional[List[Tuple[int, int, str]]], masker=None) -> None:
+        """Record the spans (``plan_spans`` output) to mask with *masker*."""
+        self._redacted = None
+        self.redaction_spans = spans or None
+        self.masker = masker
+
+    def write_redacted(self, parts: List[str]) -> None:
+        """Append this chunk's redacted text to *parts*, sliced from the buffer."""
+        if self._redacted is not None:
+            parts.append(self._redacted)
+        elif self.redaction_spans:
+            # Imported lazily so schemas do not depend on agents at import time.
+            from agents.redaction_kernel import write_spans
+            # One string per chunk: a list of small pieces would cost more
+            # in object headers than the text itself on dense chunks.
+            pieces: List[str] = []
+            write_spans(pieces, self._buffer, self._start, self._end, self.redaction_spans, self.masker)
+            parts.append("".join(pieces))
+        else:
+            parts.append(self._buffer[self._start:self._end])
+
+    def __repr__(self) -> str:
+        return (f"Chunk({self.chunk_id!r}, page={self.page_number}, span={self.token_span}, "
+                f"entities={len(self.detected_entities)})")
+
+    @classmethod
+    def from_model(cls, model: SemanticChunk) -> "Chunk":
+        chunk = cls(model.document_id, model.processed_text, model.original_text, model.page_number,
+                    tuple(model.token_span), model.bbox, model.section_label, model.chunk_id)
+        entities = getattr(model, "detected_entities", None)
+        if entities:
+            chunk.detected_entities = [Entity.from_model(entity) for entity in entities]
+        chunk.pii_density_score = getattr(model, "pii_density_score", 0.0)
+        chunk.classification_degraded = getattr(model, "classification_degraded", False)
+        redacted = getattr(model, "redacted_text", None)
+        if redacted is not None and redacted != model.processed_text:
+            chunk._redacted = redacted
+        chunk.decision = getattr(model, "decision", None)
+        return chunk
+
+    def to_model(self) -> SemanticChunk:
+        """The pydantic model for the furthest stage this chunk has reached."""
+        fields = dict(
+            chunk_id=self.chunk_id,
+            document_id=self.document_id,
+            processed_text=self.processed_text,
+            original_text=self.original_text,
+            page_number=self.page_number,
+            token_span=self.token_span,
+            bbox=self.bbox,
+            section_label=self.section_label,
+        )
+        if self.decision is None and not self.detected_entities and not self.classification_degraded:
+            return SemanticChunk(**fields)
+        fields.update(
+            detected_entities=[entity.to_model() for entity in self.detected_entities],
+            pii_density_score=self.pii_density_score,
+            classification_degraded=self.classification_degraded,
+        )
+        if self.decision is None:
+            return ClassifiedChunk(**fields)
+        return GovernedChunk(**fields, redacted_text=self.redacted_text, decision=self.decision)
+
+
+def as_chunk(chunk: Any) -> Chunk:
+    """*chunk* itself, or a :class:`Chunk` copy of a pydantic chunk model."""
+    if isinstance(chunk, BaseModel):
+        return Chunk.from_model(chunk)
+    return chunk
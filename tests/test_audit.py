@@ -0,0 +1,269 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.audit import AuditAgent
+from agents.audit_checkpoint import verify_inclusion_proof
+
+
+class TestAuditGroupCommit(unittest.TestCase):
+    """Tests for the group-commit writer in AuditAgent."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.temp_dir.name, "audit.log")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _read_entries(self):
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def test_group_commit_chain_is_valid(self):
+        agent = AuditAgent(log_file=self.log_path, group_commit=True)
+        try:
+            for i in range(5):
+                entry = agent.process({"action": f"event_{i}"})
+                self.assertEqual(len(entry["hash"]), 64)
+            result = agent.verify_chain()
+            self.assertTrue(result["valid"])
+            self.assertEqual(result["entries_verified"], 5)
+        finally:
+            agent.close()
+
+    def test_concurrent_submitters_keep_chain_intact(self):
+        agent = AuditAgent(
+            log_file=self.log_path,
+            group_commit=True,
+            durability="batch",
+            fsync_batch_size=16,
+        )
+
+        def worker(n):
+            for i in range(50):
+                agent.process({"action": f"worker_{n}_{i}"})
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        agent.close()
+
+        result = AuditAgent(log_file=self.log_path).verify_chain()
+        self.assertTrue(result["valid"])
+        self.assertEqual(result["entries_verified"], 400)
+
+    def test_submit_returns_future_and_flush_persists(self):
+        agent = AuditAgent(
+            log_file=self.log_path,
+            group_commit=True,
+            durability="interval",
+            fsync_interval_ms=1000,
+        )
+        try:
+            futures = [agent.submit({"action": f"event_{i}"}) for i in range(10)]
+            agent.flush()
+            self.assertTrue(all(f.done() for f in futures))
+            entries = self._read_entries()
+            self.assertEqual([e["hash"] for e in entries], [f.result()["hash"] for f in futures])
+        finally:
+            agent.close()
+
+    def test_chain_continues_across_modes(self):
+        sync_agent = AuditAgent(log_file=self.log_path)
+        sync_agent.process({"action": "sync_event"})
+
+        agent = AuditAgent(log_file=self.log_path, group_commit=True)
+        agent.process({"action": "group_event"})
+        agent.close()
+
+        entries = self._read_entries()
+        self.assertEqual(entries[1]["payload"]["prev_hash"], entries[0]["hash"])
+        self.assertTrue(sync_agent.verify_chain()["valid"])
+
+    def test_unknown_durability_policy_rejected(self):
+        with self.assertRaises(ValueError):
+            AuditAgent(log_file=self.log_path, durability="sometimes")
+
+
+class TestAuditCheckpoints(unittest.TestCase):
+    """Tests for Merkle checkpoints, checkpointed verification and proofs."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.temp_dir.name, "audit.log")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _agent(self, **kwargs):
+        kwargs.setdefault("checkpoint_key", "test-checkpoint-key")
+        return AuditAgent(log_file=self.log_path, checkpoint_interval=4, **kwargs)
+
+    def _tamper(self, line_idx):
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        entry = json.loads(lines[line_idx])
+        entry["payload"]["event"]["action"] = "TAMPERED"
+        lines[line_idx] = json.dumps(entry) + "\n"
+        with open(self.log_path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    def test_checkpoints_sealed_every_interval(self):
+        agent = self._agent()
+        for i in range(10):
+            agent.process({"action": f"event_{i}"})
+        self.assertEqual(len(agent._checkpoints.checkpoints), 2)
+        self.assertEqual(agent._checkpoints.last["index_end"], 8)
+
+    def test_checkpointed_modes_match_full(self):
+        agent = self._agent()
+        for i in range(10):
+            agent.process({"action": f"event_{i}"})
+        for mode in ("full", "incremental", "parallel"):
+            result = agent.verify_chain(mode=mode, max_workers=2)
+            self.assertTrue(result["valid"], mode)
+            self.assertEqual(result["entries_verified"], 10, mode)
+
+    def test_incremental_resumes_from_last_verified_checkpoint(self):
+        agent = self._agent()
+        for i in range(8):
+            agent.process({"action": f"event_{i}"})
+        self.assertEqual(agent.verify_chain(mode="incremental")["checkpoints_verified"], 2)
+        for i in range(4):
+            agent.process({"action": f"more_{i}"})
+        result = agent.verify_chain(mode="incremental")
+        self.assertTrue(result["valid"])
+        self.assertEqual(result["checkpoints_verified"], 1)
+        self.assertEqual(result["entries_verified"], 12)
+
+    def test_parallel_detects_tampering_inside_sealed_window(self):
+        agent = self._agent()
+        for i in range(10):
+            agent.process({"action": f"event_{i}"})
+        self._tamper(5)
+        result = agent.verify_chain(mode="parallel", max_workers=2)
+        self.assertFalse(result["valid"])
+        self.assertEqual(result["first_broken_at"], 6)
+
+    def test_checkpointing_needs_a_key(self):
+        agent = self._agent(checkpoint_key="")
+        for i in range(6):
+            agent.process({"action": f"event_{i}"})
+        self.assertIsNone(agent._checkpoints)
+        self.assertEqual(os.listdir(self.temp_dir.name), ["audit.log"])
+        # Checkpointed modes fall back to the full walk.
+        self.assertTrue(agent.verify_chain(mode="incremental")["valid"])
+
+    def test_checkpoints_signed_with_another_key_rejected(self):
+        forger = self._agent(checkpoint_key="attacker-key")
+        for i in range(8):
+            forger.process({"action": f"event_{i}"})
+        result = self._agent().verify_chain(mode="parallel")
+        self.assertFalse(result["valid"])
+        self.assertIn("invalid signature", result["error"])
+
+    def test_checkpoints_restored_after_restart(self):
+        agent = self._agent()
+        for i in range(6):
+            agent.process({"action": f"event_{i}"})
+
+        restarted = self._agent()
+        for i in range(2):
+            restarted.process({"action": f"after_{i}"})
+        self.assertEqual(len(restarted._checkpoints.checkpoints), 2)
+        self.assertTrue(restarted.verify_chain(mode="parallel")["valid"])
+
+    def test_inclusion_proof_round_trip(self):
+        agent = self._agent()
+        for i in range(9):
+            agent.process({"action": f"event_{i}"})
+        proof = agent.inclusion_proof(6)
+        self.assertIsNotNone(proof)
+        self.assertTrue(verify_inclusion_proof(proof))
+
+        proof["entry_hash"] = "0" * 64
+        self.assertFalse(verify_inclusion_proof(proof))
+        # Entry 8 is still in the unsealed window.
+        self.assertIsNone(agent.inclusion_proof(8))
+
+
+class TestAuditSegments(unittest.TestCase):
+    """Tests for segment rotation, cross-segment verification and trace lookup."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.temp_dir.name, "audit.log")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _agent(self, **kwargs):
+        kwargs.setdefault("segment_max_bytes", 1500)
+        kwargs.setdefault("checkpoint_interval", 4)
+        kwargs.setdefault("checkpoint_key", "test-checkpoint-key")
+        return AuditAgent(log_file=self.log_path, **kwargs)
+
+    def _fill(self, agent, n, prefix="event"):
+        for i in range(n):
+            agent.record("TEST_EVENT", {"n": i, "note": f"{prefix}_{i}"}, trace_id=f"trace-{i % 3}").result()
+
+    def test_rotates_by_size_and_chain_spans_segments(self):
+        agent = self._agent()
+        self._fill(agent, 30)
+        sealed = agent._manifest.segments
+        self.assertGreaterEqual(len(sealed), 2)
+        self.assertEqual(sum(s["entries"] for s in sealed) + agent._segment_entries, 30)
+        for mode in ("full", "incremental", "parallel"):
+            result = agent.verify_chain(mode=mode, max_workers=2)
+            self.assertTrue(result["valid"], (mode, result))
+            self.assertEqual(result["entries_verified"], 30, mode)
+
+    def test_compressed_segments_verify_and_prove(self):
+        agent = self._agent(compress_segments=True)
+        self._fill(agent, 30)
+        agent.close()
+        self.assertTrue(any(name.endswith(".gz") for name in os.listdir(self.temp_dir.name)))
+        self.assertTrue(agent.verify_chain(mode="full")["valid"])
+        self.assertTrue(agent.verify_chain(mode="parallel", max_workers=2)["valid"])
+        proof = agent.inclusion_proof(1)
+        self.assertIsNotNone(proof)
+        self.assertTrue(verify_inclusion_proof(proof))
+
+    def test_restart_continues_chain_after_rotation(self):
+        agent = self._agent(group_commit=True)
+        self._fill(agent, 20)
+        agent.close()
+
+        restarted = self._agent()
+        self.assertEqual(restarted._segment, agent._segment)
+        self._fill(restarted, 20, prefix="after")
+        result = restarted.verify_chain(mode="full")
+        self.assertTrue(result["valid"], result)
+        self.assertEqual(result["entries_verified"], 40)
+
+    def test_trace_lookup_across_segments(self):
+        agent = self._agent()
+        self._fill(agent, 30)
+        events = agent.trace("trace-1")
+        self.assertEqual(len(events), 10)
+        self.assertEqual(
+            [e["payload"]["event"]["data"]["n"] for e in events], list(range(1, 30, 3))
+        )
+        self.assertEqual(agent.trace("missing"), [])
+
+        os.remove(agent._trace_index.path)
+        agent._trace_index.close()
+        self.assertEqual(agent.rebuild_trace_index(), 30)
+        self.assertEqual(len(agent.trace("trace-2")), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
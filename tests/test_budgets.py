@@ -0,0 +1,273 @@
+import logging
+import unittest
+import sys
+import os
+import pickle
+import tempfile
+import time
+import yaml
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from presidio_analyzer import Pattern, PatternRecognizer, pattern_recognizer
+
+from agents import budgets
+from agents.budgets import (
+    BUDGET_OVERRUNS,
+    HardLimits,
+    InputTooLarge,
+    PipelineCancelled,
+    PipelineDeadline,
+    RecognizerBudget,
+    apply_presidio_regex_timeout,
+    check_input_size,
+    check_regex,
+)
+from agents.policy_agent import PolicyAgent
+from agents.redaction_agent import RedactionAgent
+from agents.redaction_kernel import UNSCANNED, page_entity_spans
+from agents.rule_sets import RuleSetError, load_rule_set
+from schemas.core_models import ClassifiedChunk, DetectedPII
+from schemas.internal import as_chunk
+
+
+def _overruns(stage, name):
+    return BUDGET_OVERRUNS.labels(stage=stage, name=name)._value.get()
+
+
+class _SlowRecognizer:
+    def __init__(self, name, delay=0.0):
+        self.name = name
+        self.delay = delay
+        self.calls = 0
+
+    def analyze(self, text, entities=None, nlp_artifacts=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        return ["hit"]
+
+
+class TestHardLimits(unittest.TestCase):
+    """Tests for loading and applying nsrl/security/hard_limits.yml."""
+
+    def test_loads_repository_limits(self):
+        limits = HardLimits.load("nsrl/security/hard_limits.yml")
+        self.assertEqual(limits.execution_timeout_ms, 50)
+        self.assertEqual(limits.max_input_size_bytes, 1048576)
+        self.assertFalse(limits.allow_backtracking)
+        self.assertEqual(limits.regex_timeout_ms, 5)
+
+    def test_oversize_input_rejected(self):
+        limits = HardLimits(max_input_size_bytes=16)
+        check_input_size("short", limits, stage="test")
+        before = _overruns("test", "max_input_size_bytes")
+        with self.assertRaises(InputTooLarge):
+            check_input_size("é" * 10, limits, stage="test")
+        self.assertEqual(_overruns("test", "max_input_size_bytes"), before + 1)
+
+    def test_nested_quantifiers_rejected(self):
+        limits = HardLimits()
+        for unsafe in (r"(a+)+$", r"(\w*\s?)*@", r"(?:\d{2,})+x"):
+            with self.assertRaises(ValueError):
+                check_regex(unsafe, limits)
+        check_regex(r"\b\d{4}\s?\d{4}\s?\d{4}\b", limits)
+        check_regex(r"\b[A-Z]{5}[0-9]{4}[A-Z]{1}\b", limits)
+        check_regex(r"(a+)+$", HardLimits(allow_backtracking=True))
+
+    def test_structure_limits_reject_rule_file(self):
+        with tempfile.TemporaryDirectory() as rules_dir:
+            rule = {
+                "id": "WIDE-001",
+                "version": "1.0",
+                "meta": {"name": "wide", "description": "wide"},
+                "conditions": [{"type": "PII_MATCH", "field": "type", "operator": "EQUALS", "value": "X"}] * 3,
+                "actions": {"classification": "RESTRICTED", "severity": "HIGH", "score": 0.9},
+            }
+            with open(os.path.join(rules_dir, "wide.yml"), "w") as f:
+                yaml.dump([rule], f)
+            limits = HardLimits(max_conditions_per_rule=2)
+            with self.assertRaises(RuleSetError):
+                load_rule_set(rules_dir, strict=True, limits=limits)
+            self.assertEqual(load_rule_set(rules_dir, limits=limits).rules, [])
+            self.assertEqual(len(load_rule_set(rules_dir).rules), 1)
+
+
+class TestRecognizerBudget(unittest.TestCase):
+    """Tests for the cooperative classification deadline."""
+
+    def test_recognizers_after_deadline_are_skipped(self):
+        slow, late = _SlowRecognizer("SlowRec", delay=0.02), _SlowRecognizer("LateRec")
+        budget = RecognizerBudget(budget_ms=5)
+        budget.install([slow, late])
+        before = _overruns("recognizer", "LateRec")
+
+        results, degraded = budget.run(lambda: slow.analyze("x") + late.analyze("x"))
+
+        self.assertEqual(results, ["hit"])
+        self.assertTrue(degraded)
+        self.assertEqual(late.calls, 0)
+        self.assertEqual(_overruns("recognizer", "LateRec"), before + 1)
+
+    def test_within_budget_is_not_degraded(self):
+        rec = _SlowRecognizer("FastRec")
+        budget = RecognizerBudget(budget_ms=1000)
+        budget.install([rec])
+        self.assertEqual(budget.run(lambda: rec.analyze("x")), (["hit"], False))
+        # Outside run() no deadline applies.
+        self.assertEqual(rec.analyze("x"), ["hit"])
+
+    def test_regex_timeout_counted_against_recognizer(self):
+        saved = pattern_recognizer.REGEX_TIMEOUT_SECONDS
+        self.addCleanup(setattr, pattern_recognizer, "REGEX_TIMEOUT_SECONDS", saved)
+        apply_presidio_regex_timeout(HardLimits(regex_timeout_ms=1))
+        recognizer = PatternRecognizer(
+            supported_entity="EVIL",
+            name="EvilRecognizer",
+            patterns=[Pattern(name="evil", regex=r"(a|aa)+$", score=0.5)],
+        )
+        budget = RecognizerBudget(budget_ms=0)
+        budget.install([recognizer])
+        before = _overruns("recognizer", "EvilRecognizer")
+
+        results, degraded = budget.run(
+            lambda: recognizer.analyze("a" * 40 + "!", entities=["EVIL"], nlp_artifacts=None)
+        )
+
+        self.assertEqual(results, [])
+        self.assertTrue(degraded)
+        self.assertEqual(_overruns("recognizer", "EvilRecognizer"), before + 1)
+
+
+    def test_timeout_filter_installed_once_and_released(self):
+        presidio_logger = logging.getLogger("presidio-analyzer")
+        users = budgets._timeout_filter_users
+        created = [RecognizerBudget(budget_ms=0) for _ in range(3)]
+        self.assertEqual(presidio_logger.filters.count(budgets._timeout_filter), 1)
+        for budget in created:
+            budget.close()
+            budget.close()
+        self.assertEqual(budgets._timeout_filter_users, users)
+        self.assertEqual(presidio_logger.filters.count(budgets._timeout_filter), 1 if users else 0)
+
+
+class TestPipelineDeadline(unittest.TestCase):
+    """Tests for the document-wide deadline shared by the v2 stages."""
+
+    def test_expiry_and_cancel(self):
+        deadline = PipelineDeadline(1000)
+        deadline.check("test")
+        self.assertGreater(deadline.remaining(), 0.5)
+        deadline.cancel("client disconnected")
+        self.assertTrue(deadline.expired())
+        self.assertEqual(deadline.remaining(), 0.0)
+        with self.assertRaises(PipelineCancelled) as raised:
+            deadline.check("classifier")
+        self.assertEqual((raised.exception.stage, raised.exception.reason), ("classifier", "client disconnected"))
+
+        expired = PipelineDeadline(1)
+        time.sleep(0.005)
+        self.assertEqual(expired.reason, "timeout")
+        self.assertFalse(PipelineDeadline(0).expired())
+        self.assertIsNone(PipelineDeadline(0).remaining())
+
+    def test_pickled_copy_keeps_expiry(self):
+        deadline = PipelineDeadline(60000)
+        copy = pickle.loads(pickle.dumps(deadline))
+        self.assertFalse(copy.expired())
+        self.assertAlmostEqual(copy.remaining(), deadline.remaining(), delta=1)
+        deadline.cancel()
+        self.assertTrue(pickle.loads(pickle.dumps(deadline)).cancelled)
+
+    def test_stops_recognizers(self):
+        first, second = _SlowRecognizer("FirstRec"), _SlowRecognizer("SecondRec")
+        budget = RecognizerBudget(budget_ms=1000)
+        budget.install([first, second])
+        deadline = PipelineDeadline(1000)
+
+        def analyze():
+            hits = first.analyze("x")
+            deadline.cancel()
+            return hits + second.analyze("x")
+
+        with self.assertRaises(PipelineCancelled):
+            budget.run(analyze, deadline)
+        self.assertEqual((first.calls, second.calls), (1, 0))
+
+
+class TestPolicyBudget(unittest.TestCase):
+    """Tests for the policy evaluation deadline and fail-closed decisions."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        rules_dir = os.path.join(self.temp_dir.name, "rules")
+        os.makedirs(rules_dir)
+        rules = [{
+            "id": f"LOW-{i:03d}",
+            "version": "1.0",
+            "meta": {"name": "low", "description": "low", "priority": 100 - i},
+            "conditions": [{"type": "PII_MATCH", "field": "type", "operator": "EQUALS", "value": "EMAIL_ADDRESS"}],
+            "actions": {"classification": "INTERNAL", "severity": "LOW", "score": 0.2},
+        } for i in range(3)]
+        with open(os.path.join(rules_dir, "low.yml"), "w") as f:
+            yaml.dump(rules, f)
+        self.agent = PolicyAgent(rules_dir=rules_dir, hot_reload=False)
+
+    def tearDown(self):
+        self.agent.close()
+        self.temp_dir.cleanup()
+
+    def _chunk(self, text="mail a@b.co", entities=True, **kwargs):
+        detected = [DetectedPII(
+            entity_type="EMAIL_ADDRESS", text_value="a@b.co", start_index=5, end_index=11, score=0.9, source="test"
+        )] if entities else []
+        return ClassifiedChunk(
+            document_id="doc1", processed_text=text, original_text=text, page_number=1, token_span=(0, len(text)),
+            detected_entities=detected, **kwargs
+        )
+
+    def test_within_budget_keeps_rule_decision(self):
+        governed = self.agent.evaluate_chunk(self._chunk())
+        self.assertEqual(governed.decision.action, "Allow")
+        self.assertEqual(len(governed.decision.justification_trace), 3)
+
+    def test_deadline_overrun_fails_closed(self):
+        self.agent.limits = HardLimits(execution_timeout_ms=1e-9)
+        before = _overruns("policy_rule", "LOW-000")
+
+        governed = self.agent.evaluate_chunk(self._chunk())
+
+        self.assertEqual(governed.decision.action, "Redact")
+        self.assertIn("execution_timeout_ms", governed.decision.justification_trace[-1])
+        self.assertEqual(_overruns("policy_rule", "LOW-000"), before + 1)
+
+    def test_degraded_classification_fails_closed(self):
+        governed = self.agent.evaluate_chunk(self._chunk(entities=False, classification_degraded=True))
+        self.assertEqual(governed.decision.action, "Redact")
+
+    def test_degraded_chunk_is_masked_whole(self):
+        # Nothing detected: the recognizers that would have found these never ran.
+        text = "SSN 123-45-6789 for John Smith"
+        for masker in ("entity", "token"):
+            redacted = RedactionAgent(masker).redact(
+                self.agent.evaluate_chunk(self._chunk(text, entities=False, classification_degraded=True))
+            )
+            self.assertEqual(redacted.redacted_text, "#" * len(text))
+
+        # Pipeline chunks redact at assembly, and file writers get one page span.
+        chunk = RedactionAgent().redact(self.agent.evaluate_chunk(
+            as_chunk(self._chunk(text, classification_degraded=True))
+        ))
+        parts = []
+        chunk.write_redacted(parts)
+        self.assertEqual(parts, ["#" * len(text)])
+        [span] = page_entity_spans([chunk])[1]
+        self.assertEqual((span.start, span.end, span.entity_type), (0, len(text), UNSCANNED))
+
+    def test_oversize_chunk_rejected(self):
+        self.agent.limits = HardLimits(max_input_size_bytes=8)
+        with self.assertRaises(InputTooLarge):
+            self.agent.evaluate_chunk(self._chunk())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import unittest
+import sys
+import os
+import re
+import shutil
+import tempfile
+from email import policy
+from email.message import EmailMessage
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.email_redactor import EmlRedactionError, EmlRedactionWriter
+from agents.extractor import ExtractorAgent
+from agents.redaction_kernel import PageSpan, fixed_mask, normalise_page_text
+from core.v2.parsers import RFCEmailParser
+
+_ATTACHMENT = b"\x00\x01binary-payload" * 500
+
+
+def _message():
+    msg = EmailMessage()
+    msg["From"] = "John Smith <john.smith@example.com>"
+    msg["To"] = "ops@example.org"
+    msg["Subject"] = "Rückruf für Jane Roe"
+    msg.set_content("Hi,\nplease call Jane Roe at 555-0100.\n", cte="quoted-printable")
+    msg.add_alternative(
+        '<p>Call <b>Jane</b> Roe &amp; co at 555-0100 '
+        '<a href="mailto:john.smith@example.com">mail</a></p><!-- Jane Roe -->',
+        subtype="html",
+    )
+    msg.add_attachment(_ATTACHMENT, maintype="application", subtype="octet-stream", filename="blob.bin")
+    return msg.as_bytes(policy=policy.SMTP)
+
+
+class TestEmlRedactionWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.extractor = ExtractorAgent(quarantine_dir=os.path.join(self.tmp, "quarantine"))
+        self.source = os.path.join(self.tmp, "in.eml")
+        self.output = os.path.join(self.tmp, "out.eml")
+        with open(self.source, "wb") as f:
+            f.write(_message())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def pages(self, path):
+        return [normalise_page_text(entry["text"]) for entry in self.extractor._read_eml(Path(path))]
+
+    def spans(self, values):
+        found = {}
+        for page, text in enumerate(self.pages(self.source), start=1):
+            for value, entity_type in values:
+                for match in re.finditer(re.escape(value), text):
+                    found.setdefault(page, []).append(PageSpan(match.start(), match.end(), entity_type, value))
+        return found
+
+    def test_pages_follow_headers_and_parts(self):
+        pages = self.pages(self.source)
+        self.assertEqual(len(pages), 3)
+        self.assertTrue(pages[0].startswith("Subject: Rückruf für Jane Roe From: John Smith"))
+        self.assertEqual(pages[1], "Hi, please call Jane Roe at 555-0100.")
+        self.assertEqual(pages[2], "Call Jane Roe & co at 555-0100 mail Jane Roe")
+
+    def test_text_parts_scan_matches_full_parse(self):
+        parser = RFCEmailParser()
+        with open(self.source, "rb") as f:
+            raw = f.read()
+        full, scanned = parser.parse(raw), parser.parse_text_parts(raw)
+        self.assertEqual(scanned.text_parts, full.text_parts)
+        self.assertEqual(scanned.attachments, full.attachments)
+        self.assertEqual(set(scanned.mime_boundaries), set(full.mime_boundaries))
+        self.assertEqual(scanned.headers, full.headers)
+
+    def test_headers_and_text_parts_redacted(self):
+        spans = self.spans([("Jane Roe", "PERSON"), ("john.smith@example.com", "EMAIL_ADDRESS"),
+                            ("555-0100", "PHONE_NUMBER")])
+        report = EmlRedactionWriter().redact(self.source, self.output, spans)
+        self.assertEqual(report["headers_rewritten"], 2)
+        self.assertEqual(report["parts_rewritten"], 2)
+        self.assertEqual(report["unresolved"], {})
+
+        pages = self.pages(self.output)
+        self.assertIn("Subject: Rückruf für [PERSON]", pages[0])
+        self.assertEqual(pages[1], "Hi, please call [PERSON] at [PHONE_NUMBER].")
+        self.assertEqual(pages[2], "Call [PERSON] & co at [PHONE_NUMBER] mail [PERSON]")
+        with open(self.output, "rb") as f:
+            redacted = f.read()
+        # The address only detected in the From header is masked in the link too.
+        self.assertNotIn(b"john.smith@example.com", redacted)
+        self.assertIn(b"&amp; co", redacted)
+
+    def test_attribute_sweep_leaves_markup_alone(self):
+        msg = EmailMessage()
+        msg["Subject"] = "Visit"
+        msg.set_content("Meet at center with Verdana.")
+        msg.add_alternative(
+            '<p align="center" style="font-family: Verdana; text-align: center">Meet at center with '
+            '<span title="Verdana">Verdana</span>.</p><img alt="center" src="center.png">',
+            subtype="html",
+        )
+        with open(self.source, "wb") as f:
+            f.write(msg.as_bytes(policy=policy.SMTP))
+        spans = self.spans([("center", "LOCATION"), ("Verdana", "PERSON")])
+        EmlRedactionWriter().redact(self.source, self.output, spans)
+        html_part = RFCEmailParser().parse_text_parts(open(self.output, "rb").read()).text_parts[1].text
+        self.assertIn('<p align="center" style="font-family: Verdana; text-align: center">', html_part)
+        self.assertIn('<span title="[PERSON]">[PERSON]</span>', html_part)
+        self.assertIn('<img alt="[LOCATION]" src="[LOCATION].png">', html_part)
+        self.assertIn("Meet at [LOCATION] with", html_part)
+
+    def test_attachment_and_boundaries_untouched(self):
+        spans = self.spans([("Jane Roe", "PERSON")])
+        EmlRedactionWriter(masker=fixed_mask).redact(self.source, self.output, spans)
+        with open(self.source, "rb") as f:
+            original = f.read()
+        with open(self.output, "rb") as f:
+            redacted = f.read()
+        boundary = RFCEmailParser().parse(original).raw_message.get_boundary().encode()
+        self.assertEqual(original.count(boundary), redacted.count(boundary))
+        # Everything from the attachment part onwards is the original bytes.
+        tail = original[original.index(b'filename="blob.bin"'):]
+        self.assertTrue(redacted.endswith(tail))
+        attachment = next(RFCEmailParser().parse(redacted).raw_message.iter_attachments())
+        self.assertEqual(attachment.get_content(), _ATTACHMENT)
+
+    def test_no_spans_copies_source(self):
+        report = EmlRedactionWriter().redact(self.source, self.output, {})
+        self.assertEqual(report["parts_rewritten"], 0)
+        with open(self.source, "rb") as a, open(self.output, "rb") as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_unlocated_spans_fail_closed(self):
+        spans = {2: [PageSpan(500, 520, "PERSON", "Missing Person")]}
+        with self.assertRaises(EmlRedactionError):
+            EmlRedactionWriter().redact(self.source, self.output, spans)
+        self.assertFalse(os.path.exists(self.output))
+        self.assertEqual(sorted(os.listdir(self.tmp)), ["in.eml", "quarantine"])
+
+    def test_reconstruct_splices_plain_body(self):
+        parser = RFCEmailParser()
+        with open(self.source, "rb") as f:
+            original = f.read()
+        parsed = parser.parse(original)
+        body = parsed.body_text.replace("Jane Roe", "[PERSON]")
+        rebuilt = parser.reconstruct(parsed, body)
+        self.assertEqual(parser.parse(rebuilt).body_text, body)
+        # Headers before the first boundary are unchanged.
+        head = original[:original.index(b"\r\n\r\n")]
+        self.assertTrue(rebuilt.startswith(head))
+
+
+if __name__ == '__main__':
+    unittest.main()
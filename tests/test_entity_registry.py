@@ -0,0 +1,110 @@
+import unittest
+import sys
+import os
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.entity_registry import EntityRegistry, Occurrence
+from agents.policy_agent import PolicyAgent
+from agents.policy_engine import CompiledRule
+from schemas.internal import Chunk, Entity
+from schemas.rule_schema import NSRLRule
+
+
+def _rule(rule_id, conditions, severity="HIGH", score=0.5):
+    return NSRLRule(**{
+        "id": rule_id,
+        "version": "1.0",
+        "meta": {"name": rule_id, "description": rule_id, "priority": 100},
+        "conditions": conditions,
+        "actions": {"classification": "INTERNAL", "severity": severity, "score": score,
+                    "justification": rule_id},
+    })
+
+
+def _chunk(text, values, page=1, page_offset=0):
+    chunk = Chunk.on_page("doc", " " * page_offset + text, page, page_offset, page_offset + len(text))
+    for entity_type, value, score in values:
+        start = text.index(value)
+        chunk.detected_entities.append(
+            Entity(entity_type, value, start, start + len(value), score, "test", page, page_offset)
+        )
+    return chunk
+
+
+class TestEntityRegistry(unittest.TestCase):
+
+    def test_interns_by_type_and_canonical_value(self):
+        registry = EntityRegistry()
+        registry.add_chunk(_chunk("Call 555-0100 or 5550100", [
+            ("PHONE_NUMBER", "555-0100", 0.6), ("PHONE_NUMBER", "5550100", 0.9),
+        ]))
+        registry.add_chunk(_chunk("JANE DOE met jane doe", [
+            ("PERSON", "JANE DOE", 0.8), ("PERSON", "jane doe", 0.8), ("LOCATION", "jane doe", 0.4),
+        ]))
+        self.assertEqual(len(registry), 3)
+        self.assertEqual(registry.occurrence_count, 5)
+        phone = next(iter(registry))
+        self.assertEqual(phone.text_value, "555-0100")  # first spelling
+        self.assertEqual(phone.score, 0.9)  # highest score
+        self.assertEqual(len(phone.occurrences), 2)
+
+    def test_occurrences_keep_page_offsets(self):
+        registry = EntityRegistry()
+        registry.add_chunk(_chunk("mail a@b.io", [("EMAIL_ADDRESS", "a@b.io", 1.0)], page=2, page_offset=40),
+                           redacted_types={"EMAIL_ADDRESS"})
+        registry.add_chunk(_chunk("a@b.io again", [("EMAIL_ADDRESS", "a@b.io", 1.0)], page=3))
+        entry = next(iter(registry))
+        self.assertEqual([o[1:] for o in entry.occurrences], [(2, 45, 51, True), (3, 0, 6, False)])
+        self.assertIsInstance(entry.first, Occurrence)
+        self.assertTrue(entry.redacted)
+        self.assertEqual(entry.redacted_count, 1)
+
+
+class TestPolicyWithRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.agent = PolicyAgent(rules_dir="tests/does_not_exist")
+        self.agent.rules = [
+            _rule("EMAIL", [{"type": "PII_MATCH", "field": "type", "operator": "EQUALS", "value": "EMAIL_ADDRESS"}],
+                  severity="CRITICAL", score=0.9),
+            _rule("ALICE", [{"type": "PII_MATCH", "field": "value", "operator": "IN_LIST", "value": ["alice"]}]),
+            _rule("LOW-CONF", [{"type": "PII_MATCH", "field": "confidence", "operator": "LESS_THAN", "value": 0.5}],
+                  severity="LOW", score=0.2),
+        ]
+
+    def _chunks(self):
+        values = [("EMAIL_ADDRESS", "a@b.io", 0.9), ("PERSON", "alice", 0.4), ("PERSON", "bob", 0.9)]
+        return [_chunk("a@b.io alice bob", values, page=page) for page in range(1, 6)]
+
+    def test_decisions_match_unregistered_evaluation(self):
+        registry = EntityRegistry()
+        for chunk in self._chunks():
+            plain = self.agent.evaluate_chunk(chunk, "t").decision
+            chunk.decision = None
+            memoised = self.agent.evaluate_chunk(chunk, "t", registry=registry).decision
+            self.assertEqual(memoised.action, plain.action)
+            self.assertEqual(memoised.risk_score, plain.risk_score)
+            self.assertEqual(memoised.justification_trace, plain.justification_trace)
+
+    def test_each_distinct_value_evaluated_once(self):
+        registry = EntityRegistry()
+        with mock.patch.object(CompiledRule, "matches", autospec=True, side_effect=CompiledRule.matches) as matches:
+            for chunk in self._chunks():
+                self.agent.evaluate_chunk(chunk, "t", registry=registry)
+        candidates = self.agent.rule_set.compiled.candidates
+        expected = sum(len(candidates(t)) for t in ("EMAIL_ADDRESS", "PERSON", "PERSON"))
+        self.assertEqual(matches.call_count, expected)
+
+    def test_memo_starts_over_on_rule_change(self):
+        registry = EntityRegistry()
+        chunk = self._chunks()[0]
+        self.assertEqual(self.agent.evaluate_chunk(chunk, "t", registry=registry).decision.action, "Redact")
+        self.agent.rules = []
+        chunk.decision = None
+        self.assertEqual(self.agent.evaluate_chunk(chunk, "t", registry=registry).decision.action, "Allow")
+
+
+if __name__ == '__main__':
+    unittest.main()
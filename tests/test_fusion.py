@@ -1,11 +1,17 @@
 import unittest
 import sys
 import os
+import random
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from agents.fusion_agent import FusionAgent
 from schemas.core_models import DetectedPII
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 class TestFusionAgent(unittest.TestCase):
     
     def setUp(self):
@@ -89,5 +95,37 @@ class TestFusionAgent(unittest.TestCase):
         self.assertEqual(e2.text_value, "John Doe")
         self.assertGreater(e1.score, 0.9)
 
+    @unittest.skipIf(numpy is None, "the numpy fusion backend needs numpy")
+    def test_backends_identical(self):
+        python_agent = FusionAgent(backend="python")
+        numpy_agent = FusionAgent(backend="numpy")
+        rng = random.Random(7)
+        for _ in range(300):
+            span = rng.choice([20, 200, 5000])
+            entities = []
+            for i in range(rng.randint(1, 200)):
+                start = rng.randint(0, span)
+                entities.append(self.create_entity(
+                    str(i), start, start + rng.choice([0, 1, 3, 5, 8, 8, 12]), score=rng.choice([0.5, 0.85, 1.0])
+                ))
+            expected = python_agent.deduplicate_entities(entities)
+            actual = numpy_agent.deduplicate_entities(entities)
+            # Same entities, same order, same tie-breaks.
+            self.assertEqual([id(e) for e in actual], [id(e) for e in expected])
+
+    def test_cross_chunk_picks_boundary_entities_without_sorting(self):
+        from schemas.core_models import ClassifiedChunk
+
+        c1 = ClassifiedChunk(document_id="doc1", processed_text="Hello John", original_text="Hello John",
+                             page_number=1, token_span=(0, 10))
+        c1.detected_entities = [self.create_entity("John", 6, 10), self.create_entity("Hello", 0, 5)]
+        c2 = ClassifiedChunk(document_id="doc1", processed_text="Doe said hi", original_text="Doe said hi",
+                             page_number=1, token_span=(10, 21))
+        c2.detected_entities = [self.create_entity("hi", 9, 11), self.create_entity("Doe", 0, 3)]
+
+        self.agent.fuse_cross_chunks([c1, c2])
+        self.assertEqual([e.text_value for e in c1.detected_entities], ["John Doe", "Hello"])
+        self.assertEqual([e.text_value for e in c2.detected_entities], ["hi", "John Doe"])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.fusion_agent import FusionAgent
+from agents.redaction_agent import RedactionAgent
+from agents.redaction_kernel import entity_mask, page_entity_spans, plan_spans, redact_spans
+from schemas.core_models import AgentDecision, ClassifiedChunk, DetectedPII, GovernedChunk, LocationContext, SemanticChunk
+from schemas.internal import Chunk, Entity, as_chunk
+
+
+class TestInternalModels(unittest.TestCase):
+
+    def _chunk(self):
+        chunk = Chunk("doc1", "Call 555-0100 or mail a@b.co", "Call 555-0100 or mail a@b.co", 2, (40, 68))
+        chunk.detected_entities = [
+            Entity("PHONE_NUMBER", "555-0100", 5, 13, 0.9, "Presidio", 2, 40),
+            Entity("PHONE_NUMBER", "555-01", 5, 11, 0.5, "Presidio", 2, 40),
+            Entity("EMAIL_ADDRESS", "a@b.co", 22, 28, 1.0, "Presidio", 2, 40),
+        ]
+        return chunk
+
+    def test_slots_only(self):
+        chunk = self._chunk()
+        self.assertFalse(hasattr(chunk, "__dict__"))
+        self.assertFalse(hasattr(chunk.detected_entities[0], "__dict__"))
+        with self.assertRaises(AttributeError):
+            chunk.unknown_field = 1
+
+    def test_location_derived_from_page_offset(self):
+        location = self._chunk().detected_entities[2].location
+        self.assertEqual((location.page_number, location.char_start_on_page, location.char_end_on_page), (2, 62, 68))
+        self.assertIsNone(Entity("PERSON", "x", 0, 1, 1.0, "t").location)
+
+    def test_model_round_trip(self):
+        chunk = self._chunk()
+        classified = chunk.to_model()
+        self.assertIsInstance(classified, ClassifiedChunk)
+        self.assertNotIsInstance(classified, GovernedChunk)
+        self.assertEqual(classified.detected_entities[2].location,
+                         LocationContext(page_number=2, char_start_on_page=62, char_end_on_page=68))
+
+        back = Chunk.from_model(classified)
+        self.assertEqual(back.chunk_id, chunk.chunk_id)
+        self.assertEqual(back.detected_entities[2].location.char_start_on_page, 62)
+        self.assertEqual(back.to_model(), classified)
+        self.assertIsInstance(Chunk("d", "t", "t", 1, (0, 1)).to_model(), SemanticChunk)
+
+    def test_as_chunk(self):
+        chunk = self._chunk()
+        self.assertIs(as_chunk(chunk), chunk)
+        model = ClassifiedChunk(
+            document_id="d", processed_text="x", original_text="x", page_number=1, token_span=(0, 1),
+            detected_entities=[DetectedPII(entity_type="PERSON", text_value="x", start_index=0, end_index=1,
+                                           score=1.0, source="t")],
+        )
+        converted = as_chunk(model)
+        self.assertIsInstance(converted, Chunk)
+        self.assertIsInstance(converted.detected_entities[0], Entity)
+
+    def test_stages_update_in_place(self):
+        chunk = self._chunk()
+        fused = FusionAgent().fuse_chunk(chunk)
+        self.assertIs(fused, chunk)
+        self.assertEqual([e.text_value for e in chunk.detected_entities], ["555-0100", "a@b.co"])
+
+        chunk.decision = AgentDecision(
+            trace_id="t", chunk_id=chunk.chunk_id, agent_name="PolicyAgent", action="Redact",
+            risk_score=1.0, justification_trace=[],
+        )
+        redacted = RedactionAgent().redact(chunk)
+        self.assertIs(redacted, chunk)
+        self.assertEqual(chunk.redacted_text, "Call [PHONE_NUMBER] or mail [EMAIL_ADDRESS]")
+        self.assertIsInstance(chunk.to_model(), GovernedChunk)
+        self.assertEqual([(s.start, s.end) for s in page_entity_spans([chunk])[2]], [(45, 53), (62, 68)])
+
+    def test_chunks_view_shared_page_buffer(self):
+        page = "Mail a@b.co now. Call 555-0100 today."
+        first = Chunk.on_page("doc1", page, 1, 0, 16)
+        second = Chunk.on_page("doc1", page, 1, 12, len(page))
+        self.assertEqual(first.processed_text, "Mail a@b.co now.")
+        self.assertEqual(second.original_text, page[12:])
+        self.assertEqual(second.text_length, len(page) - 12)
+        self.assertIs(first._buffer, second._buffer)
+        self.assertEqual(first.to_model().processed_text, "Mail a@b.co now.")
+
+    def test_redacted_text_written_at_assembly(self):
+        page = "Mail a@b.co now. Call 555-0100 today."
+        first = Chunk.on_page("doc1", page, 1, 0, 16)
+        first.detected_entities = [Entity("EMAIL_ADDRESS", "a@b.co", 5, 11, 1.0, "t", 1, 0)]
+        second = Chunk.on_page("doc1", page, 1, 17, len(page))
+        second.detected_entities = [Entity("PHONE_NUMBER", "555-0100", 5, 13, 1.0, "t", 1, 17)]
+        third = Chunk.on_page("doc1", page, 1, 0, 4)
+
+        expected = "\n\n".join(
+            redact_spans(chunk.processed_text, chunk.detected_entities)[0] for chunk in (first, second, third)
+        )
+        parts = []
+        for chunk in (first, second, third):
+            chunk.set_redaction(plan_spans(chunk.text_length, chunk.detected_entities), entity_mask)
+            if parts:
+                parts.append("\n\n")
+            chunk.write_redacted(parts)
+        self.assertEqual("".join(parts), expected)
+        self.assertEqual(first.redacted_text, "Mail [EMAIL_ADDRESS] now.")
+        self.assertEqual(third.redacted_text, "Mail")
+
+        # An explicit text (e.g. from a pydantic model) wins over recorded spans.
+        first.redacted_text = "replaced"
+        parts = []
+        first.write_redacted(parts)
+        self.assertEqual(parts, ["replaced"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import sys
+import os
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.base import NDRAAgent, _AsyncQueueHandler, _JsonFormatter
+from schemas.core_models import DocumentMetadata
+
+
+class _EchoAgent(NDRAAgent):
+    def process(self, input_data, context=None):
+        return input_data
+
+
+class _Unserializable:
+    def __str__(self):
+        raise AssertionError("details must not be formatted while INFO is disabled")
+
+
+class TestStructuredLogEvent(unittest.TestCase):
+    """Tests for NDRAAgent.log_event and the JSON formatter."""
+
+    def setUp(self):
+        self.agent = _EchoAgent("LogTest")
+        self.stream = io.StringIO()
+        self.handler = logging.StreamHandler(self.stream)
+        self.handler.setFormatter(_JsonFormatter())
+        self.agent.logger.addHandler(self.handler)
+        self.agent.logger.propagate = False
+        self.agent.logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        self.agent.logger.removeHandler(self.handler)
+        self.agent.logger.propagate = True
+        self.agent.logger.setLevel(logging.NOTSET)
+
+    def _records(self):
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_fields_emitted_as_structured_json(self):
+        self.agent.log_event("PII_DETECTED", {"chunk_id": "c1", "count": 2, "types": {"EMAIL_ADDRESS"}})
+        record = self._records()[-1]
+        self.assertEqual(record["event"], "PII_DETECTED")
+        self.assertEqual(record["agent"], "LogTest")
+        self.assertEqual(record["details"], {"chunk_id": "c1", "count": 2, "types": ["EMAIL_ADDRESS"]})
+        self.assertEqual(record["message"], "AUDIT_EVENT: PII_DETECTED")
+
+    def test_pydantic_model_dumped_at_format_time(self):
+        meta = DocumentMetadata(filename="a.pdf", file_size_bytes=10, mime_type="application/pdf", sha256_hash="h")
+        self.agent.log_event("DOCUMENT_RECEIVED", meta)
+        details = self._records()[-1]["details"]
+        self.assertEqual(details["filename"], "a.pdf")
+        self.assertEqual(details["file_size_bytes"], 10)
+
+    def test_disabled_level_skips_all_work(self):
+        self.agent.logger.setLevel(logging.WARNING)
+        self.agent.log_event("NOISY", {"value": _Unserializable()})
+        self.assertEqual(self.stream.getvalue(), "")
+
+    def test_async_queue_handler_formats_on_listener(self):
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, self.handler)
+        queue_handler = _AsyncQueueHandler(log_queue)
+        self.agent.logger.removeHandler(self.handler)
+        self.agent.logger.addHandler(queue_handler)
+        listener.start()
+        try:
+            self.agent.log_event("ASYNC_EVENT", {"n": 1})
+        finally:
+            listener.stop()
+            self.agent.logger.removeHandler(queue_handler)
+        record = self._records()[-1]
+        self.assertEqual(record["event"], "ASYNC_EVENT")
+        self.assertEqual(record["details"], {"n": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
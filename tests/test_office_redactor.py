@@ -0,0 +1,214 @@
+import unittest
+import sys
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openpyxl
+from docx import Document
+from pptx import Presentation
+from pptx.util import Inches
+
+from agents.extractor import ExtractorAgent
+from agents.office_redactor import (
+    DocxRedactionWriter,
+    OfficeRedactionError,
+    PptxRedactionWriter,
+    XlsxRedactionWriter,
+)
+from agents.redaction_kernel import PageSpan, fixed_mask, normalise_page_text
+
+_SHARED_STRINGS_WORKBOOK = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Staff" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/worksheets/sheet1.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        '<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c></row>'
+        '<row r="2"><c r="A2" t="s"><v>2</v></c><c r="B2" t="s"><v>3</v></c></row>'
+        "</sheetData></worksheet>"
+    ),
+    "xl/sharedStrings.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="4" uniqueCount="4">'
+        "<si><t>name</t></si><si><t>note</t></si><si><t>Dana Scully</t></si>"
+        '<si><r><t>mail dana</t></r><r><rPr><b/></rPr><t>@fbi.gov today</t></r></si>'
+        "</sst>"
+    ),
+}
+
+
+def _raw_member(path, name):
+    # Compressed bytes of a member, as stored in the package.
+    with zipfile.ZipFile(path) as package, open(path, "rb") as handle:
+        info = package.getinfo(name)
+        handle.seek(info.header_offset)
+        header = handle.read(30)
+        handle.seek(int.from_bytes(header[26:28], "little") + int.from_bytes(header[28:30], "little"), os.SEEK_CUR)
+        return handle.read(info.compress_size)
+
+
+class TestOfficeRedactionWriters(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.extractor = ExtractorAgent(quarantine_dir=os.path.join(self.tmp, "quarantine"))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.tmp, name)
+
+    def spans(self, pages, values):
+        found = {}
+        for entry in pages:
+            text = normalise_page_text(str(entry["text"]))
+            for value, entity_type in values:
+                for match in re.finditer(re.escape(value), text):
+                    found.setdefault(entry["page"], []).append(PageSpan(match.start(), match.end(), entity_type, value))
+        return found
+
+    def test_docx_span_across_runs(self):
+        document = Document()
+        document.add_paragraph("Customer: John Smith")
+        paragraph = document.add_paragraph()
+        paragraph.add_run("Email: john.")
+        paragraph.add_run("smith@example.com").bold = True
+        paragraph.add_run("\tkept")
+        document.save(self.path("in.docx"))
+
+        spans = self.spans(self.extractor._read_docx(Path(self.path("in.docx"))),
+                           [("John Smith", "PERSON"), ("john.smith@example.com", "EMAIL_ADDRESS")])
+        report = DocxRedactionWriter().redact(self.path("in.docx"), self.path("out.docx"), spans)
+        self.assertEqual(report["spans_redacted"], 2)
+        self.assertEqual(report["parts_rewritten"], 1)
+
+        redacted = Document(self.path("out.docx"))
+        self.assertEqual(redacted.paragraphs[0].text, "Customer: [PERSON]")
+        self.assertEqual(redacted.paragraphs[1].text, "Email: [EMAIL_ADDRESS]\tkept")
+        # Runs and their formatting survive.
+        self.assertEqual(len(redacted.paragraphs[1].runs), 3)
+        self.assertTrue(redacted.paragraphs[1].runs[1].bold)
+        # Untouched members keep their compressed bytes.
+        for name in zipfile.ZipFile(self.path("in.docx")).namelist():
+            if name != "word/document.xml":
+                self.assertEqual(_raw_member(self.path("in.docx"), name), _raw_member(self.path("out.docx"), name), name)
+
+    def test_copy_without_zipfile_internals(self):
+        document = Document()
+        document.add_paragraph("Customer: John Smith")
+        document.save(self.path("in.docx"))
+        spans = self.spans(self.extractor._read_docx(Path(self.path("in.docx"))), [("John Smith", "PERSON")])
+        with mock.patch("agents.office_redactor._raw_copy_supported", return_value=False):
+            DocxRedactionWriter().redact(self.path("in.docx"), self.path("out.docx"), spans)
+
+        self.assertEqual(Document(self.path("out.docx")).paragraphs[0].text, "Customer: [PERSON]")
+        # Untouched members are recompressed but keep their content.
+        with zipfile.ZipFile(self.path("in.docx")) as source, zipfile.ZipFile(self.path("out.docx")) as output:
+            self.assertIsNone(output.testzip())
+            self.assertEqual(source.namelist(), output.namelist())
+            for name in source.namelist():
+                if name != "word/document.xml":
+                    self.assertEqual(source.read(name), output.read(name), name)
+
+    def test_pptx_pages_are_slides(self):
+        presentation = Presentation()
+        first = presentation.slides.add_slide(presentation.slide_layouts[5])
+        first.shapes.title.text = "Title"
+        first.shapes.add_textbox(Inches(1), Inches(2), Inches(4), Inches(1)).text_frame.text = "Call Alice Jones"
+        second = presentation.slides.add_slide(presentation.slide_layouts[5])
+        second.shapes.title.text = "SSN 123-45-6789"
+        presentation.save(self.path("in.pptx"))
+
+        spans = self.spans(self.extractor._read_pptx(Path(self.path("in.pptx"))),
+                           [("Alice Jones", "PERSON"), ("123-45-6789", "US_SSN")])
+        report = PptxRedactionWriter(masker=fixed_mask).redact(self.path("in.pptx"), self.path("out.pptx"), spans)
+        self.assertEqual(report["spans_redacted"], 2)
+        self.assertEqual(report["parts_rewritten"], 2)
+
+        texts = [entry["text"] for entry in self.extractor._read_pptx(Path(self.path("out.pptx")))]
+        self.assertEqual(texts, ["Title\nCall [REDACTED]", "SSN [REDACTED]"])
+
+    def test_xlsx_cells_and_numbers(self):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(["name", "ssn"])
+        sheet.append(["Bob Brown", 123456789])
+        sheet.append(["Keep", 1])
+        workbook.create_sheet("Other").append(["Bob Brown stays here"])
+        workbook.save(self.path("in.xlsx"))
+
+        spans = self.spans(self.extractor._read_excel(Path(self.path("in.xlsx"))),
+                           [("Bob Brown", "PERSON"), ("123456789", "US_SSN")])
+        self.assertEqual(sorted(spans), [1, 2])
+        report = XlsxRedactionWriter().redact(self.path("in.xlsx"), self.path("out.xlsx"), {1: spans[1]})
+        self.assertEqual(report["spans_redacted"], 2)
+
+        redacted = openpyxl.load_workbook(self.path("out.xlsx"))
+        rows = [[cell.value for cell in row] for row in redacted.worksheets[0].iter_rows()]
+        self.assertEqual(rows, [["name", "ssn"], ["[PERSON]", "[US_SSN]"], ["Keep", 1]])
+        # Only the first sheet had spans.
+        self.assertEqual(redacted.worksheets[1]["A1"].value, "Bob Brown stays here")
+
+    def test_xlsx_shared_strings(self):
+        with zipfile.ZipFile(self.path("in.xlsx"), "w", zipfile.ZIP_DEFLATED) as package:
+            for name, data in _SHARED_STRINGS_WORKBOOK.items():
+                package.writestr(name, data)
+        spans = {1: [PageSpan(0, 0, "PERSON", "Dana Scully"), PageSpan(0, 0, "EMAIL_ADDRESS", "dana@fbi.gov")]}
+        report = XlsxRedactionWriter().redact(self.path("in.xlsx"), self.path("out.xlsx"), spans)
+        self.assertEqual(report["parts_rewritten"], 1)
+        self.assertEqual(report["unresolved"], {})
+
+        sheet = openpyxl.load_workbook(self.path("out.xlsx")).active
+        self.assertEqual(sheet["A2"].value, "[PERSON]")
+        # The match crossed two rich-text runs.
+        self.assertEqual(sheet["B2"].value, "mail [EMAIL_ADDRESS] today")
+
+    def test_unlocated_values_fail_closed(self):
+        workbook = openpyxl.Workbook()
+        workbook.active.append(["nothing here"])
+        workbook.save(self.path("in.xlsx"))
+        spans = {1: [PageSpan(0, 0, "PERSON", "Missing Person")]}
+        with self.assertRaises(OfficeRedactionError):
+            XlsxRedactionWriter().redact(self.path("in.xlsx"), self.path("out.xlsx"), spans)
+        self.assertFalse(os.path.exists(self.path("out.xlsx")))
+        # No temporary package is left behind either.
+        self.assertEqual(sorted(os.listdir(self.tmp)), ["in.xlsx", "quarantine"])
+
+
+if __name__ == '__main__':
+    unittest.main()
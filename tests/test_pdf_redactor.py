@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+import re
+import shutil
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pypdf import PdfReader
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from agents.pdf_redactor import PdfRedactionError, PdfRedactionWriter, page_spans
+from schemas.core_models import AgentDecision, DetectedPII, GovernedChunk, LocationContext
+
+
+def _page_text(reader, index):
+    return re.sub(r"\s+", " ", reader.pages[index].extract_text() or "").strip()
+
+
+class TestPdfRedactionWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmp, "source.pdf")
+        self.output = os.path.join(self.tmp, "redacted.pdf")
+        pdf = canvas.Canvas(self.source, pagesize=letter)
+        pdf.drawString(72, 720, "Customer: John Smith")
+        pdf.drawString(72, 700, "Email: john.smith@example.com")
+        pdf.showPage()
+        pdf.drawString(72, 720, "Second page stays intact.")
+        pdf.showPage()
+        pdf.save()
+        self.text = _page_text(PdfReader(self.source), 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def span_of(self, value):
+        start = self.text.index(value)
+        return start, start + len(value)
+
+    def test_redacts_span_and_keeps_other_text(self):
+        report = PdfRedactionWriter().redact(self.source, self.output, {1: [self.span_of("John Smith")]})
+        self.assertEqual(report["pages_redacted"], 1)
+        self.assertEqual(report["glyphs_removed"], len("JohnSmith"))
+        self.assertEqual(report["unresolved"], {})
+
+        reader = PdfReader(self.output, strict=True)
+        self.assertEqual(len(reader.pages), 2)
+        redacted = _page_text(reader, 0)
+        self.assertNotIn("John Smith", redacted)
+        self.assertIn("Customer:", redacted)
+        self.assertIn("john.smith@example.com", redacted)
+        self.assertEqual(_page_text(reader, 1), "Second page stays intact.")
+
+    def test_no_spans_copies_pages(self):
+        report = PdfRedactionWriter().redact(self.source, self.output, {})
+        self.assertEqual(report["pages_redacted"], 0)
+        self.assertEqual(_page_text(PdfReader(self.output), 0), self.text)
+
+    def test_unresolved_span_fails_closed(self):
+        spans = {1: [(len(self.text) + 10, len(self.text) + 20)]}
+        with self.assertRaises(PdfRedactionError):
+            PdfRedactionWriter().redact(self.source, self.output, spans)
+        self.assertFalse(os.path.exists(self.output))
+
+        report = PdfRedactionWriter(fail_closed=False).redact(self.source, self.output, spans)
+        self.assertIn(1, report["unresolved"])
+        self.assertTrue(os.path.exists(self.output))
+
+
+class TestPageSpans(unittest.TestCase):
+
+    def create_chunk(self, chunk_id, action, entities):
+        decision = AgentDecision(
+            trace_id="test", chunk_id=chunk_id, agent_name="Policy", action=action,
+            risk_score=0.0, justification_trace=[]
+        )
+        return GovernedChunk(
+            chunk_id=chunk_id, document_id="doc1", processed_text="x", original_text="x",
+            page_number=2, token_span=(100, 200), detected_entities=entities,
+            redacted_text="", decision=decision
+        )
+
+    def test_spans_follow_decisions_and_locations(self):
+        located = DetectedPII(
+            entity_type="PERSON", text_value="John", start_index=0, end_index=4, score=0.9, source="t",
+            location=LocationContext(page_number=3, char_start_on_page=40, char_end_on_page=44)
+        )
+        relative = DetectedPII(
+            entity_type="EMAIL_ADDRESS", text_value="a@b.io", start_index=5, end_index=11, score=0.9, source="t"
+        )
+        chunks = [
+            self.create_chunk("c1", "Redact", [located, relative]),
+            self.create_chunk("c2", "Allow", [relative]),
+        ]
+        self.assertEqual(page_spans(chunks), {3: [(40, 44)], 2: [(105, 111)]})
+        self.assertEqual(page_spans(chunks, {"c2": {"EMAIL_ADDRESS"}}), {2: [(105, 111)]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,11 +4,17 @@ import os
 import shutil
 import tempfile
 import yaml
+from unittest import mock
 
 # Fix path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from agents.policy_agent import PolicyAgent
+from agents.policy_engine import CompiledRuleSet
+from agents.rule_sets import TenantOverlayCache, load_rule_set
+from agents.rule_snapshot import RuleSetSnapshotStore
+from agents.rule_testing import RuleProfiler, check_case, run_rule_tests
+from agents.rule_integrity import IntegrityError, IntegrityPolicy, ManifestVerifier, render_manifest_checksums
 from agents.audit import AuditAgent
 from schemas.core_models import ClassifiedChunk, DetectedPII
 from schemas.rule_schema import NSRLRule
@@ -260,6 +266,473 @@ class TestPolicyAgentEvaluateDocument(unittest.TestCase):
         self.assertEqual(snap["pii_total_count"], 1)
         self.assertTrue(snap["has_gov_id"])
         self.assertFalse(snap["has_financial_data"])
+        self.assertEqual(snap["entity_type_counts"], {"US_SSN": 1})
+
+    def _install_mixed_rule(self):
+        # Fires when a high-confidence SSN appears in a document with financial data.
+        mixed = NSRLRule(**{
+            "id": "TEST-MIXED-001",
+            "version": "1.0",
+            "meta": {"name": "Mixed", "description": "SSN + finance", "priority": 100},
+            "conditions": [
+                {"type": "PII_MATCH", "field": "type", "operator": "EQUALS", "value": "US_SSN"},
+                {"type": "PII_MATCH", "field": "confidence", "operator": "GREATER_THAN", "value": 0.8},
+                {"type": "CONTEXT_MATCH", "field": "has_financial_data", "operator": "EQUALS", "value": True},
+            ],
+            "actions": {"classification": "RESTRICTED", "severity": "HIGH", "score": 0.9},
+        })
+        self.agent.rules = self.agent.rules + [mixed]
+
+    def test_mixed_rule_requires_entity_and_context(self):
+        self._install_mixed_rule()
+        result = self.agent.evaluate_document([self._make_chunk(["US_SSN"])], trace_id="t7")
+        self.assertNotIn("TEST-MIXED-001", result["rules_fired"])
+        result = self.agent.evaluate_document([self._make_chunk(["CREDIT_CARD"])], trace_id="t8")
+        self.assertNotIn("TEST-MIXED-001", result["rules_fired"])
+        result = self.agent.evaluate_document(
+            [self._make_chunk(["US_SSN"]), self._make_chunk(["CREDIT_CARD"])], trace_id="t9"
+        )
+        self.assertIn("TEST-MIXED-001", result["rules_fired"])
+
+    def test_incremental_context_matches_batch(self):
+        self._install_mixed_rule()
+        chunks = [
+            self._make_chunk(["US_SSN", "EMAIL_ADDRESS"]),
+            self._make_chunk(["CREDIT_CARD"]),
+            self._make_chunk(["EMAIL_ADDRESS", "PHONE_NUMBER"]),
+        ]
+        context = self.agent.new_document_context()
+        for chunk in chunks:
+            context.add_chunk(chunk)
+        streamed = self.agent.evaluate_document(trace_id="t10", context=context)
+        batch = self.agent.evaluate_document(chunks, trace_id="t10")
+        self.assertEqual(streamed, batch)
+        self.assertEqual(
+            streamed["rules_fired"], ["TEST-CTX-DENSITY-001", "TEST-CTX-TOXIC-001", "TEST-MIXED-001"]
+        )
+
+
+class TestCompiledRuleSet(unittest.TestCase):
+    """The compiled, type-indexed engine must agree with _check_conditions."""
+
+    def _rule(self, rule_id, priority, conditions, severity="HIGH", score=0.5):
+        return NSRLRule(**{
+            "id": rule_id,
+            "version": "1.0",
+            "meta": {"name": rule_id, "description": rule_id, "priority": priority},
+            "conditions": conditions,
+            "actions": {"classification": "INTERNAL", "severity": severity, "score": score},
+        })
+
+    def _pii(self, field, operator, value):
+        return {"type": "PII_MATCH", "field": field, "operator": operator, "value": value}
+
+    def setUp(self):
+        self.agent = PolicyAgent(rules_dir="tests/does_not_exist")
+        self.agent.rules = [
+            self._rule("EQ", 100, [self._pii("type", "EQUALS", "EMAIL_ADDRESS")]),
+            self._rule("EQ-CONF", 90, [
+                self._pii("type", "EQUALS", "PERSON"),
+                self._pii("confidence", "GREATER_THAN", 0.8),
+            ]),
+            self._rule("IN", 80, [self._pii("type", "IN_LIST", ["PERSON", "US_SSN"])]),
+            self._rule("LOW-CONF", 70, [self._pii("confidence", "LESS_THAN_OR_EQUALS", 0.3)]),
+            self._rule("VALUE", 60, [self._pii("value", "IN_LIST", ["alice", "bob"])]),
+            self._rule("BAD-FIELD", 50, [self._pii("colour", "EQUALS", "red")]),
+            self._rule("BAD-OP", 40, [self._pii("type", "MATCHES", "PERSON")]),
+            self._rule("MIXED", 30, [
+                self._pii("type", "EQUALS", "US_SSN"),
+                {"type": "CONTEXT_MATCH", "field": "has_gov_id", "operator": "EQUALS", "value": True},
+            ]),
+            self._rule("NO-CONDITIONS", 10, []),
+        ]
+
+    def test_matches_interpreted_evaluator(self):
+        for entity_type in ("EMAIL_ADDRESS", "PERSON", "US_SSN", "UNKNOWN"):
+            for score in (0.1, 0.3, 0.5, 0.9):
+                for value in ("alice", "carol"):
+                    entity = DetectedPII(
+                        entity_type=entity_type, text_value=value,
+                        start_index=0, end_index=len(value), score=score, source="test",
+                    )
+                    expected = [r.id for r in self.agent.rules if self.agent._check_conditions(entity, r)]
+                    actual = [r.id for r in self.agent.rule_set.compiled.matching_rules(entity)]
+                    self.assertEqual(actual, expected, (entity_type, score, value))
+
+    def test_candidates_limited_to_entity_type(self):
+        ids = [c.rule.id for c in self.agent.rule_set.compiled.candidates("EMAIL_ADDRESS")]
+        self.assertEqual(ids, ["EQ", "LOW-CONF", "VALUE", "NO-CONDITIONS"])
+        ids = [c.rule.id for c in self.agent.rule_set.compiled.candidates("UNKNOWN")]
+        self.assertEqual(ids, ["LOW-CONF", "VALUE", "NO-CONDITIONS"])
+
+    def test_context_rules_exclude_mixed(self):
+        rule = self._rule("CTX", 5, [
+            {"type": "CONTEXT_MATCH", "field": "has_gov_id", "operator": "EQUALS", "value": True},
+        ])
+        compiled = CompiledRuleSet(self.agent.rules + [rule])
+        self.assertEqual([r.id for r in compiled.context_rules], ["CTX"])
+        self.assertEqual([r.rule.id for r in compiled.mixed_rules], ["MIXED"])
+
+    def test_context_predicates_match_interpreted_evaluator(self):
+        def ctx(field, operator, value):
+            return {"type": "CONTEXT_MATCH", "field": field, "operator": operator, "value": value}
+
+        rules = [
+            self._rule("GT", 50, [ctx("pii_total_count", "GREATER_THAN", 2)]),
+            self._rule("LE", 40, [ctx("pii_total_count", "LESS_THAN_OR_EQUALS", 2)]),
+            self._rule("IN", 30, [ctx("jurisdiction", "IN_LIST", ["EU", "UK"])]),
+            self._rule("EQ-AND", 20, [ctx("has_gov_id", "EQUALS", True), ctx("jurisdiction", "EQUALS", "EU")]),
+            self._rule("BAD-OP", 10, [ctx("has_gov_id", "MATCHES", True)]),
+        ]
+        compiled = CompiledRuleSet(rules)
+        for count in (0, 2, 3):
+            for jurisdiction in (None, "EU", "US"):
+                for has_gov_id in (True, False):
+                    snapshot = {"pii_total_count": count, "jurisdiction": jurisdiction, "has_gov_id": has_gov_id}
+                    expected = [r.id for r in rules if self.agent._check_context_conditions(snapshot, r)]
+                    actual = [d.rule.id for d in compiled.document_rules if d.matches_context(snapshot)]
+                    self.assertEqual(actual, expected, snapshot)
+
+
+class TestRuleSetHotReload(unittest.TestCase):
+    """Tests for versioned rule sets and atomic reload."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.rules_dir = os.path.join(self.temp_dir.name, "rules")
+        os.makedirs(self.rules_dir)
+        self.rule_file = os.path.join(self.rules_dir, "test.yml")
+        self._write_rule("HOT-001", "ENTITY_A")
+        self.agent = PolicyAgent(rules_dir=self.rules_dir, hot_reload=False)
+
+    def tearDown(self):
+        self.agent.close()
+        self.temp_dir.cleanup()
+
+    def _write_rule(self, rule_id, entity_type):
+        rule = [{
+            "id": rule_id,
+            "version": "1.0",
+            "meta": {"name": rule_id, "description": rule_id, "priority": 10},
+            "conditions": [{"type": "PII_MATCH", "field": "type", "operator": "EQUALS", "value": entity_type}],
+            "actions": {"classification": "RESTRICTED", "severity": "HIGH", "score": 0.9},
+        }]
+        with open(self.rule_file, "w") as f:
+            yaml.dump(rule, f)
+        # Make the change visible to the mtime/size fingerprint.
+        stat = os.stat(self.rule_file)
+        os.utime(self.rule_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_unchanged_files_do_not_reload(self):
+        version = self.agent.rule_set_version
+        self.assertFalse(self.agent.reload_rules())
+        self.assertEqual(self.agent.rule_set_version, version)
+
+    def test_reload_swaps_in_new_version(self):
+        old_set = self.agent.rule_set
+        self._write_rule("HOT-002", "ENTITY_B")
+        self.assertTrue(self.agent.reload_rules())
+        self.assertNotEqual(self.agent.rule_set_version, old_set.version)
+        self.assertEqual([r.id for r in self.agent.rules], ["HOT-002"])
+        # Snapshots taken before the swap are untouched.
+        self.assertEqual([r.id for r in old_set.rules], ["HOT-001"])
+
+    def test_invalid_rule_file_keeps_active_set(self):
+        version = self.agent.rule_set_version
+        with open(self.rule_file, "w") as f:
+            f.write("- id: BROKEN\n  conditions: [\n")
+        self.assertFalse(self.agent.reload_rules(force=True))
+        self.assertEqual(self.agent.rule_set_version, version)
+        self.assertEqual([r.id for r in self.agent.rules], ["HOT-001"])
+
+    def test_version_is_content_hash(self):
+        other = PolicyAgent(rules_dir=self.rules_dir, hot_reload=False)
+        self.assertEqual(other.rule_set_version, self.agent.rule_set_version)
+
+
+class TestRuleSetSnapshot(unittest.TestCase):
+    """Tests for precompiled rule-set snapshots."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.rules_dir = os.path.join(self.temp_dir.name, "rules")
+        os.makedirs(self.rules_dir)
+        self.rule_file = os.path.join(self.rules_dir, "test.yml")
+        self._write_rules("ENTITY_A")
+        self.store = RuleSetSnapshotStore(os.path.join(self.temp_dir.name, "snapshots"), "test-snapshot-key")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write_rules(self, entity_type):
+        rules = [{
+            "id": f"SNAP-{i}",
+            "version": "1.0",
+            "meta": {"name": "snap", "description": "snap", "priority": i, "tags": ["t"]},
+            "conditions": [
+                {"type": "PII_MATCH", "field": "type", "operator": "IN_LIST", "value": [entity_type, "X"]},
+                {"type": "PII_MATCH", "field": "confidence", "operator": "GREATER_THAN", "value": 0.5},
+            ],
+            "actions": {"classification": "RESTRICTED", "severity": "HIGH", "score": 0.9, "justification": "j"},
+        } for i in range(3)]
+        with open(self.rule_file, "w") as f:
+            yaml.dump(rules, f)
+
+    def test_snapshot_hit_skips_yaml(self):
+        fresh = load_rule_set(self.rules_dir, snapshots=self.store)
+        with mock.patch("agents.rule_sets.yaml.load", side_effect=AssertionError("YAML parsed")):
+            cached = load_rule_set(self.rules_dir, snapshots=self.store)
+        self.assertEqual(cached.version, fresh.version)
+        self.assertEqual([r.model_dump() for r in cached.rules], [r.model_dump() for r in fresh.rules])
+        entity = DetectedPII(entity_type="ENTITY_A", text_value="v", start_index=0, end_index=1, score=0.9, source="t")
+        self.assertEqual(
+            [r.id for r in cached.compiled.matching_rules(entity)], ["SNAP-2", "SNAP-1", "SNAP-0"]
+        )
+
+    def test_changed_source_is_reparsed(self):
+        load_rule_set(self.rules_dir, snapshots=self.store)
+        self._write_rules("ENTITY_B")
+        rule_set = load_rule_set(self.rules_dir, snapshots=self.store)
+        self.assertEqual(rule_set.rules[0].conditions[0].value, ["ENTITY_B", "X"])
+
+    def test_corrupt_snapshot_falls_back_to_yaml(self):
+        fresh = load_rule_set(self.rules_dir, snapshots=self.store)
+        (path,) = [os.path.join(self.store.directory, n) for n in os.listdir(self.store.directory)]
+        with open(path, "r+b") as f:
+            f.seek(-4, os.SEEK_END)
+            f.write(b"\0\0\0\0")
+        rule_set = load_rule_set(self.rules_dir, snapshots=self.store)
+        self.assertEqual(rule_set.version, fresh.version)
+        self.assertEqual(len(rule_set.rules), 3)
+
+    def test_forged_snapshot_is_ignored(self):
+        fresh = load_rule_set(self.rules_dir, snapshots=self.store)
+        (name,) = os.listdir(self.store.directory)
+        # Someone who can write the directory but lacks the key swaps the rules.
+        forger = RuleSetSnapshotStore(self.store.directory, "attacker-key")
+        forger.save(name[len("ruleset-"):-len(".snap")], [])
+        with self.assertLogs("agents.rule_snapshot", "WARNING"):
+            rule_set = load_rule_set(self.rules_dir, snapshots=self.store)
+        self.assertEqual(rule_set.version, fresh.version)
+        self.assertEqual(len(rule_set.rules), 3)
+
+    def test_failed_file_is_not_snapshotted(self):
+        with open(os.path.join(self.rules_dir, "broken.yml"), "w") as f:
+            f.write("- id: BROKEN\n")
+        load_rule_set(self.rules_dir, snapshots=self.store)
+        self.assertFalse(os.path.exists(self.store.directory) and os.listdir(self.store.directory))
+
+
+class TestTenantOverlays(unittest.TestCase):
+    """Tests for per-tenant policy overlays over the shared base rules."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.rules_dir = os.path.join(self.temp_dir.name, "rules")
+        os.makedirs(self.rules_dir)
+        base = [self._rule("BASE-EMAIL", 50, "EMAIL_ADDRESS"), self._rule("BASE-SSN", 90, "US_SSN")]
+        tenants = {"tenants": {
+            "acme": {
+                "disable": ["BASE-SSN"],
+                "rules": [self._rule("BASE-EMAIL", 50, "EMAIL_ADDRESS", score=0.95), self._rule("ACME-ID", 70, "EMPLOYEE_ID")],
+            },
+            "globex": {"rules": [self._rule("GLOBEX-ID", 10, "EMAIL_ADDRESS")]},
+        }}
+        with open(os.path.join(self.rules_dir, "base.yml"), "w") as f:
+            yaml.dump(base, f)
+        with open(os.path.join(self.rules_dir, "tenant_overrides.yml"), "w") as f:
+            yaml.dump(tenants, f)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def _rule(rule_id, priority, entity_type, score=0.5):
+        return {
+            "id": rule_id,
+            "version": "1.0",
+            "meta": {"name": rule_id, "description": rule_id, "priority": priority},
+            "conditions": [{"type": "PII_MATCH", "field": "type", "operator": "EQUALS", "value": entity_type}],
+            "actions": {"classification": "INTERNAL", "severity": "HIGH", "score": score},
+        }
+
+    @staticmethod
+    def _entity(entity_type):
+        return DetectedPII(entity_type=entity_type, text_value="v", start_index=0, end_index=1, score=0.9, source="t")
+
+    def _matching(self, compiled, entity_type):
+        return [(r.id, r.actions.score) for r in compiled.matching_rules(self._entity(entity_type))]
+
+    def test_overlay_replaces_disables_and_adds(self):
+        rule_set = load_rule_set(self.rules_dir)
+        self.assertEqual([r.id for r in rule_set.rules], ["BASE-SSN", "BASE-EMAIL"])
+        acme = TenantOverlayCache().get(rule_set, "acme")
+        self.assertEqual(self._matching(acme, "EMAIL_ADDRESS"), [("BASE-EMAIL", 0.95)])
+        self.assertEqual(self._matching(acme, "US_SSN"), [])
+        self.assertEqual(self._matching(acme, "EMPLOYEE_ID"), [("ACME-ID", 0.5)])
+        # The base set is untouched.
+        self.assertEqual(self._matching(rule_set.compiled, "EMAIL_ADDRESS"), [("BASE-EMAIL", 0.5)])
+        self.assertEqual(self._matching(rule_set.compiled, "EMPLOYEE_ID"), [])
+
+    def test_unknown_tenant_uses_base(self):
+        rule_set = load_rule_set(self.rules_dir)
+        cache = TenantOverlayCache()
+        self.assertIs(cache.get(rule_set, None), rule_set.compiled)
+        self.assertIs(cache.get(rule_set, "initech"), rule_set.compiled)
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_eviction(self):
+        rule_set = load_rule_set(self.rules_dir)
+        cache = TenantOverlayCache(capacity=1)
+        acme = cache.get(rule_set, "acme")
+        self.assertIs(cache.get(rule_set, "acme"), acme)
+        cache.get(rule_set, "globex")
+        self.assertEqual(len(cache), 1)
+        self.assertIsNot(cache.get(rule_set, "acme"), acme)
+
+    def test_tenants_survive_snapshot(self):
+        store = RuleSetSnapshotStore(os.path.join(self.temp_dir.name, "snapshots"), "test-snapshot-key")
+        load_rule_set(self.rules_dir, snapshots=store)
+        with mock.patch("agents.rule_sets.yaml.load", side_effect=AssertionError("YAML parsed")):
+            rule_set = load_rule_set(self.rules_dir, snapshots=store)
+        self.assertEqual(sorted(rule_set.tenants), ["acme", "globex"])
+        self.assertEqual(rule_set.tenants["acme"].disabled, frozenset({"BASE-SSN"}))
+        acme = TenantOverlayCache().get(rule_set, "acme")
+        self.assertEqual(self._matching(acme, "EMAIL_ADDRESS"), [("BASE-EMAIL", 0.95)])
+
+    def test_agent_evaluates_per_tenant(self):
+        agent = PolicyAgent(rules_dir=self.rules_dir, hot_reload=False)
+        entity = self._entity("US_SSN")
+        chunk = ClassifiedChunk(
+            chunk_id="c1", document_id="d1", processed_text="v", original_text="v",
+            page_number=1, token_span=(0, 1), detected_entities=[entity],
+        )
+
+        def fired(tenant_id):
+            return " ".join(agent.evaluate_chunk(chunk, tenant_id=tenant_id).decision.justification_trace)
+
+        self.assertIn("BASE-SSN", fired("globex"))
+        self.assertNotIn("BASE-SSN", fired("acme"))
+        context = agent.new_document_context(tenant_id="acme")
+        self.assertEqual(context.rule_set_version, agent.rule_set_version)
+
+
+class TestManifestIntegrity(unittest.TestCase):
+    """Tests for the integrity_checks.yml manifest checksum enforcement."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        for sub in ("rules", "meta", "security"):
+            os.makedirs(os.path.join(self.root, sub))
+        with open(os.path.join(self.root, "security", "integrity_checks.yml"), "w") as f:
+            yaml.dump({
+                "policy": {"enforcement_mode": "FAIL_CLOSED"},
+                "checksums": {"algorithm": "sha256", "manifest_path": "meta/policy_manifest.yml",
+                              "enforce_strict_mode": True},
+                "validation_events": ["ON_ENGINE_START", "ON_CONFIG_RELOAD"],
+            }, f)
+        self.modules = []
+        for name in ("a", "b", "c"):
+            self._write_rules(f"rules/{name}.yml", f"INT-{name}")
+            self.modules.append(f"rules/{name}.yml")
+        self._write_manifest()
+        self.policy = IntegrityPolicy.load(os.path.join(self.root, "security", "integrity_checks.yml"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write_rules(self, rel, rule_id):
+        with open(os.path.join(self.root, rel), "w") as f:
+            yaml.dump([{
+                "id": rule_id,
+                "version": "1.0",
+                "meta": {"name": rule_id, "description": rule_id},
+                "conditions": [{"type": "PII_MATCH", "field": "type", "operator": "EQUALS", "value": "X"}],
+                "actions": {"classification": "INTERNAL", "severity": "LOW", "score": 0.1},
+            }], f)
+
+    def _write_manifest(self):
+        with open(os.path.join(self.root, "meta", "policy_manifest.yml"), "w") as f:
+            yaml.dump({"active_modules": self.modules}, f)
+        policy = IntegrityPolicy.load(os.path.join(self.root, "security", "integrity_checks.yml"))
+        text = render_manifest_checksums(self.root, policy)
+        with open(os.path.join(self.root, "meta", "policy_manifest.yml"), "w") as f:
+            f.write(text)
+
+    def test_verified_manifest_loads(self):
+        agent = PolicyAgent(rules_dir=os.path.join(self.root, "rules"), hot_reload=False)
+        self.assertEqual(len(agent.rules), 3)
+
+    def test_tampered_rule_file_fails_closed(self):
+        self._write_rules("rules/b.yml", "INT-TAMPERED")
+        with self.assertRaises(IntegrityError):
+            PolicyAgent(rules_dir=os.path.join(self.root, "rules"), hot_reload=False)
+
+    def test_orphan_rule_file_rejected(self):
+        self._write_rules("rules/orphan.yml", "INT-ORPHAN")
+        report = ManifestVerifier(self.root, self.policy).verify(os.path.join(self.root, "rules"))
+        self.assertFalse(report["valid"])
+        self.assertIn("Orphan rule file not in manifest: rules/orphan.yml", report["errors"])
+
+    def test_digest_cache_rehashes_only_changed_files(self):
+        verifier = ManifestVerifier(self.root, self.policy, max_workers=4)
+        rules_dir = os.path.join(self.root, "rules")
+        first = verifier.verify(rules_dir)
+        self.assertEqual((first["hashed"], first["cached"]), (3, 0))
+        second = verifier.verify(rules_dir)
+        self.assertEqual((second["hashed"], second["cached"]), (0, 3))
+
+        self._write_rules("rules/c.yml", "INT-c2")
+        self._write_manifest()
+        third = verifier.verify(rules_dir)
+        self.assertTrue(third["valid"])
+        self.assertEqual((third["hashed"], third["cached"]), (1, 2))
+
+    def test_reload_rejected_on_checksum_mismatch(self):
+        agent = PolicyAgent(rules_dir=os.path.join(self.root, "rules"), hot_reload=False)
+        version = agent.rule_set_version
+        self._write_rules("rules/a.yml", "INT-UNAPPROVED")
+        self.assertFalse(agent.reload_rules(force=True))
+        self.assertEqual(agent.rule_set_version, version)
+
+
+class TestNSRLRuleTests(unittest.TestCase):
+    """The nsrl/tests cases run against the shipped rules, plus the profiler."""
+
+    def setUp(self):
+        self.agent = PolicyAgent(hot_reload=False)
+
+    def test_shipped_cases_pass(self):
+        summary = run_rule_tests(self.agent, "nsrl/tests")
+        self.assertGreater(summary["total"], 0)
+        failed = [(r["name"], r["failures"]) for r in summary["results"] if not r["passed"]]
+        self.assertEqual(failed, [])
+
+    def test_check_case_reports_mismatches(self):
+        actual = {"matched_rules": ["A"], "severity": "HIGH", "classification": "RESTRICTED"}
+        self.assertEqual(check_case({"matched_rules": ["A"], "severity": "HIGH"}, actual), [])
+        failures = check_case({"matched_rules": ["B"], "severity": "CRITICAL"}, actual)
+        self.assertEqual(len(failures), 2)
+
+    def test_profiler_counts_and_exports(self):
+        self.agent.profiler = RuleProfiler()
+        run_rule_tests(self.agent, "nsrl/tests")
+        rows = {row["rule_id"]: row for row in self.agent.profiler.report(r.id for r in self.agent.rules)}
+        high = rows["GOV-US-SSN-HIGH-001"]
+        self.assertGreater(high["evaluations"], 0)
+        self.assertGreater(high["matches"], 0)
+        self.assertLessEqual(high["matches"], high["evaluations"])
+        # Rules the workload never reached are reported with zero counts.
+        self.assertEqual(rows["PII-EMAIL-001"]["evaluations"], 0)
+
+        families = {f.name: f for f in self.agent.profiler.collect()}
+        samples = {
+            s.labels["rule_id"]: s.value
+            for s in families["ndrapii_rule_evaluations"].samples
+            if s.name.endswith("_total")
+        }
+        self.assertEqual(samples["GOV-US-SSN-HIGH-001"], high["evaluations"])
 
 
 class TestAuditVerifyChain(unittest.TestCase):
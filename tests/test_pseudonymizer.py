@@ -0,0 +1,77 @@
+import unittest
+import sys
+import os
+import re
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.pseudonymizer import Pseudonymizer, luhn_check_digit, verhoeff_check_digit
+from agents.redaction_kernel import MASKERS, redact_spans
+from schemas.core_models import DetectedPII
+
+
+class TestPseudonymizer(unittest.TestCase):
+
+    def setUp(self):
+        self.pseudonymizer = Pseudonymizer(b"test-key", cache_size=8)
+
+    def test_deterministic_per_key(self):
+        token = self.pseudonymizer("US_SSN", "123-45-6789")
+        self.assertEqual(Pseudonymizer(b"test-key")("US_SSN", "123-45-6789"), token)
+        self.assertNotEqual(Pseudonymizer(b"other-key")("US_SSN", "123-45-6789"), token)
+        self.assertNotEqual(token, "123-45-6789")
+
+    def test_format_preserved(self):
+        self.assertRegex(self.pseudonymizer("US_SSN", "123-45-6789"), r"^\d{3}-\d{2}-\d{4}$")
+        self.assertRegex(self.pseudonymizer("PERSON", "John Smith"), r"^[A-Z][a-z]{3} [A-Z][a-z]{4}$")
+        self.assertRegex(
+            self.pseudonymizer("EMAIL_ADDRESS", "jane.doe@example.com"), r"^[a-z]{4}\.[a-z]{3}@[a-z]{7}\.[a-z]{3}$"
+        )
+
+    def test_separators_and_case_share_a_token(self):
+        dashed = self.pseudonymizer("US_SSN", "123-45-6789")
+        plain = self.pseudonymizer("US_SSN", "123456789")
+        self.assertEqual(dashed.replace("-", ""), plain)
+        self.assertEqual(self.pseudonymizer("PERSON", "JOHN SMITH").lower(),
+                         self.pseudonymizer("PERSON", "John Smith").lower())
+
+    def test_check_digits(self):
+        self.assertEqual(verhoeff_check_digit("236"), 3)
+        self.assertEqual(luhn_check_digit("7992739871"), 3)
+        for value in ("2345 6789 0123", "9999-8888-7777", "123412341234"):
+            digits = re.sub(r"\D", "", self.pseudonymizer("IN_AADHAAR", value))
+            self.assertEqual(len(digits), 12)
+            self.assertIn(digits[0], "23456789")
+            self.assertEqual(verhoeff_check_digit(digits[:-1]), int(digits[-1]))
+        card = re.sub(r"\D", "", self.pseudonymizer("CREDIT_CARD", "4111 1111 1111 1111"))
+        self.assertEqual(luhn_check_digit(card[:-1]), int(card[-1]))
+        for i in range(50):
+            area, group, serial = self.pseudonymizer("US_SSN", f"{i:03d}-12-3456").split("-")
+            self.assertNotIn(area, ("000", "666"))
+            self.assertNotEqual(area[0], "9")
+            self.assertNotEqual(group, "00")
+            self.assertNotEqual(serial, "0000")
+
+    def test_cache_is_bounded(self):
+        for i in range(20):
+            self.pseudonymizer("PHONE_NUMBER", f"555-01{i:02d}")
+        self.assertEqual(len(self.pseudonymizer), 8)
+        # Evicted values come back with the same token.
+        self.assertEqual(self.pseudonymizer("PHONE_NUMBER", "555-0100"),
+                         self.pseudonymizer.pseudonym("PHONE_NUMBER", "555-0100"))
+
+    def test_kernel_masker(self):
+        self.assertIn("pseudonym", MASKERS)
+        text = "SSN 123-45-6789 and again 123-45-6789"
+        entities = [
+            DetectedPII(entity_type="US_SSN", text_value="123-45-6789", start_index=4, end_index=15, score=1.0, source="Regex"),
+            DetectedPII(entity_type="US_SSN", text_value="123-45-6789", start_index=26, end_index=37, score=1.0, source="Regex"),
+        ]
+        redacted, types = redact_spans(text, entities, self.pseudonymizer)
+        token = self.pseudonymizer("US_SSN", "123-45-6789")
+        self.assertEqual(redacted, f"SSN {token} and again {token}")
+        self.assertEqual(types, {"US_SSN"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,6 +5,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from agents.redaction_agent import RedactionAgent
+from agents.redaction_kernel import block_mask, fixed_mask, redact_spans
 from schemas.core_models import GovernedChunk, AgentDecision, DetectedPII
 
 class TestRedactionAgent(unittest.TestCase):
@@ -71,5 +72,53 @@ class TestRedactionAgent(unittest.TestCase):
         result = self.agent.redact(chunk)
         self.assertEqual(result.redacted_text, "My name is [INITIAL].")
 
+    def test_custom_masker(self):
+        text = "Mail a@b.io now"
+        entities = [DetectedPII(entity_type="EMAIL_ADDRESS", text_value="a@b.io", start_index=5, end_index=11, score=0.9, source="t")]
+        agent = RedactionAgent(masker=lambda entity_type, span: span[0] + "***")
+        result = agent.redact(self.create_chunk(text, entities=entities))
+        self.assertEqual(result.redacted_text, "Mail a*** now")
+
+
+class TestRedactionKernel(unittest.TestCase):
+
+    def _pii(self, entity_type, start, end):
+        return DetectedPII(entity_type=entity_type, text_value="x", start_index=start, end_index=end, score=0.9, source="t")
+
+    def _legacy(self, text, entities, masker):
+        # The reverse-splice implementation the kernel replaced.
+        chars = list(text)
+        for entity in sorted(entities, key=lambda item: item.start_index, reverse=True):
+            chars[entity.start_index:entity.end_index] = list(masker(entity.entity_type, text[entity.start_index:entity.end_index]))
+        return "".join(chars)
+
+    def test_matches_legacy_splice(self):
+        text = "".join(f"name{i} lives at {i} Main St; " for i in range(200))
+        entities = [self._pii("PERSON", i * 27, i * 27 + 4 + len(str(i))) for i in range(0, 200, 3)]
+        for masker in (block_mask, fixed_mask):
+            redacted, types = redact_spans(text, reversed(entities), masker)
+            self.assertEqual(redacted, self._legacy(text, entities, masker))
+            self.assertEqual(types, {"PERSON"})
+
+    def test_allowlist_and_invalid_spans(self):
+        text = "Alice 555-1234 Bob"
+        entities = [
+            self._pii("PERSON", 0, 5),
+            self._pii("PHONE_NUMBER", 6, 14),
+            self._pii("PERSON", 15, 99),
+            self._pii("PERSON", 3, 3),
+        ]
+        redacted, types = redact_spans(text, entities, fixed_mask, allowed_types={"PHONE_NUMBER"})
+        self.assertEqual(redacted, "Alice [REDACTED] Bob")
+        self.assertEqual(types, {"PHONE_NUMBER"})
+        self.assertEqual(redact_spans(text, entities, fixed_mask, allowed_types=set()), (text, set()))
+
+    def test_overlap_leaves_no_original_text(self):
+        text = "John Smith Jr"
+        entities = [self._pii("PERSON", 0, 10), self._pii("NAME", 5, 13), self._pii("FIRST", 0, 4)]
+        redacted, _ = redact_spans(text, entities)
+        self.assertEqual(redacted, "[FIRST][PERSON][NAME]")
+
+
 if __name__ == '__main__':
     unittest.main()
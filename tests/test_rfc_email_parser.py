@@ -111,8 +111,14 @@ class TestRFCEmailParser:
         
         # Verify boundary is intact
         boundary = parsed.mime_boundaries[0]
-        assert f"------{boundary}".encode() in reconstructed
-        assert f"------{boundary}--".encode() in reconstructed
+        assert f"--{boundary}\n".encode() in reconstructed
+        assert f"--{boundary}--".encode() in reconstructed
+        assert b"Jane Smith" not in reconstructed
+        assert b"[PERSON]" in reconstructed
+        # The untouched HTML part is carried over byte for byte.
+        html_part = MULTIPART_EMAIL.split(f"--{boundary}\n".encode())[2].split(f"--{boundary}--".encode())[0]
+        assert b"<html><body>HTML body</body></html>" in html_part
+        assert html_part in reconstructed
     
     def test_quoted_printable_bracket_encoding(self):
         """Test that brackets are properly encoded in quoted-printable.
@@ -175,13 +181,13 @@ class TestRFCEmailParser:
     
     def test_unicode_handling(self):
         """Test proper handling of Unicode characters."""
-        unicode_email = b"""From: sender@example.com
+        unicode_email = """From: sender@example.com
 To: recipient@example.com
 Subject: =?utf-8?B?4KSV4KS/4KSu4KSk?=
 Content-Type: text/plain; charset=utf-8
 
 This email contains Hindi: राहुल शर्मा and Aadhaar: 1234 5678 9012
-"""
+""".encode("utf-8")
         parser = RFCEmailParser()
         parsed = parser.parse(unicode_email)
         
@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+import shutil
+import sqlite3
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.token_vault import TokenVault, TokenVaultError
+
+
+class TestTokenVault(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "vault.db")
+        self.vault = TokenVault(self.path, b"test-key", batch_size=100)
+
+    def tearDown(self):
+        self.vault.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def rows(self):
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute("SELECT token, entity_type, value FROM tokens").fetchall()
+
+    def test_round_trip_and_stable_tokens(self):
+        token = self.vault.tokenize("US_SSN", "123-45-6789")
+        self.assertRegex(token, r"^\[US_SSN:[a-z2-7]{24}\]$")
+        self.assertEqual(self.vault("US_SSN", "123-45-6789"), token)
+        self.assertNotEqual(self.vault("PHONE_NUMBER", "123-45-6789"), token)
+        self.assertEqual(self.vault.flush(), 2)
+
+        # A fresh vault on the same key issues the same token and resolves it.
+        other = TokenVault(self.path, b"test-key")
+        self.assertEqual(other.tokenize("US_SSN", "123-45-6789"), token)
+        resolved = other.detokenize([token, token[8:-1], "[US_SSN:unknown]"])
+        self.assertEqual(resolved[token], {"entity_type": "US_SSN", "value": "123-45-6789"})
+        self.assertEqual(resolved[token[8:-1]], resolved[token])
+        self.assertIsNone(resolved["[US_SSN:unknown]"])
+        self.assertEqual(other.flush(), 0)
+        other.close()
+
+    def test_values_encrypted_at_rest(self):
+        self.vault.tokenize("EMAIL_ADDRESS", "jane.doe@example.com")
+        self.vault.flush()
+        self.vault.close()
+        for name in os.listdir(self.tmp):
+            with open(os.path.join(self.tmp, name), "rb") as f:
+                self.assertNotIn(b"jane.doe", f.read())
+        with self.assertRaises(TokenVaultError):
+            TokenVault(self.path, b"wrong-key").detokenize([self.rows()[0][0]])
+
+    def test_tokens_scoped_to_tenant(self):
+        acme = self.vault.tokenize("US_SSN", "123-45-6789", "acme")
+        globex = self.vault.masker("globex")("US_SSN", "123-45-6789")
+        master = self.vault.tokenize("US_SSN", "123-45-6789")
+        self.assertEqual(len({acme, globex, master}), 3)
+
+        self.assertEqual(self.vault.detokenize([acme], "acme")[acme]["value"], "123-45-6789")
+        # Neither another tenant nor the master key resolves acme's token,
+        # even by bare id.
+        self.assertIsNone(self.vault.detokenize([acme], "globex")[acme])
+        self.assertIsNone(self.vault.detokenize([acme[8:-1]], "globex")[acme[8:-1]])
+        self.assertIsNone(self.vault.detokenize([acme])[acme])
+        self.assertIsNone(self.vault.detokenize([master], "acme")[master])
+
+        # Moving a row to another tenant does not make it decrypt there.
+        self.vault.close()
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("UPDATE tokens SET tenant = 'globex' WHERE token = ?", (acme[8:-1],))
+        with self.assertRaises(TokenVaultError):
+            TokenVault(self.path, b"test-key").detokenize([acme], "globex")
+
+    def test_pre_tenant_vault_migrated(self):
+        token = self.vault.tokenize("PERSON", "Jane Doe")
+        self.vault.close()
+        with sqlite3.connect(self.path) as conn:
+            conn.executescript("""
+                CREATE TABLE old (token TEXT PRIMARY KEY, entity_type TEXT NOT NULL,
+                                  nonce BLOB NOT NULL, value BLOB NOT NULL) WITHOUT ROWID;
+                INSERT INTO old SELECT token, entity_type, nonce, value FROM tokens;
+                DROP TABLE tokens;
+                ALTER TABLE old RENAME TO tokens;
+            """)
+        vault = TokenVault(self.path, b"test-key")
+        self.assertEqual(vault.detokenize([token])[token]["value"], "Jane Doe")
+        self.assertIsNone(vault.detokenize([token], "acme")[token])
+        vault.close()
+
+    def test_inserts_batched(self):
+        tokens = [self.vault.tokenize("PERSON", f"Person {i}") for i in range(250)]
+        # Two full batches were written; the rest waits for flush.
+        self.assertEqual(len(self.rows()), 200)
+        self.assertEqual(self.vault.flush(), 50)
+        resolved = self.vault.detokenize(tokens)
+        self.assertEqual([entry["value"] for entry in resolved.values()], [f"Person {i}" for i in range(250)])
+
+    def test_bulk_lookup_beyond_parameter_limit(self):
+        tokens = [self.vault.tokenize("PHONE_NUMBER", f"555-{i:04d}") for i in range(2000)]
+        resolved = self.vault.detokenize(tokens)
+        self.assertEqual(sum(1 for entry in resolved.values() if entry is not None), 2000)
+
+
+if __name__ == '__main__':
+    unittest.main()
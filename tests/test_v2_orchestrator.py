@@ -1,8 +1,17 @@
+import os
+import random
+import tempfile
+import threading
+import time
 import unittest
 
+from agents.budgets import PipelineCancelled, PipelineDeadline
+from agents.extractor import ExtractorAgent
+from agents.fusion_agent import FusionAgent
+from core.v2.checkpoint import CLASSIFIED, GOVERNED, CheckpointStore, document_key
 from core.v2.models import PipelineContext
 from core.v2.pipeline import V2PipelineOrchestrator
-from core.v2.settings import V2RuntimeSettings
+from core.v2.settings import StagePoolSettings, V2RuntimeSettings
 from schemas.core_models import (
     AgentDecision,
     ClassifiedChunk,
@@ -130,5 +139,361 @@ class TestV2Orchestrator(unittest.TestCase):
         self.assertIn("Chunk limit exceeded", result.diagnostics.get("error", ""))
 
 
+class DocumentExtractor:
+    """Forty chunks; every third one holds an email split over its end."""
+
+    def process(self, file_path, context=None):
+        return [
+            SemanticChunk(
+                document_id="doc-1",
+                processed_text=f"chunk {i} mail jane" if i % 3 == 0 else f"doe@example.com chunk {i}",
+                original_text="",
+                page_number=i // 10 + 1,
+                token_span=(i * 30, i * 30 + 20),
+            )
+            for i in range(40)
+        ]
+
+
+class JitteryClassifier:
+    """Finishes out of order, to exercise the pipelined reordering."""
+
+    def process(self, chunk, context=None):
+        time.sleep(random.random() * 0.004)
+        text = chunk.processed_text
+        value = "jane" if text.endswith("jane") else "doe@example.com"
+        start = text.find(value)
+        return ClassifiedChunk(
+            **chunk.model_dump(),
+            detected_entities=[
+                DetectedPII(
+                    entity_type="EMAIL_ADDRESS",
+                    text_value=value,
+                    start_index=start,
+                    end_index=start + len(value),
+                    score=0.5 + (len(text) % 5) / 10,
+                    source="test",
+                )
+            ],
+        )
+
+
+class ScoringPolicy(FakePolicy):
+    def evaluate_chunk(self, chunk, trace_id="unknown"):
+        governed = super().evaluate_chunk(chunk, trace_id)
+        governed.decision.action = "Redact" if chunk.detected_entities[0].score > 0.6 else "Allow"
+        return governed
+
+
+class PreviewRedaction:
+    def redact(self, chunk):
+        entity = chunk.detected_entities[0]
+        chunk.redacted_text = f"{chunk.chunk_id}:{entity.text_value}:{entity.score:.1f}"
+        return chunk
+
+
+class FailingClassifier:
+    def process(self, chunk, context=None):
+        raise RuntimeError("classifier crashed")
+
+
+class TestV2PipelinedExecution(unittest.TestCase):
+    def _run(self, classifier=None, **settings):
+        orchestrator = V2PipelineOrchestrator(
+            extractor=DocumentExtractor(),
+            classifier=classifier or JitteryClassifier(),
+            fusion=FusionAgent(backend="python"),
+            policy=ScoringPolicy(),
+            redaction=PreviewRedaction(),
+            settings=V2RuntimeSettings(**settings),
+        )
+        return orchestrator.run(
+            file_path="/tmp/dummy.txt",
+            context=PipelineContext(trace_id="trace-3", filename="dummy.txt"),
+        )
+
+    def _pipelined(self, **settings):
+        pools = dict(
+            classify_pool=StagePoolSettings(workers=4),
+            policy_pool=StagePoolSettings(workers=3),
+            redaction_pool=StagePoolSettings(workers=2),
+        )
+        pools.update(settings)
+        return self._run(execution_mode="pipelined", stage_queue_size=2, **pools)
+
+    @staticmethod
+    def _comparable(result):
+        return result.model_dump(exclude={"step_metrics", "redacted_text_preview"})
+
+    def test_matches_sequential(self):
+        sequential = self._run()
+        pipelined = self._pipelined()
+        self.assertEqual(pipelined.status, "processed")
+        self.assertEqual(self._comparable(pipelined), self._comparable(sequential))
+        self.assertEqual(pipelined.chunks_count, 40)
+        self.assertEqual(pipelined.final_action, sequential.final_action)
+        # Cross-chunk fusion linked the split email of the first chunk.
+        self.assertTrue(pipelined.redacted_text_preview.endswith(":jane doe@example.com:0.9"))
+        self.assertEqual(
+            pipelined.redacted_text_preview.split(":", 1)[1], sequential.redacted_text_preview.split(":", 1)[1]
+        )
+
+    def test_stage_metrics_include_queue_waits(self):
+        result = self._pipelined()
+        self.assertEqual(
+            [metric.name for metric in result.step_metrics], ["extract", "classify", "fuse", "policy", "redact"]
+        )
+        # Downstream stages wait for the classifier to produce.
+        self.assertGreater(result.step_metrics[4].queue_wait_ms, 0)
+
+    def test_process_pool(self):
+        sequential = self._run()
+        pipelined = self._pipelined(classify_pool=StagePoolSettings(kind="process", workers=2))
+        self.assertEqual(self._comparable(pipelined), self._comparable(sequential))
+
+    def test_port_error_propagates_and_releases_stages(self):
+        before = threading.active_count()
+        with self.assertRaisesRegex(RuntimeError, "classifier crashed"):
+            self._pipelined(classifier=FailingClassifier())
+        self.assertEqual(threading.active_count(), before)
+
+    def test_chunk_limit(self):
+        result = self._pipelined(max_chunks_per_document=10)
+        self.assertEqual(result.status, "failed")
+        self.assertIn("Chunk limit exceeded", result.diagnostics.get("error", ""))
+
+
+class SlowClassifier(JitteryClassifier):
+    """Slow per chunk; checks the deadline only as the orchestrator does."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.idle = threading.Event()
+        self.idle.set()
+
+    def process(self, chunk, context=None):
+        self.idle.clear()
+        try:
+            time.sleep(self.delay)
+            return super().process(chunk, context)
+        finally:
+            self.idle.set()
+
+
+class TestV2Deadline(unittest.TestCase):
+    def _run(self, classifier, deadline, **settings):
+        orchestrator = V2PipelineOrchestrator(
+            extractor=DocumentExtractor(),
+            classifier=classifier,
+            fusion=FusionAgent(backend="python"),
+            policy=ScoringPolicy(),
+            redaction=PreviewRedaction(),
+            settings=V2RuntimeSettings(**settings),
+        )
+        start = time.monotonic()
+        result = orchestrator.run(
+            file_path="/tmp/dummy.txt",
+            context=PipelineContext(trace_id="trace-4", filename="dummy.txt", deadline=deadline),
+        )
+        return result, time.monotonic() - start
+
+    def _assert_stopped_in_classify(self, result, error):
+        self.assertEqual(result.status, "failed")
+        self.assertEqual(result.final_action, "Quarantine")
+        self.assertEqual(result.diagnostics["error"], error)
+        self.assertEqual(result.progress.stopped_in, "classify")
+        self.assertEqual(result.chunks_count, result.progress.extracted)
+        self.assertGreater(result.progress.classified, 0)
+        self.assertLess(result.progress.classified, 40)
+
+    def test_sequential_stops_between_chunks(self):
+        result, elapsed = self._run(SlowClassifier(0.02), PipelineDeadline(150))
+        self._assert_stopped_in_classify(result, "Processing timeout exceeded")
+        self.assertEqual(result.progress.extracted, 40)
+        self.assertLess(elapsed, 0.15 + 0.1)
+
+    def test_pipelined_returns_without_waiting_for_calls_in_flight(self):
+        classifier = SlowClassifier(0.6)
+        result, elapsed = self._run(
+            classifier, PipelineDeadline(150), execution_mode="pipelined",
+            classify_pool=StagePoolSettings(workers=2),
+        )
+        self.assertEqual(result.diagnostics["error"], "Processing timeout exceeded")
+        self.assertEqual(result.progress.stopped_in, "classify")
+        self.assertEqual(result.progress.governed, 0)
+        self.assertLess(elapsed, 0.15 + 0.2)
+        classifier.idle.wait(2)
+
+    def test_cancel_from_another_thread(self):
+        deadline = PipelineDeadline(60000)
+        threading.Timer(0.1, deadline.cancel, args=("client disconnected",)).start()
+        result, elapsed = self._run(
+            SlowClassifier(0.02), deadline, execution_mode="pipelined", classify_pool=StagePoolSettings(workers=2)
+        )
+        self._assert_stopped_in_classify(result, "Processing cancelled: client disconnected")
+        self.assertLess(elapsed, 0.1 + 0.2)
+
+    def test_partial_progress_on_entity_limit(self):
+        class DoublingClassifier(JitteryClassifier):
+            def process(self, chunk, context=None):
+                classified = super().process(chunk, context)
+                word = classified.detected_entities[0].model_copy(update={"start_index": 100, "end_index": 104})
+                classified.detected_entities.append(word)
+                return classified
+
+        result, _ = self._run(DoublingClassifier(), None, max_entities_per_chunk=1)
+        self.assertEqual(result.diagnostics["error"], "Entity limit exceeded")
+        self.assertEqual(result.progress.model_dump(), {
+            "extracted": 40, "classified": 40, "fused": 40, "governed": 1, "stopped_in": "govern",
+        })
+        self.assertEqual(result.pii_detected_count, 2)
+
+    def test_extractor_checks_deadline_between_pages(self):
+        extractor = ExtractorAgent()
+        deadline = PipelineDeadline(60000)
+        deadline.cancel()
+        pages = [{"text": "page one", "page": 1}, {"text": "page two", "page": 2}]
+        with self.assertRaises(PipelineCancelled):
+            extractor._chunk_text(iter(pages), _metadata(), deadline)
+        self.assertEqual(len(extractor._chunk_text(iter(pages), _metadata(), PipelineDeadline(60000))), 2)
+
+
+class CountingClassifier(JitteryClassifier):
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def process(self, chunk, context=None):
+        with self._lock:
+            self.calls += 1
+        return super().process(chunk, context)
+
+
+class CrashingPolicy(ScoringPolicy):
+    """Crashes after *limit* calls, as a worker dying mid-document would."""
+
+    def __init__(self, limit=None, rule_set_version="v1"):
+        self.limit = limit
+        self.rule_set_version = rule_set_version
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def evaluate_chunk(self, chunk, trace_id="unknown"):
+        with self._lock:
+            self.calls += 1
+            if self.limit is not None and self.calls > self.limit:
+                raise RuntimeError("worker lost")
+        return super().evaluate_chunk(chunk, trace_id)
+
+
+class TestV2Checkpoints(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.file_path = os.path.join(self.tmp.name, "large.pdf")
+        with open(self.file_path, "wb") as f:
+            f.write(b"%PDF large document")
+        self.db_path = os.path.join(self.tmp.name, "checkpoints.db")
+
+    def _run(self, classifier, policy, **settings):
+        settings.setdefault("checkpoint_path", self.db_path)
+        settings.setdefault("checkpoint_key", "test-key")
+        orchestrator = V2PipelineOrchestrator(
+            extractor=DocumentExtractor(),
+            classifier=classifier,
+            fusion=FusionAgent(backend="python"),
+            policy=policy,
+            redaction=PreviewRedaction(),
+            settings=V2RuntimeSettings(checkpoint_batch_size=4, **settings),
+        )
+        try:
+            return orchestrator.run(
+                file_path=self.file_path,
+                context=PipelineContext(trace_id="trace-5", filename="large.pdf"),
+            )
+        finally:
+            if orchestrator.checkpoints is not None:
+                orchestrator.checkpoints.close()
+
+    def _checkpoints(self, stage=GOVERNED, version="v1", key="test-key"):
+        return CheckpointStore(self.db_path, key).load(document_key(self.file_path, version), stage)
+
+    def _assert_resumes(self, **settings):
+        expected = self._run(JitteryClassifier(), ScoringPolicy(), checkpoint_path=None, **settings)
+        with self.assertRaisesRegex(RuntimeError, "worker lost"):
+            self._run(JitteryClassifier(), CrashingPolicy(limit=25), **settings)
+        classified = len(self._checkpoints(CLASSIFIED))
+        committed = len(self._checkpoints())
+        self.assertGreater(committed, 0)
+
+        # A fresh orchestrator and store on the same file: another worker.
+        classifier, policy = CountingClassifier(), CrashingPolicy()
+        result = self._run(classifier, policy, **settings)
+        self.assertEqual(result.status, "processed")
+        self.assertEqual(classifier.calls, 40 - classified)
+        self.assertEqual(policy.calls, 40 - committed)
+        self.assertEqual(result.diagnostics, {"resumed_chunks": str(committed)})
+        self.assertEqual(
+            result.model_dump(exclude={"step_metrics", "redacted_text_preview", "diagnostics"}),
+            expected.model_dump(exclude={"step_metrics", "redacted_text_preview", "diagnostics"}),
+        )
+        # Completed documents leave nothing behind.
+        self.assertEqual(self._checkpoints(), {})
+
+    def test_sequential_resumes_from_last_committed_chunk(self):
+        self._assert_resumes()
+
+    def test_pipelined_resumes_from_last_committed_chunk(self):
+        self._assert_resumes(execution_mode="pipelined", classify_pool=StagePoolSettings(workers=4),
+                             policy_pool=StagePoolSettings(workers=3))
+
+    def test_rule_change_does_not_reuse_results(self):
+        self._run(JitteryClassifier(), CrashingPolicy(), checkpoint_keep_completed=True)
+        self.assertEqual(len(self._checkpoints()), 40)
+
+        policy = CrashingPolicy()
+        result = self._run(JitteryClassifier(), policy, checkpoint_keep_completed=True)
+        self.assertEqual((policy.calls, result.diagnostics), (0, {"resumed_chunks": "40"}))
+
+        policy = CrashingPolicy(rule_set_version="v2")
+        result = self._run(JitteryClassifier(), policy)
+        self.assertEqual((policy.calls, result.diagnostics), (40, {}))
+
+    def test_results_encrypted_at_rest(self):
+        self._run(JitteryClassifier(), CrashingPolicy(), checkpoint_keep_completed=True)
+        self.assertEqual(len(self._checkpoints()), 40)
+        for name in os.listdir(self.tmp.name):
+            if name.startswith("checkpoints.db"):
+                with open(os.path.join(self.tmp.name, name), "rb") as f:
+                    content = f.read()
+                self.assertNotIn(b"doe@example.com", content)
+                self.assertNotIn(b"jane", content)
+        # Another key reads nothing, so the run recomputes every chunk.
+        self.assertEqual(self._checkpoints(key="other-key"), {})
+        policy = CrashingPolicy()
+        result = self._run(JitteryClassifier(), policy, checkpoint_key="other-key")
+        self.assertEqual((policy.calls, result.diagnostics), (40, {}))
+
+    def test_no_key_runs_without_checkpoints(self):
+        result = self._run(JitteryClassifier(), ScoringPolicy(), checkpoint_key=None)
+        self.assertEqual(result.status, "processed")
+        self.assertFalse(os.path.exists(self.db_path))
+        with self.assertRaises(ValueError):
+            CheckpointStore(self.db_path, "")
+
+    def test_unreadable_file_runs_without_checkpoints(self):
+        self.file_path = os.path.join(self.tmp.name, "missing.pdf")
+        result = self._run(JitteryClassifier(), ScoringPolicy())
+        self.assertEqual(result.status, "processed")
+        self.assertFalse(os.path.exists(self.db_path))
+
+
+def _metadata():
+    from schemas.core_models import DocumentMetadata
+
+    return DocumentMetadata(filename="x.txt", file_size_bytes=1, mime_type="text/plain", sha256_hash="0" * 64,
+                            source_channel="test")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,101 @@
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schemas.core_models import (
+    AgentDecision,
+    ClassifiedChunk,
+    DetectedPII,
+    GovernedChunk,
+    LocationContext,
+    SemanticChunk,
+)
+from schemas.internal import Chunk, Entity
+
+
+# Detector output stand-in: (entity_type, start, end, score) per chunk.
+def _detections(n_chunks, n_entities, chunk_len, seed=7):
+    rng = random.Random(seed)
+    return [
+        [
+            (rng.choice(["PERSON", "EMAIL_ADDRESS", "PHONE_NUMBER"]), start, start + 8, 0.85)
+            for start in sorted(rng.sample(range(0, chunk_len - 12, 12), n_entities))
+        ]
+        for _ in range(n_chunks)
+    ]
+
+
+def _decision(chunk_id):
+    return AgentDecision(trace_id="bench", chunk_id=chunk_id, agent_name="PolicyAgent", action="Redact",
+                         risk_score=0.9, justification_trace=["bench"])
+
+
+def _pydantic_pipeline(text, detections):
+    # What classifier and policy did before: a model per entity and location,
+    # and a full ``**chunk.model_dump()`` copy at each stage.
+    governed = []
+    for page, results in enumerate(detections, start=1):
+        chunk = SemanticChunk(document_id="doc", processed_text=text, original_text=text, page_number=page,
+                              token_span=(0, len(text)))
+        entities = [
+            DetectedPII(entity_type=entity_type, text_value=text[start:end], start_index=start, end_index=end,
+                        score=score, source="Presidio",
+                        location=LocationContext(page_number=page, char_start_on_page=start, char_end_on_page=end,
+                                                 nearby_context=text[max(0, start - 20):end + 20]))
+            for entity_type, start, end, score in results
+        ]
+        classified = ClassifiedChunk(**chunk.model_dump(), detected_entities=entities, pii_density_score=0.1)
+        governed.append(GovernedChunk(**classified.model_dump(), redacted_text=text, decision=_decision(chunk.chunk_id)))
+    return governed
+
+
+def _slot_pipeline(text, detections):
+    governed = []
+    for page, results in enumerate(detections, start=1):
+        chunk = Chunk("doc", text, text, page, (0, len(text)))
+        chunk.detected_entities = [
+            Entity(entity_type, text[start:end], start, end, score, "Presidio", page, 0)
+            for entity_type, start, end, score in results
+        ]
+        chunk.pii_density_score = 0.1
+        chunk.redacted_text = text
+        chunk.decision = _decision(chunk.chunk_id)
+        governed.append(chunk)
+    return governed
+
+
+def _measure(fn, text, detections):
+    start = time.perf_counter()
+    fn(text, detections)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = fn(text, detections)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, retained, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pydantic and __slots__ chunk/entity representations.")
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--entities", type=int, default=40, help="Entities per chunk.")
+    parser.add_argument("--chunk-chars", type=int, default=800)
+    args = parser.parse_args()
+
+    text = "x" * args.chunk_chars
+    detections = _detections(args.chunks, args.entities, args.chunk_chars)
+    print(f"{args.chunks} chunks x {args.entities} entities")
+    print(f"{'model':>9} {'time_ms':>9} {'retained_kib':>13} {'peak_kib':>9}")
+    for name, fn in (("pydantic", _pydantic_pipeline), ("slots", _slot_pipeline)):
+        elapsed, retained, peak = _measure(fn, text, detections)
+        print(f"{name:>9} {elapsed * 1000:>9.1f} {retained / 1024:>13.0f} {peak / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.fusion_agent import FusionAgent
+from schemas.internal import Entity
+
+
+def _log_entities(n_entities, overlap_rate, seed=7):
+    # Log-style chunk: disjoint IPs/emails, some also matched by a second,
+    # longer recognizer (URL), in the classifier's arbitrary order.
+    rng = random.Random(seed)
+    entities, pos = [], 0
+    for i in range(n_entities):
+        length = rng.randint(7, 15)
+        entities.append(Entity("IP_ADDRESS", str(i), pos, pos + length, 0.85, "bench"))
+        if rng.random() < overlap_rate:
+            entities.append(Entity("URL", str(i), pos, pos + length + 3, 0.5, "bench"))
+        pos += length + rng.randint(1, 30)
+    rng.shuffle(entities)
+    return entities
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the Python and NumPy fusion backends.")
+    parser.add_argument("--entities", type=int, nargs="+", default=[100, 500, 1000, 5000, 20000])
+    parser.add_argument("--overlap-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    python_agent = FusionAgent(backend="python")
+    numpy_agent = FusionAgent(backend="numpy")
+    print(f"{'entities':>8} {'python_ms':>10} {'numpy_ms':>9} {'speedup':>8}")
+    for n_entities in args.entities:
+        entities = _log_entities(n_entities, args.overlap_rate)
+        expected = python_agent.deduplicate_entities(entities)
+        assert [id(e) for e in numpy_agent.deduplicate_entities(entities)] == [id(e) for e in expected]
+        repeat = max(5, 200000 // n_entities)
+        python_s = timeit.timeit(lambda: python_agent.deduplicate_entities(entities), number=repeat) / repeat
+        numpy_s = timeit.timeit(lambda: numpy_agent.deduplicate_entities(entities), number=repeat) / repeat
+        print(f"{len(entities):>8} {python_s * 1000:>10.3f} {numpy_s * 1000:>9.3f} {python_s / numpy_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
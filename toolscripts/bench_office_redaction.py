@@ -0,0 +1,65 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openpyxl
+
+from agents.office_redactor import XlsxRedactionWriter
+from agents.redaction_kernel import PageSpan
+
+
+def _build_workbook(path, rows):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Data")
+    sheet.append(["id", "name", "email", "amount", "note"])
+    for i in range(rows):
+        sheet.append([i, f"Customer {i}", f"user{i}@example.com", i * 1.5, "lorem ipsum dolor sit amet " * 3])
+    workbook.save(path)
+
+
+def _timed(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def _rerender(source, output):
+    # What a library round trip costs: load every cell and write it back out.
+    workbook = openpyxl.load_workbook(source)
+    workbook.active["B2"] = "[PERSON]"
+    workbook.save(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the in-place XLSX redaction writer with a zip copy and an openpyxl round trip.")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--skip-rerender", action="store_true", help="Skip the (slow) openpyxl round trip.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "source.xlsx")
+        _build_workbook(source, args.rows)
+        spans = {1: [PageSpan(0, 0, "PERSON", "Customer 7"), PageSpan(0, 0, "EMAIL_ADDRESS", "user42@example.com")]}
+        report = {}
+        results = [
+            ("zip copy", _timed(lambda: shutil.copyfile(source, os.path.join(tmp, "copy.xlsx")))),
+            ("in-place", _timed(lambda: report.update(
+                XlsxRedactionWriter().redact(source, os.path.join(tmp, "redacted.xlsx"), spans)
+            ))),
+        ]
+        if not args.skip_rerender:
+            results.append(("openpyxl", _timed(lambda: _rerender(source, os.path.join(tmp, "rerendered.xlsx")))))
+        print(f"rows={args.rows} size_mb={os.path.getsize(source) / 2**20:.1f} "
+              f"parts_rewritten={report['parts_rewritten']} parts_copied={report['parts_copied']}")
+        print(f"{'writer':>10} {'seconds':>9}")
+        for name, seconds in results:
+            print(f"{name:>10} {seconds:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import yaml
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.rule_integrity import IntegrityPolicy, ManifestVerifier, render_manifest_checksums
+from agents.rule_sets import load_rule_set
+from agents.rule_snapshot import RuleSetSnapshotStore
+
+
+def _build_tree(root, n_files, rules_per_file):
+    os.makedirs(os.path.join(root, "rules"))
+    os.makedirs(os.path.join(root, "meta"))
+    modules = []
+    for i in range(n_files):
+        rel = f"rules/bench_{i:04d}.yml"
+        rules = [
+            {
+                "id": f"BENCH-{i}-{j}",
+                "version": "1.0",
+                "meta": {"name": "bench", "description": "bench", "priority": j},
+                "conditions": [{"type": "PII_MATCH", "field": "type", "operator": "EQUALS", "value": f"T{j}"}],
+                "actions": {"classification": "INTERNAL", "severity": "LOW", "score": 0.1},
+            }
+            for j in range(rules_per_file)
+        ]
+        with open(os.path.join(root, rel), "w") as f:
+            yaml.dump(rules, f)
+        modules.append(rel)
+    with open(os.path.join(root, "meta", "policy_manifest.yml"), "w") as f:
+        yaml.dump({"active_modules": modules}, f)
+    policy = IntegrityPolicy()
+    text = render_manifest_checksums(root, policy)
+    with open(os.path.join(root, "meta", "policy_manifest.yml"), "w") as f:
+        f.write(text)
+    return policy
+
+
+def _timed(label, fn):
+    started = time.perf_counter()
+    result = fn()
+    print(f"{label:<40} {1000 * (time.perf_counter() - started):8.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure NSRL startup: integrity check, rule compilation and snapshots.")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--rules-per-file", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        policy = _build_tree(root, args.files, args.rules_per_file)
+        rules_dir = os.path.join(root, "rules")
+        print(f"{args.files} rule files x {args.rules_per_file} rules")
+
+        serial = ManifestVerifier(root, policy, max_workers=1)
+        _timed("integrity check, serial, cold", lambda: serial.verify(rules_dir))
+        verifier = ManifestVerifier(root, policy, max_workers=args.workers)
+        _timed("integrity check, parallel, cold", lambda: verifier.verify(rules_dir))
+        _timed("integrity check, parallel, cached", lambda: verifier.verify(rules_dir))
+        _timed("load + compile rule set", lambda: load_rule_set(rules_dir))
+        snapshots = RuleSetSnapshotStore(os.path.join(root, "snapshots"), os.urandom(16).hex())
+        _timed("load + compile, snapshot miss (write)", lambda: load_rule_set(rules_dir, snapshots=snapshots))
+        _timed("load + compile, snapshot hit", lambda: load_rule_set(rules_dir, snapshots=snapshots))
+
+
+if __name__ == "__main__":
+    main()
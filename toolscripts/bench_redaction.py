@@ -0,0 +1,63 @@
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.redaction_kernel import get_masker, redact_spans
+from schemas.core_models import DetectedPII
+
+
+def _legacy_redact(text, entities, masker):
+    # The list-of-characters, reverse-splice approach the kernel replaced.
+    chars = list(text)
+    for entity in sorted(entities, key=lambda item: item.start_index, reverse=True):
+        start, end = entity.start_index, entity.end_index
+        chars[start:end] = list(masker(entity.entity_type, text[start:end]))
+    return "".join(chars)
+
+
+def _build_chunk(n_chars, n_entities, seed=7):
+    rng = random.Random(seed)
+    text = "".join(rng.choice("abcdefghij klmnopqrstuvwxyz") for _ in range(n_chars))
+    starts = sorted(rng.sample(range(0, n_chars - 12, 12), n_entities))
+    entities = [
+        DetectedPII(
+            entity_type=rng.choice(["PERSON", "EMAIL_ADDRESS", "PHONE_NUMBER"]),
+            text_value=text[start:start + 8],
+            start_index=start,
+            end_index=start + 8,
+            score=0.9,
+            source="bench",
+        )
+        for start in starts
+    ]
+    rng.shuffle(entities)
+    return text, entities
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the single-pass redaction kernel with reverse splicing.")
+    parser.add_argument("--chars", type=int, default=20000, help="Chunk length in characters.")
+    parser.add_argument("--entities", type=int, nargs="+", default=[10, 100, 500, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'entities':>8} {'style':>7} {'legacy_us':>11} {'kernel_us':>11} {'speedup':>8}")
+    for n_entities in args.entities:
+        text, entities = _build_chunk(args.chars, min(n_entities, args.chars // 12 - 1))
+        for style in ("entity", "fixed", "block"):
+            masker = get_masker(style)
+            assert _legacy_redact(text, entities, masker) == redact_spans(text, entities, masker)[0]
+            legacy = timeit.timeit(lambda: _legacy_redact(text, entities, masker), number=args.repeat)
+            kernel = timeit.timeit(lambda: redact_spans(text, entities, masker), number=args.repeat)
+            print(
+                f"{n_entities:>8} {style:>7} {legacy * 1e6 / args.repeat:>11.1f} "
+                f"{kernel * 1e6 / args.repeat:>11.1f} {legacy / kernel:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
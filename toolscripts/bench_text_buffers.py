@@ -0,0 +1,102 @@
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.redaction_kernel import entity_mask, plan_spans, redact_spans
+from schemas.internal import Chunk, Entity
+
+# Same windowing as ExtractorAgent._chunk_text.
+CHUNK_SIZE = 800
+OVERLAP = 100
+
+
+def _page(n_chars, seed=7):
+    rng = random.Random(seed)
+    words = ["alpha", "beta", "gamma", "delta", "epsilon", "555-0100", "report."] * 6 + ["user@example.com"]
+    out, size = [], 0
+    while size < n_chars:
+        word = rng.choice(words)
+        out.append(word)
+        size += len(word) + 1
+    return " ".join(out)
+
+
+def _windows(page):
+    start = 0
+    while start < len(page):
+        end = min(start + CHUNK_SIZE, len(page))
+        yield start, end
+        start += CHUNK_SIZE - OVERLAP
+
+
+def _entities(text, offset):
+    found, pos = [], text.find("user@example.com")
+    while pos != -1:
+        found.append(Entity("EMAIL_ADDRESS", "user@example.com", pos, pos + 16, 1.0, "bench", 1, offset))
+        pos = text.find("user@example.com", pos + 16)
+    return found
+
+
+def _copied(make_page):
+    # Before: every chunk held its own text, and its redacted text was kept
+    # until the document text was joined at the end.
+    page = make_page()
+    chunks = []
+    for start, end in _windows(page):
+        text = page[start:end]
+        chunk = Chunk("doc", text, text, 1, (start, end))
+        chunk.detected_entities = _entities(text, start)
+        chunk.redacted_text, _ = redact_spans(text, chunk.detected_entities)
+        chunks.append(chunk)
+    del page  # extraction dropped the page once it was chunked
+    return chunks, "\n\n".join(chunk.redacted_text for chunk in chunks)
+
+
+def _shared(make_page):
+    # After: chunks view the page buffer (kept alive by them) and the
+    # redacted text is written once, straight into the document assembly.
+    page = make_page()
+    chunks, parts = [], []
+    for start, end in _windows(page):
+        chunk = Chunk.on_page("doc", page, 1, start, end)
+        chunk.detected_entities = _entities(chunk.processed_text, start)
+        chunk.set_redaction(plan_spans(chunk.text_length, chunk.detected_entities), entity_mask)
+        chunks.append(chunk)
+        if parts:
+            parts.append("\n\n")
+        chunk.write_redacted(parts)
+    document = "".join(parts)
+    parts.clear()
+    return chunks, document
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-chunk text copies with shared page buffers.")
+    parser.add_argument("--mib", type=int, default=16, help="Page text size in MiB.")
+    args = parser.parse_args()
+
+    n_chars = args.mib * 1024 * 1024
+    base = _page(n_chars)
+    make_page = lambda: base + " "  # a fresh page string per run
+    assert _copied(make_page)[1] == _shared(make_page)[1]
+    print(f"{args.mib} MiB page, {sum(1 for _ in _windows(make_page()))} chunks")
+    print(f"{'layout':>7} {'time_ms':>9} {'retained_mib':>13} {'peak_mib':>9}")
+    for name, fn in (("copied", _copied), ("shared", _shared)):
+        start = time.perf_counter()
+        fn(make_page)
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        result = fn(make_page)
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        print(f"{name:>7} {elapsed * 1000:>9.0f} {retained / 2 ** 20:>13.1f} {peak / 2 ** 20:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.budgets import PipelineDeadline
+from core.v2.models import PipelineContext
+from core.v2.pipeline import V2PipelineOrchestrator
+from core.v2.settings import StagePoolSettings, V2RuntimeSettings
+from schemas.core_models import AgentDecision, ClassifiedChunk, DetectedPII, GovernedChunk, SemanticChunk
+
+
+# Stand-in ports: each call costs a fixed time, either waiting (I/O, native
+# code releasing the GIL) or spinning (pure-Python work, which only scales
+# across processes).
+def _work(seconds, cpu):
+    if not cpu:
+        time.sleep(seconds)
+        return
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class Extractor:
+    def __init__(self, n_chunks):
+        self.n_chunks = n_chunks
+
+    def process(self, file_path, context=None):
+        return [
+            SemanticChunk(document_id="doc", processed_text=f"chunk {i} mail a@b.io", original_text="",
+                          page_number=1, token_span=(i * 20, i * 20 + 19))
+            for i in range(self.n_chunks)
+        ]
+
+
+class Classifier:
+    def __init__(self, seconds, cpu):
+        self.seconds, self.cpu = seconds, cpu
+
+    def process(self, chunk, context=None):
+        _work(self.seconds, self.cpu)
+        start = chunk.processed_text.index("a@b.io")
+        entity = DetectedPII(entity_type="EMAIL_ADDRESS", text_value="a@b.io", start_index=start,
+                             end_index=start + 6, score=0.9, source="bench")
+        return ClassifiedChunk(**chunk.model_dump(), detected_entities=[entity])
+
+
+class Fusion:
+    def fuse_chunk(self, chunk):
+        return chunk
+
+    def fuse_cross_chunks(self, chunks):
+        return chunks
+
+
+class Policy:
+    def __init__(self, seconds, cpu):
+        self.seconds, self.cpu = seconds, cpu
+
+    def evaluate_chunk(self, chunk, trace_id="unknown"):
+        _work(self.seconds, self.cpu)
+        decision = AgentDecision(trace_id=trace_id, chunk_id=chunk.chunk_id, agent_name="bench", action="Redact",
+                                 risk_score=0.9, justification_trace=[])
+        return GovernedChunk(**chunk.model_dump(), redacted_text=chunk.processed_text, decision=decision)
+
+
+class Redaction:
+    def __init__(self, seconds, cpu):
+        self.seconds, self.cpu = seconds, cpu
+
+    def redact(self, chunk):
+        _work(self.seconds, self.cpu)
+        chunk.redacted_text = chunk.processed_text.replace("a@b.io", "[EMAIL_ADDRESS]")
+        return chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sequential and pipelined v2 orchestration.")
+    parser.add_argument("--chunks", type=int, default=400)
+    parser.add_argument("--classify-ms", type=float, default=4.0)
+    parser.add_argument("--policy-ms", type=float, default=1.0)
+    parser.add_argument("--redact-ms", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--cpu", action="store_true", help="Spin instead of sleeping; uses process pools.")
+    parser.add_argument("--deadline-ms", type=float, default=0,
+                        help="Stop each run at this deadline and report the overrun past it.")
+    args = parser.parse_args()
+
+    kind = "process" if args.cpu else "thread"
+    ports = dict(
+        extractor=Extractor(args.chunks),
+        classifier=Classifier(args.classify_ms / 1000, args.cpu),
+        fusion=Fusion(),
+        policy=Policy(args.policy_ms / 1000, args.cpu),
+        redaction=Redaction(args.redact_ms / 1000, args.cpu),
+    )
+    modes = {
+        "sequential": V2RuntimeSettings(),
+        "pipelined": V2RuntimeSettings(
+            execution_mode="pipelined",
+            classify_pool=StagePoolSettings(kind=kind, workers=args.workers),
+            policy_pool=StagePoolSettings(kind=kind, workers=max(1, args.workers // 2)),
+            redaction_pool=StagePoolSettings(kind=kind, workers=max(1, args.workers // 2)),
+        ),
+    }
+    print(f"{args.chunks} chunks, {args.workers} workers, {'cpu' if args.cpu else 'wait'}-bound ports")
+    print(f"{'mode':>10} {'wall_ms':>8}  stages (elapsed/queue_wait/blocked ms)")
+    for name, settings in modes.items():
+        orchestrator = V2PipelineOrchestrator(settings=settings, **ports)
+        deadline = PipelineDeadline(args.deadline_ms) if args.deadline_ms else None
+        start = time.perf_counter()
+        result = orchestrator.run("bench", PipelineContext(trace_id="bench", filename="bench", deadline=deadline))
+        wall = time.perf_counter() - start
+        if deadline is None:
+            assert result.status == "processed" and result.pii_detected_count == args.chunks
+            stages = " ".join(
+                f"{m.name}={m.elapsed_ms}/{m.queue_wait_ms}/{m.blocked_ms}" for m in result.step_metrics
+            )
+        else:
+            stages = (f"{result.diagnostics.get('error', result.status)}; overrun "
+                      f"{wall * 1000 - args.deadline_ms:.0f} ms; progress {result.progress}")
+        print(f"{name:>10} {wall * 1000:>8.0f}  {stages}")
+
+
+if __name__ == "__main__":
+    main()
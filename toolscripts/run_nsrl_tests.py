@@ -0,0 +1,63 @@
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prometheus_client import CollectorRegistry, write_to_textfile
+
+from agents.policy_agent import PolicyAgent
+from agents.rule_testing import RuleProfiler, run_rule_tests
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the NSRL test cases (nsrl/tests/*.yml) against PolicyAgent."
+    )
+    parser.add_argument("--rules-dir", default="nsrl/rules")
+    parser.add_argument("--tests-dir", default="nsrl/tests")
+    parser.add_argument("--profile", action="store_true", help="Record per-rule counts, match rates and time.")
+    parser.add_argument("--repeat", type=int, default=1, help="Run the cases N times (profiling workload).")
+    parser.add_argument("--report", help="Write the JSON report (results and profile) to this path.")
+    parser.add_argument("--metrics", help="Write the profile as a Prometheus textfile to this path.")
+    args = parser.parse_args()
+
+    agent = PolicyAgent(rules_dir=args.rules_dir, hot_reload=False)
+    if args.profile or args.metrics:
+        agent.profiler = RuleProfiler()
+
+    for _ in range(max(1, args.repeat)):
+        summary = run_rule_tests(agent, args.tests_dir)
+
+    for result in summary["results"]:
+        status = "PASS" if result["passed"] else "FAIL"
+        print(f"[{status}] {result['suite']}: {result['name']}")
+        for failure in result["failures"]:
+            print(f"       {failure}")
+    print(f"{summary['passed']}/{summary['total']} passed (rule set {summary['rule_set_version']})")
+
+    report = {"tests": summary}
+    if agent.profiler is not None:
+        rows = agent.profiler.report(rule.id for rule in agent.rules)
+        report["profile"] = rows
+        print(f"\n{'rule_id':<32} {'evals':>8} {'matches':>8} {'rate':>7} {'total_ms':>10} {'mean_us':>9}")
+        for row in rows:
+            print(
+                f"{row['rule_id']:<32} {row['evaluations']:>8} {row['matches']:>8} "
+                f"{row['match_rate']:>7.2%} {row['total_ms']:>10.3f} {row['mean_us']:>9.3f}"
+            )
+        if args.metrics:
+            registry = CollectorRegistry()
+            registry.register(agent.profiler)
+            write_to_textfile(args.metrics, registry)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    sys.exit(0 if summary["failed"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.rule_integrity import IntegrityPolicy, render_manifest_checksums
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Regenerate the checksums block of nsrl/meta/policy_manifest.yml."
+    )
+    parser.add_argument("--nsrl-root", default="nsrl")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if the manifest is out of date.")
+    args = parser.parse_args()
+
+    policy = IntegrityPolicy.load(os.path.join(args.nsrl_root, "security", "integrity_checks.yml"))
+    manifest_path = os.path.join(args.nsrl_root, policy.manifest_path)
+    updated = render_manifest_checksums(args.nsrl_root, policy)
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        current = f.read()
+
+    if args.check:
+        if current != updated:
+            print(f"{manifest_path} checksums are out of date.")
+            sys.exit(1)
+        print(f"{manifest_path} is up to date.")
+        return
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        f.write(updated)
+    print(f"Updated checksums in {manifest_path}.")
+
+
+if __name__ == "__main__":
+    main()